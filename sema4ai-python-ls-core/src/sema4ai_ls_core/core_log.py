@@ -21,9 +21,12 @@ Note that we have 3 levels:
 2: show debug
 """
 
+import atexit
+import collections
 import os.path
 import sys
 import threading
+import time
 import traceback
 from datetime import datetime
 
@@ -39,19 +42,85 @@ def _as_str(s):
     return s
 
 
-MAX_LOG_MSG_SIZE = 20000
-try:
-    MAX_LOG_MSG_SIZE = int(os.environ.get("MAX_LOG_MSG_SIZE", MAX_LOG_MSG_SIZE))
-except Exception:
-    pass
+def _get_int_from_env(env_var: str, default: int) -> int:
+    try:
+        return int(os.environ.get(env_var, default))
+    except Exception:
+        return default
+
+
+MAX_LOG_MSG_SIZE = _get_int_from_env("MAX_LOG_MSG_SIZE", 20000)
+
+# When the log file goes over this size it's renamed to `<log file>.1` (only
+# one backup is kept) and a new log file is started.
+MAX_LOG_FILE_SIZE = _get_int_from_env("MAX_LOG_FILE_SIZE", 100 * 1024 * 1024)
+
+# Debug messages bigger than this are considered payload-heavy (i.e.: the
+# messages read/written in the language server protocol)...
+PAYLOAD_DEBUG_MSG_SIZE = _get_int_from_env("PAYLOAD_DEBUG_MSG_SIZE", 2000)
+
+# ... and only this amount of those is logged per second (the others are
+# dropped and a note with the number of dropped messages is logged).
+MAX_PAYLOAD_DEBUG_MSGS_PER_SECOND = _get_int_from_env(
+    "MAX_PAYLOAD_DEBUG_MSGS_PER_SECOND", 50
+)
+
+# Time the writer thread waits to collect debug messages to write in a batch.
+LOG_WRITE_INTERVAL = 0.2
+
+# The args with one of those types may be formatted later on (in the writer
+# thread) as they can't be changed afterwards.
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _format_message(msg, args) -> str:
+    msg = _as_str(msg)
+    if args:
+        args = tuple(_as_str(arg) for arg in args)
+        try:
+            return msg % args
+        except Exception:
+            return f"{msg} - {args}"
+    return msg
 
 
 class _LogConfig:
-    __slots__ = ["_lock", "__stream", "prefix", "log_level", "_log_file", "pid"]
+    """
+    Messages with the debug level are queued and then formatted and written
+    in batches by a writer thread (so, the threads logging debug messages
+    don't do any I/O). Messages with other levels are written right away
+    (after the messages already queued, so that the order is kept).
+    """
+
+    __slots__ = [
+        "_lock",
+        "__stream",
+        "prefix",
+        "log_level",
+        "_log_file",
+        "pid",
+        "_written",
+        "_pending",
+        "_pending_event",
+        "_writer_thread",
+        "_payload_lock",
+        "_payload_window_start",
+        "_payload_msgs",
+        "_payload_msgs_dropped",
+    ]
 
     def __init__(self):
         self._lock = threading.Lock()
         self.__stream = None
+        self._written = 0
+        self._pending = collections.deque()
+        self._pending_event = threading.Event()
+        self._writer_thread = None
+
+        self._payload_lock = threading.Lock()
+        self._payload_window_start = 0.0
+        self._payload_msgs = 0
+        self._payload_msgs_dropped = 0
 
         self.prefix = ""
         self.log_level = 0
@@ -65,6 +134,9 @@ class _LogConfig:
     @log_file.setter
     def log_file(self, log_file):
         with self._lock:
+            # Messages still pending go to the previous stream.
+            self._write_pending_unlocked()
+
             if log_file is None:
                 self._log_file = None
                 self.__stream = None
@@ -78,30 +150,34 @@ class _LogConfig:
                 self._log_file = None
                 self.__stream = log_file
 
-    @property
-    def _stream(self):
+    def _get_stream_unlocked(self):
         stream = self.__stream
         if stream is None:
             # open it on demand
-            with self._lock:
-                log_file = self._log_file
-                if self.__stream is None:
-                    stream = sys.stderr
-                    if log_file:
-                        stream = open(log_file, "w")
-                    self.__stream = stream
-                    return stream
-
+            stream = sys.stderr
+            log_file = self._log_file
+            if log_file:
+                stream = open(log_file, "w")
+                self._written = 0
+            self.__stream = stream
         return stream
 
     def close_logging_streams(self):
         with self._lock:
+            self._write_pending_unlocked()
             if self.__stream is not None:
                 self.__stream.write("-- Closing logging streams --")
                 self.__stream.close()
             self.__stream = NULL
 
-    def report(self, logger_name, show_stacktrace, levelname, message, trim):
+    def flush(self):
+        """
+        Writes the messages still pending.
+        """
+        with self._lock:
+            self._write_pending_unlocked()
+
+    def _format(self, logger_name, levelname, threadname, timestamp, message, trim):
         if trim:
             msg_len = len(message)
             if msg_len > MAX_LOG_MSG_SIZE:
@@ -111,33 +187,173 @@ class _LogConfig:
             self.prefix
             + ": %(asctime)s UTC pid: %(process)d - %(threadname)s - %(levelname)s - %(name)s\n%(message)s\n\n"
         )
-        msg = log_format % {
-            "asctime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        return log_format % {
+            "asctime": datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S"),
             "process": self.pid,
-            "threadname": threading.current_thread().name,
+            "threadname": threadname,
             "levelname": levelname,
             "name": logger_name,
             "message": message,
         }
+
+    def _write_unlocked(self, stream, text):
+        stream.write(text)
+        self._written += len(text)
+
+    def _flush_unlocked(self, stream):
+        stream.flush()
+
+        log_file = self._log_file
+        if log_file and self._written > MAX_LOG_FILE_SIZE and stream is self.__stream:
+            # Rotate the log file.
+            self._written = 0
+            try:
+                stream.close()
+                os.replace(log_file, log_file + ".1")
+            except Exception:
+                pass
+            self.__stream = open(log_file, "w")
+
+    def _write_pending_unlocked(self):
+        pending = self._pending
+        if not pending:
+            return
+
+        parts = []
+        # Note: the number of entries is fixed so that this finishes even if
+        # other threads keep on adding messages.
+        for _i in range(len(pending)):
+            logger_name, levelname, threadname, timestamp, msg, args, trim = (
+                pending.popleft()
+            )
+            message = _format_message(msg, args)
+            parts.append(
+                self._format(
+                    logger_name, levelname, threadname, timestamp, message, trim
+                )
+            )
+        try:
+            stream = self._get_stream_unlocked()
+            self._write_unlocked(stream, "".join(parts))
+            self._flush_unlocked(stream)
+        except Exception:
+            pass  # Never fail when logging.
+
+    def report(self, logger_name, show_stacktrace, levelname, message, trim):
+        msg = self._format(
+            logger_name,
+            levelname,
+            threading.current_thread().name,
+            time.time(),
+            message,
+            trim,
+        )
         try:
-            # Get stream without using the lock to avoid deadlocks.
-            stream = self._stream
             with self._lock:
-                stream.write(msg)
+                self._write_pending_unlocked()
+                stream = self._get_stream_unlocked()
+                self._write_unlocked(stream, msg)
                 if show_stacktrace:
                     traceback.print_exc(file=stream)
-                stream.flush()
+                self._flush_unlocked(stream)
         except Exception:
             pass  # Never fail when logging.
 
+    def _accept_payload_msg(self) -> bool:
+        with self._payload_lock:
+            now = time.monotonic()
+            if now - self._payload_window_start >= 1:
+                dropped = self._payload_msgs_dropped
+                self._payload_window_start = now
+                self._payload_msgs = 0
+                self._payload_msgs_dropped = 0
+                if dropped:
+                    self._pending.append(
+                        (
+                            __name__,
+                            "DEBUG",
+                            threading.current_thread().name,
+                            time.time(),
+                            "Dropped %s payload-heavy debug messages (max per second: %s).",
+                            (dropped, MAX_PAYLOAD_DEBUG_MSGS_PER_SECOND),
+                            False,
+                        )
+                    )
+
+            self._payload_msgs += 1
+            if self._payload_msgs > MAX_PAYLOAD_DEBUG_MSGS_PER_SECOND:
+                self._payload_msgs_dropped += 1
+                return False
+            return True
+
+    def report_async(self, logger_name, levelname, msg, args, trim):
+        """
+        Queues the message to be formatted and written by the writer thread.
+        """
+        if args and not all(isinstance(arg, _IMMUTABLE_TYPES) for arg in args):
+            # The args could change, so, format right away.
+            msg = _format_message(msg, args)
+            args = ()
+            payload_size = len(msg)
+        else:
+            payload_size = len(msg) + sum(
+                len(arg) for arg in args if isinstance(arg, (str, bytes))
+            )
+
+        if payload_size > PAYLOAD_DEBUG_MSG_SIZE and not self._accept_payload_msg():
+            return
+
+        self._pending.append(
+            (
+                logger_name,
+                levelname,
+                threading.current_thread().name,
+                time.time(),
+                msg,
+                args,
+                trim,
+            )
+        )
+        if not self._pending_event.is_set():
+            self._pending_event.set()
+
+        if self._writer_thread is None:
+            self._start_writer_thread()
+
+    def _start_writer_thread(self):
+        with self._lock:
+            if self._writer_thread is not None:
+                return
+            t = self._writer_thread = threading.Thread(
+                target=self._run_writer, name="LogWriter"
+            )
+            t.daemon = True
+            t.start()
+
+    def _run_writer(self):
+        while True:
+            self._pending_event.wait()
+            # Wait a bit so that the messages are written in batches.
+            time.sleep(LOG_WRITE_INTERVAL)
+            self._pending_event.clear()
+            self.flush()
+
 
 _log_config = _LogConfig()
+atexit.register(_log_config.flush)
 
 
 def close_logging_streams():
     _log_config.close_logging_streams()
 
 
+def flush_logging_streams():
+    """
+    Writes the debug messages which are still queued.
+    """
+    _log_config.flush()
+
+
 class _Logger:
     def __init__(self, name):
         self.name = name
@@ -156,7 +372,7 @@ class _Logger:
 
     def debug(self, msg="", *args):
         if _log_config.log_level >= 2:
-            self._report("DEBUG", False, True, msg, *args)
+            _log_config.report_async(self.name, "DEBUG", msg, args, True)
 
     warn = warning = info
     error = exception
@@ -174,16 +390,7 @@ class _Logger:
         return logging.ERROR
 
     def _report(self, levelname, show_stacktrace, trim, msg="", *args):
-        msg = _as_str(msg)
-        if args:
-            args = tuple(_as_str(arg) for arg in args)
-            try:
-                message = msg % args
-            except Exception:
-                message = f"{msg} - {args}"
-        else:
-            message = msg
-
+        message = _format_message(msg, args)
         _log_config.report(self.name, show_stacktrace, levelname, message, trim)
 
 
@@ -209,6 +416,8 @@ def get_logger(name: str) -> ILog:
 
 
 def _configure_logger(prefix, log_level, log_file):
+    # Messages still queued are written with the previous configuration.
+    _log_config.flush()
     _log_config.prefix = prefix
     _log_config.log_level = log_level
     _log_config.log_file = log_file
@@ -26,7 +26,6 @@ writer_thread just keeps on sending any message posted to the queue it receives.
 from functools import partial
 import itertools
 from sema4ai_ls_core.core_log import get_logger, get_log_level
-import json
 from typing import Optional, Dict
 
 
@@ -39,7 +38,7 @@ STOP_WRITER_THREAD = "STOP_WRITER_THREAD"
 READER_THREAD_STOPPED = "READER_THREAD_STOPPED"
 
 
-def read(stream, debug_prefix=b"read") -> dict | None:
+def read(stream, debug_prefix=b"read", codec=None) -> dict | None:
     """
     Reads one message from the stream and returns the related dict (or None if EOF was reached).
 
@@ -49,67 +48,35 @@ def read(stream, debug_prefix=b"read") -> dict | None:
     :return dict|NoneType:
         The dict which represents a message or None if the stream was closed.
     """
-    headers = {}
-    while True:
-        # Interpret the http protocol headers
-        line = stream.readline()  # The trailing \r\n should be there.
+    from sema4ai_ls_core.jsonrpc.streams import read_bytes
 
+    body = read_bytes(stream)
+    if body is None:  # EOF
         if get_log_level() > 1:
-            log.debug(
-                (
-                    debug_prefix
-                    + b": >>%s<<\n"
-                    % (line.replace(b"\r", b"\\r").replace(b"\n", b"\\n"))
-                ).decode("utf-8", "replace")
-            )
-
-        if not line:  # EOF
-            return None
-        line = line.strip().decode("ascii")
-        if not line:  # Read just a new line without any contents
-            break
-        try:
-            name, value = line.split(": ", 1)
-        except ValueError:
-            raise RuntimeError(f"Invalid header line: {line}.")
-        headers[name.strip()] = value.strip()
-
-    if not headers:
-        raise RuntimeError("Got message without headers.")
-
-    content_length = int(headers["Content-Length"])
-
-    # Get the actual json
-    body = _read_len(stream, content_length)
+            log.debug((debug_prefix + b": >>EOF<<\n").decode("utf-8", "replace"))
+        return None
+
     if get_log_level() > 1:
         log.debug((debug_prefix + b": %s" % (body,)).decode("utf-8", "replace"))
 
+    if codec is None:
+        codec = _get_default_codec()
     try:
-        return json.loads(body.decode("utf-8"))
+        return codec.loads(body)
     except:
-        raise RuntimeError(f"Error reading: {body!r}")
-
-
-def _read_len(stream, content_length) -> bytes:
-    buf = b""
-    if not content_length:
-        return buf
-
-    # Grab the body
-    while True:
-        data = stream.read(content_length - len(buf))
-        if not buf and len(data) == content_length:
-            # Common case
-            return data
-        buf += data
-        if len(buf) == content_length:
-            return buf
-        if len(buf) > content_length:
-            raise AssertionError(
-                "Expected to read message up to len == %s (already read: %s). Found:\n%s"
-                % (content_length, len(buf), buf.decode("utf-8", "replace"))
-            )
-        # len(buf) < content_length (just keep on going).
+        raise RuntimeError(f"Error reading: {bytes(body)!r}")
+
+
+_default_codec = None
+
+
+def _get_default_codec():
+    global _default_codec
+    if _default_codec is None:
+        from sema4ai_ls_core.jsonrpc.json_codec import create_json_codec
+
+        _default_codec = create_json_codec()
+    return _default_codec
 
 
 def reader_thread(
@@ -126,9 +93,10 @@ def reader_thread(
     )
     from sema4ai_ls_core.debug_adapter_core.dap.dap_schema import Response
 
+    codec = _get_default_codec()
     try:
         while True:
-            data = read(stream, debug_prefix)
+            data = read(stream, debug_prefix, codec)
             if data is None:
                 break
             try:
@@ -171,6 +139,9 @@ def writer_thread_no_auto_seq(
     Same as writer_thread but does not set the message 'seq' automatically
     (meant to be used when responses, which need the seq id set need to be handled).
     """
+    from sema4ai_ls_core.jsonrpc.streams import frame_message
+
+    codec = _get_default_codec()
     try:
         while True:
             to_write = queue.get()
@@ -182,7 +153,7 @@ def writer_thread_no_auto_seq(
             if isinstance(to_write, dict):
                 assert "seq" in to_write
                 try:
-                    to_write = json.dumps(to_write)
+                    to_write = codec.dumps(to_write)
                 except:
                     log.exception("Error serializing %s to json.", to_write)
                     continue
@@ -193,23 +164,22 @@ def writer_thread_no_auto_seq(
                     # Some protocol message
                     assert to_write.seq >= 0
                     try:
-                        to_write = to_json(update_ids_to_dap=update_ids_to_dap)
+                        to_write = codec.dumps(
+                            to_write.to_dict(update_ids_to_dap=update_ids_to_dap)
+                        )
                     except:
                         log.exception("Error serializing %s to json.", to_write)
                         continue
 
-            if get_log_level() > 1:
-                log.debug(debug_prefix + ": %s\n", to_write)
-
             if to_write.__class__ == bytes:
                 as_bytes = to_write
             else:
                 as_bytes = to_write.encode("utf-8")
 
-            stream.write(
-                ("Content-Length: %s\r\n\r\n" % (len(as_bytes))).encode("ascii")
-            )
-            stream.write(as_bytes)
+            if get_log_level() > 1:
+                log.debug(debug_prefix + ": %s\n", as_bytes.decode("utf-8", "replace"))
+
+            stream.write(frame_message(as_bytes))
             stream.flush()
     except:
         log.exception("Error writing message.")
@@ -221,7 +191,10 @@ def writer_thread(stream, queue, debug_prefix="write", update_ids_to_dap=False):
     """
     Same as writer_thread_no_auto_seq but sets the message 'seq' automatically.
     """
+    from sema4ai_ls_core.jsonrpc.streams import frame_message
+
     _next_seq = partial(next, itertools.count())
+    codec = _get_default_codec()
 
     try:
         while True:
@@ -234,7 +207,7 @@ def writer_thread(stream, queue, debug_prefix="write", update_ids_to_dap=False):
             if isinstance(to_write, dict):
                 to_write["seq"] = _next_seq()
                 try:
-                    to_write = json.dumps(to_write)
+                    to_write = codec.dumps(to_write)
                 except:
                     log.exception("Error serializing %s to json.", to_write)
                     continue
@@ -245,23 +218,22 @@ def writer_thread(stream, queue, debug_prefix="write", update_ids_to_dap=False):
                     # Some protocol message
                     to_write.seq = _next_seq()
                     try:
-                        to_write = to_json(update_ids_to_dap=update_ids_to_dap)
+                        to_write = codec.dumps(
+                            to_write.to_dict(update_ids_to_dap=update_ids_to_dap)
+                        )
                     except:
                         log.exception("Error serializing %s to json.", to_write)
                         continue
 
-            if get_log_level() > 1:
-                log.debug(debug_prefix + ": %s\n", to_write)
-
             if to_write.__class__ == bytes:
                 as_bytes = to_write
             else:
                 as_bytes = to_write.encode("utf-8")
 
-            stream.write(
-                ("Content-Length: %s\r\n\r\n" % (len(as_bytes))).encode("ascii")
-            )
-            stream.write(as_bytes)
+            if get_log_level() > 1:
+                log.debug(debug_prefix + ": %s\n", as_bytes.decode("utf-8", "replace"))
+
+            stream.write(frame_message(as_bytes))
             stream.flush()
     except ConnectionResetError:
         pass  # No need to log this
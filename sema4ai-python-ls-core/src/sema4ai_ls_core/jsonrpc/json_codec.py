@@ -0,0 +1,129 @@
+"""
+Provides the json encoding/decoding used for the messages in the json-rpc
+streams.
+
+When available, `orjson` or `msgspec` are used (they're much faster than the
+builtin `json` module). Anything the fast codec can't deal with (i.e.: str
+subclasses in msgspec, integers bigger than 64 bits in orjson or `NaN` when
+decoding) falls back to the builtin `json` module.
+
+Note: the fast codec is only used to encode dicts (which is what the
+json-rpc/dap messages are) and msgspec serializes some types which the
+builtin `json` can't (such as sets and datetimes inside those dicts).
+
+The codec may be forced through the `ROBOTFRAMEWORK_LS_JSON_CODEC` environment
+variable (one of: "orjson", "msgspec", "json").
+"""
+
+import json
+import os
+from collections.abc import Callable
+from typing import Any
+
+from sema4ai_ls_core.core_log import get_logger
+
+log = get_logger(__name__)
+
+BytesLike = bytes | bytearray | memoryview
+
+
+class JsonCodec:
+    def __init__(
+        self,
+        name: str = "json",
+        fast_dumps: Callable[[Any], bytes] | None = None,
+        fast_loads: Callable[[BytesLike], Any] | None = None,
+        **json_dumps_args,
+    ) -> None:
+        self.name = name
+        self._fast_dumps = fast_dumps
+        self._fast_loads = fast_loads
+        self._json_dumps_args = json_dumps_args
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        :raises TypeError: if the object can't be serialized.
+        """
+        if self._fast_dumps is not None and obj.__class__ is dict:
+            try:
+                return self._fast_dumps(obj)
+            except Exception:
+                pass  # Fall back to the builtin json.
+        return json.dumps(obj, **self._json_dumps_args).encode("utf-8")
+
+    def loads(self, data: BytesLike | str) -> Any:
+        """
+        :raises ValueError: if the data is not valid json.
+        """
+        if self._fast_loads is not None and not isinstance(data, str):
+            try:
+                return self._fast_loads(data)
+            except Exception:
+                pass  # Fall back to the builtin json.
+
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+
+def _create_orjson_codec(sort_keys: bool) -> JsonCodec:
+    import orjson
+
+    # Note: datetimes are passed through so that they fail as in the builtin
+    # json (instead of being serialized as a str).
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=option)
+
+    return JsonCodec("orjson", dumps, orjson.loads, sort_keys=sort_keys)
+
+
+def _create_msgspec_codec(sort_keys: bool) -> JsonCodec:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(order="sorted" if sort_keys else None)
+    decoder = msgspec.json.Decoder()
+    return JsonCodec("msgspec", encoder.encode, decoder.decode, sort_keys=sort_keys)
+
+
+_CODEC_FACTORIES: dict[str, Callable[[bool], JsonCodec]] = {
+    "orjson": _create_orjson_codec,
+    "msgspec": _create_msgspec_codec,
+}
+
+
+def create_json_codec(codec_name: str | None = None, **json_dumps_args) -> JsonCodec:
+    """
+    :param codec_name: The codec to be used (if not given it's gotten from
+        the `ROBOTFRAMEWORK_LS_JSON_CODEC` environment variable or the
+        fastest available is used).
+
+    :param json_dumps_args: The arguments for `json.dumps` (only `sort_keys`
+        is supported by the fast codecs, so, if other arguments are given the
+        builtin json is used).
+    """
+    if codec_name is None:
+        codec_name = os.environ.get("ROBOTFRAMEWORK_LS_JSON_CODEC", "").strip()
+
+    sort_keys = bool(json_dumps_args.get("sort_keys", False))
+    if set(json_dumps_args).difference(("sort_keys",)) or codec_name == "json":
+        return JsonCodec("json", **json_dumps_args)
+
+    if codec_name:
+        names = [codec_name]
+    else:
+        names = list(_CODEC_FACTORIES)
+
+    for name in names:
+        factory = _CODEC_FACTORIES.get(name)
+        if factory is None:
+            log.info("Unknown json codec: %s", name)
+            continue
+        try:
+            return factory(sort_keys)
+        except ImportError:
+            continue
+    return JsonCodec("json", **json_dumps_args)
@@ -15,94 +15,139 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import threading
-from sema4ai_ls_core.core_log import get_logger
-from typing import Optional
-import json
+from sema4ai_ls_core.core_log import get_logger, get_log_level
 from sema4ai_ls_core.options import BaseOptions
 import queue
 
 log = get_logger(__name__)
 
+_CONTENT_LENGTH = b"Content-Length"
 
-def read(stream) -> str | None:
+
+def read_bytes(stream) -> bytes | bytearray | None:
     """
-    Reads one message from the stream and returns the message (or None if EOF was reached).
+    Reads one message from the stream and returns the message bytes (or None if EOF was reached).
 
     :param stream:
-        The stream we should be reading from.
-
-    :return str|NoneType:
-        The message or None if the stream was closed.
+        The (binary) stream we should be reading from.
     """
-    headers = {}
+    content_length = None
+    has_headers = False
     while True:
         # Interpret the http protocol headers
         line = stream.readline()  # The trailing \r\n should be there.
 
         if not line:  # EOF
             return None
-        line = line.strip().decode("ascii")
+        line = line.strip()
         if not line:  # Read just a new line without any contents
             break
-        try:
-            name, value = line.split(": ", 1)
-        except ValueError:
-            raise RuntimeError(f"Invalid header line: {line}.")
-        headers[name.strip()] = value.strip()
+        name, sep, value = line.partition(b": ")
+        if not sep:
+            raise RuntimeError(
+                f"Invalid header line: {line.decode('ascii', 'replace')}."
+            )
+        has_headers = True
+        if name.strip() == _CONTENT_LENGTH:
+            content_length = int(value)
 
-    if not headers:
+    if not has_headers:
         raise RuntimeError("Got message without headers.")
 
-    content_length = int(headers["Content-Length"])
+    if content_length is None:
+        raise RuntimeError("Got message without Content-Length header.")
 
     # Get the actual json
-    body = _read_len(stream, content_length)
+    return _read_len(stream, content_length)
+
+
+def read(stream) -> str | None:
+    """
+    Reads one message from the stream and returns the message (or None if EOF was reached).
+
+    :param stream:
+        The stream we should be reading from.
+
+    :return str|NoneType:
+        The message or None if the stream was closed.
+    """
+    body = read_bytes(stream)
+    if body is None:
+        return None
     return body.decode("utf-8")
 
 
-def _read_len(stream, content_length) -> bytes:
-    buf = b""
+def _read_len(stream, content_length) -> bytes | bytearray:
     if not content_length:
-        return buf
+        return b""
 
-    # Grab the body
-    while True:
-        data = stream.read(content_length - len(buf))
-        if not buf and len(data) == content_length:
-            # Common case
-            return data
-        buf += data
-        if len(buf) == content_length:
-            return buf
-        if len(buf) > content_length:
-            raise AssertionError(
-                "Expected to read message up to len == %s (already read: %s). Found:\n%s"
-                % (content_length, len(buf), buf.decode("utf-8", "replace"))
+    data = stream.read(content_length)
+    if len(data) == content_length:
+        # Common case
+        return data
+
+    if len(data) > content_length:
+        raise AssertionError(
+            "Expected to read message up to len == %s (already read: %s). Found:\n%s"
+            % (content_length, len(data), data.decode("utf-8", "replace"))
+        )
+
+    # Partial read: read the remainder directly into a buffer with the
+    # expected size.
+    buf = bytearray(content_length)
+    view = memoryview(buf)
+    read_len = len(data)
+    view[:read_len] = data
+    readinto = getattr(stream, "readinto", None)
+    while read_len < content_length:
+        if readinto is not None:
+            n = readinto(view[read_len:])
+        else:
+            data = stream.read(content_length - read_len)
+            n = len(data)
+            view[read_len : read_len + n] = data
+        if not n:
+            raise EOFError(
+                "Expected to read message up to len == %s (but EOF was reached after: %s)."
+                % (content_length, read_len)
             )
-        # len(buf) < content_length (just keep on going).
+        read_len += n
+    return buf
+
+
+def frame_message(body: bytes) -> bytes:
+    """
+    :return: the message (with the headers) to be written to the stream.
+    """
+    return b"Content-Length: %d\r\n\r\n%b" % (len(body), body)
 
 
 class _JsonRpcStreamReaderThread(threading.Thread):
-    def __init__(self, rfile, queue, message_consumer):
+    def __init__(self, rfile, queue, message_consumer, codec):
         threading.Thread.__init__(self)
         self._rfile = rfile
         self._queue = queue
         self._message_consumer = message_consumer
+        self._codec = codec
         self.name = "_JsonRpcStreamReaderThread"
         self.daemon = True
 
     def run(self):
         try:
+            codec = self._codec
             while not self._rfile.closed:
-                data = read(self._rfile)
+                data = read_bytes(self._rfile)
                 if data is None:
                     log.debug("Read: %s", data)
                     return
 
                 try:
-                    msg = json.loads(data)
+                    msg = codec.loads(data)
                 except:
-                    log.exception("Failed to parse JSON message %s", data)
+                    log.exception(
+                        "Failed to parse JSON message %s",
+                        data.decode("utf-8", "replace"),
+                    )
                     continue
 
                 if isinstance(msg, dict):
@@ -116,10 +161,13 @@ class _JsonRpcStreamReaderThread(threading.Thread):
                             log.exception("Error processing JSON message %s", msg)
                         continue
 
-                    if msg.get("command") not in BaseOptions.HIDE_COMMAND_MESSAGES:
-                        log.debug("Read: %s", data)
-                else:
-                    log.debug("Read (non dict data): %s", data)
+                    if get_log_level() > 1:
+                        if msg.get("command") not in BaseOptions.HIDE_COMMAND_MESSAGES:
+                            log.debug("Read: %s", data.decode("utf-8", "replace"))
+                elif get_log_level() > 1:
+                    log.debug(
+                        "Read (non dict data): %s", data.decode("utf-8", "replace")
+                    )
 
                 self._queue.put(msg)
 
@@ -144,10 +192,13 @@ class _JsonRpcStreamReaderThread(threading.Thread):
 
 
 class JsonRpcStreamReader:
-    def __init__(self, rfile):
+    def __init__(self, rfile, codec_name: str | None = None):
+        from sema4ai_ls_core.jsonrpc.json_codec import create_json_codec
+
         self._rfile = rfile
-        self._queue = queue.Queue()
+        self._queue: queue.Queue = queue.Queue()
         self._reader_thread = None
+        self._codec = create_json_codec(codec_name)
 
     def get_read_queue(self):
         return self._queue
@@ -165,7 +216,7 @@ class JsonRpcStreamReader:
             message_consumer (fn): function that is passed each message as it is read off the socket.
         """
         self._reader_thread = _JsonRpcStreamReaderThread(
-            self._rfile, self._queue, message_consumer
+            self._rfile, self._queue, message_consumer, self._codec
         )
         self._reader_thread.start()
         try:
@@ -194,11 +245,13 @@ class JsonRpcStreamReader:
 
 
 class JsonRpcStreamWriter:
-    def __init__(self, wfile, **json_dumps_args):
+    def __init__(self, wfile, codec_name: str | None = None, **json_dumps_args):
+        from sema4ai_ls_core.jsonrpc.json_codec import create_json_codec
+
         assert wfile is not None
         self._wfile = wfile
         self._wfile_lock = threading.Lock()
-        self._json_dumps_args = json_dumps_args
+        self._codec = create_json_codec(codec_name, **json_dumps_args)
 
     def close(self):
         log.debug("Will close writer")
@@ -206,26 +259,35 @@ class JsonRpcStreamWriter:
             self._wfile.close()
 
     def write(self, message):
+        if self._wfile.closed:
+            log.debug("Unable to write %s (file already closed).", (message,))
+            return False
+
+        try:
+            if isinstance(message, dict):
+                if message.get("command") not in BaseOptions.HIDE_COMMAND_MESSAGES:
+                    log.debug("Writing: %s", message)
+            else:
+                log.debug("Writing (non dict message): %s", message)
+
+            # Note: serialize without holding the lock (only the actual
+            # write must be synchronized).
+            framed = frame_message(self._codec.dumps(message))
+        except Exception:  # pylint: disable=broad-except
+            log.exception(
+                "Failed to write message to output file %s - closed: %s",
+                message,
+                self._wfile.closed,
+            )
+            return False
+
         with self._wfile_lock:
             if self._wfile.closed:
                 log.debug("Unable to write %s (file already closed).", (message,))
                 return False
             try:
-                if isinstance(message, dict):
-                    if message.get("command") not in BaseOptions.HIDE_COMMAND_MESSAGES:
-                        log.debug("Writing: %s", message)
-                else:
-                    log.debug("Writing (non dict message): %s", message)
-
-                body = json.dumps(message, **self._json_dumps_args)
-
-                as_bytes = body.encode("utf-8")
                 stream = self._wfile
-                content_len_as_str = "Content-Length: %s\r\n\r\n" % len(as_bytes)
-                content_len_bytes = content_len_as_str.encode("ascii")
-
-                stream.write(content_len_bytes)
-                stream.write(as_bytes)
+                stream.write(framed)
                 stream.flush()
                 return True
             except Exception:  # pylint: disable=broad-except
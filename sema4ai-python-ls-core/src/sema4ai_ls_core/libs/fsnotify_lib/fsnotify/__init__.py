@@ -362,6 +362,19 @@ class Watcher:
 
         :rtype: Iterable[Tuple[Change, str]]
         """
+        for changes in self.iter_change_batches():
+            yield from changes
+
+    def iter_change_batches(self):
+        """
+        Continuously provides the changes found in each scan (until dispose()
+        is called).
+
+        Each batch is a (non-empty) list of tuples with the Change enum and
+        filesystem path.
+
+        :rtype: Iterable[List[Tuple[Change, str]]]
+        """
         while not self._disposed.is_set():
 
             with self._lock:
@@ -381,7 +394,8 @@ class Watcher:
             for entry in old_file_to_mtime:
                 append_change((Change.deleted, entry))
 
-            yield from changes
+            if changes:
+                yield changes
 
             actual_time = time.time() - initial_time
             if self.print_poll_time:
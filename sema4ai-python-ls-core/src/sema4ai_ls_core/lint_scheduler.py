@@ -0,0 +1,251 @@
+"""
+A scheduler for lints which runs them in a bounded pool of threads.
+
+- Only one lint is pending per uri (scheduling a new one replaces the previous).
+- The same uri is never linted in parallel (if a new lint is scheduled while
+  the previous one is still running -- i.e.: it was cancelled but didn't finish
+  yet -- the new one waits for it to finish).
+- Lints with a lower priority value are run first (so, open documents are
+  linted before the ones requested in a manual lint).
+- Background lints (priority >= PRIORITY_MANUAL) have their own concurrency
+  limit (so that a manual lint of a big folder doesn't starve the open
+  documents).
+"""
+
+import heapq
+import itertools
+import os
+import threading
+from collections.abc import Callable
+from functools import partial
+
+from sema4ai_ls_core.core_log import get_logger
+
+log = get_logger(__name__)
+
+PRIORITY_OPEN_DOC = 0
+PRIORITY_MANUAL = 10
+
+# Threads which are idle for this amount of time exit (and are recreated
+# when needed).
+_WORKER_IDLE_TIMEOUT = 30
+
+
+def default_max_workers() -> int:
+    return max(2, min(32, os.cpu_count() or 1))
+
+
+class _ScheduledLint:
+    __slots__ = ["priority", "seq", "doc_uri", "task", "removed"]
+
+    def __init__(
+        self, priority: int, seq: int, doc_uri: str, task: Callable[[], None]
+    ) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.doc_uri = doc_uri
+        self.task = task
+        self.removed = False
+
+    def __lt__(self, other: "_ScheduledLint") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    @property
+    def is_background(self) -> bool:
+        return self.priority >= PRIORITY_MANUAL
+
+
+class LintScheduler:
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_background_workers: int | None = None,
+    ) -> None:
+        """
+        :param max_workers: The max number of threads used to lint.
+        :param max_background_workers: The max number of threads which may be
+            running background (manual) lints at the same time (by default
+            one thread is kept free for the open documents).
+        """
+        if max_workers is None:
+            max_workers = default_max_workers()
+        self._max_workers = max(1, max_workers)
+        self._max_background_workers = self._compute_max_background_workers(
+            max_background_workers
+        )
+
+        self._next_seq = partial(next, itertools.count())
+        self._condition = threading.Condition()
+
+        # All the fields below require the condition lock.
+        self._heap: list[_ScheduledLint] = []
+        self._uri_to_pending: dict[str, _ScheduledLint] = {}
+        self._running_uris: set[str] = set()
+        self._running_background = 0
+        self._num_workers = 0
+        self._idle_workers = 0
+        self._disposed = False
+
+    def _compute_max_background_workers(
+        self, max_background_workers: int | None
+    ) -> int:
+        if max_background_workers is None:
+            max_background_workers = self._max_workers - 1
+        return max(1, min(self._max_workers, max_background_workers))
+
+    def set_max_background_workers(self, max_background_workers: int | None) -> None:
+        with self._condition:
+            self._max_background_workers = self._compute_max_background_workers(
+                max_background_workers
+            )
+            self._ensure_workers()
+            self._condition.notify_all()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def max_background_workers(self) -> int:
+        return self._max_background_workers
+
+    def submit(
+        self, doc_uri: str, task: Callable[[], None], priority: int = PRIORITY_OPEN_DOC
+    ) -> None:
+        """
+        Schedules the given task to be run for the given uri (if there's already
+        a task pending for the uri it's replaced by this one).
+        """
+        with self._condition:
+            if self._disposed:
+                return
+            prev = self._uri_to_pending.pop(doc_uri, None)
+            if prev is not None:
+                prev.removed = True
+                # Keep the higher priority (i.e.: a document which was
+                # scheduled in a manual lint and is now open).
+                priority = min(priority, prev.priority)
+
+            scheduled = _ScheduledLint(priority, self._next_seq(), doc_uri, task)
+            self._uri_to_pending[doc_uri] = scheduled
+            heapq.heappush(self._heap, scheduled)
+            self._ensure_workers()
+            self._condition.notify()
+
+    def cancel(self, doc_uri: str) -> bool:
+        """
+        Removes the pending task for the given uri (tasks already running
+        must be cancelled through their own monitor).
+
+        :return: True if some pending task was removed.
+        """
+        with self._condition:
+            prev = self._uri_to_pending.pop(doc_uri, None)
+            if prev is not None:
+                prev.removed = True
+                return True
+            return False
+
+    def is_pending(self, doc_uri: str) -> bool:
+        with self._condition:
+            return doc_uri in self._uri_to_pending
+
+    def is_running(self, doc_uri: str) -> bool:
+        with self._condition:
+            return doc_uri in self._running_uris
+
+    def count_pending(self) -> int:
+        with self._condition:
+            return len(self._uri_to_pending)
+
+    def dispose(self) -> None:
+        with self._condition:
+            self._disposed = True
+            for scheduled in self._uri_to_pending.values():
+                scheduled.removed = True
+            self._uri_to_pending.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+
+    def _ensure_workers(self) -> None:
+        # Requires lock.
+        if self._num_workers >= self._max_workers:
+            return
+        if self._idle_workers >= len(self._uri_to_pending):
+            return
+        self._num_workers += 1
+        t = threading.Thread(target=self._worker_loop, name="Lint worker")
+        t.daemon = True
+        t.start()
+
+    def _pop_next(self) -> _ScheduledLint | None:
+        # Requires lock.
+        heap = self._heap
+        deferred = []
+        found = None
+        while heap:
+            scheduled = heapq.heappop(heap)
+            if scheduled.removed:
+                continue
+
+            if scheduled.is_background and (
+                self._running_background >= self._max_background_workers
+            ):
+                # Everything after this one is also a background lint.
+                deferred.append(scheduled)
+                break
+
+            if scheduled.doc_uri in self._running_uris:
+                # Wait for the current one for the same uri to finish.
+                deferred.append(scheduled)
+                continue
+
+            found = scheduled
+            break
+
+        for scheduled in deferred:
+            heapq.heappush(heap, scheduled)
+
+        if found is not None:
+            del self._uri_to_pending[found.doc_uri]
+        return found
+
+    def _worker_loop(self) -> None:
+        condition = self._condition
+        while True:
+            with condition:
+                while True:
+                    if self._disposed:
+                        self._num_workers -= 1
+                        return
+                    scheduled = self._pop_next()
+                    if scheduled is not None:
+                        break
+
+                    self._idle_workers += 1
+                    try:
+                        notified = condition.wait(_WORKER_IDLE_TIMEOUT)
+                    finally:
+                        self._idle_workers -= 1
+                    if not notified and not self._uri_to_pending:
+                        self._num_workers -= 1
+                        return
+
+                self._running_uris.add(scheduled.doc_uri)
+                is_background = scheduled.is_background
+                if is_background:
+                    self._running_background += 1
+                # There may be more work for other workers.
+                self._ensure_workers()
+
+            try:
+                scheduled.task()
+            except Exception:
+                log.exception("Error running lint for: %s", scheduled.doc_uri)
+            finally:
+                with condition:
+                    self._running_uris.discard(scheduled.doc_uri)
+                    if is_background:
+                        self._running_background -= 1
+                    # Deferred lints may be able to run now.
+                    condition.notify_all()
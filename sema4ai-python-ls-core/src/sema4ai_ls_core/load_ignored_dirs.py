@@ -1,7 +1,12 @@
-import os
-from typing import Optional, Dict
 import fnmatch
 import glob
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
 
 from sema4ai_ls_core.core_log import get_logger
 
@@ -109,32 +114,357 @@ def glob_matches_path(path, pattern, sep=os.sep, altsep=os.altsep):
     return _check_matches(patterns, paths)
 
 
+_DEFAULT_IGNORED_DIRS = (
+    "**/.git",
+    "**/__pycache__",
+    "**/.idea",
+    "**/node_modules",
+    "**/.metadata",
+    "**/.vscode",
+)
+
+# The names of the files with (gitignore-like) patterns which are honored.
+_IGNORE_FILE_NAMES = (".gitignore", ".ignore")
+
+_IGNORE_CASE = normcase("A") == normcase("a")
+
+# Time (in seconds) for which the ignore files of a directory aren't checked
+# again for changes (the results for directories which depend on the ignore
+# files are also only reused for this amount of time).
+_IGNORE_FILES_CHECK_INTERVAL = 3.0
+
+
+def _translate_component(component: str) -> str:
+    """
+    Translates a glob for a single path component into a regex (as
+    `fnmatch.translate`, but where wildcards don't match the separator).
+    """
+    i = 0
+    n = len(component)
+    res = []
+    while i < n:
+        c = component[i]
+        i += 1
+        if c == "*":
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and component[j] == "!":
+                j += 1
+            if j < n and component[j] == "]":
+                j += 1
+            j = component.find("]", j)
+            if j == -1:
+                res.append("\\[")
+            else:
+                stuff = component[i:j].replace("\\", "\\\\")
+                i = j + 1
+                if stuff.startswith("!"):
+                    stuff = "^/" + stuff[1:]
+                elif stuff.startswith(("^", "[")):
+                    stuff = "\\" + stuff
+                res.append(f"[{stuff}]")
+        else:
+            res.append(re.escape(c))
+    return "".join(res)
+
+
+def _components_to_regex(components: list[str]) -> str:
+    """
+    Creates a regex which matches paths in the format `/comp1/comp2`.
+    """
+    res = []
+    last = len(components) - 1
+    for i, component in enumerate(components):
+        if component == "**":
+            # Matches any number of components (at least one if it's the last).
+            res.append("(?:/[^/]+)+" if i == last else "(?:/[^/]+)*")
+        elif not glob.has_magic(component):
+            res.append("/" + re.escape(component))
+        else:
+            res.append("/" + _translate_component(component))
+    return "".join(res)
+
+
+def _glob_to_regex(pattern: str, sep=os.sep, altsep=os.altsep) -> str:
+    """
+    Translates a pattern (with the same semantics as `glob_matches_path`) into
+    a regex to match the paths converted with `_to_match_path`.
+    """
+    if altsep:
+        pattern = pattern.replace(altsep, sep)
+
+    drive_regex = "(?:[a-zA-Z]:)?"
+    if len(pattern) > 1 and pattern[1] == ":":
+        drive_regex = re.escape(pattern[:2])
+        pattern = pattern[2:]
+
+    components = [c for c in pattern.split(sep) if c]
+    return drive_regex + _components_to_regex(components)
+
+
+def _to_match_path(path: str) -> str:
+    """
+    Converts a path to the format used in the matching (i.e.: `c:/comp1/comp2`
+    or `/comp1/comp2`).
+    """
+    if os.altsep:
+        path = path.replace(os.sep, os.altsep)
+
+    drive = ""
+    if len(path) > 1 and path[1] == ":":
+        drive, path = path[:2], path[2:]
+
+    if "//" in path or not path.startswith("/") or path.endswith("/"):
+        path = "/" + "/".join(c for c in path.split("/") if c)
+    return drive + path
+
+
+def _ignore_file_line_to_regex(line: str) -> tuple[str, bool] | None:
+    """
+    Translates a line of a `.gitignore` (only the directory-related semantics
+    are relevant as only directories are checked).
+
+    :return: the regex (to match the path relative to the directory with the
+        ignore file in the format `/comp1/comp2`) and whether it's a negated
+        pattern (or None if the line has no pattern).
+    """
+    line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]  # i.e.: "\#" or "\!"
+
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A pattern with a separator is relative to the directory with the ignore
+    # file, otherwise it matches at any level.
+    anchored = "/" in line
+    components = [c for c in line.split("/") if c]
+    if not anchored:
+        components.insert(0, "**")
+    return _components_to_regex(components), negate
+
+
+def _stat_ignore_files(dir_path: str) -> tuple:
+    """
+    :return: a key which changes when the ignore files (or the `.git`) in the
+        given directory change.
+    """
+    key: list = []
+    for name in _IGNORE_FILE_NAMES:
+        try:
+            stat = os.stat(os.path.join(dir_path, name))
+        except OSError:
+            key.append(None)
+        else:
+            key.append((stat.st_mtime_ns, stat.st_size))
+    # Note: just the existence of the `.git` matters (its mtime changes on
+    # most git operations).
+    key.append(os.path.exists(os.path.join(dir_path, ".git")))
+    return tuple(key)
+
+
+def _load_ignore_file_rules(dir_path: str) -> tuple[tuple[re.Pattern, bool], ...]:
+    flags = re.IGNORECASE if _IGNORE_CASE else 0
+    rules = []
+    for name in _IGNORE_FILE_NAMES:
+        try:
+            with open(os.path.join(dir_path, name), encoding="utf-8") as stream:
+                contents = stream.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+
+        for line in contents.splitlines():
+            translated = _ignore_file_line_to_regex(line)
+            if translated is not None:
+                try:
+                    rules.append((re.compile(translated[0], flags), translated[1]))
+                except re.error:
+                    log.debug("Unable to handle ignore pattern: %s", line)
+    return tuple(rules)
+
+
+class AcceptDirectory:
+    """
+    Callable which provides whether a directory should be tracked (i.e.: it
+    doesn't match any of the ignored patterns).
+
+    The patterns are compiled into a single regex and the results are kept
+    in a (bounded) cache.
+
+    Note: patterns in `.gitignore`/`.ignore` files in the parent directories
+    of the directory being checked are also honored (the lookup for those
+    files stops at the root of the git repository and the files in the home
+    directory aren't considered as some users have a repository with a `*`
+    pattern in the home directory). The rules are keyed by the mtime/size of
+    the ignore files, which are checked again (along with the cached results)
+    after `ignore_files_check_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        ignored_dirs: Iterable[str],
+        use_ignore_files: bool = True,
+        max_cache_size: int = 20_000,
+        ignore_files_check_interval: float = _IGNORE_FILES_CHECK_INTERVAL,
+    ):
+        patterns = sorted(set(ignored_dirs))
+        self._patterns = patterns
+        flags = re.IGNORECASE if _IGNORE_CASE else 0
+        regex = "|".join(f"(?:{_glob_to_regex(pattern)})" for pattern in patterns)
+        self._regex: re.Pattern | None = re.compile(regex, flags) if regex else None
+        self._use_ignore_files = use_ignore_files
+        self._max_cache_size = max_cache_size
+        self._ignore_files_check_interval = ignore_files_check_interval
+        self._home = normcase(os.path.expanduser("~"))
+
+        self._lock = threading.Lock()
+        # dir path -> (accept, time computed)
+        self._cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+
+        # dir path -> (ignore file rules, whether it's a repository root,
+        # stat of the ignore files, time checked)
+        self._dir_rules: OrderedDict[
+            str, tuple[tuple[tuple[re.Pattern, bool], ...], bool, tuple, float]
+        ] = OrderedDict()
+
+    def _cache_get(self, cache: OrderedDict, key: str) -> Any:
+        with self._lock:
+            try:
+                value = cache[key]
+            except KeyError:
+                return None
+            cache.move_to_end(key)
+            return value
+
+    def _cache_set(self, cache: OrderedDict, key: str, value: Any) -> None:
+        with self._lock:
+            cache[key] = value
+            while len(cache) > self._max_cache_size:
+                cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._dir_rules.clear()
+
+    def _get_dir_rules(
+        self, dir_path: str
+    ) -> tuple[tuple[tuple[re.Pattern, bool], ...], bool]:
+        if normcase(dir_path) == self._home:
+            return ((), True)
+
+        now = time.monotonic()
+        cached = self._cache_get(self._dir_rules, dir_path)
+        if cached is not None and now - cached[3] < self._ignore_files_check_interval:
+            return cached[0], cached[1]
+
+        stat_key = _stat_ignore_files(dir_path)
+        if cached is not None and cached[2] == stat_key:
+            rules, is_repo_root = cached[0], cached[1]
+        else:
+            rules = _load_ignore_file_rules(dir_path)
+            is_repo_root = stat_key[-1]
+        self._cache_set(self._dir_rules, dir_path, (rules, is_repo_root, stat_key, now))
+        return rules, is_repo_root
+
+    def _matches_ignore_file(self, dir_path: str) -> bool:
+        """
+        :return: True if the directory is ignored by an ignore file in some
+            parent directory.
+        """
+        current = dir_path
+        parent = os.path.dirname(current)
+        while parent and parent != current:
+            rules, is_repo_root = self._get_dir_rules(parent)
+            if rules:
+                relative = _to_match_path(dir_path[len(parent) :])
+                # The last matching pattern wins (and the ignore files in inner
+                # directories have precedence).
+                for regex, negate in reversed(rules):
+                    if regex.fullmatch(relative):
+                        return not negate
+            if is_repo_root:
+                break
+            current, parent = parent, os.path.dirname(parent)
+        return False
+
+    def is_ignored(self, dir_path: str) -> bool:
+        regex = self._regex
+        if regex is not None and regex.fullmatch(_to_match_path(dir_path)):
+            return True
+        return self._use_ignore_files and self._matches_ignore_file(dir_path)
+
+    def __call__(self, dir_path: str) -> bool:
+        now = time.monotonic()
+        cached = self._cache_get(self._cache, dir_path)
+        if cached is not None and (
+            not self._use_ignore_files
+            or now - cached[1] < self._ignore_files_check_interval
+        ):
+            return cached[0]
+
+        accept = not self.is_ignored(dir_path)
+        if cached is None or cached[0] != accept:
+            if accept:
+                log.debug("Directory tracked for changes: %s", dir_path)
+            else:
+                log.debug("Directory untracked for changes: %s", dir_path)
+        self._cache_set(self._cache, dir_path, (accept, now))
+        return accept
+
+    def accept_path(self, root: str, path: str) -> bool:
+        """
+        :return: whether the directories from the given root up to the
+            given path (exclusive) are all accepted.
+        """
+        root_len = len(root)
+        dir_path = os.path.dirname(path)
+        while len(dir_path) > root_len:
+            if not self(dir_path):
+                return False
+            parent = os.path.dirname(dir_path)
+            if parent == dir_path:
+                break
+            dir_path = parent
+        return True
+
+
 def create_accept_directory_callable(
     additional_dirs_to_ignore_str: str | None = None,
-):
-    ignored_dirs = {
-        "**/.git",
-        "**/__pycache__",
-        "**/.idea",
-        "**/node_modules",
-        "**/.metadata",
-        "**/.vscode",
-    }
+    use_ignore_files: bool | None = None,
+    extra_ignored_dirs: Iterable[str] = (),
+) -> AcceptDirectory:
+    """
+    :param additional_dirs_to_ignore_str:
+        A json list with additional patterns to be ignored (if not given it's
+        gotten from the `ROBOTFRAMEWORK_LS_IGNORE_DIRS` environment variable).
+
+    :param use_ignore_files:
+        Whether the `.gitignore`/`.ignore` files should be honored (if not
+        given it's gotten from the `ROBOTFRAMEWORK_LS_USE_IGNORE_FILES`
+        environment variable -- enabled by default).
 
+    :param extra_ignored_dirs:
+        Patterns to be ignored in addition to the default ones (for clients
+        which know that some directories are never interesting for them).
+    """
+    ignored_dirs = set(_DEFAULT_IGNORED_DIRS)
     ignored_dirs.update(_load_ignored_dirs_patterns(additional_dirs_to_ignore_str))
+    ignored_dirs.update(extra_ignored_dirs)
 
-    def accept_directory(dir_path: str, *, cache: dict[str, bool] = {}):
-        try:
-            return cache[dir_path]
-        except KeyError:
-            for pattern in ignored_dirs:
-                if glob_matches_path(dir_path, pattern):
-                    cache[dir_path] = False
-                    log.debug("Directory untracked for changes: %s", dir_path)
-                    return False
-
-            log.debug("Directory tracked for changes: %s", dir_path)
-            cache[dir_path] = True
-            return True
+    if use_ignore_files is None:
+        use_ignore_files = os.environ.get(
+            "ROBOTFRAMEWORK_LS_USE_IGNORE_FILES", "1"
+        ).strip().lower() not in ("0", "false")
 
-    return accept_directory
+    return AcceptDirectory(ignored_dirs, use_ignore_files=use_ignore_files)
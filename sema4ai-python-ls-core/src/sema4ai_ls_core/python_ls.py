@@ -19,7 +19,6 @@ import os
 import socketserver
 import sys
 import threading
-import weakref
 from functools import partial
 from pathlib import Path
 from typing import ContextManager, Dict, Optional, Set
@@ -270,8 +269,7 @@ class BaseLintInfo:
 
     def __call__(self) -> None:
         """
-        Note: the lint info is used as a target for run_in_new_thread, so, this
-        is called in a thread.
+        Note: this is called in a thread from the lint scheduler.
         """
         try:
             from sema4ai_ls_core.jsonrpc.exceptions import JsonRpcRequestCancelled
@@ -292,77 +290,54 @@ class BaseLintInfo:
         raise NotImplementedError(f"{self} must implement _do_lint().")
 
     def _on_finish(self):
-        from sema4ai_ls_core.progress_report import progress_context
-
-        # When it'lint_manager finished, remove it from our references (if it's still
-        # the current one...).
-        #
-        # Also, if we have remaining items which were manually scheduled,
-        # we need to lint those.
         try:
             lint_manager = self._weak_lint_manager()
-            lock = lint_manager._lock
-            doc_id_to_info = lint_manager._doc_id_to_info
-
-            next_uri_to_lint = None
-            remaining_count = 0
-            with lock:
-                if doc_id_to_info.get(self.doc_uri) is self:
-                    del doc_id_to_info[self.doc_uri]
-
-                if lint_manager is not None:
-                    if lint_manager._progress_reporter is not None:
-                        if lint_manager._progress_reporter.cancelled:
-                            lint_manager._uris_to_lint.clear()
-
-                    if lint_manager._uris_to_lint:
-                        next_uri_to_lint = lint_manager._uris_to_lint.pop()
-                        remaining_count = len(lint_manager._uris_to_lint)
-
-                if lint_manager._progress_context is None:
-                    if remaining_count > 0:
-                        lint_manager._progress_context = progress_context(
-                            lint_manager._endpoint,
-                            "Linting files... ",
-                            None,
-                            cancellable=True,
-                        )
-                        lint_manager._progress_reporter = (
-                            lint_manager._progress_context.__enter__()
-                        )
-                else:
-                    if remaining_count == 0:
-                        lint_manager._progress_context.__exit__(None, None, None)
-                        lint_manager._progress_context = None
-                        lint_manager._progress_reporter = None
-                    else:
-                        if lint_manager._progress_reporter is not None:
-                            lint_manager._progress_reporter.set_additional_info(
-                                f"(remaining: {remaining_count})"
-                            )
-
-            if next_uri_to_lint and lint_manager is not None:
-                # As schedule lint must be done in the main thread, we
-                # we put an item in the queue to process the main thread.
-                weak_lint_manager = weakref.ref(lint_manager)
-
-                def _schedule():
-                    lint_manager = weak_lint_manager()
-                    if lint_manager is not None:
-                        lint_manager.schedule_lint(next_uri_to_lint, True, 0.0)
-
-                lint_manager._read_queue.put(_schedule)
+            if lint_manager is not None:
+                lint_manager._on_lint_finished(self)
         except:
             log.exception("Unhandled error on lint finish.")
 
+    def kill_subprocess_on_cancel(self, pid: int) -> None:
+        """
+        Registers a subprocess (launched to compute the lint) which should
+        be killed (along with its subprocesses) if the lint is cancelled.
+        """
+        from sema4ai_ls_core.process import (
+            is_process_alive,
+            kill_process_and_subprocesses,
+        )
+
+        def _kill():
+            if is_process_alive(pid):
+                log.debug("Killing lint subprocess (lint cancelled): %s", pid)
+                kill_process_and_subprocesses(pid)
+
+        self._monitor.add_listener(_kill)
+
     def cancel(self):
         self._monitor.cancel()
 
 
 class BaseLintManager:
-    def __init__(self, lsp_messages, endpoint: IEndPoint, read_queue) -> None:
+    def __init__(
+        self,
+        lsp_messages,
+        endpoint: IEndPoint,
+        read_queue,
+        max_workers: int | None = None,
+        max_manual_lint_workers: int | None = None,
+    ) -> None:
+        """
+        :param max_workers: The max number of threads used to lint (by default
+            based on the number of cpus).
+        :param max_manual_lint_workers: The max number of threads which can be
+            used at the same time in a manual lint (by default all but one,
+            which is kept for the open documents).
+        """
         import queue
 
+        from sema4ai_ls_core.lint_scheduler import LintScheduler
+
         self._lsp_messages = lsp_messages
         self._endpoint = endpoint
         self._read_queue: queue.Queue = read_queue
@@ -371,18 +346,41 @@ class BaseLintManager:
 
         self._lock = threading.Lock()
         self._doc_id_to_info: dict[str, BaseLintInfo] = {}  # requires lock
-        self._uris_to_lint: set[str] = set()  # requires lock
+        self._uris_to_lint: set[str] = set()  # requires lock (manual lint)
 
         self._progress_context: ContextManager[IProgressReporter] | None = None
         self._progress_reporter: IProgressReporter | None = None
 
+        self._scheduler = LintScheduler(max_workers, max_manual_lint_workers)
+
+    def set_manual_lint_concurrency(self, max_manual_lint_workers: int | None) -> None:
+        """
+        :param max_manual_lint_workers: The max number of documents linted in
+            parallel in a manual lint (None means the default).
+        """
+        self._scheduler.set_max_background_workers(max_manual_lint_workers)
+
     def _create_curr_lint_info(
         self, doc_uri: str, is_saved: bool, timeout: float
     ) -> BaseLintInfo | None:
         # Note: this call must be done in the main thread.
         raise NotImplementedError(f"{self} must implement _create_curr_lint_info(...)")
 
-    def schedule_lint(self, doc_uri: str, is_saved: bool, timeout: float) -> None:
+    def schedule_lint(
+        self,
+        doc_uri: str,
+        is_saved: bool,
+        timeout: float,
+        priority: int | None = None,
+    ) -> None:
+        """
+        :param timeout: The time to wait before actually starting the lint
+            (a new lint for the same document cancels the previous one).
+        :param priority: The priority for the lint (by default the lint is
+            considered to be for an open document).
+        """
+        from sema4ai_ls_core.lint_scheduler import PRIORITY_OPEN_DOC
+
         self.cancel_lint(doc_uri)
 
         curr_info = self._create_curr_lint_info(doc_uri, is_saved, timeout)
@@ -392,22 +390,101 @@ class BaseLintManager:
         with self._lock:
             self._doc_id_to_info[doc_uri] = curr_info
 
+        if priority is None:
+            priority = PRIORITY_OPEN_DOC
+
+        if timeout <= 0:
+            self._submit_lint(curr_info, priority)
+            return
+
         from sema4ai_ls_core.timeouts import TimeoutTracker
 
         timeout_tracker = TimeoutTracker.get_singleton()
         timeout_tracker.call_on_timeout(
-            timeout,
-            partial(run_in_new_thread, curr_info, f"Lint: {doc_uri}"),
+            timeout, partial(self._submit_lint, curr_info, priority)
         )
 
+    def _submit_lint(self, curr_info: BaseLintInfo, priority: int) -> None:
+        with self._lock:
+            if self._doc_id_to_info.get(curr_info.doc_uri) is not curr_info:
+                return  # Cancelled in the meanwhile.
+
+            # Note: submit while holding the lock so that a cancel for the
+            # uri can't be done between the check and the submit.
+            self._scheduler.submit(curr_info.doc_uri, curr_info, priority)
+
     def cancel_lint(self, doc_uri: str) -> None:
         with self._lock:
             curr_info = self._doc_id_to_info.pop(doc_uri, None)
             if curr_info is not None:
                 log.debug("Cancel lint for: %s", doc_uri)
 
+                self._scheduler.cancel(doc_uri)
                 curr_info.cancel()
 
+            if doc_uri in self._uris_to_lint:
+                self._uris_to_lint.discard(doc_uri)
+                self._update_manual_lint_progress()
+
+    def _on_lint_finished(self, curr_info: BaseLintInfo) -> None:
+        cancel_manual_lint = False
+        with self._lock:
+            doc_uri = curr_info.doc_uri
+            if self._doc_id_to_info.get(doc_uri) is curr_info:
+                del self._doc_id_to_info[doc_uri]
+
+                if doc_uri in self._uris_to_lint:
+                    self._uris_to_lint.discard(doc_uri)
+                    if (
+                        self._progress_reporter is not None
+                        and self._progress_reporter.cancelled
+                    ):
+                        cancel_manual_lint = True
+                    else:
+                        self._update_manual_lint_progress()
+
+        if cancel_manual_lint:
+            self.cancel_manual_lint()
+
+    def cancel_manual_lint(self) -> None:
+        with self._lock:
+            uris_to_cancel = list(self._uris_to_lint)
+
+        for doc_uri in uris_to_cancel:
+            self.cancel_lint(doc_uri)
+
+        with self._lock:
+            self._uris_to_lint.clear()
+            self._update_manual_lint_progress()
+
+    def _update_manual_lint_progress(self) -> None:
+        # Requires lock.
+        from sema4ai_ls_core.progress_report import progress_context
+
+        remaining_count = len(self._uris_to_lint)
+        if self._progress_context is None:
+            if remaining_count > 0:
+                self._progress_context = progress_context(
+                    self._endpoint,
+                    "Linting files... ",
+                    None,
+                    cancellable=True,
+                )
+                self._progress_reporter = self._progress_context.__enter__()
+                self._progress_reporter.set_additional_info(
+                    f"(remaining: {remaining_count})"
+                )
+        else:
+            if remaining_count == 0:
+                self._progress_context.__exit__(None, None, None)
+                self._progress_context = None
+                self._progress_reporter = None
+            else:
+                if self._progress_reporter is not None:
+                    self._progress_reporter.set_additional_info(
+                        f"(remaining: {remaining_count})"
+                    )
+
     def schedule_manual_lint(self, lint_paths: Sequence[str]) -> None:
         """
         This method is called to lint the given paths and provide the diagnostics
@@ -416,8 +493,13 @@ class BaseLintManager:
         It doesn't require files to be open and folders are recursively checked
         for files (.robot and .resource files).
 
+        The documents are linted in parallel (in the lint scheduler), with a
+        lower priority than the open documents.
+
         :param lint_paths: The paths that should be linted.
         """
+        from sema4ai_ls_core.lint_scheduler import PRIORITY_MANUAL
+
         new_uris_to_lint_set = set()
 
         for path in lint_paths:
@@ -435,14 +517,30 @@ class BaseLintManager:
                     uri = uris.from_fs_path(str(f))
                     new_uris_to_lint_set.add(uri)
 
-        next_uri_to_lint = None
+        for uri in sorted(new_uris_to_lint_set):
+            with self._lock:
+                if uri in self._doc_id_to_info:
+                    # Already scheduled (the result of that lint is used).
+                    continue
+
+            self.schedule_lint(uri, True, 0.0, priority=PRIORITY_MANUAL)
+            with self._lock:
+                if uri in self._doc_id_to_info:
+                    self._uris_to_lint.add(uri)
+
+        with self._lock:
+            self._update_manual_lint_progress()
+
+    def dispose(self) -> None:
         with self._lock:
-            self._uris_to_lint.update(new_uris_to_lint_set)
-            if new_uris_to_lint_set:
-                next_uri_to_lint = new_uris_to_lint_set.pop()
+            infos = list(self._doc_id_to_info.values())
+            self._doc_id_to_info.clear()
+            self._uris_to_lint.clear()
+            self._update_manual_lint_progress()
 
-        if next_uri_to_lint:
-            self.schedule_lint(next_uri_to_lint, True, 0.0)
+        self._scheduler.dispose()
+        for curr_info in infos:
+            curr_info.cancel()
 
 
 class PythonLanguageServer(MethodDispatcher):
@@ -502,6 +600,13 @@ class PythonLanguageServer(MethodDispatcher):
 
     def m_shutdown(self, **_kwargs):
         self._shutdown = True
+        try:
+            lint_manager = self.__lint_manager
+        except AttributeError:
+            pass  # Not created.
+        else:
+            if lint_manager is not None:
+                lint_manager.dispose()
         workspace = self._workspace
         if workspace is not None:
             workspace.dispose()
@@ -0,0 +1,310 @@
+"""
+A line-based text buffer used by the documents so that ranged edits don't
+need to rebuild the whole source.
+
+The lines (as given by `str.splitlines(True)`) are kept in chunks (each with
+at most `_MAX_CHUNK_LINES` lines), so, an edit only needs to change the lines
+in the affected chunks and the cumulative line count/offset of each chunk is
+updated with a (C-level) accumulate over the chunks (which is a small number
+even for big documents).
+
+Finding a line or offset is a bisect in the chunks and then a bisect in the
+(lazily computed) line offsets of the chunk found.
+
+The chunks are never changed after being created: an edit creates a new
+(immutable) snapshot sharing the chunks which weren't affected, so, readers
+in other threads don't need to synchronize with the writer.
+"""
+
+import bisect
+import itertools
+from collections.abc import Iterator, Sequence
+
+_MAX_CHUNK_LINES = 512
+_MIN_CHUNK_LINES = _MAX_CHUNK_LINES // 4
+
+
+def _ends_with_new_line(line: str) -> bool:
+    return line.endswith(("\r", "\n"))
+
+
+class _Chunk:
+    __slots__ = ["lines", "char_len", "_line_offsets"]
+
+    def __init__(self, lines: list[str]) -> None:
+        self.lines = lines
+        self.char_len = sum(map(len, lines))
+        self._line_offsets: list[int] | None = None
+
+    def line_offsets(self) -> list[int]:
+        """
+        Provides the start offset of each line (relative to the chunk start).
+        """
+        line_offsets = self._line_offsets
+        if line_offsets is None:
+            line_offsets = [0]
+            line_offsets.extend(itertools.accumulate(map(len, self.lines)))
+            line_offsets.pop()
+            self._line_offsets = line_offsets
+        return line_offsets
+
+
+class TextBufferSnapshot:
+    """
+    An immutable view of the contents of a `TextBuffer` (a `TextBuffer` edit
+    creates a new snapshot, so, a reader which needs to do more than one
+    query and get consistent results should use the same snapshot for all of
+    those).
+    """
+
+    __slots__ = ["_chunks", "_chunk_starts", "_line_count", "_char_len"]
+
+    def __init__(self, chunks: tuple[_Chunk, ...]) -> None:
+        self._chunks = chunks
+        # Cumulative line count/offset at the start of each chunk (lazily
+        # computed and set as a single attribute so that threads computing
+        # it at the same time just compute the same value).
+        self._chunk_starts: tuple[list[int], list[int]] | None = None
+        self._line_count = sum(len(c.lines) for c in chunks)
+        self._char_len = sum(c.char_len for c in chunks)
+
+    def _get_chunk_starts(self) -> tuple[list[int], list[int]]:
+        chunk_starts = self._chunk_starts
+        if chunk_starts is None:
+            chunks = self._chunks
+            chunk_line_starts = [0]
+            chunk_line_starts.extend(itertools.accumulate(len(c.lines) for c in chunks))
+            chunk_line_starts.pop()
+
+            chunk_offset_starts = [0]
+            chunk_offset_starts.extend(itertools.accumulate(c.char_len for c in chunks))
+            chunk_offset_starts.pop()
+
+            chunk_starts = self._chunk_starts = (chunk_line_starts, chunk_offset_starts)
+        return chunk_starts
+
+    def _find_chunk_for_line(self, line: int) -> tuple[int, int]:
+        """
+        :return: the index of the chunk and the index of the line in the chunk.
+        """
+        chunk_line_starts, _ = self._get_chunk_starts()
+        i_chunk = bisect.bisect_right(chunk_line_starts, line) - 1
+        return i_chunk, line - chunk_line_starts[i_chunk]
+
+    def __len__(self) -> int:
+        return self._char_len
+
+    def get_line_count(self) -> int:
+        return self._line_count
+
+    def get_line(self, line: int) -> str:
+        """
+        :return: the line with its line ending.
+        :raises IndexError: if the line is not available.
+        """
+        if line < 0:
+            line += self._line_count
+        if line < 0 or line >= self._line_count:
+            raise IndexError(line)
+        i_chunk, i_line = self._find_chunk_for_line(line)
+        return self._chunks[i_chunk].lines[i_line]
+
+    def iter_lines(self, start_line: int = 0) -> Iterator[str]:
+        if start_line >= self._line_count:
+            return
+        if start_line <= 0:
+            i_chunk, i_line = 0, 0
+        else:
+            i_chunk, i_line = self._find_chunk_for_line(start_line)
+
+        chunks = self._chunks
+        yield from itertools.islice(chunks[i_chunk].lines, i_line, None)
+        for chunk in itertools.islice(chunks, i_chunk + 1, None):
+            yield from chunk.lines
+
+    def get_lines(self) -> tuple[str, ...]:
+        return tuple(self.iter_lines())
+
+    def get_text(self) -> str:
+        return "".join(self.iter_lines())
+
+    def get_line_start_offset(self, line: int) -> int:
+        """
+        :return: the offset where the given line starts (if the line is after
+            the last line the length of the buffer is returned).
+        """
+        if line >= self._line_count:
+            return self._char_len
+        i_chunk, i_line = self._find_chunk_for_line(line)
+        _, chunk_offset_starts = self._get_chunk_starts()
+        return (
+            chunk_offset_starts[i_chunk] + self._chunks[i_chunk].line_offsets()[i_line]
+        )
+
+    def offset_to_line_col(self, offset: int) -> tuple[int, int]:
+        """
+        Note: offsets after the end are considered to be in the last line
+        (which is an empty line if the buffer ends with a new line).
+        """
+        if self._line_count == 0:
+            return (0, offset)
+
+        if offset >= self._char_len:
+            last_line = self.get_line(-1)
+            if _ends_with_new_line(last_line):
+                return (self._line_count, offset - self._char_len)
+            return (
+                self._line_count - 1,
+                offset - (self._char_len - len(last_line)),
+            )
+
+        chunk_line_starts, chunk_offset_starts = self._get_chunk_starts()
+        i_chunk = bisect.bisect_right(chunk_offset_starts, offset) - 1
+        # Empty chunks are not kept, so, this is the chunk with the offset.
+        chunk = self._chunks[i_chunk]
+        chunk_offset = offset - chunk_offset_starts[i_chunk]
+        line_offsets = chunk.line_offsets()
+        i_line = bisect.bisect_right(line_offsets, chunk_offset) - 1
+        return (
+            chunk_line_starts[i_chunk] + i_line,
+            chunk_offset - line_offsets[i_line],
+        )
+
+
+class TextBuffer:
+    """
+    Note: not thread-safe for writing (the document must make sure that it's
+    only mutated in its mutate thread), but it can be read from any thread:
+    an edit never changes the current snapshot (it builds a new one and then
+    swaps it), so, each read is done in a single consistent snapshot.
+    """
+
+    def __init__(self, source: str) -> None:
+        self._snapshot = self._create_snapshot(source.splitlines(True))
+
+    @staticmethod
+    def _create_snapshot(lines: list[str]) -> TextBufferSnapshot:
+        return TextBufferSnapshot(
+            tuple(
+                _Chunk(lines[i : i + _MAX_CHUNK_LINES])
+                for i in range(0, len(lines), _MAX_CHUNK_LINES)
+            )
+        )
+
+    def snapshot(self) -> TextBufferSnapshot:
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def get_line_count(self) -> int:
+        return self._snapshot.get_line_count()
+
+    def get_line(self, line: int) -> str:
+        """
+        :return: the line with its line ending.
+        :raises IndexError: if the line is not available.
+        """
+        return self._snapshot.get_line(line)
+
+    def iter_lines(self, start_line: int = 0) -> Iterator[str]:
+        return self._snapshot.iter_lines(start_line)
+
+    def get_lines(self) -> tuple[str, ...]:
+        return self._snapshot.get_lines()
+
+    def get_text(self) -> str:
+        return self._snapshot.get_text()
+
+    def get_line_start_offset(self, line: int) -> int:
+        return self._snapshot.get_line_start_offset(line)
+
+    def offset_to_line_col(self, offset: int) -> tuple[int, int]:
+        return self._snapshot.offset_to_line_col(offset)
+
+    def replace_lines(self, start_line: int, end_line: int, new_text: str) -> None:
+        """
+        Replaces the lines from `start_line` up to `end_line` (exclusive) with
+        the lines in the given text.
+
+        The lines before/after the replaced range are re-split along with the
+        new text when needed (i.e.: when the change makes a "\\r" and a "\\n"
+        become a single "\\r\\n" line ending or when the new text doesn't end
+        with a new line -- in which case it's merged with the next line).
+        """
+        snapshot = self._snapshot
+        line_count = snapshot.get_line_count()
+        start_line = max(0, min(start_line, line_count))
+        end_line = max(start_line, min(end_line, line_count))
+
+        if start_line > 0:
+            prev_line = snapshot.get_line(start_line - 1)
+            if not _ends_with_new_line(prev_line) or (
+                prev_line.endswith("\r") and new_text.startswith("\n")
+            ):
+                # i.e.: the last line without a new line or a "\r" which
+                # will become "\r\n".
+                start_line -= 1
+                new_text = prev_line + new_text
+
+        while end_line < line_count:
+            if new_text and not _ends_with_new_line(new_text):
+                pass  # Merge with the next line.
+            elif new_text.endswith("\r") and snapshot.get_line(end_line).startswith(
+                "\n"
+            ):
+                pass  # Merge to make a single "\r\n".
+            else:
+                break
+            new_text += snapshot.get_line(end_line)
+            end_line += 1
+
+        self._snapshot = self._replace_lines(
+            snapshot, start_line, end_line, new_text.splitlines(True)
+        )
+
+    def _replace_lines(
+        self,
+        snapshot: TextBufferSnapshot,
+        start_line: int,
+        end_line: int,
+        new_lines: Sequence[str],
+    ) -> TextBufferSnapshot:
+        """
+        :return: a new snapshot with the given lines replaced (the chunks
+            which aren't affected are shared with the given snapshot).
+        """
+        chunks = snapshot._chunks
+        if not chunks:
+            return self._create_snapshot(list(new_lines))
+
+        line_count = snapshot.get_line_count()
+        if start_line >= line_count:
+            i_start_chunk = len(chunks) - 1
+            i_start_line = len(chunks[-1].lines)
+        else:
+            i_start_chunk, i_start_line = snapshot._find_chunk_for_line(start_line)
+
+        if end_line >= line_count:
+            i_end_chunk = len(chunks) - 1
+            i_end_line = len(chunks[-1].lines)
+        else:
+            i_end_chunk, i_end_line = snapshot._find_chunk_for_line(end_line)
+
+        lines = chunks[i_start_chunk].lines[:i_start_line]
+        lines.extend(new_lines)
+        lines.extend(chunks[i_end_chunk].lines[i_end_line:])
+
+        # Keep the chunks from becoming too small (merge with the next one).
+        i_next_chunk = i_end_chunk + 1
+        if len(lines) < _MIN_CHUNK_LINES and i_next_chunk < len(chunks):
+            lines.extend(chunks[i_next_chunk].lines)
+            i_next_chunk += 1
+
+        new_chunks = tuple(
+            _Chunk(lines[i : i + _MAX_CHUNK_LINES])
+            for i in range(0, len(lines), _MAX_CHUNK_LINES)
+        )
+        return TextBufferSnapshot(
+            chunks[:i_start_chunk] + new_chunks + chunks[i_next_chunk:]
+        )
@@ -1,3 +1,6 @@
+import heapq
+import itertools
+import queue
 import threading
 import time
 import weakref
@@ -9,16 +12,113 @@ from sema4ai_ls_core.core_log import get_logger
 
 _DEBUG = False  # Default should be False as this can be very verbose.
 
+# Max number of threads used to call the `on_timeout` callbacks.
+_MAX_CALLBACK_WORKERS = 4
+
+# Time for an idle worker to exit.
+_CALLBACK_WORKER_IDLE_TIMEOUT = 30
+
+# The heap is compacted (removing the disposed handles) when its size goes
+# over this number of entries (or over twice the size after the last
+# compaction).
+_MIN_COMPACT_SIZE = 1024
+
 log = get_logger(__name__)
 
 
+class _CallbacksExecutor:
+    """
+    Calls the `on_timeout` callbacks in a bounded number of (daemon) threads
+    so that a slow callback doesn't delay the others.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._max_workers = max_workers
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._n_workers = 0
+
+        # Workers waiting for a handle which weren't reserved for a handle
+        # already in the queue.
+        self._n_idle = 0
+
+        # Handles in the queue which couldn't reserve a worker (all workers
+        # were busy): the first workers to finish take those.
+        self._n_unreserved = 0
+
+    def submit(self, handle: "_OnTimeoutHandle") -> None:
+        with self._lock:
+            self._queue.put(handle)
+            if self._n_idle > 0:
+                # Reserve an idle worker for this handle.
+                self._n_idle -= 1
+                return
+
+            if self._n_workers >= self._max_workers:
+                self._n_unreserved += 1
+                return
+
+            # Note: the new worker is reserved for this handle.
+            self._n_workers += 1
+
+        t = threading.Thread(target=self._run_worker, name="TimeoutCallbacks")
+        t.daemon = True
+        t.start()
+
+    def _run_worker(self) -> None:
+        while True:
+            try:
+                handle = self._queue.get(timeout=_CALLBACK_WORKER_IDLE_TIMEOUT)
+            except queue.Empty:
+                with self._lock:
+                    # Note: `submit` puts in the queue with the lock held, so,
+                    # if the queue is empty there's no reservation pending
+                    # and this worker is one of the idle ones.
+                    if self._queue.empty():
+                        self._n_idle -= 1
+                        self._n_workers -= 1
+                        return
+                continue
+
+            if handle is None:
+                with self._lock:
+                    self._n_workers -= 1
+                return
+
+            try:
+                handle.exec_on_timeout()
+            except:
+                log.exception()
+
+            with self._lock:
+                if self._n_unreserved > 0:
+                    # Take a handle which is waiting for a worker.
+                    self._n_unreserved -= 1
+                else:
+                    self._n_idle += 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            n_workers = self._n_workers
+        for _i in range(n_workers):
+            self._queue.put(None)
+
+
 class _TimeoutThread(threading.Thread):
     """
     The idea in this class is that it should be usually stopped waiting
     for the next event to be called (paused in a threading.Event.wait).
 
-    When a new handle is added it sets the event so that it processes the handles and
-    then keeps on waiting as needed again.
+    The handles are kept in a heap (ordered by the time they time out), so,
+    adding a handle is O(log n) and the thread is only awakened when the new
+    handle times out before the others.
+
+    Handles disposed before timing out are just skipped when they reach the
+    top of the heap (and the heap is compacted if it grows too much with
+    disposed handles).
+
+    The callbacks are called in a bounded executor (so, a slow callback
+    doesn't delay the others).
 
     This is done so that it's a bit more optimized than creating many Timer threads.
     """
@@ -26,12 +126,12 @@ class _TimeoutThread(threading.Thread):
     def __init__(self):
         threading.Thread.__init__(self)
         self._event = threading.Event()
-        self._handles = []
+        self._heap: list[tuple[float, int, _OnTimeoutHandle]] = []
+        self._counter = itertools.count()
+        self._compact_at = _MIN_COMPACT_SIZE
+        self._executor = _CallbacksExecutor(_MAX_CALLBACK_WORKERS)
         self.daemon = True
 
-        # We could probably do things valid without this lock so that it's possible to add
-        # handles while processing, but the implementation would also be harder to follow,
-        # so, for now, we're either processing or adding handles, not both at the same time.
         self._timeout_thread_lock = threading.Lock()
         self._kill_received = False
 
@@ -46,7 +146,8 @@ class _TimeoutThread(threading.Thread):
             self._event.wait(wait_time)
 
             if self._kill_received:
-                self._handles = []
+                self._heap = []
+                self._executor.shutdown()
                 return
 
             wait_time = self.process_handles()
@@ -62,47 +163,39 @@ class _TimeoutThread(threading.Thread):
             Returns the time we should be waiting for to process the next event properly.
         """
         exec_new_handles = []
-        min_handle_timeout = None
 
-        try:
-            with self._timeout_thread_lock:
+        with self._timeout_thread_lock:
+            if _DEBUG:
+                log.critical("timeouts: Processing handles")
+            self._event.clear()
+            heap = self._heap
+
+            # Do all the processing based on this time (we want to consider snapshots
+            # of processing time -- anything not processed now may be processed at the
+            # next snapshot).
+            curtime = time.time()
+
+            while heap:
+                abs_timeout, _, handle = heap[0]
+                if handle.disposed:
+                    heapq.heappop(heap)
+                    continue
+
+                if curtime < abs_timeout:
+                    # It still didn't time out (and no other handle did).
+                    break
+
                 if _DEBUG:
-                    log.critical("timeouts: Processing handles")
-                self._event.clear()
-                handles = self._handles
-                new_handles = self._handles = []
-
-                # Do all the processing based on this time (we want to consider snapshots
-                # of processing time -- anything not processed now may be processed at the
-                # next snapshot).
-                curtime = time.time()
-
-                for handle in handles:
-                    if curtime < handle.abs_timeout and not handle.disposed:
-                        # It still didn't time out.
-                        if _DEBUG:
-                            log.critical("timeouts: Handle NOT processed: %s", handle)
-                        new_handles.append(handle)
-                        if min_handle_timeout is None:
-                            min_handle_timeout = handle.abs_timeout
-
-                        elif handle.abs_timeout < min_handle_timeout:
-                            min_handle_timeout = handle.abs_timeout
-
-                    else:
-                        if _DEBUG:
-                            log.critical("timeouts: Handle processed: %s", handle)
-                        # Timed out (or disposed), so, let's execute it (should be no-op if disposed).
-                        exec_new_handles.append(handle)
-
-        finally:
-            # Only call the handles after releasing the lock (so that this
-            # execution can add a new handler -- otherwise it'd deadlock).
-            for handle in exec_new_handles:
-                try:
-                    handle.exec_on_timeout()
-                except:
-                    log.exception()
+                    log.critical("timeouts: Handle processed: %s", handle)
+                heapq.heappop(heap)
+                exec_new_handles.append(handle)
+
+            min_handle_timeout = heap[0][0] if heap else None
+
+        # Only call the handles after releasing the lock (so that this
+        # execution can add a new handler -- otherwise it'd deadlock).
+        for handle in exec_new_handles:
+            self._executor.submit(handle)
 
         if min_handle_timeout is None:
             return None
@@ -113,10 +206,22 @@ class _TimeoutThread(threading.Thread):
 
             return timeout
 
+    def _compact(self):
+        heap = self._heap
+        heap[:] = [entry for entry in heap if not entry[2].disposed]
+        heapq.heapify(heap)
+        self._compact_at = max(_MIN_COMPACT_SIZE, len(heap) * 2)
+
     def add_on_timeout_handle(self, handle):
         with self._timeout_thread_lock:
-            self._handles.append(handle)
-            self._event.set()
+            heap = self._heap
+            if len(heap) >= self._compact_at:
+                self._compact()
+
+            heapq.heappush(heap, (handle.abs_timeout, next(self._counter), handle))
+            if heap[0][2] is handle:
+                # Only wake up the thread if it must wait less time.
+                self._event.set()
 
 
 class _OnTimeoutHandle:
@@ -7,9 +7,10 @@ import os.path
 import sys
 import logging
 import threading
+import time
 import weakref
 from typing import List, Tuple, Optional, Set, Any
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
 from sema4ai_ls_core.uris import normalize_drive
 
 log = logging.getLogger(__name__)
@@ -207,6 +208,166 @@ def create_notifier(callback, timeout, extensions=None):
     return notifier
 
 
+def _on_change_with_extensions(
+    on_change: IFSCallback, extensions: Sequence[str] | None
+) -> IFSCallback:
+    if not extensions:
+        return on_change
+
+    extensions = tuple(extensions)
+
+    def on_change_with_extensions(src_path, *args):
+        lower = src_path.lower()
+        if lower.endswith(extensions):
+            on_change(src_path, *args)
+
+    return on_change_with_extensions
+
+
+class _WatchTrieNode:
+    __slots__ = ["children", "recursive", "non_recursive"]
+
+    def __init__(self) -> None:
+        self.children: dict[str, _WatchTrieNode] = {}
+        # Note: tuples are used (and replaced on changes) so that they can be
+        # read without a lock.
+        self.recursive: tuple[tuple[str, Any, Any, bool], ...] = ()
+        self.non_recursive: tuple[tuple[str, Any, Any, bool], ...] = ()
+
+
+class _WatchTrie:
+    """
+    Keeps the notifications (path, on_change, call_args, recursive) in a
+    trie of the (lowercased) path components so that finding the
+    notifications for a changed path only needs to visit its components
+    (instead of checking all the notifications).
+
+    Note: changes must be synchronized by the caller, but lookups may be
+    done without a lock (from the thread collecting the changes).
+    """
+
+    def __init__(self) -> None:
+        self._root = _WatchTrieNode()
+
+    @staticmethod
+    def _split(path: str) -> list[str]:
+        path = path.lower()
+        if sys.platform == "win32":
+            path = path.replace("\\", "/")
+        return path.rstrip("/").split("/")
+
+    def add(self, notification: tuple[str, Any, Any, bool]) -> None:
+        node = self._root
+        for part in self._split(notification[0]):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _WatchTrieNode()
+            node = child
+
+        if notification[3]:
+            node.recursive = node.recursive + (notification,)
+        else:
+            node.non_recursive = node.non_recursive + (notification,)
+
+    def remove(self, notification: tuple[str, Any, Any, bool]) -> None:
+        """
+        :raises ValueError: if the notification is not available.
+        """
+        parts = self._split(notification[0])
+        nodes = [self._root]
+        for part in parts:
+            child = nodes[-1].children.get(part)
+            if child is None:
+                raise ValueError(f"Notification not tracked: {notification}")
+            nodes.append(child)
+
+        node = nodes[-1]
+        if notification[3]:
+            lst = list(node.recursive)
+            lst.remove(notification)
+            node.recursive = tuple(lst)
+        else:
+            lst = list(node.non_recursive)
+            lst.remove(notification)
+            node.non_recursive = tuple(lst)
+
+        # Prune the nodes which are no longer needed.
+        for i in range(len(parts) - 1, -1, -1):
+            node = nodes[i + 1]
+            if node.children or node.recursive or node.non_recursive:
+                break
+            del nodes[i].children[parts[i]]
+
+    def iter_matches(self, src_path: str) -> Iterator[tuple[str, Any, Any, bool]]:
+        """
+        Provides the notifications which should be notified on a change in
+        the given path (recursive notifications for the path or any parent
+        and non-recursive notifications for the path or its parent).
+        """
+        parts = self._split(src_path)
+        parent_index = len(parts) - 2
+        node = self._root
+        for i, part in enumerate(parts):
+            child = node.children.get(part)
+            if child is None:
+                return
+            node = child
+            yield from node.recursive
+            if i >= parent_index:
+                yield from node.non_recursive
+
+    def is_watched_dir(self, dir_path: str) -> bool:
+        """
+        :return: whether the given directory is tracked itself or is inside a
+            recursively tracked directory.
+        """
+        parts = self._split(dir_path)
+        last_index = len(parts) - 1
+        node = self._root
+        for i, part in enumerate(parts):
+            child = node.children.get(part)
+            if child is None:
+                return False
+            node = child
+            if node.recursive or (i == last_index and node.non_recursive):
+                return True
+        return False
+
+    def has_recursive_parent(self, path: str) -> bool:
+        node = self._root
+        for part in self._split(path)[:-1]:
+            child = node.children.get(part)
+            if child is None:
+                return False
+            node = child
+            if node.recursive:
+                return True
+        return False
+
+    def dispatch(self, src_paths: Iterable[str]) -> None:
+        """
+        Notifies the changes in the given paths (the paths are coalesced per
+        notification, so, each notification is called only once per path).
+        """
+        notification_to_paths: dict[int, tuple[tuple, dict[str, None]]] = {}
+        for src_path in src_paths:
+            for notification in self.iter_matches(src_path):
+                key = id(notification)
+                entry = notification_to_paths.get(key)
+                if entry is None:
+                    notification_to_paths[key] = (notification, {src_path: None})
+                else:
+                    entry[1][src_path] = None
+
+        for notification, paths in notification_to_paths.values():
+            _path, on_change, call_args, _recursive = notification
+            for src_path in paths:
+                try:
+                    on_change(normalize_drive(src_path), *call_args)
+                except Exception:
+                    log.exception("Error handling change on: %s", src_path)
+
+
 class _DummyWatchList:
     def stop_tracking(self):
         pass
@@ -285,7 +446,7 @@ class _FSNotifyObserver(threading.Thread):
 
         self._all_paths_to_track: list[fsnotify.TrackedPath] = []
         self._lock = threading.Lock()
-        self._notifications: list[tuple[str, Any, list[Any], bool]] = []
+        self._watch_trie = _WatchTrie()
         self._was_started = False
 
     def dispose(self):
@@ -293,36 +454,12 @@ class _FSNotifyObserver(threading.Thread):
             self._disposed.set()
             self._watcher.dispose()
 
-    _dir_separators: tuple[str, ...] = ("/",)
-    if sys.platform == "win32":
-        _dir_separators = ("\\", "/")
-
     def run(self):
         log.debug("Started listening on _FSNotifyObserver.")
         try:
             while not self._disposed.is_set():
-                dir_separators = self._dir_separators
-                for _change, src_path in self._watcher.iter_changes():
-                    src_path_lower = src_path.lower()
-                    for path, on_change, call_args, recursive in self._notifications:
-                        path_lower = path.lower()
-                        if src_path_lower.startswith(path_lower):
-                            if len(src_path_lower) == len(path_lower):
-                                pass
-                            elif src_path_lower[len(path_lower)] in dir_separators:
-                                pass
-                            else:
-                                continue
-
-                            if recursive:
-                                on_change(normalize_drive(src_path), *call_args)
-                            else:
-                                remainder = src_path_lower[len(path_lower) + 1 :]
-                                count_dir_sep = 0
-                                for dir_sep in dir_separators:
-                                    count_dir_sep += remainder.count(dir_sep)
-                                if count_dir_sep == 0:
-                                    on_change(normalize_drive(src_path), *call_args)
+                for changes in self._watcher.iter_change_batches():
+                    self._watch_trie.dispatch(src_path for _change, src_path in changes)
 
         except:
             log.exception("Error collecting changes in _FSNotifyObserver.")
@@ -339,7 +476,7 @@ class _FSNotifyObserver(threading.Thread):
             for path in new_paths_to_track:
                 self._all_paths_to_track.remove(path)
             for notification in new_notifications:
-                self._notifications.remove(notification)
+                self._watch_trie.remove(notification)
         threading.Thread(target=self._tracked_paths_set_on_thread).start()
 
     def notify_on_any_change(
@@ -354,15 +491,7 @@ class _FSNotifyObserver(threading.Thread):
 
         import fsnotify
 
-        used_on_change = on_change
-        if extensions:
-
-            def on_change_with_extensions(src_path, *args):
-                lower = src_path.lower()
-                if lower.endswith(extensions):
-                    on_change(src_path, *args)
-
-            used_on_change = on_change_with_extensions
+        used_on_change = _on_change_with_extensions(on_change, extensions)
 
         with self._lock:
             new_paths_to_track = []
@@ -374,7 +503,8 @@ class _FSNotifyObserver(threading.Thread):
                     (path.path, used_on_change, call_args, path.recursive)
                 )
 
-            self._notifications.extend(new_notifications)
+            for notification in new_notifications:
+                self._watch_trie.add(notification)
             self._all_paths_to_track.extend(new_paths_to_track)
 
         threading.Thread(target=self._tracked_paths_set_on_thread).start()
@@ -393,6 +523,430 @@ class _FSNotifyObserver(threading.Thread):
         _: IFSObserver = check_implements(self)
 
 
+class _InotifyWatchList:
+    def __init__(self, new_paths, new_notifications, observer):
+        """
+        :param List[PathInfo] new_paths:
+
+        :param Tuple[str, Callback, Tuple[...], bool] new_notifications:
+            (path.path, on_change, call_args, recursive)
+
+        :param _InotifyObserver observer:
+        """
+        self._new_paths: list[PathInfo] = new_paths
+        self._new_notifications = new_notifications
+        self._observer = weakref.ref(observer)
+
+    def stop_tracking(self):
+        observer: _InotifyObserver | None = self._observer()
+        if observer is not None and self._new_paths:
+            observer._stop_tracking(self._new_paths, self._new_notifications)
+        self._new_paths = []
+        self._new_notifications = []
+
+    def __typecheckself__(self) -> None:
+        from sema4ai_ls_core.protocols import check_implements
+
+        _: IFSWatch = check_implements(self)
+
+
+class _InotifyObserver(threading.Thread):
+    """
+    Observer which uses the Linux inotify API directly (through the ctypes
+    bindings from the vendored `watchdog.observers.inotify_c`).
+
+    All the tracked directories share a single inotify file descriptor and
+    the thread blocks in `poll()` until some event arrives, so, changes are
+    reported as soon as the kernel provides them and there's no cost while
+    idle (as opposed to `fsnotify` which has to rescan the tracked paths).
+
+    Notes:
+
+    - Directories not accepted by `load_ignored_dirs` (nor symlinks) are not
+      watched.
+    - When the kernel event queue overflows (`IN_Q_OVERFLOW`) the tracked
+      directories are rescanned: missing watches are added and all the
+      entries found are reported as changed.
+    - While some tracked path isn't watched (i.e.: it didn't exist when the
+      tracking started or it was removed) it's checked periodically and
+      it's watched (and its entries are reported as changed) when it's found.
+    """
+
+    # Max amount of bytes read at once from the inotify file descriptor.
+    _READ_BUFFER_SIZE = 256 * 1024
+
+    # Interval (in seconds) to check whether tracked paths which aren't
+    # watched were created.
+    _MISSING_PATHS_CHECK_INTERVAL = 1.0
+
+    def __init__(self, extensions: tuple[str, ...] | None):
+        from sema4ai_ls_core import load_ignored_dirs
+        from watchdog.observers import inotify_c
+
+        threading.Thread.__init__(self)
+        self.name = "_InotifyObserver"
+        self.daemon = True
+
+        self._inotify_c = inotify_c
+        constants = inotify_c.InotifyConstants
+        self._event_mask = (
+            constants.IN_MODIFY
+            | constants.IN_ATTRIB
+            | constants.IN_CLOSE_WRITE
+            | constants.IN_CREATE
+            | constants.IN_DELETE
+            | constants.IN_MOVED_FROM
+            | constants.IN_MOVED_TO
+            | constants.IN_DELETE_SELF
+            | constants.IN_ONLYDIR
+            | constants.IN_EXCL_UNLINK
+        )
+
+        fd = inotify_c.inotify_init()
+        if fd == -1:
+            inotify_c.Inotify._raise_error()
+            raise OSError("Unable to initialize inotify.")
+        os.set_inheritable(fd, False)
+        os.set_blocking(fd, False)
+        self._fd = fd
+        self._wake_read_fd, self._wake_write_fd = os.pipe()
+
+        self._disposed = threading.Event()
+        self._extensions: tuple[str, ...] = tuple(extensions) if extensions else ()
+        self._accept_directory = load_ignored_dirs.create_accept_directory_callable()
+
+        self._lock = threading.Lock()
+        self._all_paths_to_track: list[PathInfo] = []
+        self._watch_trie = _WatchTrie()
+        self._dir_to_wd: dict[str, int] = {}
+        self._wd_to_dir: dict[int, str] = {}
+        self._cookie_to_moved_from: dict[int, str] = {}
+        self._warned_watch_limit = False
+        self._was_started = False
+
+    def dispose(self):
+        if not self._disposed.is_set():
+            self._disposed.set()
+            with self._lock:
+                was_started = self._was_started
+            if was_started:
+                # The thread closes the other file descriptors when it exits.
+                try:
+                    os.write(self._wake_write_fd, b"x")
+                except OSError:
+                    pass  # The thread already exited.
+            else:
+                self._close_fds(self._fd, self._wake_read_fd)
+            self._close_fds(self._wake_write_fd)
+
+    def _close_fds(self, *fds: int):
+        for fd in fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def run(self):
+        import select
+
+        log.debug("Started listening on _InotifyObserver.")
+        try:
+            poller = select.poll()
+            poller.register(self._fd, select.POLLIN)
+            poller.register(self._wake_read_fd, select.POLLIN)
+            parse_event_buffer = self._inotify_c.Inotify._parse_event_buffer
+            check_interval = self._MISSING_PATHS_CHECK_INTERVAL
+            next_missing_paths_check = 0.0
+
+            while not self._disposed.is_set():
+                with self._lock:
+                    has_missing_paths = self._has_missing_paths()
+
+                timeout_in_ms = None
+                if has_missing_paths:
+                    timeout_in_ms = max(
+                        0, (next_missing_paths_check - time.monotonic()) * 1000
+                    )
+                poll_events = poller.poll(timeout_in_ms)
+                if self._disposed.is_set():
+                    break
+
+                if has_missing_paths and time.monotonic() >= next_missing_paths_check:
+                    next_missing_paths_check = time.monotonic() + check_interval
+                    self._add_missing_paths()
+
+                for fd, _event in poll_events:
+                    if fd == self._wake_read_fd:
+                        # Woken up just to check the missing paths.
+                        os.read(self._wake_read_fd, 1024)
+                    elif fd == self._fd:
+                        try:
+                            event_buffer = os.read(self._fd, self._READ_BUFFER_SIZE)
+                        except (BlockingIOError, InterruptedError):
+                            continue
+                        self._process_events(parse_event_buffer(event_buffer))
+        except Exception:
+            log.exception("Error collecting changes in _InotifyObserver.")
+        finally:
+            self._close_fds(self._fd, self._wake_read_fd)
+            log.debug("Finished listening on _InotifyObserver.")
+
+    def _process_events(self, events) -> None:
+        """
+        :param events:
+            An iterable with the (wd, mask, cookie, name) of the inotify events.
+        """
+        constants = self._inotify_c.InotifyConstants
+        changed: dict[str, None] = {}  # Used as an ordered set.
+
+        with self._lock:
+            for wd, mask, cookie, name in events:
+                if mask & constants.IN_Q_OVERFLOW:
+                    log.info("inotify event queue overflow: rescanning tracked paths.")
+                    self._rescan(changed)
+                    continue
+
+                dir_path = self._wd_to_dir.get(wd)
+                if dir_path is None:
+                    continue
+
+                if mask & constants.IN_IGNORED:
+                    # The watch was removed (the directory was deleted or
+                    # the watch was explicitly removed).
+                    del self._wd_to_dir[wd]
+                    if self._dir_to_wd.get(dir_path) == wd:
+                        del self._dir_to_wd[dir_path]
+                    continue
+
+                if name:
+                    src_path = os.path.join(dir_path, os.fsdecode(name))
+                else:
+                    src_path = dir_path
+                changed[src_path] = None
+
+                if not mask & constants.IN_ISDIR:
+                    continue
+
+                if mask & constants.IN_MOVED_FROM:
+                    self._cookie_to_moved_from[cookie] = src_path
+                    self._remove_watches(src_path)
+
+                elif mask & (constants.IN_CREATE | constants.IN_MOVED_TO):
+                    moved_from = None
+                    if mask & constants.IN_MOVED_TO:
+                        moved_from = self._cookie_to_moved_from.pop(cookie, None)
+
+                    if self._watch_trie.has_recursive_parent(
+                        src_path
+                    ) and self._accept_directory(src_path):
+                        # Note: the contents may have been created/moved
+                        # before the watch was added, so, report them too.
+                        found: list[str] = []
+                        self._add_watches(src_path, True, found)
+                        changed.update(dict.fromkeys(found))
+                        if moved_from is not None:
+                            for path in found:
+                                changed[moved_from + path[len(src_path) :]] = None
+
+            if len(self._cookie_to_moved_from) > 100:
+                # Moves to a place which is not tracked.
+                self._cookie_to_moved_from.clear()
+
+        self._dispatch(changed)
+
+    def _dispatch(self, changed: dict[str, None]) -> None:
+        extensions = self._extensions
+        if extensions:
+            self._watch_trie.dispatch(p for p in changed if p.endswith(extensions))
+        else:
+            self._watch_trie.dispatch(changed)
+
+    def _add_watch(self, dir_path: str) -> bool:
+        """
+        :return: True if the directory is being watched and False otherwise.
+        """
+        if dir_path in self._dir_to_wd:
+            return True
+
+        inotify_c = self._inotify_c
+        wd = inotify_c.inotify_add_watch(
+            self._fd, os.fsencode(dir_path), self._event_mask
+        )
+        if wd == -1:
+            import ctypes
+            import errno
+
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                if not self._warned_watch_limit:
+                    self._warned_watch_limit = True
+                    log.critical(
+                        "inotify watch limit reached (changes in %s and other "
+                        "directories will not be tracked). "
+                        "Consider increasing fs.inotify.max_user_watches.",
+                        dir_path,
+                    )
+            elif err not in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                log.info("Unable to watch: %s (%s).", dir_path, os.strerror(err or 0))
+            return False
+
+        previous_dir = self._wd_to_dir.get(wd)
+        if previous_dir is not None and previous_dir != dir_path:
+            # The same directory reached through another path: keep the
+            # first one.
+            return False
+        self._wd_to_dir[wd] = dir_path
+        self._dir_to_wd[dir_path] = wd
+        return True
+
+    def _add_watches(
+        self, dir_path: str, recursive: bool, found: list[str] | None
+    ) -> None:
+        """
+        Adds watches to the given directory (and to its subdirectories if
+        recursive).
+
+        :param found:
+            If given, the entries found are added to it.
+        """
+        accept_directory = self._accept_directory
+        dirs = [dir_path]
+        while dirs:
+            current = dirs.pop()
+            if not self._add_watch(current):
+                continue
+            if not recursive and found is None:
+                continue
+
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+
+                        if found is not None:
+                            found.append(entry.path)
+                        if is_dir and recursive and accept_directory(entry.path):
+                            dirs.append(entry.path)
+            except OSError:
+                # Removed in the meanwhile or no permissions.
+                continue
+
+    def _remove_watches(self, dir_path: str) -> None:
+        """
+        Removes the watches from the given directory and its subdirectories.
+        """
+        rm_watch = self._inotify_c.inotify_rm_watch
+        prefix = dir_path + "/"
+        for path in [
+            p for p in self._dir_to_wd if p == dir_path or p.startswith(prefix)
+        ]:
+            wd = self._dir_to_wd.pop(path)
+            self._wd_to_dir.pop(wd, None)
+            rm_watch(self._fd, wd)
+
+    def _has_missing_paths(self) -> bool:
+        dir_to_wd = self._dir_to_wd
+        return any(p.path not in dir_to_wd for p in self._all_paths_to_track)
+
+    def _add_missing_paths(self) -> None:
+        """
+        Adds the watches to the tracked paths which weren't watched but now
+        exist (their entries are reported as changed).
+        """
+        changed: dict[str, None] = {}
+        with self._lock:
+            for path_info in self._all_paths_to_track:
+                path = path_info.path
+                if path in self._dir_to_wd or not os.path.isdir(path):
+                    continue
+
+                found: list[str] = []
+                self._add_watches(path, path_info.recursive, found)
+                if path in self._dir_to_wd:
+                    changed[path] = None
+                    changed.update(dict.fromkeys(found))
+
+        if changed:
+            self._dispatch(changed)
+
+    def _rescan(self, changed: dict[str, None]) -> None:
+        for path_info in self._all_paths_to_track:
+            found: list[str] = []
+            self._add_watches(path_info.path, path_info.recursive, found)
+            changed[path_info.path] = None
+            changed.update(dict.fromkeys(found))
+
+    def _stop_tracking(self, paths: list[PathInfo], notifications) -> None:
+        if self._disposed.is_set():
+            return
+
+        with self._lock:
+            for path_info in paths:
+                self._all_paths_to_track.remove(path_info)
+            for notification in notifications:
+                self._watch_trie.remove(notification)
+
+            rm_watch = self._inotify_c.inotify_rm_watch
+            is_watched_dir = self._watch_trie.is_watched_dir
+            for dir_path in [d for d in self._dir_to_wd if not is_watched_dir(d)]:
+                wd = self._dir_to_wd.pop(dir_path)
+                self._wd_to_dir.pop(wd, None)
+                rm_watch(self._fd, wd)
+
+    def notify_on_any_change(
+        self,
+        paths: list[PathInfo],
+        on_change: IFSCallback,
+        call_args=(),
+        extensions: Sequence[str] | None = None,
+    ) -> IFSWatch:
+        if self._disposed.is_set():
+            return _DummyWatchList()
+
+        used_on_change = _on_change_with_extensions(on_change, extensions)
+
+        with self._lock:
+            new_paths = []
+            new_notifications = []
+            for path in paths:
+                path_info = PathInfo(
+                    os.path.normpath(os.path.abspath(path.path)), path.recursive
+                )
+                new_paths.append(path_info)
+                new_notifications.append(
+                    (path_info.path, used_on_change, call_args, path_info.recursive)
+                )
+
+            for notification in new_notifications:
+                self._watch_trie.add(notification)
+            self._all_paths_to_track.extend(new_paths)
+
+            # Note: the watches are added before returning so that any change
+            # done afterwards is reported.
+            for path_info in new_paths:
+                self._add_watches(path_info.path, path_info.recursive, None)
+
+            if not self._was_started:
+                self._was_started = True
+                self.start()
+            elif any(p.path not in self._dir_to_wd for p in new_paths):
+                # Wake up the thread so that it checks the missing paths.
+                try:
+                    os.write(self._wake_write_fd, b"x")
+                except OSError:
+                    pass
+
+        return _InotifyWatchList(new_paths, new_notifications, self)
+
+    def __typecheckself__(self) -> None:
+        from sema4ai_ls_core.protocols import check_implements
+
+        _: IFSObserver = check_implements(self)
+
+
 class _WatchdogWatchList:
     def __init__(self, watches, observer, info_to_count):
         self.watches = watches
@@ -424,12 +978,14 @@ class _WatchdogWatchList:
 
 class _WatchdogObserver:
     def __init__(self, extensions=None):
+        from sema4ai_ls_core import load_ignored_dirs
         from watchdog.observers import Observer
 
         self._observer = Observer()
         self._started = False
         self._extensions = extensions
         self._info_to_count = {}
+        self._accept_directory = load_ignored_dirs.create_accept_directory_callable()
 
     def dispose(self):
         self._observer.stop()
@@ -476,11 +1032,12 @@ class _WatchdogObserver:
         if not extensions:
             extensions = self._extensions
 
+        accept_directory = self._accept_directory
+
         class _Handler(FileSystemEventHandler):
-            def __init__(
-                self,
-            ):
+            def __init__(self, root: str):
                 FileSystemEventHandler.__init__(self)
+                self.root = root
 
             def on_any_event(self, event):
                 # with open("c:/temp/out.txt", "a+") as stream:
@@ -496,17 +1053,18 @@ class _WatchdogObserver:
                             break
                     else:
                         return
-                # Note: notify on directory and file changes.
-                on_change(event.src_path, *call_args)
+                # Note: notify on directory and file changes (skipping the
+                # ones inside ignored directories).
+                if accept_directory.accept_path(self.root, event.src_path):
+                    on_change(event.src_path, *call_args)
                 try:
                     dest_path = event.dest_path
                 except AttributeError:
                     pass
                 else:
-                    if dest_path:
+                    if dest_path and accept_directory.accept_path(self.root, dest_path):
                         on_change(dest_path, *call_args)
 
-        handler = _Handler()
         watches = []
 
         for path_info in paths:
@@ -516,7 +1074,7 @@ class _WatchdogObserver:
             #     )
 
             watch = self._observer.schedule(
-                handler, path_info.path, recursive=path_info.recursive
+                _Handler(path_info.path), path_info.path, recursive=path_info.recursive
             )
             key = watch.key
             if key not in self._info_to_count:
@@ -558,8 +1116,20 @@ def create_observer(backend: str, extensions: tuple[str, ...] | None) -> IFSObse
     """
     :param backend:
         The backend to use.
-        'fsnotify', 'watchdog' or 'dummy'.
+        'inotify', 'fsnotify', 'watchdog' or 'dummy'.
+
+        Note: 'inotify' is only available on Linux ('fsnotify' is used if
+        it's not available).
     """
+    if backend == "inotify":
+        if sys.platform.startswith("linux"):
+            try:
+                _import_watchdog()
+                return _InotifyObserver(extensions)
+            except Exception:
+                log.exception("Unable to create inotify observer (using fsnotify).")
+        backend = "fsnotify"
+
     if backend == "watchdog":
         _import_watchdog()
         return _WatchdogObserver(extensions)
@@ -580,9 +1150,9 @@ def create_remote_observer(
     """
     :param backend:
         The backend to use.
-        'fsnotify' or 'watchdog'.
+        'inotify', 'fsnotify' or 'watchdog'.
     """
-    assert backend in ("watchdog", "fsnotify")
+    assert backend in ("watchdog", "fsnotify", "inotify")
     from sema4ai_ls_core.remote_fs_observer_impl import RemoteFSObserver
 
     return RemoteFSObserver(backend, extensions)
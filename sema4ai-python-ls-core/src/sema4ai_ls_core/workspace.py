@@ -15,7 +15,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import io
+import itertools
 import os
 import threading
 import time
@@ -43,6 +43,7 @@ from sema4ai_ls_core.protocols import (
     IWorkspace,
     IWorkspaceFolder,
 )
+from sema4ai_ls_core.text_buffer import TextBuffer
 from sema4ai_ls_core.uris import normalize_drive, normalize_uri, to_fs_path, uri_scheme
 from sema4ai_ls_core.watchdog_wrapper import IFSObserver
 
@@ -57,14 +58,28 @@ def _text_edit_key(text_edit: TextEditTypedDict | TextEdit):
 
 
 class _DirInfo:
-    def __init__(self, scan_path):
+    def __init__(self, scan_path: str, mtime_ns: int = -1):
         self.scan_path = scan_path
         self.files_in_directory: set[str] = set()
 
+        # The mtime of the directory when it was listed and the names of its
+        # subdirectories (used to revalidate the snapshot).
+        self.mtime_ns = mtime_ns
+        self.subdirs: list[str] = []
+
 
 class _VirtualFSThread(threading.Thread):
     SLEEP_AMONG_SCANS = 0.5
-    INNER_SLEEP = 0.1
+
+    # Number of threads used to list the directories in the initial scan.
+    SCAN_WORKERS = 4
+
+    # Max number of levels scanned.
+    MAX_LEVEL = 20
+
+    # Min time between saves of the snapshot (the snapshot is also saved
+    # during the initial scan so that it can be resumed if interrupted).
+    SNAPSHOT_SAVE_INTERVAL = 5.0
 
     on_created = Callback()
 
@@ -86,61 +101,128 @@ class _VirtualFSThread(threading.Thread):
         self._disposed = threading.Event()
         self.first_check_done = threading.Event()
         self._check_done_events = []
-        self._last_sleep = None
         self._fs_watch: IFSWatch | None = None
         self._dirs_changed = set()
         self._trigger_loop = threading.Event()
+        self._last_snapshot_save = time.time()
         self.on_file_changed = Callback()
         self.on_created(self)
 
-    def _check_need_sleep(self):
-        last_sleep = self._last_sleep
-        if last_sleep is None:
-            self._last_sleep = time.time()
-            return
-        if time.time() - last_sleep > 0.3:
-            time.sleep(self.INNER_SLEEP)
-            self._last_sleep = time.time()
-
-    def _check_dir(self, dir_path: str, directories: set[str], level=0, recursive=True):
-        # This is the actual poll loop
-        if level > 20:  # At most 20 levels deep...
-            log.critical(
-                "Directory tree more than 20 levels deep: %s. Bailing out.", dir_path
-            )
-            return
+    def _list_dir(self, dir_path: str, previous: _DirInfo | None) -> _DirInfo | None:
+        """
+        Lists the given directory (the previous info is reused if the mtime
+        of the directory didn't change).
 
-        self._last_sleep = time.time()
-        if self._disposed.is_set():
-            return
+        :return: None if the directory is not available.
+        """
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return None
 
-        dir_path = normalize_drive(dir_path)
-        directories.add(dir_path)
-        dir_info = _DirInfo(dir_path)
+        if previous is not None and previous.mtime_ns == mtime_ns:
+            return previous
+
+        dir_info = _DirInfo(dir_path, mtime_ns)
         try:
-            assert not isinstance(dir_path, bytes)
-            if self._disposed.is_set():
-                return
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        dir_info.subdirs.append(entry.name)
+                    elif self.accept_file(entry.path):
+                        dir_info.files_in_directory.add(normalize_drive(entry.path))
+        except OSError:
+            return None  # Directory was removed in the meanwhile.
+        return dir_info
 
-            i = 0
-            for entry in os.scandir(dir_path):
-                i += 1
+    def _check_dir(self, dir_path: str) -> bool:
+        """
+        Scans the given directory tree (listing the directories in parallel)
+        and updates the `_dir_to_info` of the virtual fs.
 
-                if i % 100 == 0:
-                    self._check_need_sleep()
-                if entry.is_dir():
-                    if recursive and self.accept_directory(entry.path):
-                        self._check_dir(entry.path, directories, level + 1)
+        The directories already in the `_dir_to_info` (i.e.: loaded from the
+        snapshot) are only listed again if their mtime changed.
 
-                elif self.accept_file(entry.path):
-                    dir_info.files_in_directory.add(normalize_drive(entry.path))
+        :return: whether something changed in the `_dir_to_info`.
+        """
+        import queue
+        from concurrent.futures.thread import ThreadPoolExecutor
 
-            virtual_fs = self._virtual_fs()
-            if virtual_fs is None:
-                return
-            virtual_fs._dir_to_info[dir_path] = dir_info
-        except OSError:
-            pass  # Directory was removed in the meanwhile.
+        virtual_fs = self._virtual_fs()
+        if virtual_fs is None:
+            return False
+
+        previous_dir_to_info = dict(virtual_fs._dir_to_info)
+        found: set[str] = set()
+        changed = False
+
+        # The workers put the results in this queue (which is consumed in
+        # this thread -- the only one which changes the `_dir_to_info`).
+        results: queue.Queue[tuple[_DirInfo | None, int]] = queue.Queue()
+
+        def list_dir(path: str, level: int) -> None:
+            dir_info = None
+            try:
+                dir_info = self._list_dir(path, previous_dir_to_info.get(path))
+            except Exception:
+                log.exception("Error listing: %s", path)
+            finally:
+                results.put((dir_info, level))
+
+        with ThreadPoolExecutor(
+            max_workers=self.SCAN_WORKERS, thread_name_prefix="_VirtualFSThread scan"
+        ) as executor:
+            executor.submit(list_dir, normalize_drive(dir_path), 0)
+            pending = 1
+            while pending:
+                dir_info, level = results.get()
+                pending -= 1
+                if self._disposed.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return changed
+
+                if dir_info is not None:
+                    scan_path = dir_info.scan_path
+                    found.add(scan_path)
+                    if previous_dir_to_info.get(scan_path) is not dir_info:
+                        virtual_fs._set_dir_info(scan_path, dir_info)
+                        changed = True
+
+                    if dir_info.subdirs and level >= self.MAX_LEVEL:
+                        log.critical(
+                            "Directory tree more than %s levels deep: %s. Bailing out.",
+                            self.MAX_LEVEL,
+                            scan_path,
+                        )
+                    else:
+                        for name in dir_info.subdirs:
+                            subdir = os.path.join(scan_path, name)
+                            if self.accept_directory(subdir):
+                                executor.submit(
+                                    list_dir, normalize_drive(subdir), level + 1
+                                )
+                                pending += 1
+
+                if changed:
+                    self._save_snapshot_if_needed(virtual_fs)
+
+        # Remove what's no longer there (i.e.: from the snapshot).
+        for d in previous_dir_to_info:
+            if d not in found:
+                virtual_fs._set_dir_info(d, None)
+                changed = True
+        return changed
+
+    def _save_snapshot_if_needed(self, virtual_fs: "_VirtualFS") -> None:
+        if time.time() - self._last_snapshot_save > self.SNAPSHOT_SAVE_INTERVAL:
+            self._save_snapshot(virtual_fs)
+
+    def _save_snapshot(self, virtual_fs: "_VirtualFS") -> None:
+        self._last_snapshot_save = time.time()
+        try:
+            virtual_fs._save_snapshot()
+        except Exception:
+            log.exception("Error saving snapshot for: %s", self.root_folder_path)
 
     def run(self):
         from sema4ai_ls_core.watchdog_wrapper import PathInfo
@@ -157,12 +239,18 @@ class _VirtualFSThread(threading.Thread):
         check_done_events = self._check_done_events
         self._check_done_events = []
 
-        # Do initial scan
-        self._check_dir(self.root_folder_path, set())
+        # Load the snapshot (so that the contents are available right away)
+        # and then do the initial scan (which revalidates the snapshot).
+        virtual_fs._load_snapshot()
+        if self._check_dir(self.root_folder_path):
+            if self._disposed.is_set():
+                return
+            self._save_snapshot(virtual_fs)
 
         # Notify of initial scan
         self.first_check_done.set()
         self._notify_check_done_events(check_done_events)
+        snapshot_outdated = False
 
         while not self._disposed.is_set():
             self._trigger_loop.wait(self.SLEEP_AMONG_SCANS)
@@ -182,34 +270,28 @@ class _VirtualFSThread(threading.Thread):
 
             # This would do a clean update, which'd be very cost intensive...
             # Instead, let's work only on the `_dirs_changed`.
-            # directories = set()
-            # current = list(virtual_fs._dir_to_info)
-            # self._check_dir(self.root_folder_path, directories)
-            #
-            # for d in current:
-            #     if d not in directories:
-            #         virtual_fs._dir_to_info.pop(d, None)
-
             dirs_changed = self._dirs_changed
             self._dirs_changed = set()
 
             for dir_path in dirs_changed:
                 dir_path = normalize_drive(dir_path)
-                dir_info = _DirInfo(dir_path)
-                try:
-                    assert not isinstance(dir_path, bytes)
-                    if self._disposed.is_set():
-                        return
-
-                    for entry in os.scandir(dir_path):
-                        if not entry.is_dir() and self.accept_file(entry.path):
-                            dir_info.files_in_directory.add(entry.path)
-                except OSError:
+                if self._disposed.is_set():
+                    return
+
+                dir_info = self._list_dir(dir_path, None)
+                if dir_info is None:
                     if not os.path.exists(dir_path):
                         # Directory was removed.
-                        virtual_fs._dir_to_info.pop(dir_path, None)
+                        virtual_fs._set_dir_info(dir_path, None)
                 else:
-                    virtual_fs._dir_to_info[dir_path] = dir_info
+                    virtual_fs._set_dir_info(dir_path, dir_info)
+                snapshot_outdated = True
+
+            if snapshot_outdated and (
+                time.time() - self._last_snapshot_save > self.SNAPSHOT_SAVE_INTERVAL
+            ):
+                self._save_snapshot(virtual_fs)
+                snapshot_outdated = False
 
             virtual_fs = None
 
@@ -242,40 +324,238 @@ class _VirtualFSThread(threading.Thread):
             raise TimeoutError()
 
 
+# Bump when the format of the snapshot changes.
+_SNAPSHOT_VERSION = 1
+
+
 class _VirtualFS:
     def __init__(
-        self, root_folder_path: str, extensions: Iterable[str], fs_observer: IFSObserver
+        self,
+        root_folder_path: str,
+        extensions: Iterable[str],
+        fs_observer: IFSObserver,
+        snapshot_dir: str | None = None,
     ):
+        """
+        :param snapshot_dir:
+            If given, a snapshot of the directories found is kept in this
+            directory so that the next time the same folder is opened the
+            contents are available right away (and only the directories whose
+            mtime changed need to be listed again).
+        """
         self.root_folder_path = normalize_drive(root_folder_path)
 
         self._dir_to_info: dict[str, _DirInfo] = {}
 
         self._extensions = set(extensions)
         self._fs_observer = fs_observer
+        self._snapshot_dir = snapshot_dir
+
+        # Indexes with the files (path -> uri) by extension and by basename
+        # (updated along with the `_dir_to_info` so that queries only need
+        # to visit the matches).
+        # Note: changes are done with the lock, but reading doesn't need it
+        # (the contents are copied when iterating).
+        self._index_lock = threading.Lock()
+        self._extension_to_files: dict[str, dict[str, str]] = {
+            ext: {} for ext in self._extensions
+        }
+        self._basename_to_files: dict[str, dict[str, str]] = {}
+        self._overlapping_extensions = any(
+            ext1 != ext2 and ext1.endswith(ext2)
+            for ext1 in self._extensions
+            for ext2 in self._extensions
+        )
 
         # Do initial scan and then start tracking changes.
         self._virtual_fsthread = _VirtualFSThread(self)
         self._virtual_fsthread.start()
         self.on_file_changed = self._virtual_fsthread.on_file_changed
 
+    def _get_snapshot_file(self) -> str | None:
+        import hashlib
+
+        if not self._snapshot_dir:
+            return None
+        key = repr((self.root_folder_path, sorted(self._extensions)))
+        name = hashlib.sha224(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._snapshot_dir, f"{name}.json")
+
+    def _load_snapshot(self) -> None:
+        """
+        Loads the directories from the snapshot (if available) into the
+        `_dir_to_info`.
+        """
+        import json
+
+        snapshot_file = self._get_snapshot_file()
+        if not snapshot_file:
+            return
+
+        try:
+            with open(snapshot_file, encoding="utf-8") as stream:
+                snapshot = json.load(stream)
+        except FileNotFoundError:
+            return
+        except Exception:
+            log.exception("Error loading snapshot: %s", snapshot_file)
+            return
+
+        try:
+            if (
+                snapshot["version"] != _SNAPSHOT_VERSION
+                or snapshot["root"] != self.root_folder_path
+                or snapshot["extensions"] != sorted(self._extensions)
+            ):
+                return
+
+            dir_to_info: dict[str, _DirInfo] = {}
+            join = os.path.join
+            for dir_path, (mtime_ns, files, subdirs) in snapshot["dirs"].items():
+                dir_info = _DirInfo(dir_path, mtime_ns)
+                dir_info.files_in_directory = set(join(dir_path, f) for f in files)
+                dir_info.subdirs = subdirs
+                dir_to_info[dir_path] = dir_info
+        except Exception:
+            log.exception("Error handling snapshot: %s", snapshot_file)
+            return
+
+        log.debug(
+            "Loaded %s directories from snapshot: %s", len(dir_to_info), snapshot_file
+        )
+        for dir_path, dir_info in dir_to_info.items():
+            self._set_dir_info(dir_path, dir_info)
+
+    def _save_snapshot(self) -> None:
+        import json
+
+        snapshot_file = self._get_snapshot_file()
+        if not snapshot_file:
+            return
+
+        basename = os.path.basename
+        dirs = {}
+        for dir_info in list(self._dir_to_info.values()):
+            dirs[dir_info.scan_path] = (
+                dir_info.mtime_ns,
+                [basename(f) for f in dir_info.files_in_directory],
+                dir_info.subdirs,
+            )
+
+        snapshot = {
+            "version": _SNAPSHOT_VERSION,
+            "root": self.root_folder_path,
+            "extensions": sorted(self._extensions),
+            "dirs": dirs,
+        }
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+        # Write to a temporary file and then replace (so that a partially
+        # written snapshot is never loaded).
+        temp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as stream:
+            json.dump(snapshot, stream)
+        os.replace(temp_file, snapshot_file)
+
     def wait_for_check_done(self, timeout):
         self._virtual_fsthread.wait_for_check_done(timeout)
 
+    def _set_dir_info(self, dir_path: str, dir_info: _DirInfo | None) -> None:
+        """
+        Sets (or removes if None) the info for the given directory updating
+        the indexes with the files added/removed.
+        """
+        with self._index_lock:
+            if dir_info is None:
+                old_dir_info = self._dir_to_info.pop(dir_path, None)
+                new_files: set[str] = set()
+            else:
+                old_dir_info = self._dir_to_info.get(dir_path)
+                self._dir_to_info[dir_path] = dir_info
+                new_files = dir_info.files_in_directory
+
+            old_files = (
+                old_dir_info.files_in_directory if old_dir_info is not None else set()
+            )
+            if old_files is new_files:
+                return
+
+            for f in old_files.difference(new_files):
+                self._remove_from_index(f)
+            for f in new_files.difference(old_files):
+                self._add_to_index(f)
+
+    def _add_to_index(self, path: str) -> None:
+        uri = None
+        for ext, files in self._extension_to_files.items():
+            if path.endswith(ext):
+                if uri is None:
+                    uri = uris.from_fs_path(path)
+                files[path] = uri
+
+        if uri is None:
+            return  # Not a tracked file.
+
+        basename = os.path.basename(path)
+        basename_files = self._basename_to_files.get(basename)
+        if basename_files is None:
+            basename_files = self._basename_to_files[basename] = {}
+        basename_files[path] = uri
+
+    def _remove_from_index(self, path: str) -> None:
+        for files in self._extension_to_files.values():
+            files.pop(path, None)
+
+        basename = os.path.basename(path)
+        basename_files = self._basename_to_files.get(basename)
+        if basename_files is not None:
+            basename_files.pop(path, None)
+            if not basename_files:
+                del self._basename_to_files[basename]
+
     def _iter_all_doc_uris(self, extensions: tuple[str, ...]) -> Iterable[str]:
         """
         :param extensions:
             The extensions which are being searched (i.e.: ('.txt', '.py')).
         """
-        assert self._extensions.issuperset(extensions)
-        dir_infos = list(self._dir_to_info.values())
-        for dir_info in dir_infos:
-            for f in dir_info.files_in_directory:
-                if f.endswith(extensions):
-                    yield uris.from_fs_path(f)
+        # Extensions which aren't tracked have no matches.
+        tracked_extensions = self._extensions
+        extensions = tuple(
+            ext for ext in dict.fromkeys(extensions) if ext in tracked_extensions
+        )
+        extension_to_files = self._extension_to_files
+
+        if len(extensions) > 1 and self._overlapping_extensions:
+            # i.e.: a file may be in more than one of the extensions.
+            found: set[str] = set()
+            for ext in extensions:
+                for path, uri in list(extension_to_files[ext].items()):
+                    if path not in found:
+                        found.add(path)
+                        yield uri
+        else:
+            for ext in extensions:
+                yield from list(extension_to_files[ext].values())
+
+    def _iter_doc_uris_by_basename(self, basenames: tuple[str, ...]) -> Iterable[str]:
+        """
+        :param basenames:
+            The basenames of the files being searched (i.e.:
+            ('package.yaml', 'agent-spec.yaml')). Note that only files with
+            the tracked extensions are available.
+        """
+        basename_to_files = self._basename_to_files
+        for basename in dict.fromkeys(basenames):
+            files = basename_to_files.get(basename)
+            if files:
+                yield from list(files.values())
 
     def dispose(self):
         self._virtual_fsthread.dispose()
-        self._dir_to_info.clear()
+        with self._index_lock:
+            self._dir_to_info.clear()
+            self._basename_to_files.clear()
+            for files in self._extension_to_files.values():
+                files.clear()
 
 
 class _WorkspaceFolderWithVirtualFS:
@@ -288,13 +568,23 @@ class _WorkspaceFolderWithVirtualFS:
     invalidating them as needed.
     """
 
-    def __init__(self, uri, name, track_file_extensions, fs_observer: IFSObserver):
+    def __init__(
+        self,
+        uri,
+        name,
+        track_file_extensions,
+        fs_observer: IFSObserver,
+        snapshot_dir: str | None = None,
+    ):
         self.uri = uri
         self.name = name
         self.path = uris.to_fs_path(uri)
 
         self._vs: _VirtualFS = _VirtualFS(
-            self.path, track_file_extensions, fs_observer=fs_observer
+            self.path,
+            track_file_extensions,
+            fs_observer=fs_observer,
+            snapshot_dir=snapshot_dir,
         )
         self.on_file_changed = self._vs.on_file_changed
 
@@ -308,6 +598,16 @@ class _WorkspaceFolderWithVirtualFS:
         vs = self._vs
         yield from vs._iter_all_doc_uris(extensions)
 
+    def _iter_doc_uris_by_basename(self, basenames: tuple[str, ...]) -> Iterable[str]:
+        """
+        :param basenames:
+            The basenames of the files being searched (i.e.: ('package.yaml',)).
+        """
+        # Note: this function is meant to be thread-safe.
+
+        vs = self._vs
+        yield from vs._iter_doc_uris_by_basename(basenames)
+
     def wait_for_check_done(self, timeout):
         self._vs.wait_for_check_done(timeout)
 
@@ -332,7 +632,14 @@ class Workspace:
         fs_observer: IFSObserver,
         workspace_folders: list[IWorkspaceFolder] | None = None,
         track_file_extensions=(".robot", ".resource", ".py", ".yml", ".yaml"),
+        snapshot_dir: str | None = None,
     ) -> None:
+        """
+        :param snapshot_dir:
+            If given, snapshots of the files found in the workspace folders
+            are kept in this directory (so that reopening the same folders
+            doesn't need a full scan).
+        """
         from sema4ai_ls_core.cache import LRUCache
         from sema4ai_ls_core.callbacks import Callback
         from sema4ai_ls_core.lsp import WorkspaceFolder
@@ -345,6 +652,7 @@ class Workspace:
         self._folders: dict[str, _WorkspaceFolderWithVirtualFS] = {}
         self._track_file_extensions = track_file_extensions
         self._fs_observer = fs_observer
+        self._snapshot_dir = snapshot_dir
 
         # Contains the docs with files considered open.
         self._docs: dict[str, IDocument] = {}
@@ -425,6 +733,7 @@ class Workspace:
                 folder.name,
                 track_file_extensions=self._track_file_extensions,
                 fs_observer=self._fs_observer,
+                snapshot_dir=self._snapshot_dir,
             )
             folder.on_file_changed.register(self.on_file_changed)
             folders[folder.uri] = folder
@@ -563,6 +872,22 @@ class Workspace:
         for folder in folders:
             yield from folder._iter_all_doc_uris(extensions)
 
+    def iter_doc_uris_in_workspace_by_basename(
+        self, basenames: tuple[str, ...]
+    ) -> Iterable[str]:
+        """
+        :param basenames:
+            The basenames of the files being searched (i.e.:
+            ('package.yaml', 'agent-spec.yaml')). Note that the basenames must
+            end with one of the tracked file extensions.
+        """
+
+        # Folders are set as a whole, so, this is thread safe.
+        # This may be called in a thread.
+        folders = self._folders.values()
+        for folder in folders:
+            yield from folder._iter_doc_uris_by_basename(basenames)
+
     def dispose(self):
         self._check_in_mutate_thread()
 
@@ -586,8 +911,9 @@ class Document:
     a new document instead of mutating the source.
 
     Everything else (apart from changing the source) should be thread-safe
-    (even without locks -- sometimes we may end up calculating things more than
-    once, but that should not corrupt internal structures).
+    (the source/buffer/lines which are lazily computed from each other are
+    guarded by a lock so that a change can't be lost by a cache being filled
+    with contents computed before it).
     """
 
     def __init__(
@@ -608,8 +934,12 @@ class Document:
         self.path = uris.to_fs_path(uri)  # Note: may be None.
         self.__custom_data: dict[str, Any] = {}
 
+        # The buffer is used to apply ranged changes (after a ranged change
+        # the source is only computed again if actually requested).
+        self.__lock = threading.RLock()
+        self.__buffer: TextBuffer | None = None
+        self.__source: str | None = None
         self._source = source
-        self.__line_start_offsets = None
 
         # Only set when the source is read from disk.
         self._source_mtime = -1
@@ -634,7 +964,10 @@ class Document:
         return str(self.uri)
 
     def __len__(self):
-        return len(self.source)
+        with self.__lock:
+            if self.__source is None and self.__buffer is not None:
+                return len(self.__buffer)
+            return len(self.source)
 
     def __bool__(self):
         return True
@@ -647,24 +980,36 @@ class Document:
         return DocumentSelection(self, line, col)
 
     @property
-    def _source(self) -> str:
-        return self.__source
+    def _source(self) -> str | None:
+        source = self.__source
+        if source is None:
+            with self.__lock:
+                source = self.__source
+                if source is None:
+                    buffer = self.__buffer
+                    if buffer is not None:
+                        source = self.__source = buffer.get_text()
+        return source
 
     @_source.setter
     def _source(self, source: str) -> None:
         # i.e.: when the source is set, reset the lines.
+        self._check_can_mutate()
+        with self.__lock:
+            self.__source = source
+            self.__buffer = None
+            self._clear_caches()
+
+    def _check_can_mutate(self):
         self._check_in_mutate_thread()
         if self.immutable:
             raise RuntimeError(
                 "This document is immutable, so, its source cannot be changed."
             )
-        self.__source = source
-        self._clear_caches()
 
     def _clear_caches(self):
         self._check_in_mutate_thread()
         self.__lines = None
-        self.__line_start_offsets = None
         self.__custom_data.clear()
 
     def set_custom_data(self, key: str, value: Any):
@@ -677,19 +1022,31 @@ class Document:
         return self.__custom_data.get(key)
 
     @property
-    def _lines(self):
+    def _buffer(self) -> TextBuffer:
+        buffer = self.__buffer
+        if buffer is None:
+            with self.__lock:
+                buffer = self.__buffer
+                if buffer is None:
+                    buffer = self.__buffer = TextBuffer(self.source)
+        return buffer
+
+    @property
+    def _lines(self) -> tuple[str, ...]:
         lines = self.__lines
         if lines is None:
-            lines = self.__lines = tuple(self.source.splitlines(True))
+            with self.__lock:
+                lines = self.__lines
+                if lines is None:
+                    lines = self.__lines = self._buffer.get_lines()
         return lines
 
     def get_internal_lines(self):
         return self._lines
 
     def iter_lines(self, keep_ends=True):
-        lines = self._lines
         line = ""
-        for line in lines:
+        for line in self._buffer.iter_lines():
             if keep_ends:
                 yield line
             else:
@@ -699,54 +1056,35 @@ class Document:
         if line.endswith("\r") or line.endswith("\n"):
             yield ""
 
-    def _compute_line_start_offsets(self):
-        line_start_offset_to_info = self.__line_start_offsets
-        if line_start_offset_to_info is None:
-            line_start_offset_to_info = []
-            offset = 0
-            for line in self.iter_lines():
-                line_start_offset_to_info.append(offset)
-                offset += len(line)
-
-        self.__line_start_offsets = line_start_offset_to_info
-        return line_start_offset_to_info
-
     def offset_to_line_col(self, offset: int) -> tuple[int, int]:
         if offset < 0:
             raise ValueError(f"Expected offset to be >0. Found: {offset}")
 
-        import bisect
-
-        line_start_offset_to_info = self._compute_line_start_offsets()
-        i_line = bisect.bisect_left(line_start_offset_to_info, offset)
-        if (
-            i_line >= len(line_start_offset_to_info)
-            or line_start_offset_to_info[i_line] > offset
-        ):
-            i_line -= 1
-        line_start_offset = line_start_offset_to_info[i_line]
-        return (i_line, offset - line_start_offset)
+        return self._buffer.offset_to_line_col(offset)
 
     def get_range(self, line: int, col: int, endline: int, endcol: int) -> str:
-        if line >= self.get_line_count():
+        buffer = self._buffer.snapshot()
+        line_count = buffer.get_line_count()
+        if line >= line_count:
             return ""
 
         if line == endline:
             if endcol <= col:
                 return ""
 
-            line_contents = self.get_line(line)
+            line_contents = buffer.get_line(line).rstrip("\r\n")
             return line_contents[col:endcol]
 
         full_contents = []
-        for i_line in range(line, min(endline + 1, self.get_line_count())):
-            line_contents = self.get_line(i_line)
+        for i_line, line_contents in enumerate(
+            itertools.islice(buffer.iter_lines(line), endline + 1 - line), line
+        ):
             if i_line == line:
-                full_contents.append(self._lines[i_line][col:])
+                full_contents.append(line_contents[col:])
             elif i_line == endline:
-                full_contents.append(self._lines[i_line][:endcol])
+                full_contents.append(line_contents[:endcol])
             else:
-                full_contents.append(self._lines[i_line])
+                full_contents.append(line_contents)
         return "".join(full_contents)
 
     def _load_source(self, mtime=None):
@@ -780,13 +1118,13 @@ class Document:
     @implements(IDocument.get_line)
     def get_line(self, line: int) -> str:
         try:
-            return self._lines[line].rstrip("\r\n")
+            return self._buffer.get_line(line).rstrip("\r\n")
         except IndexError:
             return ""
 
     def get_last_line(self) -> str:
         try:
-            last_line = self._lines[-1]
+            last_line = self._buffer.get_line(-1)
             if last_line.endswith("\r") or last_line.endswith("\n"):
                 return ""
             return last_line
@@ -794,14 +1132,15 @@ class Document:
             return ""
 
     def get_last_line_col(self) -> tuple[int, int]:
-        lines = self._lines
-        if not lines:
+        buffer = self._buffer.snapshot()
+        line_count = buffer.get_line_count()
+        if not line_count:
             return (0, 0)
         else:
-            last_line = lines[-1]
+            last_line = buffer.get_line(-1)
             if last_line.endswith("\r") or last_line.endswith("\n"):
-                return len(lines), 0
-            return len(lines) - 1, len(last_line)
+                return line_count, 0
+            return line_count - 1, len(last_line)
 
     def get_last_line_col_with_contents(self, contents: str) -> tuple[int, int]:
         if not contents:
@@ -813,8 +1152,7 @@ class Document:
         raise RuntimeError(f"Unable to find line with contents: {contents}.")
 
     def get_line_count(self) -> int:
-        lines = self._lines
-        return len(lines)
+        return self._buffer.get_line_count()
 
     def apply_change(self, change: TextDocumentContentChangeEvent) -> None:
         """Apply a change to the document."""
@@ -824,7 +1162,7 @@ class Document:
         self._apply_change(change_range, text)
 
     def _apply_change(self, change_range: RangeTypedDict | None, text):
-        self._check_in_mutate_thread()
+        self._check_can_mutate()
         if not change_range:
             # The whole file has changed
 
@@ -836,44 +1174,32 @@ class Document:
         end_line = change_range["end"]["line"]
         end_col = change_range["end"]["character"]
 
-        # Check for an edit occurring at the very end of the file
-        if start_line == len(self._lines):
-            self._source = self.source + text
-            return
-
-        new = io.StringIO()
-
-        # Note: we could probably improve this sometime to work better with big documents
-        # (but the link with the AST must be well thought out too).
-        # References:
-        # https://news.ycombinator.com/item?id=30415868
-        # https://news.ycombinator.com/item?id=15381886
-        # https://code.visualstudio.com/blogs/2018/03/23/text-buffer-reimplementation
-        # https://blog.jetbrains.com/fleet/2022/02/fleet-below-deck-part-ii-breaking-down-the-editor/
-        # https://raphlinus.github.io/xi/2020/06/27/xi-retrospective.html
-
-        # Iterate over the existing document until we hit the edit range,
-        # at which point we write the new text, then loop until we hit
-        # the end of the range and continue writing.
-        for i, line in enumerate(self._lines):
-            if i < start_line:
-                new.write(line)
-                continue
-
-            if i > end_line:
-                new.write(line)
-                continue
-
-            if i == start_line:
+        # Note: the change is applied in the buffer (which only changes the
+        # affected lines) and the source is only recomputed if requested.
+        with self.__lock:
+            buffer = self._buffer
+            line_count = buffer.get_line_count()
+
+            # Check for an edit occurring at the very end of the file
+            if start_line == line_count:
+                buffer.replace_lines(line_count, line_count, text)
+            elif start_line > line_count:
+                return  # Out of range: nothing to change.
+            else:
+                line = buffer.get_line(start_line)
                 start_col = convert_utf16_code_unit_to_python(line, start_col)
-                new.write(line[:start_col])
-                new.write(text)
-
-            if i == end_line:
-                end_col = convert_utf16_code_unit_to_python(line, end_col)
-                new.write(line[end_col:])
+                new_text = line[:start_col] + text
+
+                if end_line < line_count:
+                    line = buffer.get_line(end_line)
+                    end_col = convert_utf16_code_unit_to_python(line, end_col)
+                    new_text += line[end_col:]
+                buffer.replace_lines(
+                    start_line, max(start_line, end_line) + 1, new_text
+                )
 
-        self._source = new.getvalue()
+            self.__source = None
+            self._clear_caches()
 
     def apply_text_edits(self, text_edits: list[TextEditTypedDict] | list[TextEdit]):
         self._check_in_mutate_thread()
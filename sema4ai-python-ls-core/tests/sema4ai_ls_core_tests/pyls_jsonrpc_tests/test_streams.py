@@ -101,3 +101,207 @@ def test_writer_bad_message(wfile, writer):
     )
 
     assert wfile.getvalue() in (b"", (b"Content-Length: 10\r\n\r\n1546304461"))
+
+
+class _ChunkedStream:
+    """
+    Stream which provides at most `chunk_size` bytes at each read.
+    """
+
+    def __init__(self, contents: bytes, chunk_size: int, with_readinto: bool):
+        self._stream = BytesIO(contents)
+        self._chunk_size = chunk_size
+        if with_readinto:
+            self.readinto = self._readinto
+
+    def readline(self):
+        return self._stream.readline()
+
+    def read(self, size):
+        return self._stream.read(min(size, self._chunk_size))
+
+    def _readinto(self, view):
+        data = self.read(len(view))
+        view[: len(data)] = data
+        return len(data)
+
+
+@pytest.mark.parametrize("with_readinto", [True, False])
+def test_read_partial_chunks(with_readinto):
+    from sema4ai_ls_core.jsonrpc.streams import read
+
+    body = '{"id": 1, "result": "%s"}' % ("ação" * 100)
+    as_bytes = body.encode("utf-8")
+    contents = b"Content-Length: %d\r\n\r\n%b" % (len(as_bytes), as_bytes)
+    stream = _ChunkedStream(contents * 2, 7, with_readinto)
+    assert read(stream) == body
+    assert read(stream) == body
+    assert read(stream) is None
+
+    # EOF in the middle of the message.
+    stream = _ChunkedStream(contents[:-3], 7, with_readinto)
+    with pytest.raises(EOFError):
+        read(stream)
+
+
+@pytest.mark.parametrize("codec_name", ["json", "msgspec", "orjson"])
+def test_json_codec(codec_name):
+    import json
+
+    from sema4ai_ls_core.jsonrpc.json_codec import create_json_codec
+
+    codec = create_json_codec(codec_name, sort_keys=True)
+    if codec_name != "json" and codec.name == "json":
+        pytest.skip(f"{codec_name} not available.")
+    assert codec.name == codec_name
+
+    class StrSubclass(str):
+        pass
+
+    for obj in [
+        {"z": 1, "a": [1, 2.5, None, True], "c": {"ação": "b"}},
+        {"str_subclass": StrSubclass("x")},
+        {"big_int": 2**70},
+        {1: "int key"},
+    ]:
+        encoded = codec.dumps(obj)
+        assert json.loads(encoded) == json.loads(json.dumps(obj))
+        assert list(codec.loads(encoded)) == sorted(str(k) for k in obj)
+
+    assert codec.loads(b'{"a": NaN}')["a"] != 0  # NaN
+    assert codec.loads(bytearray(b"[1, 2]")) == [1, 2]
+    with pytest.raises(ValueError):
+        codec.loads(b"{hello}}")
+
+    import datetime
+
+    with pytest.raises(TypeError):
+        codec.dumps(datetime.datetime(year=2019, month=1, day=1))
+
+
+def test_writer_single_write(writer, wfile):
+    original_write = wfile.write
+    writes = []
+
+    def write(data):
+        writes.append(data)
+        return original_write(data)
+
+    wfile.write = write
+    writer.write({"id": "hello", "method": "method", "params": {}})
+    writer.write({"id": "hello2", "method": "method", "params": {}})
+    assert len(writes) == 2
+
+
+def _create_big_message(i: int) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": i,
+        "result": [
+            {
+                "name": f"action_{j}",
+                "uri": f"file:///some/path/to/action_package/actions_{j}.py",
+                "range": {
+                    "start": {"line": j, "character": 0},
+                    "end": {"line": j, "character": 20},
+                },
+                "kind": "action",
+                "options": {"is_consequential": True, "display_name": "Some name"},
+            }
+            for j in range(200)
+        ],
+    }
+
+
+@pytest.mark.parametrize("codec_name", ["json", None])
+def test_benchmark_lsp_streams(codec_name):
+    import gc
+    import time
+
+    from sema4ai_ls_core.jsonrpc.json_codec import create_json_codec
+    from sema4ai_ls_core.jsonrpc.streams import read_bytes
+
+    n_messages = 300
+    messages = [_create_big_message(i) for i in range(n_messages)]
+    wfile = BytesIO()
+    writer = JsonRpcStreamWriter(wfile, codec_name=codec_name)
+
+    initial_time = time.perf_counter()
+    for msg in messages:
+        assert writer.write(msg)
+    write_time = time.perf_counter() - initial_time
+
+    total_bytes = len(wfile.getvalue())
+    rfile = BytesIO(wfile.getvalue())
+    codec = create_json_codec(codec_name)
+    read_messages = []
+    # The gc is disabled so that the time to collect the messages already
+    # read isn't measured.
+    gc.disable()
+    try:
+        initial_time = time.perf_counter()
+        while True:
+            data = read_bytes(rfile)
+            if data is None:
+                break
+            read_messages.append(codec.loads(data))
+        read_time = time.perf_counter() - initial_time
+    finally:
+        gc.enable()
+
+    assert read_messages == messages
+    mb = total_bytes / 1024 / 1024
+    print(
+        f"LSP ({codec.name}): {n_messages} messages ({mb:.1f} MB). "
+        f"Write: {mb / write_time:.1f} MB/s. Read: {mb / read_time:.1f} MB/s."
+    )
+
+
+def test_benchmark_dap_streams():
+    import gc
+    import queue
+    import time
+
+    from sema4ai_ls_core.debug_adapter_core.debug_adapter_threads import (
+        STOP_WRITER_THREAD,
+        read,
+        writer_thread,
+    )
+
+    class _Stream(BytesIO):
+        def close(self):
+            pass  # Keep the contents available.
+
+    n_messages = 300
+    write_queue: queue.Queue = queue.Queue()
+    for i in range(n_messages):
+        write_queue.put({"type": "event", "event": "output", "body": {"i": i}})
+        write_queue.put(_create_big_message(i))
+    write_queue.put(STOP_WRITER_THREAD)
+
+    wfile = _Stream()
+    initial_time = time.perf_counter()
+    writer_thread(wfile, write_queue)
+    write_time = time.perf_counter() - initial_time
+
+    rfile = BytesIO(wfile.getvalue())
+    read_messages = []
+    gc.disable()
+    try:
+        initial_time = time.perf_counter()
+        while True:
+            msg = read(rfile)
+            if msg is None:
+                break
+            read_messages.append(msg)
+        read_time = time.perf_counter() - initial_time
+    finally:
+        gc.enable()
+
+    assert len(read_messages) == n_messages * 2
+    assert [msg["seq"] for msg in read_messages] == list(range(n_messages * 2))
+    mb = len(wfile.getvalue()) / 1024 / 1024
+    print(
+        f"DAP: {n_messages * 2} messages ({mb:.1f} MB). "
+        f"Write: {mb / write_time:.1f} MB/s. Read: {mb / read_time:.1f} MB/s."
+    )
@@ -281,3 +281,38 @@ def test_get_document_range():
     assert d.get_range(0, 0, 3, 1) == "aa\nbb\ncc"
     assert d.get_range(0, 0, 4, 1) == "aa\nbb\ncc"
     assert d.get_range(0, 0, 4, 0) == "aa\nbb\ncc"
+
+
+def test_document_source_computed_concurrently_with_change():
+    import threading
+
+    doc = Document("file:///uri", "aa\nbb\n")
+    doc.apply_change(
+        TextDocumentContentChangeEvent(Range(Position(0, 0), Position(0, 0)), 0, "0")
+    )
+
+    # The source is computed from the buffer in another thread while a change
+    # is being applied: the change must not be lost.
+    buffer = doc._buffer
+    original_get_text = buffer.get_text
+    computing = threading.Event()
+    release = threading.Event()
+
+    def get_text():
+        text = original_get_text()
+        computing.set()
+        release.wait(5)
+        return text
+
+    buffer.get_text = get_text  # type: ignore
+    t = threading.Thread(target=lambda: doc.source)
+    t.start()
+    assert computing.wait(5)
+    threading.Timer(0.2, release.set).start()
+
+    doc.apply_change(
+        TextDocumentContentChangeEvent(Range(Position(1, 0), Position(1, 0)), 0, "1")
+    )
+    t.join()
+    buffer.get_text = original_get_text  # type: ignore
+    assert doc.source == "0aa\n1bb\n"
@@ -0,0 +1,170 @@
+import threading
+import time
+
+from sema4ai_ls_core.basic import wait_for_condition
+
+
+class _Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.finished: list[str] = []
+
+    def make_task(self, name: str, event: threading.Event | None = None):
+        def task():
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                if event is not None:
+                    event.wait(5)
+                else:
+                    time.sleep(0.01)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.finished.append(name)
+
+        return task
+
+
+def test_lint_scheduler_bounded():
+    from sema4ai_ls_core.lint_scheduler import LintScheduler
+
+    scheduler = LintScheduler(max_workers=4)
+    tracker = _Tracker()
+    try:
+        for i in range(100):
+            scheduler.submit(f"uri{i}", tracker.make_task(f"uri{i}"))
+
+        wait_for_condition(lambda: len(tracker.finished) == 100)
+        assert tracker.max_running <= 4
+        assert scheduler._num_workers <= 4
+    finally:
+        scheduler.dispose()
+
+
+def test_lint_scheduler_coalesce_and_priority():
+    from sema4ai_ls_core.lint_scheduler import PRIORITY_MANUAL, LintScheduler
+
+    scheduler = LintScheduler(max_workers=1)
+    tracker = _Tracker()
+    event = threading.Event()
+    try:
+        # Keep the only worker busy.
+        scheduler.submit("busy", tracker.make_task("busy", event))
+        wait_for_condition(lambda: scheduler.is_running("busy"))
+
+        scheduler.submit("manual1", tracker.make_task("manual1"), PRIORITY_MANUAL)
+        scheduler.submit("manual2", tracker.make_task("manual2"), PRIORITY_MANUAL)
+        scheduler.submit("open", tracker.make_task("open-old"))
+        scheduler.submit("open", tracker.make_task("open"))
+        scheduler.submit("canceled", tracker.make_task("canceled"))
+        assert scheduler.cancel("canceled")
+        assert scheduler.count_pending() == 3
+
+        event.set()
+        wait_for_condition(lambda: len(tracker.finished) == 4)
+        assert tracker.finished == ["busy", "open", "manual1", "manual2"]
+    finally:
+        event.set()
+        scheduler.dispose()
+
+
+def test_lint_scheduler_background_limit_and_same_uri():
+    from sema4ai_ls_core.lint_scheduler import PRIORITY_MANUAL, LintScheduler
+
+    scheduler = LintScheduler(max_workers=4, max_background_workers=2)
+    tracker = _Tracker()
+    event = threading.Event()
+    try:
+        for i in range(6):
+            scheduler.submit(
+                f"manual{i}", tracker.make_task(f"manual{i}", event), PRIORITY_MANUAL
+            )
+        wait_for_condition(lambda: tracker.running == 2)
+
+        # Open documents can still be linted.
+        scheduler.submit("open", tracker.make_task("open", event))
+        wait_for_condition(lambda: tracker.running == 3)
+
+        # A new lint for a uri which is running must wait for it to finish.
+        scheduler.submit("open", tracker.make_task("open2"))
+        time.sleep(0.2)
+        assert tracker.running == 3
+        assert scheduler.is_pending("open")
+
+        event.set()
+        wait_for_condition(lambda: len(tracker.finished) == 8)
+        assert tracker.finished.index("open2") > tracker.finished.index("open")
+        assert tracker.max_running <= 3
+    finally:
+        event.set()
+        scheduler.dispose()
+
+
+def test_lint_manager_cancel_kills_subprocess():
+    import subprocess
+    import sys
+    import weakref
+
+    from sema4ai_ls_core.process import is_process_alive
+    from sema4ai_ls_core.python_ls import BaseLintInfo, BaseLintManager
+
+    started = threading.Event()
+    processes = []
+
+    class _LintInfo(BaseLintInfo):
+        def _do_lint(self):
+            process = subprocess.Popen(
+                [sys.executable, "-c", "import time;time.sleep(20)"]
+            )
+            processes.append(process)
+            self.kill_subprocess_on_cancel(process.pid)
+            started.set()
+            process.wait()
+
+    class _LintManager(BaseLintManager):
+        def _create_curr_lint_info(self, doc_uri, is_saved, timeout):
+            return _LintInfo(None, doc_uri, is_saved, weakref.ref(self))
+
+    lint_manager = _LintManager(None, None, None, max_workers=2)
+    try:
+        lint_manager.schedule_lint("uri1", True, 0.0)
+        assert started.wait(10)
+        lint_manager.cancel_lint("uri1")
+        wait_for_condition(lambda: not is_process_alive(processes[0].pid))
+        wait_for_condition(lambda: not lint_manager._scheduler.is_running("uri1"))
+    finally:
+        lint_manager.dispose()
+
+
+def test_lint_scheduler_set_max_background_workers():
+    from sema4ai_ls_core.lint_scheduler import PRIORITY_MANUAL, LintScheduler
+
+    scheduler = LintScheduler(max_workers=4, max_background_workers=1)
+    tracker = _Tracker()
+    event = threading.Event()
+    try:
+        for i in range(6):
+            scheduler.submit(
+                f"manual{i}", tracker.make_task(f"manual{i}", event), PRIORITY_MANUAL
+            )
+        wait_for_condition(lambda: tracker.running == 1)
+
+        # The pending manual lints start right away when the limit is raised.
+        scheduler.set_max_background_workers(3)
+        wait_for_condition(lambda: tracker.running == 3)
+        assert scheduler.max_background_workers == 3
+
+        # None means the default (all but one).
+        scheduler.set_max_background_workers(None)
+        assert scheduler.max_background_workers == 3
+
+        event.set()
+        wait_for_condition(lambda: len(tracker.finished) == 6)
+        assert tracker.max_running == 3
+    finally:
+        event.set()
+        scheduler.dispose()
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "**/.git",
+        "**/node_modules",
+        "**/out*",
+        "**/a/**/b",
+        "**/b?",
+        "**/[ab]",
+        "**/[!a]",
+        "a/**",
+        "/a/b",
+        "**",
+        "*/b",
+    ],
+)
+def test_accept_directory_same_as_glob(pattern):
+    from sema4ai_ls_core.load_ignored_dirs import AcceptDirectory, glob_matches_path
+
+    accept_directory = AcceptDirectory([pattern], use_ignore_files=False)
+    for path in [
+        "/a",
+        "/a/b",
+        "/a/b/c",
+        "/x/a/y/z/b",
+        "/x/a/b",
+        "/x/.git",
+        "/x/.gitx",
+        "/x/node_modules",
+        "/x/node_modules/y",
+        "/x/output",
+        "/x/bc",
+        "/x/b",
+        "/x/c",
+        "/b",
+    ]:
+        path = path.replace("/", os.sep)
+        assert accept_directory.is_ignored(path) == glob_matches_path(path, pattern), (
+            f"Mismatch for: {path} with: {pattern}"
+        )
+
+
+def test_accept_directory_ignore_files(tmpdir):
+    from sema4ai_ls_core.load_ignored_dirs import create_accept_directory_callable
+
+    root = tmpdir.join("repo")
+    root.mkdir()
+    root.join(".git").mkdir()
+    root.join(".gitignore").write(
+        "# Comment\nbuild/\n/dist\n*.egg-info\noutput\n!output\ndocs/generated\n"
+    )
+    root.join("sub").mkdir()
+    root.join("sub").join(".ignore").write(".venv\n")
+
+    # An ignore file outside of the repository must not be considered.
+    tmpdir.join(".gitignore").write("repo\nsub\n")
+
+    accept_directory = create_accept_directory_callable("[]")
+
+    def accepted(*parts):
+        return accept_directory(os.path.join(str(root), *parts))
+
+    assert not accepted("build")
+    assert not accepted("sub", "build")
+    assert not accepted("dist")
+    assert accepted("sub", "dist")
+    assert not accepted("pkg.egg-info")
+    assert accepted("output")
+    assert not accepted("docs", "generated")
+    assert accepted("docs")
+    assert accepted("sub")
+    assert not accepted("sub", ".venv")
+    assert accepted(".venv")
+    assert not accepted("node_modules")
+    assert accepted("src")
+
+    assert not accept_directory.accept_path(
+        str(root), os.path.join(str(root), "build", "lib", "a.py")
+    )
+    assert accept_directory.accept_path(
+        str(root), os.path.join(str(root), "src", "lib", "a.py")
+    )
+
+    accept_directory = create_accept_directory_callable("[]", use_ignore_files=False)
+    assert accept_directory(os.path.join(str(root), "build"))
+    assert not accept_directory(os.path.join(str(root), ".git"))
+
+
+def test_accept_directory_cache():
+    from sema4ai_ls_core.load_ignored_dirs import (
+        AcceptDirectory,
+        create_accept_directory_callable,
+    )
+
+    accept_directory = AcceptDirectory(["**/out"], max_cache_size=10)
+    for i in range(100):
+        assert accept_directory(f"/not_there/{i}")
+    assert len(accept_directory._cache) == 10
+    assert not accept_directory("/not_there/out")
+
+    # The cache must not be shared among callables with different patterns.
+    accept_out = create_accept_directory_callable('["**/out"]')
+    accept_all = create_accept_directory_callable("[]")
+    assert not accept_out("/not_there/out")
+    assert accept_all("/not_there/out")
+
+
+def test_accept_directory_ignore_file_changed(tmpdir):
+    from sema4ai_ls_core.load_ignored_dirs import AcceptDirectory
+
+    root = tmpdir.join("repo")
+    root.mkdir()
+    root.join(".git").mkdir()
+    root.join(".gitignore").write("build\n")
+
+    accept_directory = AcceptDirectory([], ignore_files_check_interval=0)
+
+    def accepted(*parts):
+        return accept_directory(os.path.join(str(root), *parts))
+
+    assert not accepted("build")
+    assert accepted("dist")
+
+    # The ignore file is loaded again when it changes.
+    root.join(".gitignore").write("dist\n")
+    assert accepted("build")
+    assert not accepted("dist")
+
+    root.join(".gitignore").remove()
+    assert accepted("dist")
+
+    # With the default interval the results are reused for some time.
+    accept_directory = AcceptDirectory([])
+    assert accepted("dist")
+    root.join(".gitignore").write("dist\n")
+    assert accepted("dist")
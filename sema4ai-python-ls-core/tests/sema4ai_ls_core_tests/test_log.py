@@ -48,3 +48,111 @@ def test_log(tmpdir):
 
     assert "out_of_context" not in log_file.getvalue()
     assert "in_context" in log_file.getvalue()
+
+
+def test_log_debug_queued():
+    from sema4ai_ls_core.core_log import (
+        configure_logger,
+        flush_logging_streams,
+        get_logger,
+    )
+    import io
+
+    log = get_logger("my_logger")
+    log_file = io.StringIO()
+    with configure_logger("", 2, log_file):
+        mutable = ["before"]
+        log.debug("debug: %s - %s", "str1", b"bytes1")
+        log.debug("debug mutable: %s", mutable)
+        mutable.append("after")
+        flush_logging_streams()
+        assert "debug: str1 - bytes1" in log_file.getvalue()
+
+        log.debug("debug 2")
+        # Writing an info message writes the queued debug messages first.
+        log.info("info 2")
+        contents = log_file.getvalue()
+        assert contents.index("debug 2") < contents.index("info 2")
+
+        log.debug("debug 3")
+
+    # The queued messages are written when the configuration changes.
+    contents = log_file.getvalue()
+    assert "debug mutable: ['before']" in contents
+    assert "debug 3" in contents
+
+
+def test_log_payload_debug_rate_limited(monkeypatch):
+    from sema4ai_ls_core import core_log
+    import io
+    import time
+
+    monkeypatch.setattr(core_log, "MAX_PAYLOAD_DEBUG_MSGS_PER_SECOND", 5)
+    payload = "x" * (core_log.PAYLOAD_DEBUG_MSG_SIZE + 1)
+
+    log = core_log.get_logger("my_logger")
+    log_file = io.StringIO()
+    with core_log.configure_logger("", 2, log_file):
+        time.sleep(1)  # Start with a new window.
+        for i in range(20):
+            log.debug("payload %s: %s", i, payload)
+        log.debug("small: %s", "not payload-heavy")
+        time.sleep(1)
+        log.debug("payload last: %s", payload)
+
+    contents = log_file.getvalue()
+    assert contents.count(payload) == 6
+    assert "payload 4:" in contents
+    assert "payload 5:" not in contents
+    assert "small: not payload-heavy" in contents
+    assert "Dropped 15 payload-heavy debug messages" in contents
+    assert "payload last:" in contents
+
+
+def test_log_rotation(tmpdir, monkeypatch):
+    from sema4ai_ls_core import core_log
+
+    monkeypatch.setattr(core_log, "MAX_LOG_FILE_SIZE", 2000)
+    somedir = str(tmpdir.join("rotation"))
+
+    log = core_log.get_logger("my_logger")
+    with core_log.configure_logger("rotation", 1, os.path.join(somedir, "foo.log")):
+        log_file = core_log.get_log_file()
+        for i in range(100):
+            log.info("message %s", i)
+
+    assert os.path.exists(log_file + ".1")
+    assert os.path.getsize(log_file) < 2000 * 2
+    with open(log_file) as stream:
+        assert "message 99" in stream.read()
+
+
+def test_benchmark_log_debug(tmpdir):
+    from sema4ai_ls_core.core_log import (
+        configure_logger,
+        flush_logging_streams,
+        get_logger,
+    )
+    import time
+
+    log = get_logger("my_logger")
+    n_messages = 5000
+    payload = "x" * 1000
+    somedir = str(tmpdir.join("benchmark"))
+    with configure_logger("benchmark", 2, os.path.join(somedir, "foo.log")):
+        initial_time = time.perf_counter()
+        for i in range(n_messages):
+            log.debug("Read: %s - %s", i, payload)
+        debug_time = time.perf_counter() - initial_time
+
+        flush_logging_streams()
+
+        initial_time = time.perf_counter()
+        for i in range(n_messages):
+            log.info("Read: %s - %s", i, payload)
+        info_time = time.perf_counter() - initial_time
+
+    print(
+        f"{n_messages} messages: debug (queued): {debug_time:.3f}s, "
+        f"info (written right away): {info_time:.3f}s"
+    )
@@ -1,7 +1,7 @@
 import pytest
 
 
-@pytest.fixture(params=["watchdog", "fsnotify"])
+@pytest.fixture(params=["watchdog", "fsnotify", "inotify"])
 def remote_fs_observer(request):
     from sema4ai_ls_core.remote_fs_observer_impl import RemoteFSObserver
 
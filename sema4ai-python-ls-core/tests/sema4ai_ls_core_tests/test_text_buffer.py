@@ -0,0 +1,206 @@
+import io
+import random
+import time
+
+from sema4ai_ls_core.lsp import Position, Range, TextDocumentContentChangeEvent
+from sema4ai_ls_core.workspace import Document
+
+
+def _apply_change_in_str(source: str, start_line, start_col, end_line, end_col, text):
+    # The previous implementation (which rebuilds the whole source) used as
+    # the reference to check the buffer.
+    lines = source.splitlines(True)
+    if start_line == len(lines):
+        return source + text
+
+    new = io.StringIO()
+    for i, line in enumerate(lines):
+        if i < start_line or i > end_line:
+            new.write(line)
+            continue
+
+        if i == start_line:
+            new.write(line[:start_col])
+            new.write(text)
+
+        if i == end_line:
+            new.write(line[end_col:])
+    return new.getvalue()
+
+
+def _check_doc(doc: Document, expected: str):
+    expected_lines = expected.splitlines(True)
+    assert doc.get_line_count() == len(expected_lines)
+    assert doc.get_internal_lines() == tuple(expected_lines)
+    assert len(doc) == len(expected)
+
+    for i in range(len(expected_lines)):
+        assert doc.get_line(i) == expected_lines[i].rstrip("\r\n")
+
+    expected_doc = Document("", expected)
+    assert list(doc.iter_lines()) == list(expected_doc.iter_lines())
+    assert doc.get_last_line_col() == expected_doc.get_last_line_col()
+    for offset in range(0, len(expected) + 2, 7):
+        assert doc.offset_to_line_col(offset) == expected_doc.offset_to_line_col(offset)
+    assert doc.source == expected
+
+
+def test_text_buffer_random_edits():
+    from sema4ai_ls_core import text_buffer
+
+    rnd = random.Random(1)
+    pieces = ["a", "bc", "\n", "\r\n", "\r", "def x():\n", "  ", "é", "\x0c"]
+
+    original_chunk_lines = text_buffer._MAX_CHUNK_LINES
+    original_min_chunk_lines = text_buffer._MIN_CHUNK_LINES
+    # Small chunks to exercise the split/merge of chunks.
+    text_buffer._MAX_CHUNK_LINES = 4
+    text_buffer._MIN_CHUNK_LINES = 1
+    try:
+        for _ in range(30):
+            source = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 60)))
+            doc = Document("", source)
+            for _ in range(30):
+                lines = source.splitlines(True) or [""]
+                start_line = rnd.randint(0, len(lines))
+                end_line = rnd.randint(start_line, len(lines))
+                start_col = rnd.randint(0, len(lines[min(start_line, len(lines) - 1)]))
+                end_col = rnd.randint(0, len(lines[min(end_line, len(lines) - 1)]))
+                if start_line == end_line and end_col < start_col:
+                    start_col, end_col = end_col, start_col
+
+                # Note: columns must not be in the middle of a "\r\n" (as the
+                # editor would never send that).
+                for line_i, col in ((start_line, start_col), (end_line, end_col)):
+                    if line_i < len(lines) and lines[line_i][col - 1 : col + 1] == (
+                        "\r\n"
+                    ):
+                        break
+                else:
+                    text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 4)))
+                    source = _apply_change_in_str(
+                        source, start_line, start_col, end_line, end_col, text
+                    )
+                    doc.apply_change(
+                        TextDocumentContentChangeEvent(
+                            Range(
+                                Position(start_line, start_col),
+                                Position(end_line, end_col),
+                            ),
+                            0,
+                            text,
+                        )
+                    )
+                    _check_doc(doc, source)
+    finally:
+        text_buffer._MAX_CHUNK_LINES = original_chunk_lines
+        text_buffer._MIN_CHUNK_LINES = original_min_chunk_lines
+
+
+def test_document_custom_data_cleared_on_change():
+    doc = Document("", "a\nb\n")
+    doc.set_custom_data("key", 1)
+    doc.apply_change(
+        TextDocumentContentChangeEvent(Range(Position(0, 0), Position(0, 0)), 0, "c")
+    )
+    assert doc.get_custom_data("key") is None
+    assert doc.get_range(0, 0, 1, 1) == "ca\nb"
+
+
+def test_benchmark_large_document_edits():
+    # Benchmark: type in the middle of a big document and request lines /
+    # offsets after each change (the source itself is not requested, so,
+    # it must not be recreated for each change).
+    line = "    some_variable = call_some_function(arg1, arg2)  # comment\n"
+    n_lines = 200_000
+    doc = Document("", line * n_lines)
+    middle = n_lines // 2
+
+    n_edits = 2000
+    initial_time = time.perf_counter()
+    for i in range(n_edits):
+        doc.apply_change(
+            TextDocumentContentChangeEvent(
+                Range(Position(middle, 4), Position(middle, 4)), 0, "x"
+            )
+        )
+        assert doc.get_line(middle).startswith("    x")
+        doc.offset_to_line_col(len(line) * (middle + 1))
+    elapsed = time.perf_counter() - initial_time
+    print(
+        f"Applied {n_edits} edits in a document with {n_lines} lines "
+        f"({len(doc) / 1024 / 1024:.1f} MB) in {elapsed:.2f}s"
+    )
+
+    assert doc.get_line(middle) == "    " + "x" * n_edits + line[4:].rstrip("\n")
+    assert doc.get_line_count() == n_lines
+
+
+def test_document_read_concurrently_with_changes():
+    import threading
+
+    from sema4ai_ls_core import text_buffer
+
+    # Lines are removed and added back in the mutate thread while other
+    # threads read: each read must see one of the versions (never a mix).
+    n_lines = text_buffer._MAX_CHUNK_LINES * 4
+    full_lines = [f"line {i}\n" for i in range(n_lines)]
+    removed_lines = full_lines[:400] + full_lines[1000:]
+    full_text = "".join(full_lines)
+    removed_text = "".join(removed_lines)
+    doc = Document("", full_text)
+
+    offset = len("".join(full_lines[:1600]))
+    expected_line_cols = (
+        Document("", full_text).offset_to_line_col(offset),
+        Document("", removed_text).offset_to_line_col(offset),
+    )
+
+    stop = threading.Event()
+    errors: list[str] = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                line = doc.get_line(1000)
+                if line not in ("line 1000", "line 1600"):
+                    errors.append(f"get_line(1000): {line}")
+
+                lines = list(doc.iter_lines())
+                if lines[:-1] not in (full_lines, removed_lines):
+                    errors.append("iter_lines mixed versions")
+
+                line_col = doc.offset_to_line_col(offset)
+                if line_col not in expected_line_cols:
+                    errors.append(f"offset_to_line_col: {line_col}")
+
+                text = doc.get_range(0, 0, n_lines, 0)
+                if text not in (full_text, removed_text):
+                    errors.append("get_range mixed versions")
+            except Exception as e:
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(300):
+            doc.apply_change(
+                TextDocumentContentChangeEvent(
+                    Range(Position(400, 0), Position(1000, 0)), 0, ""
+                )
+            )
+            doc.apply_change(
+                TextDocumentContentChangeEvent(
+                    Range(Position(400, 0), Position(400, 0)),
+                    0,
+                    "".join(full_lines[400:1000]),
+                )
+            )
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert not errors, errors[:10]
+    assert doc.source == full_text
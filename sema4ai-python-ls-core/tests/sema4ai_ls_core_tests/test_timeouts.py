@@ -35,3 +35,129 @@ def test_timeout():
     assert not called
     time.sleep(2)
     assert not called
+
+
+def test_timeout_slow_callback_does_not_delay_others():
+    import threading
+
+    release_slow = threading.Event()
+    called = []
+
+    def on_slow_timeout():
+        release_slow.wait(5)
+        called.append("slow")
+
+    def on_timeout():
+        called.append("fast")
+
+    timeout_tracker = timeouts.TimeoutTracker()
+    timeout_tracker.call_on_timeout(0.05, on_slow_timeout)
+    timeout_tracker.call_on_timeout(0.1, on_timeout)
+    try:
+        wait_for_condition(lambda: called == ["fast"])
+    finally:
+        release_slow.set()
+    wait_for_condition(lambda: called == ["fast", "slow"])
+
+
+def test_timeout_callbacks_burst_with_idle_worker():
+    import threading
+
+    class _Handle:
+        def __init__(self, on_timeout):
+            self.exec_on_timeout = on_timeout
+
+    release_slow = threading.Event()
+    called = []
+
+    executor = timeouts._CallbacksExecutor(4)
+    try:
+        # Have one idle worker.
+        executor.submit(_Handle(lambda: called.append("first")))
+        wait_for_condition(lambda: executor._n_idle == 1)
+
+        # A burst in which the slow one gets the idle worker must not make the
+        # other one wait for it.
+        executor.submit(_Handle(lambda: (release_slow.wait(5), called.append("slow"))))
+        executor.submit(_Handle(lambda: called.append("fast")))
+        try:
+            wait_for_condition(lambda: called == ["first", "fast"])
+        finally:
+            release_slow.set()
+        wait_for_condition(lambda: called == ["first", "fast", "slow"])
+        wait_for_condition(lambda: executor._n_idle == 2)
+        assert executor._n_workers == 2
+    finally:
+        executor.shutdown()
+    wait_for_condition(lambda: executor._n_workers == 0)
+
+
+def test_timeout_disposed_handles_are_compacted(monkeypatch):
+    monkeypatch.setattr(timeouts, "_DEBUG", False)
+    called = []
+
+    def on_timeout(arg):
+        called.append(arg)
+
+    timeout_tracker = timeouts.TimeoutTracker()
+    for i in range(timeouts._MIN_COMPACT_SIZE * 3):
+        with timeout_tracker.call_on_timeout(60, on_timeout, kwargs={"arg": i}):
+            pass
+
+    timeout_thread = timeout_tracker._thread
+    assert timeout_thread is not None
+    assert len(timeout_thread._heap) <= timeouts._MIN_COMPACT_SIZE + 1
+    timeout_tracker.call_on_timeout(0.01, on_timeout, kwargs={"arg": "last"})
+    wait_for_condition(lambda: called == ["last"])
+
+
+def test_benchmark_timeout_tracker(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(timeouts, "_DEBUG", False)
+    n_handles = 10000
+    called = []
+    all_called = threading.Event()
+    lock = threading.Lock()
+
+    def on_timeout():
+        with lock:
+            called.append(1)
+            if len(called) == n_handles:
+                all_called.set()
+
+    timeout_tracker = timeouts.TimeoutTracker()
+
+    # Many concurrent handles which are disposed before timing out (as in
+    # the requests which finish before the timeout).
+    initial_time = time.perf_counter()
+    handles = [
+        timeout_tracker.call_on_timeout(8 + i / n_handles, on_timeout)
+        for i in range(n_handles)
+    ]
+    add_time = time.perf_counter() - initial_time
+
+    # Requests added/disposed one by one while the others are still pending
+    # (the cpu time includes the processing in the timeout thread).
+    initial_cpu_time = time.process_time()
+    for _i in range(1000):
+        with timeout_tracker.call_on_timeout(8, on_timeout):
+            time.sleep(0.0002)
+    requests_cpu_time = time.process_time() - initial_cpu_time
+
+    for handle in handles:
+        with handle:
+            pass
+
+    # Many concurrent handles which time out.
+    initial_time = time.perf_counter()
+    for i in range(n_handles):
+        timeout_tracker.call_on_timeout(0.2 + i / (n_handles * 10), on_timeout)
+    assert all_called.wait(10)
+    expire_time = time.perf_counter() - initial_time
+
+    print(
+        f"{n_handles} handles: add: {add_time:.3f}s, "
+        f"1000 requests (cpu): {requests_cpu_time:.3f}s, "
+        f"all timed out after: {expire_time:.3f}s"
+    )
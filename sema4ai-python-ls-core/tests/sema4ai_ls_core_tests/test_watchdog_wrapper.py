@@ -1,8 +1,9 @@
+import sys
 import time
 import pytest
 
 
-@pytest.mark.parametrize("backend", ["watchdog", "fsnotify"])
+@pytest.mark.parametrize("backend", ["watchdog", "fsnotify", "inotify"])
 def test_watchdog_rename_folder(tmpdir, backend):
     from sema4ai_ls_core import watchdog_wrapper
     from sema4ai_ls_core.watchdog_wrapper import PathInfo
@@ -52,7 +53,7 @@ def test_watchdog_rename_folder(tmpdir, backend):
         observer.dispose()
 
 
-@pytest.mark.parametrize("backend", ["watchdog", "fsnotify"])
+@pytest.mark.parametrize("backend", ["watchdog", "fsnotify", "inotify"])
 def test_watchdog_conflicts(tmpdir, backend):
     from sema4ai_ls_core import watchdog_wrapper
     from sema4ai_ls_core.watchdog_wrapper import PathInfo
@@ -125,7 +126,7 @@ def test_watchdog_conflicts(tmpdir, backend):
         observer.dispose()
 
 
-@pytest.mark.parametrize("backend", ["watchdog", "fsnotify"])
+@pytest.mark.parametrize("backend", ["watchdog", "fsnotify", "inotify"])
 def test_watchdog_all(tmpdir, backend):
     from sema4ai_ls_core import watchdog_wrapper
     from sema4ai_ls_core.watchdog_wrapper import PathInfo
@@ -179,7 +180,7 @@ def test_watchdog_all(tmpdir, backend):
         observer.dispose()
 
 
-@pytest.mark.parametrize("backend", ["watchdog", "fsnotify"])
+@pytest.mark.parametrize("backend", ["watchdog", "fsnotify", "inotify"])
 def test_watchdog_extensions(tmpdir, backend):
     from sema4ai_ls_core import watchdog_wrapper
     from sema4ai_ls_core.watchdog_wrapper import PathInfo
@@ -324,3 +325,208 @@ def test_watchdog_only_recursive(tmpdir):
         for watch in watches:
             observer.unschedule(watch)
         observer.stop()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only.")
+def test_inotify_new_subtree_and_overflow(tmpdir):
+    from sema4ai_ls_core import watchdog_wrapper
+    from sema4ai_ls_core.watchdog_wrapper import PathInfo
+    from sema4ai_ls_core.basic import wait_for_expected_func_return
+    import os
+
+    dir_rec = tmpdir.join("dir_rec")
+    dir_rec.mkdir()
+    dir_rec.join("node_modules").mkdir()
+
+    found = set()
+
+    def on_change(filepath, *args):
+        found.add(os.path.relpath(filepath, str(dir_rec)).replace("\\", "/"))
+
+    observer = watchdog_wrapper.create_observer("inotify", (".txt",))
+    assert isinstance(observer, watchdog_wrapper._InotifyObserver)
+    watch = observer.notify_on_any_change([PathInfo(dir_rec, True)], on_change)
+    try:
+        # Contents created along with the directory must be reported (even if
+        # the watch for the new directory is only added afterwards).
+        initial_time = time.time()
+        os.makedirs(str(dir_rec.join("a").join("b")))
+        dir_rec.join("a").join("b").join("my.txt").write("foo")
+        wait_for_expected_func_return(lambda: found, {"a/b/my.txt"})
+        # No scan is needed, so, it must be reported right away.
+        assert time.time() - initial_time < 2
+
+        # Ignored directories must not be watched.
+        dir_rec.join("node_modules").join("ignored.txt").write("foo")
+        dir_rec.join("a").join("b").join("my2.txt").write("foo")
+        wait_for_expected_func_return(lambda: found, {"a/b/my.txt", "a/b/my2.txt"})
+
+        # On an overflow everything tracked must be rescanned and reported.
+        found.clear()
+        constants = observer._inotify_c.InotifyConstants
+        observer._process_events([(-1, constants.IN_Q_OVERFLOW, 0, b"")])
+        assert found == {"a/b/my.txt", "a/b/my2.txt"}
+
+        watch.stop_tracking()
+        assert not observer._dir_to_wd
+    finally:
+        watch.stop_tracking()
+        observer.dispose()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only.")
+def test_inotify_missing_and_recreated_root(tmpdir):
+    from sema4ai_ls_core import watchdog_wrapper
+    from sema4ai_ls_core.watchdog_wrapper import PathInfo
+    from sema4ai_ls_core.basic import wait_for_condition
+    import os
+    import shutil
+
+    dir_rec = tmpdir.join("dir_rec")
+    other = tmpdir.join("other")
+    other.mkdir()
+
+    found = set()
+
+    def on_change(filepath, *args):
+        found.add(os.path.relpath(filepath, str(tmpdir)).replace("\\", "/"))
+
+    observer = watchdog_wrapper.create_observer("inotify", (".txt",))
+    assert isinstance(observer, watchdog_wrapper._InotifyObserver)
+    observer._MISSING_PATHS_CHECK_INTERVAL = 0.1
+    # Start the thread before tracking the path which doesn't exist.
+    watch_other = observer.notify_on_any_change([PathInfo(other, True)], on_change)
+    watch = observer.notify_on_any_change([PathInfo(dir_rec, True)], on_change)
+    try:
+        # A root which doesn't exist when the tracking starts is watched
+        # once it's created.
+        os.makedirs(str(dir_rec.join("a")))
+        dir_rec.join("a").join("my.txt").write("foo")
+        wait_for_condition(lambda: "dir_rec/a/my.txt" in found)
+        wait_for_condition(lambda: str(dir_rec) in observer._dir_to_wd)
+
+        found.clear()
+        dir_rec.join("a").join("my2.txt").write("foo")
+        wait_for_condition(lambda: found == {"dir_rec/a/my2.txt"})
+
+        # A root which is removed and created again is watched again.
+        shutil.rmtree(str(dir_rec))
+        wait_for_condition(lambda: str(dir_rec) not in observer._dir_to_wd)
+        found.clear()
+        dir_rec.mkdir()
+        dir_rec.join("my3.txt").write("foo")
+        wait_for_condition(lambda: "dir_rec/my3.txt" in found)
+        wait_for_condition(lambda: str(dir_rec) in observer._dir_to_wd)
+
+        found.clear()
+        dir_rec.join("my4.txt").write("foo")
+        wait_for_condition(lambda: found == {"dir_rec/my4.txt"})
+    finally:
+        watch.stop_tracking()
+        watch_other.stop_tracking()
+        observer.dispose()
+
+
+def _linear_matches(notifications, src_path):
+    # The previous implementation (which checks all the notifications) used
+    # as the reference to check the trie.
+    src_path_lower = src_path.lower()
+    for notification in notifications:
+        path_lower = notification[0].lower()
+        if src_path_lower == path_lower:
+            yield notification
+        elif src_path_lower.startswith(path_lower + "/"):
+            if notification[3] or "/" not in src_path_lower[len(path_lower) + 1 :]:
+                yield notification
+
+
+def test_watch_trie_matches():
+    import random
+    from sema4ai_ls_core.watchdog_wrapper import _WatchTrie
+
+    rnd = random.Random(0)
+    names = ["a", "B", "c", "ab"]
+
+    def random_path():
+        return "/" + "/".join(rnd.choice(names) for _ in range(rnd.randint(1, 5)))
+
+    trie = _WatchTrie()
+    notifications = []
+    for i in range(300):
+        if notifications and rnd.random() < 0.3:
+            notification = notifications.pop(rnd.randrange(len(notifications)))
+            trie.remove(notification)
+        else:
+            notification = (random_path(), i, (), rnd.random() < 0.5)
+            notifications.append(notification)
+            trie.add(notification)
+
+        for _ in range(10):
+            src_path = random_path()
+            assert sorted(trie.iter_matches(src_path), key=id) == sorted(
+                _linear_matches(notifications, src_path), key=id
+            )
+
+    for notification in notifications:
+        trie.remove(notification)
+    assert not trie._root.children
+
+
+def test_watch_trie_dispatch_coalesces():
+    from sema4ai_ls_core.watchdog_wrapper import _WatchTrie
+
+    calls = []
+
+    def on_change(src_path, *args):
+        calls.append((src_path,) + args)
+
+    trie = _WatchTrie()
+    trie.add(("/ws", on_change, ("rec",), True))
+    trie.add(("/ws/dir", on_change, ("not_rec",), False))
+
+    trie.dispatch(
+        ["/ws/dir/a.txt", "/ws/dir/a.txt", "/ws/dir/sub/b.txt", "/other/a.txt"]
+    )
+    assert calls == [
+        ("/ws/dir/a.txt", "rec"),
+        ("/ws/dir/sub/b.txt", "rec"),
+        ("/ws/dir/a.txt", "not_rec"),
+    ]
+
+
+def test_benchmark_watch_trie_dispatch():
+    # Benchmark: thousands of watches and tens of thousands of changes (i.e.:
+    # a `git checkout` with many workspace folders tracked).
+    from sema4ai_ls_core.watchdog_wrapper import _WatchTrie
+
+    n_calls = [0]
+
+    def on_change(src_path, *args):
+        n_calls[0] += 1
+
+    n_watches = 5000
+    trie = _WatchTrie()
+    notifications = []
+    for i in range(n_watches):
+        notification = (f"/home/user/ws{i}/project", on_change, (), i % 2 == 0)
+        notifications.append(notification)
+        trie.add(notification)
+
+    n_changes = 50_000
+    changes = [
+        f"/home/user/ws{i % n_watches}/project/src/module{i}.py"
+        for i in range(n_changes)
+    ]
+    initial_time = time.perf_counter()
+    trie.dispatch(changes)
+    elapsed = time.perf_counter() - initial_time
+    print(f"Dispatched {n_changes} changes with {n_watches} watches in {elapsed:.2f}s")
+    assert n_calls[0] == n_changes // 2
+
+    # The same changes with the previous (linear) matching for reference.
+    initial_time = time.perf_counter()
+    for src_path in changes[:1000]:
+        for _ in _linear_matches(notifications, src_path):
+            pass
+    elapsed = time.perf_counter() - initial_time
+    print(f"Linear matching of 1000 changes: {elapsed:.2f}s")
@@ -131,3 +131,247 @@ def test_workspace_memory_cache(tmpdir, small_vs_sleep) -> None:
     assert set(ws.iter_all_doc_uris_in_workspace((".py", ".txt"))) == set()
     vs._virtual_fsthread.join(0.5)
     assert not vs._virtual_fsthread.is_alive()
+
+
+def _create_workspace_with_snapshot(root_path, snapshot_dir):
+    from sema4ai_ls_core import uris
+    from sema4ai_ls_core.lsp import WorkspaceFolder
+    from sema4ai_ls_core.watchdog_wrapper import create_observer
+    from sema4ai_ls_core.workspace import Workspace
+
+    root_uri = uris.from_fs_path(root_path)
+    return Workspace(
+        root_uri,
+        create_observer("dummy", ()),
+        [WorkspaceFolder(root_uri, "ws")],
+        track_file_extensions=(".py", ".txt"),
+        snapshot_dir=snapshot_dir,
+    )
+
+
+def test_workspace_snapshot(tmpdir, monkeypatch):
+    import os
+
+    from sema4ai_ls_core import uris
+    from sema4ai_ls_core.workspace import _VirtualFSThread
+
+    root = tmpdir.join("ws")
+    root.mkdir()
+    for i in range(3):
+        d = root.join(f"dir{i}")
+        d.mkdir()
+        d.join(f"my{i}.py").write("foo")
+        d.join(f"my{i}.other").write("foo")
+        d.join("inner").mkdir()
+        d.join("inner").join("in.txt").write("foo")
+    snapshot_dir = str(tmpdir.join("snapshots"))
+
+    listed = []
+    original_list_dir = _VirtualFSThread._list_dir
+
+    def _list_dir(self, dir_path, previous):
+        ret = original_list_dir(self, dir_path, previous)
+        if ret is not None and ret is not previous:
+            listed.append(os.path.relpath(dir_path, str(root)).replace("\\", "/"))
+        return ret
+
+    monkeypatch.setattr(_VirtualFSThread, "_list_dir", _list_dir)
+
+    def get_files(ws):
+        return sorted(
+            os.path.relpath(uris.to_fs_path(uri), str(root)).replace("\\", "/")
+            for uri in ws.iter_all_doc_uris_in_workspace((".py", ".txt"))
+        )
+
+    ws = _create_workspace_with_snapshot(str(root), snapshot_dir)
+    ws.wait_for_check_done(10)
+    expected = [
+        "dir0/inner/in.txt",
+        "dir0/my0.py",
+        "dir1/inner/in.txt",
+        "dir1/my1.py",
+        "dir2/inner/in.txt",
+        "dir2/my2.py",
+    ]
+    assert get_files(ws) == expected
+    assert len(listed) == 7
+    for folder in list(ws.iter_folders()):
+        ws.remove_folder(folder.uri)
+    assert os.listdir(snapshot_dir)
+
+    # Only the changed directories must be listed again.
+    del listed[:]
+    root.join("dir0").join("new.py").write("foo")
+    root.join("dir1").join("inner").remove(rec=True)
+    ws = _create_workspace_with_snapshot(str(root), snapshot_dir)
+    ws.wait_for_check_done(10)
+    assert sorted(listed) == ["dir0", "dir1"]
+    assert get_files(ws) == [
+        "dir0/inner/in.txt",
+        "dir0/my0.py",
+        "dir0/new.py",
+        "dir1/my1.py",
+        "dir2/inner/in.txt",
+        "dir2/my2.py",
+    ]
+    for folder in list(ws.iter_folders()):
+        ws.remove_folder(folder.uri)
+
+
+def test_benchmark_workspace_snapshot(tmpdir):
+    import time
+
+    root = tmpdir.join("ws")
+    root.mkdir()
+    n_dirs = 2000
+    for i in range(n_dirs):
+        d = root.join(f"dir{i}")
+        d.mkdir()
+        for j in range(20):
+            d.join(f"my{j}.py").write("")
+    snapshot_dir = str(tmpdir.join("snapshots"))
+
+    timings = []
+    for _ in range(2):
+        initial_time = time.perf_counter()
+        ws = _create_workspace_with_snapshot(str(root), snapshot_dir)
+        for folder in ws.iter_folders():
+            assert folder._vs._virtual_fsthread.first_check_done.wait(30)
+        timings.append(time.perf_counter() - initial_time)
+        assert len(list(ws.iter_all_doc_uris_in_workspace((".py",)))) == n_dirs * 20
+        for folder in list(ws.iter_folders()):
+            ws.remove_folder(folder.uri)
+
+    print(
+        f"Initial scan of {n_dirs} dirs: {timings[0]:.2f}s "
+        f"(with snapshot: {timings[1]:.2f}s)"
+    )
+
+
+def _create_virtual_fs(root_path, extensions):
+    from sema4ai_ls_core.watchdog_wrapper import create_observer
+    from sema4ai_ls_core.workspace import _VirtualFS
+
+    vs = _VirtualFS(root_path, extensions, create_observer("dummy", ()))
+    assert vs._virtual_fsthread.first_check_done.wait(10)
+    return vs
+
+
+def test_workspace_file_index(tmpdir):
+    import os
+
+    from sema4ai_ls_core import uris
+    from sema4ai_ls_core.workspace import _DirInfo
+
+    root = str(tmpdir)
+    vs = _create_virtual_fs(root, (".yaml", "package.yaml", ".py"))
+    try:
+
+        def as_names(doc_uris):
+            return sorted(
+                os.path.relpath(uris.to_fs_path(uri), root).replace("\\", "/")
+                for uri in doc_uris
+            )
+
+        def set_files(dir_name, *names):
+            dir_path = os.path.join(root, dir_name)
+            dir_info = _DirInfo(dir_path)
+            dir_info.files_in_directory.update(
+                os.path.join(dir_path, name) for name in names
+            )
+            vs._set_dir_info(dir_path, dir_info)
+
+        set_files("a", "package.yaml", "conda.yaml", "a.py", "a.txt")
+        set_files("b", "package.yaml", "b.py")
+
+        assert as_names(vs._iter_all_doc_uris((".py",))) == ["a/a.py", "b/b.py"]
+        # Extensions which aren't tracked have no matches.
+        assert as_names(vs._iter_all_doc_uris((".txt", ".py"))) == [
+            "a/a.py",
+            "b/b.py",
+        ]
+        assert list(vs._iter_all_doc_uris((".txt",))) == []
+        # Overlapping extensions must not report the same file twice.
+        assert as_names(vs._iter_all_doc_uris((".yaml", "package.yaml"))) == [
+            "a/conda.yaml",
+            "a/package.yaml",
+            "b/package.yaml",
+        ]
+        assert as_names(vs._iter_doc_uris_by_basename(("package.yaml",))) == [
+            "a/package.yaml",
+            "b/package.yaml",
+        ]
+        assert list(vs._iter_doc_uris_by_basename(("a.txt",))) == []
+
+        # Incremental changes.
+        set_files("a", "conda.yaml", "a2.py")
+        assert as_names(vs._iter_all_doc_uris((".py",))) == ["a/a2.py", "b/b.py"]
+        assert as_names(vs._iter_doc_uris_by_basename(("package.yaml",))) == [
+            "b/package.yaml"
+        ]
+
+        vs._set_dir_info(os.path.join(root, "b"), None)
+        assert as_names(vs._iter_all_doc_uris((".py", ".yaml"))) == [
+            "a/a2.py",
+            "a/conda.yaml",
+        ]
+        assert "package.yaml" not in vs._basename_to_files
+    finally:
+        vs.dispose()
+    assert not vs._basename_to_files
+    assert not any(vs._extension_to_files.values())
+
+
+def test_benchmark_workspace_file_index(tmpdir):
+    import os
+    import time
+
+    from sema4ai_ls_core import uris
+    from sema4ai_ls_core.workspace import _DirInfo
+
+    root = str(tmpdir)
+    vs = _create_virtual_fs(root, (".py", ".yaml"))
+    try:
+        n_dirs = 5000
+        for i in range(n_dirs):
+            dir_path = os.path.join(root, f"dir{i}")
+            dir_info = _DirInfo(dir_path)
+            names = [f"my{j}.py" for j in range(19)]
+            names.append("package.yaml" if i % 100 == 0 else "conda.yaml")
+            dir_info.files_in_directory.update(
+                os.path.join(dir_path, name) for name in names
+            )
+            vs._set_dir_info(dir_path, dir_info)
+
+        def linear_scan(extensions):
+            # The previous implementation (used as a reference).
+            for dir_info in list(vs._dir_to_info.values()):
+                for f in dir_info.files_in_directory:
+                    if f.endswith(extensions):
+                        yield uris.from_fs_path(f)
+
+        n_queries = 5
+        initial_time = time.perf_counter()
+        for _ in range(n_queries):
+            found = list(vs._iter_all_doc_uris((".yaml",)))
+            assert len(found) == n_dirs
+            found = list(vs._iter_doc_uris_by_basename(("package.yaml",)))
+            assert len(found) == n_dirs // 100
+        indexed_time = time.perf_counter() - initial_time
+
+        initial_time = time.perf_counter()
+        for _ in range(n_queries):
+            found = list(linear_scan((".yaml",)))
+            assert len(found) == n_dirs
+        linear_time = time.perf_counter() - initial_time
+
+        assert sorted(vs._iter_all_doc_uris((".py", ".yaml"))) == sorted(
+            linear_scan((".py", ".yaml"))
+        )
+    finally:
+        vs.dispose()
+
+    print(
+        f"{n_queries} queries in {n_dirs * 20} files: indexed: {indexed_time:.3f}s "
+        f"(linear scan: {linear_time:.3f}s)"
+    )
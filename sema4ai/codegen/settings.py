@@ -122,6 +122,12 @@ SETTINGS = [
         "Specifies whether the 'Run Task' and 'Debug Task' code lenses should be shown in `dev-tasks` in `package.yaml`.",
         setting_type="boolean",
     ),
+    Setting(
+        "sema4ai.lint.manualLintConcurrency",
+        0,
+        "Specifies the max number of documents linted in parallel when linting many documents (i.e.: when linting all the documents of an agent or action package). 0 means all but one of the lint threads (which is kept to lint the open documents).",
+        setting_type="number",
+    ),
 ]
 
 
@@ -1,5 +1,6 @@
 import os
 import weakref
+from collections.abc import Callable
 from typing import List, Optional
 
 from sema4ai_ls_core.basic import overrides
@@ -8,6 +9,11 @@ from sema4ai_ls_core.lsp import DiagnosticsTypedDict, LSPMessages
 from sema4ai_ls_core.protocols import IDocument, IEndPoint, IMonitor, IWorkspace
 from sema4ai_ls_core.python_ls import BaseLintInfo, BaseLintManager
 
+from sema4ai_code._lint_cache import (
+    DiagnosticsCache,
+    compute_content_hash,
+    make_fingerprint,
+)
 from sema4ai_code.protocols import IRcc
 from sema4ai_code.robocorp_language_server import RobocorpLanguageServer
 from sema4ai_code.vendored_deps.package_deps._deps_protocols import (
@@ -73,8 +79,14 @@ def collect_conda_yaml_diagnostics(
 
 
 def collect_rcc_configuration_diagnostics(
-    rcc: IRcc, robot_yaml_fs_path
-) -> list[DiagnosticsTypedDict]:
+    rcc: IRcc, robot_yaml_fs_path, on_pid: Callable[[int], None] | None = None
+) -> list[DiagnosticsTypedDict] | None:
+    """
+    :param on_pid: If given it's called with the pid of the rcc process (i.e.:
+        so that it can be killed if the lint is cancelled).
+
+    :return: None if it wasn't possible to run rcc (so that it's not cached).
+    """
     import json
 
     from sema4ai_ls_core.lsp import DiagnosticSeverity
@@ -84,59 +96,158 @@ def collect_rcc_configuration_diagnostics(
     if not DiagnosticsConfig.analyze_rcc:
         return ret
 
-    action_result = rcc.configuration_diagnostics(robot_yaml_fs_path)
-    if action_result.success:
-        json_contents = action_result.result
-        if not json_contents:
-            return ret
-
-        as_dict = json.loads(json_contents)
-        checks = as_dict.get("checks", [])
-        ret = []
-
-        CategoryLockFile = 1020
-        CategoryLockPid = 1021
-
-        if isinstance(checks, (list, tuple)):
-            for check in checks:
-                if isinstance(check, dict):
-                    status = check.get("status", "ok").lower()
-
-                    if status != "ok":
-                        if check.get("category") in (
-                            CategoryLockFile,
-                            CategoryLockPid,
-                        ):
-                            continue
-
-                        # Default is error (for fail/fatal)
-                        severity = DiagnosticSeverity.Error
-
-                        if status in ("warn", "warning"):
-                            severity = DiagnosticSeverity.Warning
-                        elif status in ("info", "information"):
-                            severity = DiagnosticSeverity.Information
-
-                        # The actual line is not given by rcc, so, put
-                        # all errors in the first 2 lines.
-                        message = check.get("message", "<unable to get error message>")
-
-                        url = check.get("url")
-                        if url:
-                            message += f" -- see: {url} for more information."
-                        dct: DiagnosticsTypedDict = {
-                            "range": {
-                                "start": {"line": 0, "character": 0},
-                                "end": {"line": 1, "character": 0},
-                            },
-                            "severity": severity,
-                            "source": "sema4ai",
-                            "message": message,
-                        }
-                        ret.append(dct)
+    action_result = rcc.configuration_diagnostics(robot_yaml_fs_path, on_pid=on_pid)
+    if not action_result.success:
+        return None
+
+    json_contents = action_result.result
+    if not json_contents:
+        return ret
+
+    as_dict = json.loads(json_contents)
+    checks = as_dict.get("checks", [])
+    ret = []
+
+    CategoryLockFile = 1020
+    CategoryLockPid = 1021
+
+    if isinstance(checks, (list, tuple)):
+        for check in checks:
+            if isinstance(check, dict):
+                status = check.get("status", "ok").lower()
+
+                if status != "ok":
+                    if check.get("category") in (
+                        CategoryLockFile,
+                        CategoryLockPid,
+                    ):
+                        continue
+
+                    # Default is error (for fail/fatal)
+                    severity = DiagnosticSeverity.Error
+
+                    if status in ("warn", "warning"):
+                        severity = DiagnosticSeverity.Warning
+                    elif status in ("info", "information"):
+                        severity = DiagnosticSeverity.Information
+
+                    # The actual line is not given by rcc, so, put
+                    # all errors in the first 2 lines.
+                    message = check.get("message", "<unable to get error message>")
+
+                    url = check.get("url")
+                    if url:
+                        message += f" -- see: {url} for more information."
+                    dct: DiagnosticsTypedDict = {
+                        "range": {
+                            "start": {"line": 0, "character": 0},
+                            "end": {"line": 1, "character": 0},
+                        },
+                        "severity": severity,
+                        "source": "sema4ai",
+                        "message": message,
+                    }
+                    ret.append(dct)
     return ret
 
 
+# Information from the clouds (pypi/conda/rcc) may change over time, so,
+# cached diagnostics which depend on it are only reused for some time (and
+# are only kept in memory).
+_CLOUD_INFO_CACHE_TIME_IN_SECONDS = 60 * 60
+
+
+def _cloud_info_time_bucket() -> int:
+    import time
+
+    return int(time.time() // _CLOUD_INFO_CACHE_TIME_IN_SECONDS)
+
+
+def _stat_fingerprint(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+        return (path, stat.st_mtime, stat.st_size)
+    except OSError:
+        return (path, None, None)
+
+
+def _deps_fingerprint(doc_path: str, conda_cloud: ICondaCloud) -> str:
+    latest_index_info = conda_cloud.load_latest_index_info()
+    index_timestamp = (
+        latest_index_info["timestamp"].isoformat()
+        if latest_index_info is not None
+        else None
+    )
+    return make_fingerprint(
+        doc_path,
+        DiagnosticsConfig.analyze_versions,
+        index_timestamp,
+        _cloud_info_time_bucket(),
+    )
+
+
+def _rcc_fingerprint(robot_yaml_fs_path: str) -> str:
+    """
+    rcc checks the robot.yaml along with the conda.yaml (or the environment
+    configs) referenced from it, so, the fingerprint considers those files.
+    """
+    from sema4ai_ls_core import yaml_wrapper
+
+    found = [_stat_fingerprint(robot_yaml_fs_path)]
+    try:
+        with open(robot_yaml_fs_path, encoding="utf-8") as stream:
+            yaml_contents = yaml_wrapper.load(stream)
+    except Exception:
+        yaml_contents = None
+
+    if isinstance(yaml_contents, dict):
+        referenced: list = []
+        environment_configs = yaml_contents.get("environmentConfigs")
+        if isinstance(environment_configs, (list, tuple)):
+            referenced.extend(environment_configs)
+        referenced.append(yaml_contents.get("condaConfigFile"))
+
+        parent = os.path.dirname(robot_yaml_fs_path)
+        found.extend(
+            _stat_fingerprint(os.path.join(parent, path))
+            for path in referenced
+            if path and isinstance(path, str)
+        )
+
+    return make_fingerprint(
+        found, DiagnosticsConfig.analyze_rcc, _cloud_info_time_bucket()
+    )
+
+
+def _agent_spec_fingerprint(agent_spec_path: str) -> str:
+    """
+    The agent-spec.yaml validation checks the action packages (package.yaml/.zip)
+    and files referenced from the agent-spec.yaml, so, the fingerprint considers
+    the action packages (from the inventory kept for the agent, so, the
+    `actions` directory is only listed again when a change is noticed) and the
+    entries directly in the agent directory (i.e.: the runbook).
+    """
+    from pathlib import Path
+
+    from sema4ai_code.agents.list_actions_from_agent import (
+        get_action_packages_inventory,
+    )
+
+    agent_root_dir = os.path.dirname(agent_spec_path)
+    inventory = get_action_packages_inventory(Path(agent_root_dir))
+    found = [
+        _stat_fingerprint(str(path))
+        for path in sorted(inventory.list_action_packages())
+    ]
+    try:
+        with os.scandir(agent_root_dir) as it:
+            entries = sorted(entry.path for entry in it)
+    except OSError:
+        entries = []
+    found.extend(_stat_fingerprint(path) for path in entries)
+    return make_fingerprint(agent_spec_path, found)
+
+
 class _CurrLintInfo(BaseLintInfo):
     def __init__(
         self,
@@ -146,9 +257,11 @@ class _CurrLintInfo(BaseLintInfo):
         doc_uri,
         is_saved,
         weak_lint_manager,
+        diagnostics_cache: DiagnosticsCache,
     ) -> None:
         self._rcc: IRcc = rcc
         self._weak_robocorp_language_server = weak_robocorp_language_server
+        self._diagnostics_cache = diagnostics_cache
         BaseLintInfo.__init__(self, lsp_messages, doc_uri, is_saved, weak_lint_manager)
 
     @staticmethod
@@ -185,6 +298,7 @@ class _CurrLintInfo(BaseLintInfo):
 
         is_saved = self.is_saved
         doc_uri = self.doc_uri
+        diagnostics_cache = self._diagnostics_cache
 
         if doc_uri.endswith(".py"):
             ws: IWorkspace | None = robocorp_language_server.workspace
@@ -195,18 +309,58 @@ class _CurrLintInfo(BaseLintInfo):
             errors = []
 
             if doc is not None:
+                curr_doc: IDocument = doc
                 source = doc.source
+                content_hash = compute_content_hash(source)
                 ruff_future = None
                 if self._find_action_or_agent(doc_uri):
-                    from sema4ai_code.robo.lint_ruff import collect_ruff_errors
                     from sema4ai.common.run_in_thread import run_in_thread
 
-                    ruff_future = run_in_thread(lambda: collect_ruff_errors(doc))
+                    from sema4ai_code.robo.lint_ruff import (
+                        SELECTED_RUFF_ERRORS,
+                        collect_ruff_errors,
+                    )
+
+                    ruff_fingerprint = make_fingerprint(
+                        os.path.basename(doc.path), SELECTED_RUFF_ERRORS
+                    )
+                    ruff_future = run_in_thread(
+                        lambda: diagnostics_cache.get_or_compute(
+                            "ruff",
+                            content_hash,
+                            ruff_fingerprint,
+                            lambda: collect_ruff_errors(curr_doc, self._monitor),
+                        )
+                    )
 
-                if "@action" in source:
-                    from sema4ai_code.robo.lint_action import collect_lint_errors
+                from sema4ai_code.robo.python_analysis import get_document_analysis
+
+                # Only run the action lint when some function is decorated with
+                # `@action` (if the file can't be parsed, fall back to a text
+                # search so that the errors are still reported).
+                analysis = get_document_analysis(doc)
+                if analysis.uses_action_decorator or (
+                    analysis.ast is None and "@action" in source
+                ):
+                    from sema4ai_code.robo.lint_action import (
+                        collect_lint_errors,
+                        get_interpreter_info,
+                        make_environment_fingerprint,
+                    )
 
-                    errors = collect_lint_errors(robocorp_language_server.pm, doc)
+                    pm = robocorp_language_server.pm
+                    interpreter_info = get_interpreter_info(pm, doc_uri)
+                    if interpreter_info is not None:
+                        errors = diagnostics_cache.get_or_compute(
+                            "action",
+                            content_hash,
+                            make_fingerprint(
+                                make_environment_fingerprint(interpreter_info)
+                            ),
+                            lambda: collect_lint_errors(
+                                pm, curr_doc, self._monitor, interpreter_info
+                            ),
+                        )
 
                 if ruff_future:
                     errors.extend(ruff_future.result())
@@ -219,15 +373,25 @@ class _CurrLintInfo(BaseLintInfo):
             if robocorp_language_server is not None:
                 ws = robocorp_language_server.workspace
                 if ws is not None:
-                    found.extend(
-                        collect_package_yaml_diagnostics(
-                            robocorp_language_server.pypi_cloud,
-                            robocorp_language_server.conda_cloud,
-                            ws,
-                            doc_uri,
-                            self._monitor,
+                    curr_ws: IWorkspace = ws
+                    doc = ws.get_document(doc_uri, accept_from_file=True)
+                    if doc is not None:
+                        conda_cloud = robocorp_language_server.conda_cloud
+                        found.extend(
+                            diagnostics_cache.get_or_compute(
+                                "package.yaml",
+                                compute_content_hash(doc.source),
+                                _deps_fingerprint(doc.path, conda_cloud),
+                                lambda: collect_package_yaml_diagnostics(
+                                    robocorp_language_server.pypi_cloud,
+                                    conda_cloud,
+                                    curr_ws,
+                                    doc_uri,
+                                    self._monitor,
+                                ),
+                                persist=False,
+                            )
                         )
-                    )
 
             self._lsp_messages.publish_diagnostics(doc_uri, found)
             return
@@ -241,13 +405,21 @@ class _CurrLintInfo(BaseLintInfo):
                         collect_agent_spec_diagnostics,
                     )
 
-                    found.extend(
-                        collect_agent_spec_diagnostics(
-                            ws,
-                            doc_uri,
-                            self._monitor,
+                    curr_ws = ws
+                    doc = ws.get_document(doc_uri, accept_from_file=True)
+                    if doc is not None:
+                        found.extend(
+                            diagnostics_cache.get_or_compute(
+                                "agent-spec.yaml",
+                                compute_content_hash(doc.source),
+                                _agent_spec_fingerprint(doc.path),
+                                lambda: collect_agent_spec_diagnostics(
+                                    curr_ws,
+                                    doc_uri,
+                                    self._monitor,
+                                ),
+                            )
                         )
-                    )
 
             self._lsp_messages.publish_diagnostics(doc_uri, found)
             return
@@ -273,33 +445,52 @@ class _CurrLintInfo(BaseLintInfo):
 
             # When a document is saved, if it's a conda.yaml or a robot.yaml,
             # validate it with RCC.
+            ws = robocorp_language_server.workspace
+            doc = (
+                ws.get_document(doc_uri, accept_from_file=True)
+                if ws is not None
+                else None
+            )
+            content_hash = compute_content_hash(doc.source) if doc is not None else ""
+
             if is_saved:
                 executor_service: futures.ThreadPoolExecutor = getattr(
                     endpoint, "executor_service"
                 )
 
+                rcc = self._rcc
                 future_diagnostics = executor_service.submit(
-                    collect_rcc_configuration_diagnostics,
-                    self._rcc,
-                    robot_yaml_fs_path,
+                    diagnostics_cache.get_or_compute,
+                    "rcc",
+                    content_hash,
+                    _rcc_fingerprint(robot_yaml_fs_path),
+                    lambda: collect_rcc_configuration_diagnostics(
+                        rcc, robot_yaml_fs_path, on_pid=self.kill_subprocess_on_cancel
+                    ),
+                    persist=False,
                 )
 
             found = []
             # Ok, we started collecting RCC diagnostics in a thread. We
             # can now also collect other diagnostics here.
             if doc_uri.endswith(("conda.yaml", "action-server.yaml")):
-                if robocorp_language_server is not None:
-                    ws = robocorp_language_server.workspace
-                    if ws is not None:
-                        found.extend(
-                            collect_conda_yaml_diagnostics(
+                if ws is not None and doc is not None:
+                    conda_cloud = robocorp_language_server.conda_cloud
+                    found.extend(
+                        diagnostics_cache.get_or_compute(
+                            "conda.yaml",
+                            content_hash,
+                            _deps_fingerprint(doc.path, conda_cloud),
+                            lambda: collect_conda_yaml_diagnostics(
                                 robocorp_language_server.pypi_cloud,
-                                robocorp_language_server.conda_cloud,
+                                conda_cloud,
                                 ws,
                                 doc_uri,
                                 self._monitor,
-                            )
+                            ),
+                            persist=False,
                         )
+                    )
 
             if is_saved:
                 found.extend(future_diagnostics.result())
@@ -315,10 +506,25 @@ class LintManager(BaseLintManager):
         lsp_messages,
         endpoint: IEndPoint,
         read_queue,
+        diagnostics_cache_dir: str | None = None,
+        max_manual_lint_workers: int | None = None,
     ) -> None:
+        """
+        :param diagnostics_cache_dir: If given, the diagnostics computed are
+            also cached on disk in this directory.
+        :param max_manual_lint_workers: The max number of documents linted in
+            parallel in a manual lint (None means the default).
+        """
         self._rcc: IRcc = rcc
         self._weak_robocorp_language_server = weakref.ref(robocorp_language_server)
-        BaseLintManager.__init__(self, lsp_messages, endpoint, read_queue)
+        self._diagnostics_cache = DiagnosticsCache(cache_dir=diagnostics_cache_dir)
+        BaseLintManager.__init__(
+            self,
+            lsp_messages,
+            endpoint,
+            read_queue,
+            max_manual_lint_workers=max_manual_lint_workers,
+        )
 
     @overrides(BaseLintManager._create_curr_lint_info)
     def _create_curr_lint_info(
@@ -335,5 +541,6 @@ class LintManager(BaseLintManager):
             doc_uri,
             is_saved,
             weak_lint_manager,
+            self._diagnostics_cache,
         )
         return curr_info
@@ -0,0 +1,177 @@
+"""
+Cache for the diagnostics computed by the linters.
+
+Entries are keyed by (linter id, hash of the document contents, fingerprint of
+anything else the linter depends on -- i.e.: the target environment, related
+files on disk, etc.), so, linting contents which were already linted (for
+instance after an undo/redo, a save without changes or reopening a document)
+reuses the diagnostics previously computed instead of running the linter again.
+
+Besides the in-memory LRU, entries may also be persisted on disk (so that
+reopening a workspace can provide the diagnostics right away).
+"""
+
+import os
+import threading
+from collections.abc import Callable, Iterable
+
+from sema4ai_ls_core.core_log import get_logger
+
+log = get_logger(__name__)
+
+# The disk entries are pruned (oldest first) when more than this number is
+# found (checked only after some stores to avoid listing the dir all the time).
+_MAX_DISK_ENTRIES = 2000
+_PRUNE_DISK_EVERY_N_STORES = 100
+
+
+def compute_content_hash(contents: str) -> str:
+    import hashlib
+
+    return hashlib.sha256(contents.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def make_fingerprint(*parts) -> str:
+    """
+    Creates a fingerprint with the given parts (which must have a stable `repr`).
+    """
+    import hashlib
+
+    return hashlib.sha256(repr(parts).encode("utf-8", "replace")).hexdigest()
+
+
+class DiagnosticsCache:
+    def __init__(
+        self,
+        max_size: int = 300,
+        cache_dir: str | None = None,
+        max_disk_entries: int = _MAX_DISK_ENTRIES,
+    ) -> None:
+        """
+        :param max_size: The max number of entries in memory.
+        :param cache_dir: If given, entries are also persisted in this
+            directory.
+        :param max_disk_entries: The max number of entries kept in the disk.
+        """
+        from sema4ai_ls_core.cache import DirCache, LRUCache
+
+        self._lock = threading.Lock()
+        self._memory_cache: LRUCache[tuple, list] = LRUCache(max_size)
+        self._cache_dir = cache_dir
+        self._dir_cache: DirCache | None = None
+        if cache_dir:
+            try:
+                self._dir_cache = DirCache(cache_dir)
+            except Exception:
+                log.exception(f"Unable to create diagnostics cache in: {cache_dir}")
+        self._max_disk_entries = max_disk_entries
+        self._stores_since_prune = 0
+
+    def get(self, linter_id: str, content_hash: str, fingerprint: str) -> list | None:
+        key = (linter_id, content_hash, fingerprint)
+        with self._lock:
+            found = self._memory_cache.get(key)
+        if found is not None:
+            return list(found)
+
+        dir_cache = self._dir_cache
+        if dir_cache is None:
+            return None
+        try:
+            found = dir_cache.load(list(key), list)
+        except KeyError:
+            return None
+
+        with self._lock:
+            self._memory_cache[key] = found
+        return list(found)
+
+    def put(
+        self,
+        linter_id: str,
+        content_hash: str,
+        fingerprint: str,
+        diagnostics: list,
+        persist: bool = True,
+    ) -> None:
+        """
+        :param persist: If False the entry is kept only in memory (for linters
+            whose results may change based on things not in the fingerprint).
+        """
+        key = (linter_id, content_hash, fingerprint)
+        diagnostics = list(diagnostics)
+        with self._lock:
+            self._memory_cache[key] = diagnostics
+
+        dir_cache = self._dir_cache
+        if dir_cache is None or not persist:
+            return
+
+        try:
+            dir_cache.store(list(key), diagnostics)
+        except Exception:
+            log.exception("Error storing diagnostics in disk cache.")
+            return
+
+        with self._lock:
+            self._stores_since_prune += 1
+            prune = self._stores_since_prune >= _PRUNE_DISK_EVERY_N_STORES
+            if prune:
+                self._stores_since_prune = 0
+        if prune:
+            self._prune_disk_entries()
+
+    def get_or_compute(
+        self,
+        linter_id: str,
+        content_hash: str,
+        fingerprint: str,
+        compute: Callable[[], Iterable | None],
+        persist: bool = True,
+    ) -> list:
+        """
+        Provides the cached diagnostics or computes (and caches) them.
+
+        Note: if `compute` raises an exception or returns None (i.e.: the
+        linter failed) nothing is cached (an empty list is returned if it
+        returns None).
+        """
+        found = self.get(linter_id, content_hash, fingerprint)
+        if found is not None:
+            return found
+
+        computed = compute()
+        if computed is None:
+            return []
+
+        diagnostics = list(computed)
+        self.put(linter_id, content_hash, fingerprint, diagnostics, persist=persist)
+        return diagnostics
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory_cache.clear()
+
+    def _prune_disk_entries(self) -> None:
+        cache_dir = self._cache_dir
+        if not cache_dir:
+            return
+        try:
+            entries = []
+            for entry in os.scandir(cache_dir):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+
+            if len(entries) <= self._max_disk_entries:
+                return
+
+            entries.sort()
+            for _mtime, path in entries[: len(entries) - self._max_disk_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        except Exception:
+            log.exception(f"Error pruning diagnostics cache in: {cache_dir}")
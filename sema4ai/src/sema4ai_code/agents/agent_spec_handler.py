@@ -389,6 +389,19 @@ def _convert_flattened_to_nested(flattened: dict[str, Entry]) -> _SpecTreeNode:
     return root
 
 
+# id(spec entries) -> (spec entries, spec tree). The spec entries are not
+# changed after being loaded, so, the tree is built only once for each spec.
+_spec_trees: dict[int, tuple[dict[str, Entry], _SpecTreeNode]] = {}
+
+
+def _get_spec_tree(spec_entries: dict[str, Entry]) -> _SpecTreeNode:
+    cached = _spec_trees.get(id(spec_entries))
+    if cached is None or cached[0] is not spec_entries:
+        cached = (spec_entries, _convert_flattened_to_nested(spec_entries))
+        _spec_trees[id(spec_entries)] = cached
+    return cached[1]
+
+
 class InvalidSpec(Exception):
     pass
 
@@ -398,6 +411,7 @@ def validate_from_spec(
     yaml_spec_contents: str,
     agent_root_dir: Path,
     raise_on_error: bool = True,
+    cache_key: str | None = None,
 ) -> tuple[Error, ...]:
     """
     Validate the YAML agent spec against the JSON agent spec.
@@ -410,13 +424,14 @@ def validate_from_spec(
         spec_entries: The spec entries as a dictionary (previously loaded from load_spec with the correct version).
         yaml_spec_contents: The YAML agent spec contents as a string.
         agent_root_dir: The root directory of the agent package (contains the agent-spec.yaml file).
+        cache_key: If given, the parsed tree is cached with this key (i.e.: the document uri).
 
     Raises:
         InvalidSpec: If the YAML agent spec is invalid.
     """
 
     validator = Validator(spec_entries, agent_root_dir)
-    tree = tree_sitter_parse_yaml(yaml_spec_contents)
+    tree = tree_sitter_parse_yaml(yaml_spec_contents, cache_key)
     errors: tuple[Error, ...] = tuple(validator.validate(tree.root_node))
     if errors and raise_on_error:
         msg = "\n".join(e.message for e in errors)
@@ -424,15 +439,17 @@ def validate_from_spec(
     return tuple(sorted(errors, key=lambda e: e.message))
 
 
-def tree_sitter_parse_yaml(yaml_spec_contents: str) -> "Tree":
-    import tree_sitter_yaml
-    from tree_sitter import Language, Parser
+def tree_sitter_parse_yaml(
+    yaml_spec_contents: str, cache_key: str | None = None
+) -> "Tree":
+    """
+    Params:
+        cache_key: If given, the tree is cached with this key (i.e.: the document uri)
+            so that a new version of the same document is incrementally parsed.
+    """
+    from sema4ai_code.agents.yaml_tree import parse_yaml
 
-    language = tree_sitter_yaml.language()
-    parser = Parser(Language(language))
-    contents = yaml_spec_contents.encode("utf8", errors="replace")
-    tree = parser.parse(contents, encoding="utf8")
-    return tree
+    return parse_yaml(yaml_spec_contents, cache_key)
 
 
 class Validator:
@@ -1318,7 +1335,7 @@ class Validator:
             return yaml_node_text
 
     def _validate_yaml_from_spec(self) -> Iterator[Error]:
-        root = _convert_flattened_to_nested(self._spec_entries)
+        root = _get_spec_tree(self._spec_entries)
 
         # print("--- root ---")
         # print(root.pretty())
@@ -1360,11 +1377,11 @@ class Validator:
                 )
 
     def validate(self, node: "Node") -> Iterator[Error]:
-        from .list_actions_from_agent import list_actions_from_agent
+        from .list_actions_from_agent import get_action_packages_inventory
 
-        self._action_packages_found_in_filesystem = list_actions_from_agent(
+        self._action_packages_found_in_filesystem = get_action_packages_inventory(
             self._agent_root_dir
-        )
+        ).list_action_packages()
 
         yield from self._validate_nodes_exist_and_build_yaml_info(node)
         yield from self._validate_yaml_from_spec()
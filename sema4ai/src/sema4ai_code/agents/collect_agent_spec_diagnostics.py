@@ -86,6 +86,8 @@ class _Analyzer:
     def _load_yaml(self) -> None:
         from yaml.error import MarkedYAMLError
 
+        from sema4ai_code.agents.agent_spec_handler import tree_sitter_parse_yaml
+        from sema4ai_code.agents.yaml_tree import UnsupportedYamlTree, tree_to_python
         from sema4ai_code.vendored_deps.yaml_with_location import (
             LoaderWithLines,
             create_range_from_location,
@@ -99,11 +101,20 @@ class _Analyzer:
 
         try:
             contents = self.doc.source
-            loader = LoaderWithLines(contents)
-            path: pathlib.Path = pathlib.Path(self.doc.path)
+            # The tree (which is also used for the validation of the spec) is
+            # the source for the values. PyYAML is only used if it can't be
+            # used (i.e.: to report syntax errors).
+            try:
+                data = tree_to_python(
+                    tree_sitter_parse_yaml(contents, self.doc.uri), contents
+                )
+            except UnsupportedYamlTree:
+                loader = LoaderWithLines(contents)
+                path: pathlib.Path = pathlib.Path(self.doc.path)
+
+                loader.name = f".../{path.parent.name}/{path.name}"
+                data = loader.get_single_data()
 
-            loader.name = f".../{path.parent.name}/{path.name}"
-            data = loader.get_single_data()
             if isinstance(data, dict):
                 self._yaml_data = data
             else:
@@ -244,6 +255,7 @@ def validate_agent(
             doc.source,
             pathlib.Path(doc.path).parent,
             raise_on_error=False,
+            cache_key=doc.uri,
         ):
             yield typing.cast(DiagnosticsTypedDict, error.as_diagostic(agent_node))
 
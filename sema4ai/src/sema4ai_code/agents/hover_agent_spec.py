@@ -30,13 +30,11 @@ def _find_version(node: "Node") -> str | None:
 def hover_on_agent_spec_yaml(
     doc: IDocument, line: int, col: int, monitor: IMonitor
 ) -> HoverTypedDict | None:
-    import tree_sitter_yaml
-    from tree_sitter import Language, Parser, Point
+    from tree_sitter import Point
 
-    language = tree_sitter_yaml.language()
-    parser = Parser(Language(language))
-    contents = doc.source.encode("utf8", errors="replace")
-    tree = parser.parse(contents, encoding="utf8")
+    from sema4ai_code.agents.agent_spec_handler import tree_sitter_parse_yaml
+
+    tree = tree_sitter_parse_yaml(doc.source, doc.uri)
 
     pos = Point(line, col)
     descendant = tree.root_node.named_descendant_for_point_range(pos, pos)
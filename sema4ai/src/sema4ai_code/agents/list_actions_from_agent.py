@@ -1,11 +1,20 @@
+import dataclasses
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from sema4ai_ls_core.cache import LRUCache
 from sema4ai_ls_core.core_log import get_logger
+from sema4ai_ls_core.watchdog_wrapper import IFSObserver, IFSWatch
 
 log = get_logger(__name__)
 
+_MAX_CACHED_ZIP_MANIFESTS = 500
+_MAX_INVENTORIES = 20
+
 
 @dataclass
 class ActionPackageInFilesystem:
@@ -125,7 +134,7 @@ def list_actions_from_agent(
                 continue
 
             zip_path = zip_path.absolute()
-            package_yaml_contents = get_package_yaml_from_zip(zip_path)
+            package_yaml_contents = _get_package_yaml_from_zip_cached(zip_path)
             relative_path = zip_path.relative_to(actions_dir).as_posix()
             organization = zip_path.relative_to(actions_dir).parts[0]
             found[zip_path] = ActionPackageInFilesystem(
@@ -161,3 +170,157 @@ def get_package_yaml_from_zip(zip_path: Path) -> str | None:
                 return decoded
     except Exception:
         return None
+
+
+# zip path -> ((mtime_ns, size), package.yaml contents)
+_zip_manifests: LRUCache[Path, tuple[tuple[int, int], str | None]] = LRUCache(
+    _MAX_CACHED_ZIP_MANIFESTS
+)
+_zip_manifests_lock = threading.Lock()
+
+
+def _get_package_yaml_from_zip_cached(zip_path: Path) -> str | None:
+    """
+    Same as `get_package_yaml_from_zip` but the zip is only opened again if
+    its mtime or size changed.
+    """
+    try:
+        stat = zip_path.stat()
+    except OSError:
+        return None
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _zip_manifests_lock:
+        cached = _zip_manifests.get(zip_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    package_yaml_contents = get_package_yaml_from_zip(zip_path)
+    with _zip_manifests_lock:
+        _zip_manifests[zip_path] = (key, package_yaml_contents)
+    return package_yaml_contents
+
+
+class ActionPackagesInventory:
+    """
+    Keeps the action packages found for an agent (so that the `actions`
+    directory is only listed again when some change is noticed by the
+    file-watch).
+
+    Note: if it's not possible to watch the agent directory, the action
+    packages are listed on each request (zips are still only re-opened
+    if their mtime or size changed).
+    """
+
+    def __init__(self, agent_root_dir: Path) -> None:
+        self.agent_root_dir = agent_root_dir
+        self._actions_dir = os.path.normcase(
+            str((agent_root_dir / "actions").absolute())
+        )
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._found: dict[Path, ActionPackageInFilesystem] = {}
+        self._watch: IFSWatch | None = None
+
+    def start_tracking(self, observer: IFSObserver) -> None:
+        from sema4ai_ls_core.watchdog_wrapper import PathInfo
+
+        try:
+            # The agent root is tracked (and not the actions directory) as
+            # the actions directory may still not exist.
+            self._watch = observer.notify_on_any_change(
+                [PathInfo(str(self.agent_root_dir), recursive=True)],
+                self._on_change,
+            )
+        except Exception:
+            log.exception(
+                "Unable to track changes in: %s (action packages will be listed on each request).",
+                self.agent_root_dir,
+            )
+
+    def stop_tracking(self) -> None:
+        watch = self._watch
+        self._watch = None
+        if watch is not None:
+            watch.stop_tracking()
+
+    def _on_change(self, src_path: str, *args) -> None:
+        if os.path.normcase(src_path).startswith(self._actions_dir):
+            self._dirty = True
+
+    def list_action_packages(self) -> dict[Path, ActionPackageInFilesystem]:
+        """
+        Provides the same information as `list_actions_from_agent` (a new
+        `ActionPackageInFilesystem` is provided for each action package so
+        that the caller is free to mark it as referenced).
+        """
+        with self._lock:
+            if self._dirty or self._watch is None:
+                # Reset before listing so that changes done while listing
+                # are not lost.
+                self._dirty = False
+                found = list_actions_from_agent(self.agent_root_dir)
+                for action_package in found.values():
+                    # Pre-load so that the yaml is not loaded for each request
+                    # (errors are kept in the action package).
+                    try:
+                        action_package.get_as_dict()
+                    except Exception:
+                        pass
+                self._found = found
+
+            return {
+                path: dataclasses.replace(
+                    action_package, referenced_from_agent_spec=False
+                )
+                for path, action_package in self._found.items()
+            }
+
+
+_inventories: OrderedDict[Path, ActionPackagesInventory] = OrderedDict()
+_inventories_lock = threading.Lock()
+_observer: IFSObserver | None = None
+
+
+def _get_observer() -> IFSObserver:
+    global _observer
+    if _observer is None:
+        from sema4ai_ls_core import watchdog_wrapper
+
+        _observer = watchdog_wrapper.create_observer("watchdog", None)
+    return _observer
+
+
+def get_action_packages_inventory(agent_root_dir: Path) -> ActionPackagesInventory:
+    """
+    Provides the (cached) inventory of the action packages for the given agent
+    (the inventories of the agents last used are kept).
+    """
+    agent_root_dir = agent_root_dir.absolute()
+    with _inventories_lock:
+        inventory = _inventories.get(agent_root_dir)
+        if inventory is not None:
+            _inventories.move_to_end(agent_root_dir)
+            return inventory
+
+        inventory = _inventories[agent_root_dir] = ActionPackagesInventory(
+            agent_root_dir
+        )
+        try:
+            observer = _get_observer()
+        except Exception:
+            log.exception("Unable to create observer to track action packages.")
+        else:
+            inventory.start_tracking(observer)
+
+        while len(_inventories) > _MAX_INVENTORIES:
+            _, removed = _inventories.popitem(last=False)
+            removed.stop_tracking()
+        return inventory
+
+
+def clear_action_packages_inventories() -> None:
+    with _inventories_lock:
+        for inventory in _inventories.values():
+            inventory.stop_tracking()
+        _inventories.clear()
@@ -0,0 +1,446 @@
+"""
+Helpers to parse yaml with tree-sitter.
+
+The parser is reused (one per thread) and the last tree parsed for a given
+key (i.e.: the document uri) is kept so that a new version of the same
+document is parsed incrementally (the edit is computed from the common
+prefix/suffix of the old and new contents, so, the cost of the re-parse is
+related to the size of the edit, not to the size of the file).
+
+The tree may also be converted to the same location-aware values provided by
+`LoaderWithLines` (so, a valid yaml doesn't need to be parsed again by PyYAML).
+"""
+
+import re
+import threading
+import typing
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any
+
+from sema4ai_ls_core.core_log import get_logger
+
+if typing.TYPE_CHECKING:
+    from tree_sitter import Language, Node, Parser, Tree
+
+log = get_logger(__name__)
+
+_MAX_CACHED_TREES = 20
+_COMPARE_CHUNK_SIZE = 4096
+
+
+@lru_cache(maxsize=1)
+def _get_yaml_language() -> "Language":
+    import tree_sitter_yaml
+    from tree_sitter import Language
+
+    return Language(tree_sitter_yaml.language())
+
+
+_thread_local = threading.local()
+
+
+def _get_parser() -> "Parser":
+    # A parser can't be used by multiple threads at the same time, so, keep
+    # one per thread.
+    parser = getattr(_thread_local, "parser", None)
+    if parser is None:
+        from tree_sitter import Parser
+
+        parser = _thread_local.parser = Parser(_get_yaml_language())
+    return parser
+
+
+def _common_prefix_len(a: bytes, b: bytes) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    # Compare in chunks first (much faster than comparing byte by byte).
+    while i + _COMPARE_CHUNK_SIZE <= n and (
+        a[i : i + _COMPARE_CHUNK_SIZE] == b[i : i + _COMPARE_CHUNK_SIZE]
+    ):
+        i += _COMPARE_CHUNK_SIZE
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix_len(a: bytes, b: bytes, max_len: int) -> int:
+    len_a = len(a)
+    len_b = len(b)
+    i = 0
+    while i + _COMPARE_CHUNK_SIZE <= max_len and (
+        a[len_a - i - _COMPARE_CHUNK_SIZE : len_a - i]
+        == b[len_b - i - _COMPARE_CHUNK_SIZE : len_b - i]
+    ):
+        i += _COMPARE_CHUNK_SIZE
+    while i < max_len and a[len_a - i - 1] == b[len_b - i - 1]:
+        i += 1
+    return i
+
+
+def _offset_to_point(contents: bytes, offset: int) -> tuple[int, int]:
+    row = contents.count(b"\n", 0, offset)
+    col = offset - (contents.rfind(b"\n", 0, offset) + 1)
+    return row, col
+
+
+def compute_edit(old: bytes, new: bytes) -> dict[str, Any] | None:
+    """
+    Computes the edit (in the format expected by `Tree.edit`) which changes
+    the old contents into the new contents (None if they're the same).
+    """
+    if old == new:
+        return None
+    start = _common_prefix_len(old, new)
+    suffix = _common_suffix_len(old, new, min(len(old), len(new)) - start)
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    return {
+        "start_byte": start,
+        "old_end_byte": old_end,
+        "new_end_byte": new_end,
+        "start_point": _offset_to_point(old, start),
+        "old_end_point": _offset_to_point(old, old_end),
+        "new_end_point": _offset_to_point(new, new_end),
+    }
+
+
+class _CachedTree(typing.NamedTuple):
+    contents: bytes
+    # The tree which is edited and incrementally parsed when the contents
+    # change (it's never handed out as it's edited in place: it's not
+    # possible to edit a `Tree.copy()` of a tree which is in use as that
+    # crashes in py-tree-sitter).
+    private_tree: "Tree"
+    # The tree which is returned to clients (a re-parse of the private tree
+    # without any edit, which is cheap as all the nodes are reused).
+    tree: "Tree"
+
+
+class _TreeCache:
+    def __init__(self, max_size: int) -> None:
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self._key_to_tree: OrderedDict[str, _CachedTree] = OrderedDict()
+
+    def get(self, key: str, contents: bytes) -> "Tree | None":
+        """
+        Provides the cached tree if it was parsed with the same contents.
+        """
+        with self._lock:
+            cached = self._key_to_tree.get(key)
+            if cached is None or cached.contents != contents:
+                return None
+            self._key_to_tree.move_to_end(key)
+            return cached.tree
+
+    def pop(self, key: str) -> _CachedTree | None:
+        """
+        Removes the cached tree (so that the private tree may be edited
+        without another thread also using it).
+        """
+        with self._lock:
+            return self._key_to_tree.pop(key, None)
+
+    def set(self, key: str, cached: _CachedTree) -> None:
+        with self._lock:
+            self._key_to_tree[key] = cached
+            self._key_to_tree.move_to_end(key)
+            while len(self._key_to_tree) > self._max_size:
+                self._key_to_tree.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._key_to_tree.clear()
+
+
+_tree_cache = _TreeCache(_MAX_CACHED_TREES)
+
+
+def parse_yaml(contents: str, cache_key: str | None = None) -> "Tree":
+    """
+    :param cache_key:
+        If given, the tree is cached with this key (i.e.: the document uri)
+        and if the contents are the same the cached tree is returned (or if
+        they changed, the new tree is incrementally parsed from the old one).
+
+    Note: the returned tree must not be edited.
+    """
+    bytes_contents = contents.encode("utf8", errors="replace")
+    parser = _get_parser()
+    if cache_key is None:
+        return parser.parse(bytes_contents, encoding="utf8")
+
+    tree = _tree_cache.get(cache_key, bytes_contents)
+    if tree is not None:
+        return tree
+
+    cached = _tree_cache.pop(cache_key)
+    if cached is None:
+        private_tree = parser.parse(bytes_contents, encoding="utf8")
+    else:
+        private_tree = cached.private_tree
+        edit = compute_edit(cached.contents, bytes_contents)
+        if edit is not None:
+            private_tree.edit(**edit)
+            private_tree = parser.parse(bytes_contents, private_tree, encoding="utf8")
+
+    tree = parser.parse(bytes_contents, private_tree, encoding="utf8")
+    _tree_cache.set(cache_key, _CachedTree(bytes_contents, private_tree, tree))
+    return tree
+
+
+class UnsupportedYamlTree(Exception):
+    """
+    Raised when the tree can't be converted (i.e.: it has syntax errors or
+    uses some construct not handled), in which case PyYAML should be used.
+    """
+
+
+# Blank lines up to (and including) the last line break.
+_TRAILING_LINE_BREAKS_RE = re.compile(rb"(?:[ \t]*\r?\n)+")
+
+
+class _TreeToPython:
+    def __init__(self, contents: bytes) -> None:
+        from yaml.constructor import SafeConstructor
+        from yaml.nodes import ScalarNode
+        from yaml.resolver import Resolver
+
+        self._scalar_node_class = ScalarNode
+        self._contents = contents
+        self._lines = contents.split(b"\n")
+        self._anchors: dict[str, Any] = {}
+        self._resolver = Resolver()
+        self._constructor = SafeConstructor()
+
+    def _col(self, row: int, byte_col: int) -> int:
+        # tree-sitter columns are in bytes (PyYAML columns are in chars).
+        try:
+            line = self._lines[row]
+        except IndexError:
+            return byte_col
+        if line.isascii():
+            return byte_col
+        return len(line[:byte_col].decode("utf8", errors="replace"))
+
+    def _location(self, node: "Node") -> tuple[int, int, int, int]:
+        start_row, start_col = node.start_point
+        end_row, end_col = node.end_point
+        return (
+            start_row,
+            self._col(start_row, start_col),
+            end_row,
+            self._col(end_row, end_col),
+        )
+
+    def convert(self, node: "Node | None") -> Any:
+        if node is None:
+            return None
+
+        node_type = node.type
+        if node_type in ("block_node", "flow_node"):
+            anchor = None
+            content = None
+            for child in node.named_children:
+                child_type = child.type
+                if child_type == "anchor":
+                    anchor = child
+                elif child_type == "tag":
+                    raise UnsupportedYamlTree("Tags are not handled.")
+                elif child_type != "comment":
+                    content = child
+            value = self.convert(content)
+            if anchor is not None:
+                location = getattr(value, "location", None)
+                if location is not None:
+                    # As in PyYAML, the location starts at the anchor.
+                    value.location = self._location(node)[:2] + location[2:]
+                self._anchors[_text(anchor)[1:]] = value
+            return value
+
+        if node_type in ("block_mapping", "flow_mapping"):
+            return self._convert_mapping(node)
+
+        if node_type in ("block_sequence", "flow_sequence"):
+            return self._convert_sequence(node)
+
+        if node_type == "alias":
+            name = _text(node)[1:]
+            if name not in self._anchors:
+                raise UnsupportedYamlTree(f"Undefined alias: {name}")
+            return self._anchors[name]
+
+        if node_type == "plain_scalar":
+            text = _text(node)
+            if "\n" in text:
+                return self._with_location(self._load_scalar(text), node)
+            tag = self._resolver.resolve(self._scalar_node_class, text, (True, False))
+            return self._construct(tag, text, node)
+
+        if node_type in ("single_quote_scalar", "double_quote_scalar", "block_scalar"):
+            text = _text(node)
+            trailing_line_breaks = ""
+            if node_type == "block_scalar":
+                # The node doesn't include the trailing line breaks (which are
+                # needed for the clip/keep chomping).
+                trailing_line_breaks = self._trailing_line_breaks(node)
+                text += trailing_line_breaks
+            if node_type == "single_quote_scalar" and "\n" not in text:
+                value = text[1:-1].replace("''", "'")
+            elif (
+                node_type == "double_quote_scalar"
+                and "\n" not in text
+                and "\\" not in text
+            ):
+                value = text[1:-1]
+            else:
+                value = self._load_scalar(text)
+            ret = self._with_location(value, node)
+            if trailing_line_breaks:
+                # As in PyYAML, the location ends after the line breaks.
+                start_row, start_col, end_row, _end_col = ret.location
+                ret.location = (
+                    start_row,
+                    start_col,
+                    end_row + trailing_line_breaks.count("\n"),
+                    0,
+                )
+            return ret
+
+        raise UnsupportedYamlTree(f"Unexpected node: {node_type}")
+
+    def _convert_mapping(self, node: "Node") -> Any:
+        from sema4ai_code.vendored_deps.yaml_with_location import dict_with_location
+
+        ret = dict_with_location()
+        for child in node.named_children:
+            child_type = child.type
+            if child_type in ("block_mapping_pair", "flow_pair"):
+                key = self.convert(child.child_by_field_name("key"))
+                value = self.convert(child.child_by_field_name("value"))
+            elif child_type == "flow_node":
+                # i.e.: {a, b}
+                key = self.convert(child)
+                value = None
+            elif child_type == "comment":
+                continue
+            else:
+                raise UnsupportedYamlTree(f"Unexpected node in mapping: {child_type}")
+
+            try:
+                ret[key] = value
+            except TypeError:
+                raise UnsupportedYamlTree("Unhashable key.")
+        ret.location = self._location(node)
+        return ret
+
+    def _convert_sequence(self, node: "Node") -> list:
+        ret = []
+        for child in node.named_children:
+            child_type = child.type
+            if child_type == "block_sequence_item":
+                content = None
+                for item_child in child.named_children:
+                    if item_child.type != "comment":
+                        content = item_child
+                ret.append(self.convert(content))
+            elif child_type == "flow_node":
+                ret.append(self.convert(child))
+            elif child_type != "comment":
+                raise UnsupportedYamlTree(f"Unexpected node in sequence: {child_type}")
+        return ret
+
+    def _trailing_line_breaks(self, node: "Node") -> str:
+        match = _TRAILING_LINE_BREAKS_RE.match(self._contents, node.end_byte)
+        if match is None:
+            return ""
+        return match.group(0).decode("utf8", errors="replace")
+
+    def _load_scalar(self, text: str) -> Any:
+        # Multi-line/escaped scalars are rare, so, just let PyYAML deal with
+        # the folding/escaping rules (only for this scalar).
+        import yaml
+
+        try:
+            loaded = yaml.safe_load(f"x: {text}")
+        except yaml.YAMLError:
+            raise UnsupportedYamlTree(f"Unable to load scalar: {text}")
+        if not isinstance(loaded, dict):
+            raise UnsupportedYamlTree(f"Unable to load scalar: {text}")
+        return loaded.get("x")
+
+    def _construct(self, tag: str, text: str, node: "Node") -> Any:
+        if tag in ("tag:yaml.org,2002:merge", "tag:yaml.org,2002:value"):
+            # i.e.: `<<: *defaults` (merge keys are applied by PyYAML).
+            raise UnsupportedYamlTree(f"Unexpected tag: {tag}")
+        try:
+            value = self._constructor.construct_object(
+                self._scalar_node_class(tag, text)
+            )
+        except Exception:
+            raise UnsupportedYamlTree(f"Unable to construct: {text}")
+        if tag in (
+            "tag:yaml.org,2002:str",
+            "tag:yaml.org,2002:int",
+            "tag:yaml.org,2002:float",
+        ):
+            return self._with_location(value, node)
+        return value
+
+    def _with_location(self, value: Any, node: "Node") -> Any:
+        from sema4ai_code.vendored_deps.yaml_with_location import (
+            float_with_location,
+            int_with_location,
+            str_with_location,
+        )
+
+        ret: Any
+        if isinstance(value, str):
+            ret = str_with_location(value)
+        elif isinstance(value, bool):
+            return value
+        elif isinstance(value, int):
+            ret = int_with_location(value)
+        elif isinstance(value, float):
+            ret = float_with_location(value)
+        else:
+            return value
+        ret.location = self._location(node)
+        return ret
+
+
+def _text(node: "Node") -> str:
+    text = node.text
+    if text is None:
+        return ""
+    return text.decode("utf8", errors="replace")
+
+
+def tree_to_python(tree: "Tree", contents: str) -> Any:
+    """
+    Converts the tree to python objects with the same location-aware values
+    which `LoaderWithLines` provides (`dict_with_location`,
+    `str_with_location`, `int_with_location`, `float_with_location`).
+
+    :raises UnsupportedYamlTree: if the tree has errors or uses some construct
+        which isn't handled (tags, multiple documents, ...).
+    """
+    root = tree.root_node
+    if root.has_error:
+        raise UnsupportedYamlTree("The tree has errors.")
+
+    documents = [child for child in root.named_children if child.type == "document"]
+    if len(documents) > 1:
+        raise UnsupportedYamlTree("Multiple documents found.")
+    if not documents:
+        return None
+
+    converter = _TreeToPython(contents.encode("utf8", errors="replace"))
+    content = None
+    for child in documents[0].named_children:
+        if child.type != "comment":
+            if content is not None:
+                raise UnsupportedYamlTree("Unexpected document contents.")
+            content = child
+    return converter.convert(content)
@@ -34,8 +34,22 @@ Each request for a space name creates a structure in the disk such as:
                     is actually created.
     /damaged        Written if the space is to be considered damaged
                     and should be reclaimed after a timeout.
+
+/space_index.lock   Lock file used to update the index.
+/space_index.json   Index with the key of the (normalized) conda contents
+                    assigned to each space (along with the conda.yaml mtime/size
+                    when it was assigned so that stale entries are detected).
+
+The index is just a hint so that a matching space is found without having to
+lock/read/compare the conda contents of every space (the space found is
+still verified before being used and if the index is stale or missing the
+spaces are checked as usual).
 """
 
+import hashlib
+import json
+import os
+import threading
 from collections.abc import Iterable
 from pathlib import Path
 from typing import List, Optional
@@ -56,16 +70,200 @@ log = get_logger(__name__)
 _TWO_HOURS_IN_SECONDS = 60 * 60 * 2
 
 
+_DEFAULT_MAX_NUMBER_OF_SPACES = 10
+
+
 class UnableToGetSpaceName(RuntimeError):
     pass
 
 
+def _get_default_max_number_of_spaces() -> int:
+    value = os.environ.get("SEMA4AI_CODE_MAX_HOLOTREE_SPACES", "").strip()
+    if value:
+        try:
+            max_number_of_spaces = int(value)
+            if max_number_of_spaces > 0:
+                return max_number_of_spaces
+        except ValueError:
+            pass
+        log.info(
+            "Invalid value for SEMA4AI_CODE_MAX_HOLOTREE_SPACES: %s (using %s).",
+            value,
+            _DEFAULT_MAX_NUMBER_OF_SPACES,
+        )
+    return _DEFAULT_MAX_NUMBER_OF_SPACES
+
+
+def compute_space_key(conda_yaml_path: Path, conda_yaml_contents: str) -> str:
+    """
+    Provides the key used in the index for the given conda contents.
+
+    Note: the basename is part of the key because the environment created
+    for a `package.yaml` is different from the one created for a `conda.yaml`
+    with the same contents.
+    """
+    from sema4ai_code.rcc_space_info import format_conda_contents_to_compare
+
+    formatted = format_conda_contents_to_compare(conda_yaml_contents)
+    return hashlib.sha256(
+        f"{conda_yaml_path.name}\n{formatted}".encode("utf-8", "replace")
+    ).hexdigest()
+
+
+def _get_conda_contents_fingerprint(space_info: RCCSpaceInfo) -> list | None:
+    try:
+        stat = space_info.conda_contents_path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class _SpaceIndex:
+    """
+    Keeps the key of the conda contents for each space (persisted in the disk
+    so that it's shared among processes).
+
+    Each entry has the key, the fingerprint of the conda contents (mtime/size)
+    when the key was computed, the last usage and the state.
+
+    Note: it's only updated while the lock of the related space is held (and
+    the lock of the index itself is only held for the read/write of the
+    index file).
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._index_path = directory / "space_index.json"
+        self._lock = threading.Lock()
+        self._space_to_entry: dict[str, dict] = {}
+        self._key_to_space: dict[str, str] = {}
+        self._loaded_mtime_ns: int | None = None
+
+    def _acquire_file_lock(self):
+        from sema4ai_ls_core.system_mutex import timed_acquire_mutex
+
+        return timed_acquire_mutex(
+            "space_index.lock", timeout=60, base_dir=str(self._directory)
+        )
+
+    def _reload_if_needed(self) -> None:
+        # Must be called with the lock held.
+        try:
+            mtime_ns = self._index_path.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        if mtime_ns == self._loaded_mtime_ns:
+            return
+
+        space_to_entry: dict[str, dict] = {}
+        if mtime_ns is not None:
+            try:
+                loaded = json.loads(self._index_path.read_text("utf-8"))
+                if loaded.get("version") == self.INDEX_VERSION:
+                    space_to_entry = loaded["spaces"]
+            except Exception:
+                log.exception(
+                    "Error loading holotree space index: %s", self._index_path
+                )
+
+        self._space_to_entry = space_to_entry
+        self._key_to_space = {
+            entry["key"]: space_name for space_name, entry in space_to_entry.items()
+        }
+        self._loaded_mtime_ns = mtime_ns
+
+    def _write(self) -> None:
+        # Must be called with the lock held.
+        contents = json.dumps(
+            {"version": self.INDEX_VERSION, "spaces": self._space_to_entry}
+        )
+        tmp_path = self._index_path.with_name(
+            f"{self._index_path.name}.{os.getpid()}.tmp"
+        )
+        try:
+            tmp_path.write_text(contents, "utf-8")
+            os.replace(tmp_path, self._index_path)
+        except Exception:
+            log.exception("Error writing holotree space index: %s", self._index_path)
+            self._loaded_mtime_ns = None
+            return
+
+        try:
+            self._loaded_mtime_ns = self._index_path.stat().st_mtime_ns
+        except OSError:
+            self._loaded_mtime_ns = None
+
+    def get_space_name(self, key: str) -> str | None:
+        with self._lock:
+            self._reload_if_needed()
+            return self._key_to_space.get(key)
+
+    def get_key(self, space_info: RCCSpaceInfo) -> str | None:
+        """
+        :return: the key of the contents in the given space or None if it's
+            not known (or if the index entry is stale).
+        """
+        with self._lock:
+            self._reload_if_needed()
+            entry = self._space_to_entry.get(space_info.space_name)
+
+        if entry is None:
+            return None
+
+        if entry.get("fingerprint") != _get_conda_contents_fingerprint(space_info):
+            return None
+        return entry["key"]
+
+    def _update(self, space_name: str, entry: dict | None) -> None:
+        with self._lock, self._acquire_file_lock():
+            self._reload_if_needed()
+            old_entry = self._space_to_entry.pop(space_name, None)
+            if old_entry is not None:
+                if self._key_to_space.get(old_entry["key"]) == space_name:
+                    del self._key_to_space[old_entry["key"]]
+
+            if entry is not None:
+                key = entry["key"]
+                previous_space_name = self._key_to_space.get(key)
+                if previous_space_name is not None:
+                    # The same contents can't be in 2 spaces (keep the newest).
+                    self._space_to_entry.pop(previous_space_name, None)
+                self._space_to_entry[space_name] = entry
+                self._key_to_space[key] = space_name
+
+            elif old_entry is None:
+                return  # Nothing changed.
+
+            self._write()
+
+    def set(self, space_info: RCCSpaceInfo, key: str, state: str) -> None:
+        """
+        Sets the key of the contents in the given space (must be called with
+        the space lock held after the conda contents are written).
+        """
+        self._update(
+            space_info.space_name,
+            {
+                "key": key,
+                "fingerprint": _get_conda_contents_fingerprint(space_info),
+                "last_usage": space_info.last_usage,
+                "state": state,
+            },
+        )
+
+    def remove(self, space_name: str) -> None:
+        self._update(space_name, None)
+
+
 class HolotreeManager:
     def __init__(
         self,
         rcc: IRcc,
         directory: Path | None = None,
-        max_number_of_spaces: int = 10,
+        max_number_of_spaces: int | None = None,
         timeout_for_updates_in_seconds: int = 10,
         # We can only reclaim a space after 2 hours without usage.
         timeout_to_reuse_space: int = _TWO_HOURS_IN_SECONDS,
@@ -78,6 +276,12 @@ class HolotreeManager:
             Usually it should not be passed and it defaults to something
             as SEMA4AI_HOME/.vscode (but a different path can be used for
             tests).
+
+        :param max_number_of_spaces:
+            The number of spaces which may be used (if not given it's gotten
+            from the `SEMA4AI_CODE_MAX_HOLOTREE_SPACES` environment variable
+            and defaults to 10). When all the spaces are used, the least
+            recently used ones are reclaimed.
         """
         self._rcc = rcc
         self.timeout_for_updates_in_seconds = timeout_for_updates_in_seconds
@@ -87,8 +291,11 @@ class HolotreeManager:
         directory.mkdir(parents=True, exist_ok=True)
 
         self._directory = directory
+        if max_number_of_spaces is None:
+            max_number_of_spaces = _get_default_max_number_of_spaces()
         self._max_number_of_spaces = max_number_of_spaces
         self._timeout_to_reuse_space = timeout_to_reuse_space
+        self._space_index = _SpaceIndex(directory)
 
     def _iter_target_space_names(self):
         i = 1
@@ -107,7 +314,11 @@ class HolotreeManager:
         )
 
     def _compute_status(
-        self, space_name: str, conda_yaml_path: Path, conda_yaml_contents: str
+        self,
+        space_name: str,
+        conda_yaml_path: Path,
+        conda_yaml_contents: str,
+        space_key: str,
     ) -> RCCSpaceInfo:
         space_info: RCCSpaceInfo = self.create_rcc_space_info(space_name)
 
@@ -124,39 +335,52 @@ class HolotreeManager:
             # In this case, we have 2 choices:
             # 1. Reuse the space as is (if the contents are compatible).
             # 2. Bail out and note whether this state can be recreated.
-            try:
-                # Check for direct match. i.e.: let's see if we can use it as is.
-                with space_info.acquire_lock():
-                    if not self._info_in_place(conda_contents_path, space_info):
-                        # If the info is not in place, something is off -- was the info
-                        # corrupted? In any case this isn't a match and may be reused if
-                        # the timeout has elapsed.
-                        has_timeout_elapsed = space_info.has_timeout_elapsed(
-                            self._timeout_to_reuse_space
-                        )
-                        if has_timeout_elapsed:
-                            space_info.curr_status = CurrentSpaceStatus.REUSE_TARGET
-                            return space_info
-                        space_info.curr_status = CurrentSpaceStatus.NOT_AVAILABLE
-                        return space_info
-
-                    if space_info.conda_contents_match(
-                        self._rcc, conda_yaml_contents, str(conda_yaml_path)
-                    ):
-                        env_written = space_info.env_json_path.exists()
-                        if (
-                            env_written
-                            and space_info.conda_prefix_identity_yaml_still_matches_cached_space(
-                                self._rcc
+            known_key = self._space_index.get_key(space_info)
+            if known_key is not None and known_key != space_key:
+                # The index says that the contents don't match, so, there's
+                # no need to lock/read/compare the contents (just check
+                # whether it can be reused).
+                pass
+            else:
+                try:
+                    # Check for direct match. i.e.: let's see if we can use it as is.
+                    with space_info.acquire_lock():
+                        if not self._info_in_place(conda_contents_path, space_info):
+                            # If the info is not in place, something is off -- was the info
+                            # corrupted? In any case this isn't a match and may be reused if
+                            # the timeout has elapsed.
+                            self._space_index.remove(space_name)
+                            has_timeout_elapsed = space_info.has_timeout_elapsed(
+                                self._timeout_to_reuse_space
                             )
-                        ) or not env_written:
-                            space_info.update_last_usage()
-                            write_text(conda_path, str(conda_yaml_path), "utf-8")
-                            space_info.curr_status = CurrentSpaceStatus.CAN_USE
+                            if has_timeout_elapsed:
+                                space_info.curr_status = CurrentSpaceStatus.REUSE_TARGET
+                                return space_info
+                            space_info.curr_status = CurrentSpaceStatus.NOT_AVAILABLE
                             return space_info
-            except:
-                # Just ignore (we couldn't read the conda text...).
-                pass
+
+                        if space_info.conda_contents_match(
+                            self._rcc, conda_yaml_contents, str(conda_yaml_path)
+                        ):
+                            env_written = space_info.env_json_path.exists()
+                            if (
+                                env_written
+                                and space_info.conda_prefix_identity_yaml_still_matches_cached_space(
+                                    self._rcc
+                                )
+                            ) or not env_written:
+                                space_info.update_last_usage()
+                                write_text(conda_path, str(conda_yaml_path), "utf-8")
+                                self._space_index.set(
+                                    space_info,
+                                    space_key,
+                                    state_path.read_text("utf-8", "replace"),
+                                )
+                                space_info.curr_status = CurrentSpaceStatus.CAN_USE
+                                return space_info
+                except:
+                    # Just ignore (we couldn't read the conda text...).
+                    pass
 
             has_timeout_elapsed = space_info.has_timeout_elapsed(
                 self._timeout_to_reuse_space
@@ -175,6 +399,7 @@ class HolotreeManager:
                 write_text(conda_contents_path, conda_yaml_contents, "utf-8")
                 write_text(conda_path, str(conda_yaml_path), "utf-8")
                 write_text(state_path, SpaceState.CREATED.value, "utf-8")
+                self._space_index.set(space_info, space_key, SpaceState.CREATED.value)
             space_info.curr_status = CurrentSpaceStatus.CAN_USE
 
             return space_info
@@ -212,6 +437,7 @@ class HolotreeManager:
         conda_yaml_path: Path,
         space_info: RCCSpaceInfo,
         check_timeout: bool = True,
+        space_key: str | None = None,
     ) -> bool:
         """
         Used to check reuse targets we found previously.
@@ -228,6 +454,9 @@ class HolotreeManager:
                 write_text(space_info.conda_contents_path, conda_yaml_contents, "utf-8")
                 write_text(space_info.conda_path, str(conda_yaml_path), "utf-8")
                 write_text(space_info.state_path, SpaceState.CREATED.value, "utf-8")
+                if space_key is None:
+                    space_key = compute_space_key(conda_yaml_path, conda_yaml_contents)
+                self._space_index.set(space_info, space_key, SpaceState.CREATED.value)
                 return True
 
         return False
@@ -244,12 +473,29 @@ class HolotreeManager:
         conda_yaml_contents: str,
         require_timeout: bool = False,
     ) -> RCCSpaceInfo:
+        space_key = compute_space_key(conda_yaml_path, conda_yaml_contents)
+
+        # Fast path: check the space which the index says has the same contents.
+        computed: dict[str, RCCSpaceInfo] = {}
+        space_name = self._space_index.get_space_name(space_key)
+        if space_name is not None and space_name in set(
+            self._iter_target_space_names()
+        ):
+            status = self._compute_status(
+                space_name, conda_yaml_path, conda_yaml_contents, space_key
+            )
+            if status.curr_status == CurrentSpaceStatus.CAN_USE:
+                return status
+            computed[space_name] = status
+
         checked: list[str] = []
         can_reuse: list[RCCSpaceInfo] = []
         not_available: list[RCCSpaceInfo] = []
         for name in self._iter_target_space_names():
             checked.append(name)
-            status = self._compute_status(name, conda_yaml_path, conda_yaml_contents)
+            status = computed.get(name) or self._compute_status(
+                name, conda_yaml_path, conda_yaml_contents, space_key
+            )
             if status.curr_status == CurrentSpaceStatus.CAN_USE:
                 return status
             elif status.curr_status == CurrentSpaceStatus.REUSE_TARGET:
@@ -269,7 +515,10 @@ class HolotreeManager:
             )
             for space_info in can_reuse:
                 if self._can_reuse_simple(
-                    conda_yaml_contents, conda_yaml_path, space_info
+                    conda_yaml_contents,
+                    conda_yaml_path,
+                    space_info,
+                    space_key=space_key,
                 ):
                     return space_info
 
@@ -291,6 +540,7 @@ class HolotreeManager:
                     conda_yaml_path,
                     space_info,
                     check_timeout=False,
+                    space_key=space_key,
                 ):
                     return space_info
 
@@ -150,7 +150,6 @@ def _hover_handle_conda_dep(
     conda_cloud: ICondaCloud, conda_dep: CondaDepInfo
 ) -> HoverTypedDict | None:
     from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
-        sort_conda_versions,
         timestamp_to_datetime,
     )
 
@@ -174,8 +173,10 @@ def _hover_handle_conda_dep(
         }
 
     with sqlite_queries.db_cursors() as db_cursors:
-        versions = sqlite_queries.query_versions(conda_dep.name, db_cursors)
-        if not versions:
+        sorted_versions = sqlite_queries.query_sorted_versions(
+            conda_dep.name, db_cursors
+        )
+        if not sorted_versions:
             return {
                 "contents": MarkupContent(
                     MarkupKind.Markdown,
@@ -195,7 +196,7 @@ def _hover_handle_conda_dep(
         last_year_version_infos: list[CondaVersionInfo] = []
         all_version_infos: list[CondaVersionInfo] = []
 
-        for version in sort_conda_versions(versions):
+        for version in sorted_versions:
             version_info = sqlite_queries.query_version_info(
                 conda_dep.name, version, db_cursors
             )
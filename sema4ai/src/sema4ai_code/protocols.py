@@ -1,4 +1,5 @@
 import typing
+from collections.abc import Callable
 from enum import Enum
 from pathlib import Path
 from typing import Any, ContextManager, Literal, TypeVar
@@ -488,8 +489,16 @@ class IRcc(Protocol):
     def profile_list(self) -> ActionResult[ProfileListResultTypedDict]:
         pass
 
-    def configuration_diagnostics(self, robot_yaml, json=True) -> ActionResult[str]:
-        pass
+    def configuration_diagnostics(
+        self,
+        robot_yaml,
+        json=True,
+        on_pid: Callable[[int], None] | None = None,
+    ) -> ActionResult[str]:
+        """
+        :param on_pid: If given it's called with the pid of the rcc process
+            once it's started.
+        """
 
     def configuration_settings(self) -> ActionResult[str]:
         pass
@@ -1,8 +1,11 @@
 import json
 import os.path
 import sys
+import threading
 import time
 import weakref
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from subprocess import CalledProcessError, TimeoutExpired, list2cmdline
@@ -33,19 +36,104 @@ from sema4ai_code.protocols import (
     ProfileListResultTypedDict,
     RobotTemplate,
 )
-from sema4ai_code.rcc_space_info import RCCSpaceInfo, SpaceState
+from sema4ai_code.rcc_space_info import RCCSpaceInfo, SpaceState, SpaceStateWaiter
 from sema4ai_code.tools import Tool
 
 log = get_logger(__name__)
 
+# The mutexes used for rcc are per operation class (cloud/credentials) or
+# per holotree space (so, the environments for different spaces can be
+# created in parallel and cloud operations aren't blocked by the creation of
+# some environment).
 RCC_CLOUD_ROBOT_MUTEX_NAME = "rcc_cloud_activity"
 RCC_CREDENTIALS_MUTEX_NAME = "rcc_credentials"
+RCC_HOLOTREE_SPACE_MUTEX_PREFIX = "rcc_holotree_space_"
+
+# Time to wait for a mutex before reporting that it's being waited for.
+_REPORT_MUTEX_WAIT_AFTER_SECONDS = 0.5
 
 ACCOUNT_NAME = "sema4ai"
 
 _cache_hash: LRUCache[tuple[str, str], ActionResult[str]] = LRUCache(max_size=50)
 
 
+def get_holotree_space_mutex_name(space_name: str) -> str:
+    return f"{RCC_HOLOTREE_SPACE_MUTEX_PREFIX}{space_name}"
+
+
+def _check_output_notifying_pid(
+    args: list[str],
+    timeout: float,
+    on_pid: Callable[[int], None],
+    input: bytes | None = None,
+    **kwargs,
+) -> bytes:
+    """
+    Same as `subprocess.check_output` but `on_pid` is called with the pid of
+    the process as soon as it's started (i.e.: so that it can be killed
+    if the result is no longer needed).
+    """
+    import subprocess
+
+    with subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=subprocess.PIPE,
+        **kwargs,
+    ) as process:
+        on_pid(process.pid)
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise
+
+    if process.returncode:
+        raise CalledProcessError(process.returncode, args, output=stdout, stderr=stderr)
+    return stdout
+
+
+@contextmanager
+def _acquire_rcc_mutex(mutex_name: str) -> Iterator[None]:
+    """
+    Acquires the given mutex (reporting in the current progress if it has to
+    wait for it).
+    """
+    from sema4ai_ls_core.progress_report import get_current_progress_reporter
+    from sema4ai_ls_core.system_mutex import timed_acquire_mutex
+
+    progress_reporter = get_current_progress_reporter()
+    acquired = threading.Event()
+
+    def report_waiting():
+        if progress_reporter is not None and not acquired.is_set():
+            progress_reporter.set_additional_info(
+                f"Waiting for another rcc operation to finish (lock: {mutex_name})."
+            )
+
+    timer = threading.Timer(_REPORT_MUTEX_WAIT_AFTER_SECONDS, report_waiting)
+    timer.daemon = True
+    timer.start()
+
+    initial_time = time.time()
+    try:
+        mutex = timed_acquire_mutex(mutex_name, timeout=15)
+    finally:
+        acquired.set()
+        timer.cancel()
+
+    with mutex:
+        elapsed = time.time() - initial_time
+        if elapsed > _REPORT_MUTEX_WAIT_AFTER_SECONDS:
+            log.info("Waited %.2fs for rcc mutex: %s", elapsed, mutex_name)
+            if progress_reporter is not None:
+                progress_reporter.set_additional_info(
+                    f"Lock acquired after waiting {elapsed:.1f}s."
+                )
+        yield
+
+
 def download_rcc(
     location: str,
     force: bool = False,
@@ -232,6 +320,7 @@ class Rcc:
         show_interactive_output: bool = False,
         hide_in_log: str | None = None,
         send_to_stdin: str | None = None,
+        on_pid: Callable[[int], None] | None = None,
     ) -> LaunchActionResult[str]:
         """
         Returns an ActionResult where the result is the stdout of the executed command.
@@ -243,6 +332,10 @@ class Rcc:
         :param stderr:
             If given sets the stderr redirection (by default it's subprocess.PIPE,
             but users could change it to something as subprocess.STDOUT).
+
+        :param on_pid:
+            If given it's called with the pid of the rcc process once it's
+            started (not supported with `show_interactive_output`).
         """
         import subprocess
         from subprocess import check_output
@@ -276,11 +369,7 @@ class Rcc:
         cmdline = list2cmdline([str(x) for x in args])
 
         try:
-            if mutex_name:
-                from sema4ai_ls_core.system_mutex import timed_acquire_mutex
-            else:
-                timed_acquire_mutex = NULL
-            with timed_acquire_mutex(mutex_name, timeout=15):
+            with _acquire_rcc_mutex(mutex_name) if mutex_name else NULL:
                 if get_log_level() >= 2:
                     msg = f"Running: {cmdline}"
                     if hide_in_log:
@@ -300,12 +389,21 @@ class Rcc:
                     if send_to_stdin is not None:
                         kwargs["input"] = send_to_stdin.encode("utf-8")
 
-                    boutput = check_output(args, timeout=timeout, **kwargs)
+                    if on_pid is not None:
+                        boutput = _check_output_notifying_pid(
+                            args, timeout, on_pid, **kwargs
+                        )
+                    else:
+                        boutput = check_output(args, timeout=timeout, **kwargs)
                 else:
                     if send_to_stdin is not None:
                         raise ValueError(
                             "send_to_stdin cannot be provided when show_interactive_output is true (unsupported)"
                         )
+                    if on_pid is not None:
+                        raise ValueError(
+                            "on_pid cannot be provided when show_interactive_output is true (unsupported)"
+                        )
 
                     from sema4ai_ls_core.progress_report import (
                         get_current_progress_reporter,
@@ -922,12 +1020,10 @@ class Rcc:
 
         proceed_to_create_env = False
         with space_info.acquire_lock():
-            space_state = SpaceState(space_info.state_path.read_text("utf-8"))
+            space_state = space_info.load_state()
             if space_state == SpaceState.CREATED:
                 space_info.requested_pid_path.write_text(str(os.getpid()))
-                space_info.state_path.write_text(
-                    SpaceState.ENV_REQUESTED.value, "utf-8"
-                )
+                space_info.write_state(SpaceState.ENV_REQUESTED)
                 proceed_to_create_env = True
 
         if space_state in (SpaceState.ENV_REQUESTED, SpaceState.ENV_READY):
@@ -936,77 +1032,83 @@ class Rcc:
             timeout = 60 * 60  # Wait up to 1 hour for the env...
             timeout_at = time.time() + timeout
             failures = 0
-            while time.time() < timeout_at:
-                try:
-                    space_state = SpaceState(space_info.state_path.read_text("utf-8"))
-                    if space_state == SpaceState.ENV_REQUESTED:
-                        pid = space_info.load_requested_pid()
-                        if not pid or not is_process_alive(int(pid)):
+            # Note: enter the waiter before reading the state so that no
+            # change is missed.
+            with SpaceStateWaiter(space_info) as state_waiter:
+                while time.time() < timeout_at:
+                    try:
+                        space_state = space_info.load_state()
+                        if space_state == SpaceState.ENV_REQUESTED:
+                            pid = space_info.load_requested_pid()
+                            if not pid or not is_process_alive(int(pid)):
+                                with space_info.acquire_lock():
+                                    # Check again with a lock in place. If it's still not valid (the
+                                    # pid could've exited and not finished its job), we'll become the
+                                    # space creators ourselves.
+                                    space_state = space_info.load_state()
+                                    if space_state == SpaceState.ENV_REQUESTED:
+                                        pid = space_info.load_requested_pid()
+                                        if not pid or not is_process_alive(int(pid)):
+                                            space_info.requested_pid_path.write_text(
+                                                str(os.getpid())
+                                            )
+                                            proceed_to_create_env = True
+                                            break
+
+                        if space_state == SpaceState.ENV_READY:
                             with space_info.acquire_lock():
-                                # Check again with a lock in place. If it's still not valid (the
-                                # pid could've exited and not finished its job), we'll become the
-                                # space creators ourselves.
-                                space_state = SpaceState(
-                                    space_info.state_path.read_text("utf-8")
+                                environ = json.loads(
+                                    space_info.env_json_path.read_text(
+                                        "utf-8", "replace"
+                                    )
                                 )
-                                if space_state == SpaceState.ENV_REQUESTED:
-                                    pid = space_info.load_requested_pid()
-                                    if not pid or not is_process_alive(int(pid)):
-                                        space_info.requested_pid_path.write_text(
-                                            str(os.getpid())
-                                        )
-                                        proceed_to_create_env = True
-                                        break
-
-                    if space_state == SpaceState.ENV_READY:
-                        with space_info.acquire_lock():
-                            environ = json.loads(
-                                space_info.env_json_path.read_text("utf-8", "replace")
+                                space_info.update_last_usage()
+
+                            if env_json_path:
+                                try:
+                                    env_json_contents = json.loads(
+                                        env_json_path.read_text("utf-8", "replace")
+                                    )
+                                    environ.update(env_json_contents)
+                                except BaseException:
+                                    log.exception(
+                                        f"Unable to load environment information from {env_json_path}."
+                                    )
+
+                            if not isinstance(environ, dict):
+                                try:
+                                    raise RuntimeError(
+                                        f"Expected environment to be a dict. Found: {type(environ)}"
+                                    )
+                                except RuntimeError:
+                                    log.exception()
+                                    proceed_to_create_env = True
+                                    break
+
+                            new_env = {}
+                            for key, val in environ.items():
+                                # Just making sure we have a Dict[str, str]
+                                new_env[str(key)] = str(val)
+
+                            return ActionResult(
+                                True, None, RobotInfoEnv(new_env, space_info)
                             )
-                            space_info.update_last_usage()
-
-                        if env_json_path:
-                            try:
-                                env_json_contents = json.loads(
-                                    env_json_path.read_text("utf-8", "replace")
-                                )
-                                environ.update(env_json_contents)
-                            except BaseException:
-                                log.exception(
-                                    f"Unable to load environment information from {env_json_path}."
-                                )
-
-                        if not isinstance(environ, dict):
-                            try:
-                                raise RuntimeError(
-                                    f"Expected environment to be a dict. Found: {type(environ)}"
-                                )
-                            except RuntimeError:
-                                log.exception()
-                                proceed_to_create_env = True
-                                break
-
-                        new_env = {}
-                        for key, val in environ.items():
-                            # Just making sure we have a Dict[str, str]
-                            new_env[str(key)] = str(val)
+                    except Exception:
+                        log.exception(
+                            "Error when waiting for space_info creation to finish (handled and still waiting)."
+                        )
+                        failures += 1
 
+                    if failures > 5:
                         return ActionResult(
-                            True, None, RobotInfoEnv(new_env, space_info)
+                            False,
+                            f"Unable to get environment for space_info: {space_info.space_name}. Unable to collect env.",
+                            None,
                         )
-                except Exception:
-                    log.exception(
-                        "Error when waiting for space_info creation to finish (handled and still waiting)."
-                    )
-                    failures += 1
-
-                if failures > 5:
-                    return ActionResult(
-                        False,
-                        f"Unable to get environment for space_info: {space_info.space_name}. Unable to collect env.",
-                        None,
-                    )
-                time.sleep(2)
+                    # Wait for the state to change (the timeout is just a fallback
+                    # to check whether the process which requested the env is
+                    # still alive).
+                    state_waiter.wait(2)
 
             if not proceed_to_create_env:
                 return ActionResult(
@@ -1042,7 +1144,7 @@ class Rcc:
                 # it's expected that trying to resolve it again won't work, so,
                 # the user must either restart vscode or change the conda yaml
                 # for it to be requested again).
-                space_info.state_path.write_text(SpaceState.CREATED.value, "utf-8")
+                space_info.write_state(SpaceState.CREATED)
 
             return action_result
 
@@ -1070,7 +1172,7 @@ class Rcc:
             )
             ret = self._run_rcc(
                 args,
-                mutex_name=RCC_CLOUD_ROBOT_MUTEX_NAME,
+                mutex_name=get_holotree_space_mutex_name(space_info.space_name),
                 cwd=str(
                     robot_yaml_path.parent
                     if robot_yaml_path is not None
@@ -1106,7 +1208,7 @@ class Rcc:
 
             with space_info.acquire_lock():
                 space_info.env_json_path.write_text(json.dumps(environ), "utf-8")
-                space_info.state_path.write_text(SpaceState.ENV_READY.value, "utf-8")
+                space_info.write_state(SpaceState.ENV_READY)
                 try:
                     os.remove(space_info.damaged_path)
                 except BaseException:
@@ -1157,13 +1259,19 @@ class Rcc:
             log_errors=False,
         )
 
-    def configuration_diagnostics(self, robot_yaml, json=True) -> ActionResult[str]:
+    def configuration_diagnostics(
+        self,
+        robot_yaml,
+        json=True,
+        on_pid: Callable[[int], None] | None = None,
+    ) -> ActionResult[str]:
         return self._run_rcc(
             ["configuration", "diagnostics"]
             + (["--json"] if json else [])
             + ["-r", robot_yaml],
             mutex_name=None,
             timeout=60,
+            on_pid=on_pid,
         )
 
     def configuration_settings(self) -> ActionResult[str]:
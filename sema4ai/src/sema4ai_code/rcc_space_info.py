@@ -1,5 +1,6 @@
 import enum
 import os
+import threading
 import time
 from dataclasses import dataclass
 from functools import lru_cache
@@ -8,6 +9,7 @@ from typing import ContextManager
 
 from sema4ai_ls_core.core_log import get_logger
 from sema4ai_ls_core.protocols import check_implements
+from sema4ai_ls_core.watchdog_wrapper import IFSObserver, IFSWatch
 
 from sema4ai_code.protocols import IRcc, IRCCSpaceInfo
 
@@ -35,6 +37,97 @@ class SpaceState(enum.Enum):
     ENV_READY = "environment_ready"
 
 
+# space path -> events to be set when the state of the space changes (in this
+# process).
+_space_state_events: dict[Path, set[threading.Event]] = {}
+_space_state_events_lock = threading.Lock()
+
+
+def _notify_space_state_changed(space_path: Path) -> None:
+    with _space_state_events_lock:
+        events = tuple(_space_state_events.get(space_path, ()))
+    for event in events:
+        event.set()
+
+
+class SpaceStateWaiter:
+    """
+    Used to wait for a change in the state of a space.
+
+    Changes done in this process (through `RCCSpaceInfo.write_state`) wake
+    the waiter directly and changes done by other processes are noticed
+    through a file-watch in the space directory.
+
+    Note: this is just a hint that the state may have changed, so, the
+    waiter must still re-read the state (and should use a timeout so that it
+    still works if some notification is missed).
+
+    i.e.:
+
+        with SpaceStateWaiter(space_info) as waiter:
+            while not check_state():
+                waiter.wait(2)
+    """
+
+    def __init__(self, space_info: "RCCSpaceInfo") -> None:
+        self._space_path = space_info.space_path
+        self._event = threading.Event()
+        self._observer: IFSObserver | None = None
+        self._watch: IFSWatch | None = None
+
+    def __enter__(self) -> "SpaceStateWaiter":
+        with _space_state_events_lock:
+            _space_state_events.setdefault(self._space_path, set()).add(self._event)
+
+        try:
+            from sema4ai_ls_core import watchdog_wrapper
+            from sema4ai_ls_core.watchdog_wrapper import PathInfo
+
+            event = self._event
+
+            def on_change(src_path, *args):
+                if os.path.basename(src_path) == "state":
+                    event.set()
+
+            observer = self._observer = watchdog_wrapper.create_observer(
+                "watchdog", None
+            )
+            self._watch = observer.notify_on_any_change(
+                [PathInfo(str(self._space_path), recursive=False)], on_change
+            )
+        except Exception:
+            log.exception(
+                "Unable to watch for state changes in: %s (state will be polled).",
+                self._space_path,
+            )
+        return self
+
+    def wait(self, timeout: float) -> bool:
+        """
+        :return: True if some change was notified and False if the timeout
+            elapsed.
+        """
+        ret = self._event.wait(timeout)
+        self._event.clear()
+        return ret
+
+    def __exit__(self, *args) -> None:
+        with _space_state_events_lock:
+            events = _space_state_events.get(self._space_path)
+            if events is not None:
+                events.discard(self._event)
+                if not events:
+                    del _space_state_events[self._space_path]
+
+        watch = self._watch
+        observer = self._observer
+        self._watch = self._observer = None
+        if watch is not None:
+            watch.stop_tracking()
+        if observer is not None:
+            observer.dispose()
+
+
 def write_text(path: Path, contents, encoding="utf-8"):
     try:
         path.write_text(contents, encoding, errors="replace")
@@ -122,6 +215,20 @@ class RCCSpaceInfo:
         self.last_usage = last_usage
         return last_usage
 
+    def load_state(self) -> SpaceState:
+        return SpaceState(self.state_path.read_text("utf-8"))
+
+    def write_state(self, state: SpaceState) -> None:
+        """
+        Writes the state (and notifies the `SpaceStateWaiter`s in this process).
+
+        Note: should be called with the lock held.
+        """
+        try:
+            self.state_path.write_text(state.value, "utf-8")
+        finally:
+            _notify_space_state_changed(self.space_path)
+
     def load_requested_pid(self) -> str:
         try:
             return self.requested_pid_path.read_text("utf-8")
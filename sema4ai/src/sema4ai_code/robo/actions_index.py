@@ -0,0 +1,271 @@
+"""
+Keeps an index of the actions/datasources of action packages so that listing
+them doesn't require searching/parsing the action package again on each
+request.
+
+The index of an action package is created on the first request and is then
+updated incrementally based on the changes reported by the file-watch (only
+the files changed are collected again and a full rescan is only done when a
+directory is created/removed). When the actions/datasources of an action
+package change the `on_actions_changed` callback is called (with the action
+package directory) so that clients can be notified.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from sema4ai_ls_core.callbacks import Callback
+from sema4ai_ls_core.core_log import get_logger
+from sema4ai_ls_core.protocols import ActionInfoTypedDict, DatasourceInfoTypedDict
+from sema4ai_ls_core.watchdog_wrapper import IFSObserver, IFSWatch
+
+log = get_logger(__name__)
+
+_MAX_INDEXES = 20
+
+# Time to wait after a change is noticed before updating the index (so that
+# multiple changes are handled at once).
+_UPDATE_DELAY = 0.3
+
+# Called with the action package directory when its actions/datasources change.
+on_actions_changed = Callback()
+
+_EntryType = ActionInfoTypedDict | DatasourceInfoTypedDict
+
+
+class ActionsIndex:
+    """
+    Note: if it's not possible to watch the action package directory, the
+    actions are collected on each request (the files are still only parsed
+    again if their mtime or size changed).
+    """
+
+    def __init__(self, action_package_dir: Path) -> None:
+        self.action_package_dir = action_package_dir
+        self._root = os.path.normcase(str(action_package_dir))
+        self._lock = threading.Lock()
+        self._watch: IFSWatch | None = None
+
+        # None means that a full scan is needed.
+        self._file_to_entries: dict[Path, list[_EntryType]] | None = None
+        self._listed_actions: list[_EntryType] | None = None
+        self._listed_actions_and_datasources: list[_EntryType] | None = None
+
+        # Changes reported by the file-watch which still weren't applied
+        # (guarded by `_pending_lock` as it's set from the observer thread
+        # while the index may be being updated).
+        self._pending_lock = threading.Lock()
+        self._pending_files: set[Path] = set()
+        self._pending_full_scan = False
+        self._update_scheduled = False
+
+    def start_tracking(self, observer: IFSObserver) -> None:
+        from sema4ai_ls_core.watchdog_wrapper import PathInfo
+
+        try:
+            self._watch = observer.notify_on_any_change(
+                [PathInfo(str(self.action_package_dir), recursive=True)],
+                self._on_change,
+            )
+        except Exception:
+            log.exception(
+                "Unable to track changes in: %s (actions will be collected on each request).",
+                self.action_package_dir,
+            )
+
+    def stop_tracking(self) -> None:
+        watch = self._watch
+        self._watch = None
+        if watch is not None:
+            watch.stop_tracking()
+
+    def _on_change(self, src_path: str, *args) -> None:
+        from sema4ai_code.robo.collect_actions_ast import (
+            get_accept_directory,
+            is_action_file,
+        )
+
+        normalized = os.path.normcase(src_path)
+        if not normalized.startswith(self._root):
+            return
+
+        if not get_accept_directory().accept_path(self._root, normalized):
+            return
+
+        if normalized.endswith(".py"):
+            if not is_action_file(normalized):
+                return
+            with self._pending_lock:
+                self._pending_files.add(Path(src_path))
+
+        elif (
+            os.path.isdir(src_path) and get_accept_directory()(src_path)
+        ) or self._has_files_in(Path(src_path)):
+            # A directory was created, moved or removed.
+            with self._pending_lock:
+                self._pending_full_scan = True
+
+        else:
+            return
+
+        self._schedule_update()
+
+    def _has_files_in(self, dir_path: Path) -> bool:
+        file_to_entries = self._file_to_entries
+        if not file_to_entries:
+            return False
+        return any(dir_path in f.parents for f in list(file_to_entries))
+
+    def _schedule_update(self) -> None:
+        from sema4ai_ls_core.timeouts import TimeoutTracker
+
+        with self._pending_lock:
+            if self._update_scheduled:
+                return
+            self._update_scheduled = True
+
+        TimeoutTracker.get_singleton().call_on_timeout(
+            _UPDATE_DELAY, self._on_update_timeout
+        )
+
+    def _on_update_timeout(self) -> None:
+        with self._pending_lock:
+            self._update_scheduled = False
+
+        with self._lock:
+            if self._watch is None or self._file_to_entries is None:
+                # Nothing was listed yet (it'll be done in the next request).
+                return
+            changed = self._update_unlocked()
+
+        if changed:
+            log.debug("Actions changed in: %s", self.action_package_dir)
+            on_actions_changed(self.action_package_dir)
+
+    def _update_unlocked(self) -> bool:
+        """
+        Applies the pending changes.
+
+        :return: whether the actions/datasources changed.
+        """
+        from sema4ai_code.robo.collect_actions_ast import (
+            collect_file_actions_and_datasources,
+            iter_action_files,
+        )
+
+        with self._pending_lock:
+            pending_files = self._pending_files
+            full_scan = self._pending_full_scan or self._file_to_entries is None
+            self._pending_files = set()
+            self._pending_full_scan = False
+
+        old_file_to_entries = self._file_to_entries
+        if full_scan:
+            new_file_to_entries = {}
+            for f in iter_action_files(self.action_package_dir):
+                entries = collect_file_actions_and_datasources(f)
+                if entries:
+                    new_file_to_entries[f] = entries
+            changed = new_file_to_entries != old_file_to_entries
+            self._file_to_entries = new_file_to_entries
+
+        else:
+            assert old_file_to_entries is not None
+            changed = False
+            for f in pending_files:
+                entries = []
+                if f.is_file():
+                    entries = collect_file_actions_and_datasources(f)
+
+                if entries:
+                    if old_file_to_entries.get(f) != entries:
+                        old_file_to_entries[f] = entries
+                        changed = True
+                elif old_file_to_entries.pop(f, None) is not None:
+                    changed = True
+
+        if changed:
+            self._listed_actions = None
+            self._listed_actions_and_datasources = None
+        return changed
+
+    def list_actions_and_datasources(
+        self, collect_datasources: bool
+    ) -> list[_EntryType]:
+        """
+        Provides the same information as `iter_actions_and_datasources`.
+        """
+        with self._lock:
+            if self._watch is None:
+                self._file_to_entries = None
+            self._update_unlocked()
+
+            if collect_datasources:
+                listed = self._listed_actions_and_datasources
+            else:
+                listed = self._listed_actions
+
+            if listed is None:
+                assert self._file_to_entries is not None
+                listed = []
+                for f in sorted(self._file_to_entries):
+                    for entry in self._file_to_entries[f]:
+                        if collect_datasources or entry["kind"] != "datasource":
+                            listed.append(entry)
+
+                if collect_datasources:
+                    self._listed_actions_and_datasources = listed
+                else:
+                    self._listed_actions = listed
+
+            # A new list is provided as the caller may change it.
+            return list(listed)
+
+
+_indexes: OrderedDict[Path, ActionsIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+_observer: IFSObserver | None = None
+
+
+def _get_observer() -> IFSObserver:
+    global _observer
+    if _observer is None:
+        from sema4ai_ls_core import watchdog_wrapper
+
+        _observer = watchdog_wrapper.create_observer("watchdog", None)
+    return _observer
+
+
+def get_actions_index(action_package_dir: Path) -> ActionsIndex:
+    """
+    Provides the (cached) index of the actions for the given action package
+    directory (the indexes of the action packages last used are kept).
+    """
+    action_package_dir = action_package_dir.absolute()
+    with _indexes_lock:
+        index = _indexes.get(action_package_dir)
+        if index is not None:
+            _indexes.move_to_end(action_package_dir)
+            return index
+
+        index = _indexes[action_package_dir] = ActionsIndex(action_package_dir)
+        try:
+            observer = _get_observer()
+        except Exception:
+            log.exception("Unable to create observer to track actions.")
+        else:
+            index.start_tracking(observer)
+
+        while len(_indexes) > _MAX_INDEXES:
+            _, removed = _indexes.popitem(last=False)
+            removed.stop_tracking()
+        return index
+
+
+def clear_actions_indexes() -> None:
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.stop_tracking()
+        _indexes.clear()
@@ -0,0 +1,145 @@
+"""
+Cache for the information on actions which is collected by launching the
+user environment (i.e.: `python -m sema4ai.actions metadata/list`), which is
+slow as the user code needs to be imported.
+
+Entries are keyed by a fingerprint of the action package (the contents of the
+`package.yaml` and of the `.py` files in it) and of the environment used to
+collect the information, so, the user environment is only launched again when
+some code actually changed (the entries are also persisted on disk so that
+reopening the workspace doesn't need to launch it either).
+"""
+
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from sema4ai_ls_core.cache import LRUCache
+from sema4ai_ls_core.core_log import get_logger
+from sema4ai_ls_core.ep_resolve_interpreter import IInterpreterInfo
+from sema4ai_ls_core.protocols import ActionResult
+
+log = get_logger(__name__)
+
+_MAX_MEMORY_ENTRIES = 50
+_MAX_DISK_ENTRIES = 500
+_MAX_CACHED_FILE_HASHES = 5000
+
+# path -> ((mtime_ns, size), content hash)
+_file_hashes: LRUCache[str, tuple[tuple[int, int], str]] = LRUCache(
+    _MAX_CACHED_FILE_HASHES
+)
+_file_hashes_lock = threading.Lock()
+
+
+def _compute_file_hash(path: str) -> str | None:
+    """
+    Provides the hash of the contents of the given file (which is only read
+    again if its mtime or size changed).
+
+    :return: None if the file can't be read.
+    """
+    import hashlib
+
+    try:
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with _file_hashes_lock:
+            cached = _file_hashes.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with open(path, "rb") as stream:
+            file_hash = hashlib.sha256(stream.read()).hexdigest()
+    except OSError:
+        return None
+
+    with _file_hashes_lock:
+        _file_hashes[path] = (key, file_hash)
+    return file_hash
+
+
+def compute_action_package_fingerprint(package_dir: Path) -> str:
+    """
+    Provides a fingerprint of the contents of the `package.yaml` and of the
+    `.py` files in the given action package (the directories ignored when
+    searching for actions are also ignored here).
+    """
+    from sema4ai_code._lint_cache import make_fingerprint
+    from sema4ai_code.robo.collect_actions_ast import (
+        _collect_py_files,
+        get_accept_directory,
+    )
+
+    parts: list[tuple[str, str | None]] = [
+        ("package.yaml", _compute_file_hash(str(package_dir / "package.yaml")))
+    ]
+    try:
+        py_files = sorted(_collect_py_files(package_dir, get_accept_directory()))
+    except OSError:
+        py_files = []  # The directory was removed in the meanwhile.
+
+    for f in py_files:
+        parts.append(
+            (f.relative_to(package_dir).as_posix(), _compute_file_hash(str(f)))
+        )
+    return make_fingerprint(*parts)
+
+
+class ActionsMetadataCache:
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_size: int = _MAX_MEMORY_ENTRIES,
+        max_disk_entries: int = _MAX_DISK_ENTRIES,
+    ) -> None:
+        """
+        :param cache_dir: If given, entries are also persisted in this
+            directory.
+        """
+        from sema4ai_code._lint_cache import DiagnosticsCache
+
+        # Note: the results are kept in a list as that's what the
+        # `DiagnosticsCache` stores (it's used just for its memory/disk tiers).
+        self._cache = DiagnosticsCache(
+            max_size=max_size, cache_dir=cache_dir, max_disk_entries=max_disk_entries
+        )
+
+    def get_or_compute(
+        self,
+        kind: str,
+        args: tuple,
+        package_dir: Path,
+        interpreter_info: IInterpreterInfo,
+        compute: Callable[[], ActionResult],
+    ) -> ActionResult:
+        """
+        Provides the cached result or computes (and caches) it.
+
+        :param kind: The kind of information (i.e.: "metadata", "list").
+        :param args: Anything else which identifies the request (must have a
+            stable `repr`).
+
+        Note: failures are not cached.
+        """
+        from sema4ai_code._lint_cache import make_fingerprint
+        from sema4ai_code.robo.lint_action import make_environment_fingerprint
+
+        package_fingerprint = compute_action_package_fingerprint(package_dir)
+        fingerprint = make_fingerprint(
+            args, make_environment_fingerprint(interpreter_info)
+        )
+
+        found = self._cache.get(kind, package_fingerprint, fingerprint)
+        if found is not None and len(found) == 1:
+            log.debug("Using cached actions %s for: %s", kind, package_dir)
+            return ActionResult.make_success(found[0])
+
+        result = compute()
+        if result.success:
+            self._cache.put(kind, package_fingerprint, fingerprint, [result.result])
+        return result
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -1,16 +1,24 @@
 import json
+import threading
+import typing
+from pathlib import Path
 from typing import TypedDict
 
+from sema4ai_ls_core.cache import LRUCache
 from sema4ai_ls_core.core_log import get_logger
-from sema4ai_ls_core.ep_resolve_interpreter import (
-    EPResolveInterpreter,
-    IInterpreterInfo,
-)
+from sema4ai_ls_core.ep_resolve_interpreter import IInterpreterInfo
 from sema4ai_ls_core.pluginmanager import PluginManager
 from sema4ai_ls_core.protocols import ActionResult, IMonitor
 
+if typing.TYPE_CHECKING:
+    from sema4ai_code.robo.actions_metadata_cache import ActionsMetadataCache
+
 log = get_logger(__name__)
 
+# environment fingerprint -> `sema4ai.actions` version
+_actions_version_cache: LRUCache[tuple, tuple[int, ...]] = LRUCache(50)
+_actions_version_cache_lock = threading.Lock()
+
 _MetadataType = TypedDict(
     "_MetadataType",
     {
@@ -112,44 +120,42 @@ def _execute_within_user_env(
     monitor: IMonitor,
     cwd: str,
     returns_json=True,
+    interpreter_info: IInterpreterInfo | None = None,
 ) -> ActionResult:
     from sema4ai_ls_core.basic import launch_and_return_future
 
+    from sema4ai_code.robo.lint_action import get_interpreter_info
+
     try:
-        for ep in pm.get_implementations(EPResolveInterpreter):
-            interpreter_info: IInterpreterInfo = ep.get_interpreter_info_for_doc_uri(
-                uri
+        if interpreter_info is None:
+            interpreter_info = get_interpreter_info(pm, uri)
+        if interpreter_info is not None:
+            environ = interpreter_info.get_environ()
+            python_exe = interpreter_info.get_python_exe()
+            future = launch_and_return_future(
+                [python_exe] + args,
+                environ=environ,
+                cwd=cwd,
+                timeout=30,
+                monitor=monitor,
             )
-            if interpreter_info is not None:
-                environ = interpreter_info.get_environ()
-                python_exe = interpreter_info.get_python_exe()
-                future = launch_and_return_future(
-                    [python_exe] + args,
-                    environ=environ,
-                    cwd=cwd,
-                    timeout=30,
-                    monitor=monitor,
+            result = future.result(30)
+            if result.returncode == 0:
+                if result.stdout:
+                    if returns_json:
+                        try:
+                            return ActionResult.make_success(json.loads(result.stdout))
+                        except Exception:
+                            msg = f"Unable to parse as json: {result.stdout}"
+                            log.exception(msg)
+                            return ActionResult.make_failure(msg)
+                    else:
+                        return ActionResult.make_success(result.stdout)
+            if result.stderr:
+                error_msg = (
+                    f"Found errors while running {args[2]} errors: {result.stderr}"
                 )
-                result = future.result(30)
-                if result.returncode == 0:
-                    if result.stdout:
-                        if returns_json:
-                            try:
-                                return ActionResult.make_success(
-                                    json.loads(result.stdout)
-                                )
-                            except Exception:
-                                msg = f"Unable to parse as json: {result.stdout}"
-                                log.exception(msg)
-                                return ActionResult.make_failure(msg)
-                        else:
-                            return ActionResult.make_success(result.stdout)
-                if result.stderr:
-                    error_msg = (
-                        f"Found errors while running {args[2]} errors: {result.stderr}"
-                    )
-                    log.info(error_msg)
-                break
+                log.info(error_msg)
     except BaseException as e:
         message = f"Unable to execute {args[2]} command. Error: {e}"
         log.exception(message)
@@ -158,12 +164,30 @@ def _execute_within_user_env(
     return ActionResult.make_failure(f"Unable to execute {args[2]} command")
 
 
+def _find_action_package_dir(path: Path) -> Path:
+    """
+    Provides the directory with the `package.yaml` for the given file/directory
+    (if not found the directory of the given path is provided).
+    """
+    search_from = path if path.is_dir() else path.parent
+    p = search_from
+    while True:
+        if (p / "package.yaml").exists():
+            return p
+        if not p.parent or p.parent == p:
+            # Couldn't find package.yaml, use the directory where we started searching from!
+            return search_from
+        p = p.parent
+
+
 def _call_sema4ai_actions(
     pm: PluginManager,
     monitor: IMonitor,
     argument: str,
     uri: str,
     cwd: str | None = None,
+    interpreter_info: IInterpreterInfo | None = None,
+    metadata_cache: "ActionsMetadataCache | None" = None,
 ) -> ActionResult:
     """Note: the way this works is that we'll launch a separate script using the user
     environment to collect the actions information.
@@ -173,11 +197,14 @@ def _call_sema4ai_actions(
     version of python we could potentially have a syntax error or load libraries not
     available to the VSCode extension (because for listing the actions we need to
     actually load the user code to resolve things such as complex models).
-    """
-    from pathlib import Path
 
+    If a `metadata_cache` is given the user environment is only launched if
+    the action package (or the environment) changed since the last call.
+    """
     from sema4ai_ls_core import uris
 
+    from sema4ai_code.robo.lint_action import get_interpreter_info
+
     if not uri:
         return ActionResult.make_failure("No uri given")
 
@@ -190,37 +217,51 @@ def _call_sema4ai_actions(
         "--skip-lint",
     ]
 
-    search_cwd_from: str = ""
     if not path.is_dir():
         # If a file is given, we'll use the glob to list the actions just in that file.
         args.append("--glob")
         args.append(file_name)
-        search_cwd_from = str(path.parent)
-    else:
-        search_cwd_from = str(path)
 
+    package_dir = _find_action_package_dir(path)
     if cwd is None:
-        p = Path(search_cwd_from)
-        while True:
-            if (p / "package.yaml").exists():
-                cwd = str(p)
-                break
-            if not p.parent or p.parent == p:
-                # Couldn't find package.yaml, use the directory where we started searching from!
-                cwd = search_cwd_from
-                break
-            p = p.parent
+        cwd = str(package_dir)
+
+    def compute() -> ActionResult:
+        assert cwd is not None
+        return _execute_within_user_env(
+            pm, uri, args, monitor, cwd, interpreter_info=interpreter_info
+        )
 
-    return _execute_within_user_env(pm, uri, args, monitor, cwd)
+    if metadata_cache is None:
+        return compute()
+
+    if interpreter_info is None:
+        interpreter_info = get_interpreter_info(pm, uri)
+        if interpreter_info is None:
+            return compute()
+
+    return metadata_cache.get_or_compute(
+        argument, (str(path), cwd), package_dir, interpreter_info, compute
+    )
 
 
 def _get_actions_version(
-    pm: PluginManager, uri: str, monitor: IMonitor
+    pm: PluginManager,
+    uri: str,
+    monitor: IMonitor,
+    interpreter_info: IInterpreterInfo | None = None,
 ) -> ActionResult[tuple[int, int, int]]:
-    from pathlib import Path
-
+    """
+    Note: the version is cached for the environment (so, the user environment
+    is only launched the first time the version is requested for it).
+    """
     from sema4ai_ls_core import uris
 
+    from sema4ai_code.robo.lint_action import (
+        get_interpreter_info,
+        make_environment_fingerprint,
+    )
+
     libname = "sema4ai.actions"
     args = ["-c", f"import {libname};print({libname}.__version__)"]
 
@@ -237,7 +278,26 @@ def _get_actions_version(
     is defined in your `package.yaml`).
     """
 
-    result = _execute_within_user_env(pm, uri, args, monitor, cwd, returns_json=False)
+    if interpreter_info is None:
+        interpreter_info = get_interpreter_info(pm, uri)
+
+    environment_fingerprint = None
+    if interpreter_info is not None:
+        environment_fingerprint = make_environment_fingerprint(interpreter_info)
+        with _actions_version_cache_lock:
+            version = _actions_version_cache.get(environment_fingerprint)
+        if version is not None:
+            return ActionResult.make_success(typing.cast(tuple[int, int, int], version))
+
+    result = _execute_within_user_env(
+        pm,
+        uri,
+        args,
+        monitor,
+        cwd,
+        returns_json=False,
+        interpreter_info=interpreter_info,
+    )
     if result.success and result.result:
         try:
             result.result = tuple(int(x) for x in result.result.strip().split("."))
@@ -246,28 +306,70 @@ def _get_actions_version(
     else:
         return ActionResult.make_failure(error_msg)
 
+    if environment_fingerprint is not None:
+        with _actions_version_cache_lock:
+            _actions_version_cache[environment_fingerprint] = result.result
     return result
 
 
 def collect_actions_full_and_slow(
-    pm: PluginManager, uri: str, action_package_yaml_directory: str, monitor: IMonitor
+    pm: PluginManager,
+    uri: str,
+    action_package_yaml_directory: str,
+    monitor: IMonitor,
+    metadata_cache: "ActionsMetadataCache | None" = None,
 ) -> ActionResult:
     return _call_sema4ai_actions(
-        pm, monitor, "list", uri, cwd=action_package_yaml_directory
+        pm,
+        monitor,
+        "list",
+        uri,
+        cwd=action_package_yaml_directory,
+        metadata_cache=metadata_cache,
     )
 
 
-def get_metadata(pm: PluginManager, uri: str, monitor: IMonitor) -> ActionResult[dict]:
-    actions_library_result = _get_actions_version(pm, uri, monitor)
+def get_metadata(
+    pm: PluginManager,
+    uri: str,
+    monitor: IMonitor,
+    metadata_cache: "ActionsMetadataCache | None" = None,
+) -> ActionResult[dict]:
+    """
+    :param metadata_cache: If given, the metadata is only collected again
+        (by launching the user environment) if the action package or the
+        environment changed.
+    """
+    from sema4ai_code.robo.lint_action import get_interpreter_info
+
+    # Resolve only once (it's used for the version and the metadata).
+    interpreter_info = get_interpreter_info(pm, uri)
+    actions_library_result = _get_actions_version(
+        pm, uri, monitor, interpreter_info=interpreter_info
+    )
     if not actions_library_result.success:
         return ActionResult.make_failure(
             actions_library_result.message or "Unable to get `sema4ai.actions` version"
         )
 
     if actions_library_result.result and actions_library_result.result > (1, 0, 1):
-        return _call_sema4ai_actions(pm, monitor, "metadata", uri)
+        return _call_sema4ai_actions(
+            pm,
+            monitor,
+            "metadata",
+            uri,
+            interpreter_info=interpreter_info,
+            metadata_cache=metadata_cache,
+        )
     else:
-        result = _call_sema4ai_actions(pm, monitor, "list", uri)
+        result = _call_sema4ai_actions(
+            pm,
+            monitor,
+            "list",
+            uri,
+            interpreter_info=interpreter_info,
+            metadata_cache=metadata_cache,
+        )
         if result.success:
             metadata: _MetadataType = {
                 "actions_spec_version": "v2",
@@ -1,5 +1,9 @@
 import ast as ast_module
-from collections.abc import Iterator
+import fnmatch
+import os
+import re
+import typing
+from collections.abc import Callable, Iterator
 from pathlib import Path
 from typing import Any, Literal, TypedDict
 
@@ -13,13 +17,19 @@ from sema4ai_ls_core.protocols import (
     IMonitor,
 )
 
+if typing.TYPE_CHECKING:
+    from sema4ai_ls_core.load_ignored_dirs import AcceptDirectory
+
 log = get_logger(__name__)
 
 
-def _collect_py_files(root_path: Path) -> Iterator[Path]:
+def _collect_py_files(
+    root_path: Path, accept_directory: Callable[[str], bool]
+) -> Iterator[Path]:
     for item in root_path.iterdir():
         if item.is_dir():
-            yield from _collect_py_files(item)
+            if accept_directory(str(item)):
+                yield from _collect_py_files(item, accept_directory)
         elif item.suffix == ".py":
             yield item
 
@@ -279,6 +289,120 @@ DEFAULT_ACTION_SEARCH_GLOB = (
 
 globs = DEFAULT_ACTION_SEARCH_GLOB.split("|")
 
+# All the globs in a single regex (so that each file name is matched only once).
+_action_file_name_regex = re.compile(
+    "|".join(fnmatch.translate(os.path.normcase(glob)) for glob in globs)
+)
+
+# Directories which never have actions (in addition to the ones from
+# `load_ignored_dirs`).
+_ACTION_PACKAGE_IGNORED_DIRS = ("**/.venv", "**/venv", "**/output")
+
+_accept_directory: "AcceptDirectory | None" = None
+
+
+def is_action_file(path: Path | str) -> bool:
+    """
+    :return: whether the given file name matches the globs of the files which
+        may have actions/datasources.
+    """
+    return (
+        _action_file_name_regex.match(os.path.normcase(os.path.basename(path)))
+        is not None
+    )
+
+
+def get_accept_directory() -> "AcceptDirectory":
+    """
+    Provides the callable to know whether some directory must be searched for
+    actions (honors the `load_ignored_dirs` and skips virtual environments and
+    the output of runs).
+    """
+    global _accept_directory
+    if _accept_directory is None:
+        from sema4ai_ls_core import load_ignored_dirs
+
+        _accept_directory = load_ignored_dirs.create_accept_directory_callable(
+            extra_ignored_dirs=_ACTION_PACKAGE_IGNORED_DIRS
+        )
+    return _accept_directory
+
+
+def iter_action_files(root_directory: Path) -> Iterator[Path]:
+    """
+    Provides the files which may have actions/datasources in the given directory.
+    """
+    accept_directory = get_accept_directory()
+    for f in _collect_py_files(root_directory, accept_directory):
+        if is_action_file(f.name):
+            yield f
+
+
+def collect_file_actions_and_datasources(
+    f: Path,
+) -> list[ActionInfoTypedDict | DatasourceInfoTypedDict]:
+    """
+    Collects the actions and the datasources from the given file (errors are
+    logged and what could be collected is returned).
+    """
+    from sema4ai_code.robo.python_analysis import get_file_analysis
+
+    ret: list[ActionInfoTypedDict | DatasourceInfoTypedDict] = []
+    try:
+        analysis = get_file_analysis(f)
+        if analysis.parse_error is not None:
+            raise analysis.parse_error
+        uri = uris.from_fs_path(str(f))
+
+        for node_info_action in analysis.actions:
+            function_def_node = node_info_action["node"]
+            node_range = _get_ast_node_range(function_def_node)
+            ret.append(
+                ActionInfoTypedDict(
+                    uri=uri,
+                    range=node_range,
+                    name=function_def_node.name,
+                    kind=node_info_action["kind"],
+                )
+            )
+
+        # Note: Instead of iterating over all nodes to collect datasources, we
+        # try to find the following structure:
+        #
+        # DataSourceVarName = Annotated[DataSource, DataSourceSpec(name="my_datasource")]
+        #
+        # Note that the DataSourceSpec(...) is a Call node inside the Annotated[...]
+        # which in turn must be inside an Assign node.
+        for node_info_datasource in analysis.datasources:
+            ast_node = node_info_datasource["node"]
+            node_range = _get_ast_node_range(ast_node)
+            ret.append(
+                DatasourceInfoTypedDict(
+                    range=node_range,
+                    uri=uri,
+                    name=node_info_datasource.get("name") or "<name not found>",
+                    engine=node_info_datasource.get(
+                        "engine",
+                    )
+                    or "<engine not found>",
+                    model_name=node_info_datasource.get("model_name"),
+                    created_table=node_info_datasource.get("created_table"),
+                    kind="datasource",
+                    python_variable_name=node_info_datasource.get(
+                        "python_variable_name"
+                    ),
+                    setup_sql=node_info_datasource.get("setup_sql"),
+                    setup_sql_files=node_info_datasource.get("setup_sql_files"),
+                    description=node_info_datasource.get("description"),
+                    file=node_info_datasource.get("file"),
+                )
+            )
+    except Exception as e:
+        log.error(
+            f"Unable to collect @action/@query/@predict/datasources from {f}. Error: {e}"
+        )
+    return ret
+
 
 def iter_actions_and_datasources(
     root_directory: Path,
@@ -288,72 +412,15 @@ def iter_actions_and_datasources(
     Iterates over the actions just by using the AST (this means that it doesn't
     give complete information, rather, it is a fast way to provide just simple
     metadata such as the action name and location).
+
+    Note: `sema4ai_code.robo.actions_index` provides the same information
+    incrementally (it should be preferred when the same action package is
+    queried multiple times).
     """
-    import fnmatch
-
-    f: Path
-    for f in _collect_py_files(root_directory):
-        for glob in globs:
-            if fnmatch.fnmatch(f.name, glob):
-                try:
-                    action_contents_file = f.read_bytes()
-                    ast = ast_module.parse(action_contents_file, "<string>")
-                    uri = uris.from_fs_path(str(f))
-
-                    for node_info_action in _collect_actions_from_ast(ast):
-                        function_def_node = node_info_action["node"]
-                        node_range = _get_ast_node_range(function_def_node)
-                        yield ActionInfoTypedDict(
-                            uri=uri,
-                            range=node_range,
-                            name=function_def_node.name,
-                            kind=node_info_action["kind"],
-                        )
-
-                    if collect_datasources:
-                        variables = _collect_variables(ast)
-                        # Note: Instead of iterating over all nodes to collect datasources, we
-                        # try to find the following structure:
-                        #
-                        # DataSourceVarName = Annotated[DataSource, DataSourceSpec(name="my_datasource")]
-                        #
-                        # Note that the DataSourceSpec(...) is a Call node inside the Annotated[...]
-                        # which in turn must be inside an Assign node.
-
-                        if collect_datasources:
-                            for node_info_datasource in _collect_datasources(
-                                ast, variables
-                            ):
-                                ast_node = node_info_datasource["node"]
-                                node_range = _get_ast_node_range(ast_node)
-                                yield DatasourceInfoTypedDict(
-                                    range=node_range,
-                                    uri=uri,
-                                    name=node_info_datasource.get("name")
-                                    or "<name not found>",
-                                    engine=node_info_datasource.get(
-                                        "engine",
-                                    )
-                                    or "<engine not found>",
-                                    model_name=node_info_datasource.get("model_name"),
-                                    created_table=node_info_datasource.get(
-                                        "created_table"
-                                    ),
-                                    kind="datasource",
-                                    python_variable_name=node_info_datasource.get(
-                                        "python_variable_name"
-                                    ),
-                                    setup_sql=node_info_datasource.get("setup_sql"),
-                                    setup_sql_files=node_info_datasource.get(
-                                        "setup_sql_files"
-                                    ),
-                                    description=node_info_datasource.get("description"),
-                                    file=node_info_datasource.get("file"),
-                                )
-                except Exception as e:
-                    log.error(
-                        f"Unable to collect @action/@query/@predict/datasources from {f}. Error: {e}"
-                    )
+    for f in iter_action_files(root_directory):
+        for entry in collect_file_actions_and_datasources(f):
+            if collect_datasources or entry["kind"] != "datasource":
+                yield entry
 
 
 def get_action_signature(
@@ -366,15 +433,15 @@ def get_action_signature(
     if not action_file_path.exists():
         return ActionResult.make_failure(f"Action file not found: {action_file_path}")
 
-    action_contents_file = action_file_path.read_bytes()
-    try:
-        ast = ast_module.parse(action_contents_file, "<string>")
-    except Exception:
+    from sema4ai_code.robo.python_analysis import get_file_analysis
+
+    analysis = get_file_analysis(action_file_path)
+    if analysis.parse_error is not None:
         return ActionResult.make_failure(
             f"Unable to parse action file: {action_file_path}"
         )
 
-    for node_info_action in _collect_actions_from_ast(ast):
+    for node_info_action in analysis.actions:
         function_def_node = node_info_action["node"]
         if function_def_node.name == action_name:
             # Convert the function signature to a string
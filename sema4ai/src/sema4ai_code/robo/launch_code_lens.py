@@ -1,4 +1,3 @@
-import typing
 from functools import partial
 from pathlib import Path
 
@@ -13,10 +12,6 @@ from sema4ai_ls_core.protocols import (
     IWorkspace,
 )
 
-if typing.TYPE_CHECKING:
-    import ast
-
-
 log = get_logger(__name__)
 
 
@@ -78,54 +73,6 @@ def compute_code_lenses(
     return None
 
 
-def _is_robocorp_tasks_import(node: "ast.AST") -> bool:
-    import ast
-
-    if isinstance(node, ast.ImportFrom):
-        # Check if the module is 'robocorp.tasks' and 'task' is in the names
-        if node.module == "robocorp.tasks":
-            for alias in node.names:
-                if alias.name == "task":
-                    return True
-    return False
-
-
-def _is_sema4ai_actions_import(node: "ast.AST") -> bool:
-    import ast
-
-    if isinstance(node, ast.ImportFrom):
-        # Check if the module is 'sema4ai.actions' and 'action' is in the names
-        if node.module == "sema4ai.actions":
-            for alias in node.names:
-                if alias.name == "action":
-                    return True
-    return False
-
-
-def _is_sema4ai_queries_import(node: "ast.AST") -> bool:
-    import ast
-
-    if isinstance(node, ast.ImportFrom):
-        # Check if the module is 'sema4ai.data' and 'query' is in the names
-        if node.module == "sema4ai.data":
-            for alias in node.names:
-                if alias.name == "query":
-                    return True
-    return False
-
-
-def _is_sema4ai_predict_import(node: "ast.AST") -> bool:
-    import ast
-
-    if isinstance(node, ast.ImportFrom):
-        # Check if the module is 'sema4ai.data' and 'predict' is in the names
-        if node.module == "sema4ai.data":
-            for alias in node.names:
-                if alias.name == "predict":
-                    return True
-    return False
-
-
 def _create_code_lens(start_line, title, command, arguments) -> CodeLensTypedDict:
     return {
         "range": {
@@ -201,197 +148,186 @@ def _collect_python_code_lenses_in_thread(
     compute_action_packages_code_lenses: bool,
     monitor: IMonitor,
 ) -> list[CodeLensTypedDict] | None:
-    import ast
-
     from sema4ai_code.commands import (
         SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
         SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
     )
+    from sema4ai_code.robo.python_analysis import get_document_analysis
 
     tasks_code_lenses: list[CodeLensTypedDict] = []
     actions_code_lenses: list[CodeLensTypedDict] = []
-    contents = document.source
 
-    # Parse the document source into an AST
-    try:
-        tree = ast.parse(contents)
-    except Exception:
+    # The analysis (ast/imports/decorated functions) is shared with the
+    # other features which need it for the same version of the document.
+    analysis = get_document_analysis(document)
+    if analysis.ast is None:
         return None
 
-    found_robocorp_tasks_import = False
-    found_sema4ai_actions_import = False
-    found_sema4ai_queries_import = False
-    found_sema4ai_predict_import = False
-
     package_yaml_path = _find_package_yaml_from_path(Path(document.path))
     if not package_yaml_path:
         compute_action_packages_code_lenses = False
 
-    # Iterate over the AST nodes
-    for node in ast.walk(tree):
+    imports = analysis.imports
+
+    # Detect if there's a `from robocorp.tasks import task` import.
+    found_robocorp_tasks_import = compute_robo_tasks_code_lenses and (
+        ("robocorp.tasks", "task") in imports
+    )
+
+    # Detect if there's a `from sema4ai.actions import action` import.
+    found_sema4ai_actions_import = compute_action_packages_code_lenses and (
+        ("sema4ai.actions", "action") in imports
+    )
+
+    # Detect if there's a `from sema4ai.data import query` import.
+    found_sema4ai_queries_import = compute_action_packages_code_lenses and (
+        ("sema4ai.data", "query") in imports
+    )
+
+    # Detect if there's a `from sema4ai.data import predict` import.
+    found_sema4ai_predict_import = compute_action_packages_code_lenses and (
+        ("sema4ai.data", "predict") in imports
+    )
+
+    for node, decorator in analysis.decorated_functions:
         monitor.check_cancelled()
 
-        # Detect if there's a `from robocorp.tasks import task` import.
-        if not found_robocorp_tasks_import and compute_robo_tasks_code_lenses:
-            found_robocorp_tasks_import = _is_robocorp_tasks_import(node)
-
-        # Detect if there's a `from sema4ai.actions import action` import.
-        if not found_sema4ai_actions_import and compute_action_packages_code_lenses:
-            found_sema4ai_actions_import = _is_sema4ai_actions_import(node)
-
-        # Detect if there's a `from sema4ai.data import query` import.
-        if not found_sema4ai_queries_import and compute_action_packages_code_lenses:
-            found_sema4ai_queries_import = _is_sema4ai_queries_import(node)
-
-        # Detect if there's a `from sema4ai.data import predict` import.
-        if not found_sema4ai_predict_import and compute_action_packages_code_lenses:
-            found_sema4ai_predict_import = _is_sema4ai_predict_import(node)
-
-        if isinstance(node, ast.FunctionDef) and node.decorator_list:
-            for decorator in node.decorator_list:
-                if (
-                    compute_action_packages_code_lenses
-                    and found_sema4ai_actions_import
-                    and isinstance(decorator, ast.Name)
-                    and decorator.id == "action"
-                ):
-                    assert package_yaml_path is not None, (
-                        "Expected package_yaml_path to be defined at this point."
-                    )
-                    function_name = node.name
-                    start_line = decorator.lineno - 1  # AST line numbers are 1-based
-                    robot_entry = {
-                        "actionName": function_name,
-                        "robot": {
-                            "directory": str(package_yaml_path.parent),
-                            "filePath": str(package_yaml_path),
-                        },
-                        "uri": document.uri,
-                    }
-                    actions_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Run Action",
-                            SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
-                            [robot_entry],
-                        )
-                    )
-                    actions_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Debug Action",
-                            SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
-                            [robot_entry],
-                        )
-                    )
+        if (
+            compute_action_packages_code_lenses
+            and found_sema4ai_actions_import
+            and decorator.id == "action"
+        ):
+            assert package_yaml_path is not None, (
+                "Expected package_yaml_path to be defined at this point."
+            )
+            function_name = node.name
+            start_line = decorator.lineno - 1  # AST line numbers are 1-based
+            robot_entry = {
+                "actionName": function_name,
+                "robot": {
+                    "directory": str(package_yaml_path.parent),
+                    "filePath": str(package_yaml_path),
+                },
+                "uri": document.uri,
+            }
+            actions_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Run Action",
+                    SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
+                    [robot_entry],
+                )
+            )
+            actions_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Debug Action",
+                    SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
+                    [robot_entry],
+                )
+            )
 
-                elif (
-                    compute_action_packages_code_lenses
-                    and found_sema4ai_queries_import
-                    and isinstance(decorator, ast.Name)
-                    and decorator.id == "query"
-                ):
-                    assert package_yaml_path is not None, (
-                        "Expected package_yaml_path to be defined at this point."
-                    )
-                    function_name = node.name
-                    start_line = decorator.lineno - 1  # AST line numbers are 1-based
-                    robot_entry = {
-                        "actionName": function_name,
-                        "robot": {
-                            "directory": str(package_yaml_path.parent),
-                            "filePath": str(package_yaml_path),
-                        },
-                        "uri": document.uri,
-                    }
-                    actions_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Run Query",
-                            SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
-                            [robot_entry],
-                        )
-                    )
-                    actions_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Debug Query",
-                            SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
-                            [robot_entry],
-                        )
-                    )
+        elif (
+            compute_action_packages_code_lenses
+            and found_sema4ai_queries_import
+            and decorator.id == "query"
+        ):
+            assert package_yaml_path is not None, (
+                "Expected package_yaml_path to be defined at this point."
+            )
+            function_name = node.name
+            start_line = decorator.lineno - 1  # AST line numbers are 1-based
+            robot_entry = {
+                "actionName": function_name,
+                "robot": {
+                    "directory": str(package_yaml_path.parent),
+                    "filePath": str(package_yaml_path),
+                },
+                "uri": document.uri,
+            }
+            actions_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Run Query",
+                    SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
+                    [robot_entry],
+                )
+            )
+            actions_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Debug Query",
+                    SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
+                    [robot_entry],
+                )
+            )
 
-                elif (
-                    compute_action_packages_code_lenses
-                    and found_sema4ai_predict_import
-                    and isinstance(decorator, ast.Name)
-                    and decorator.id == "predict"
-                ):
-                    assert package_yaml_path is not None, (
-                        "Expected package_yaml_path to be defined at this point."
-                    )
-                    function_name = node.name
-                    start_line = decorator.lineno - 1  # AST line numbers are 1-based
-                    robot_entry = {
-                        "actionName": function_name,
-                        "robot": {
-                            "directory": str(package_yaml_path.parent),
-                            "filePath": str(package_yaml_path),
-                        },
-                        "uri": document.uri,
-                    }
-                    actions_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Run Predict",
-                            SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
-                            [robot_entry],
-                        )
-                    )
-                    actions_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Debug Predict",
-                            SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
-                            [robot_entry],
-                        )
-                    )
+        elif (
+            compute_action_packages_code_lenses
+            and found_sema4ai_predict_import
+            and decorator.id == "predict"
+        ):
+            assert package_yaml_path is not None, (
+                "Expected package_yaml_path to be defined at this point."
+            )
+            function_name = node.name
+            start_line = decorator.lineno - 1  # AST line numbers are 1-based
+            robot_entry = {
+                "actionName": function_name,
+                "robot": {
+                    "directory": str(package_yaml_path.parent),
+                    "filePath": str(package_yaml_path),
+                },
+                "uri": document.uri,
+            }
+            actions_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Run Predict",
+                    SEMA4AI_ROBOTS_VIEW_ACTION_RUN,
+                    [robot_entry],
+                )
+            )
+            actions_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Debug Predict",
+                    SEMA4AI_ROBOTS_VIEW_ACTION_DEBUG,
+                    [robot_entry],
+                )
+            )
 
-                elif (
-                    compute_robo_tasks_code_lenses
-                    and isinstance(decorator, ast.Name)
-                    and decorator.id == "task"
-                ):
-                    function_name = node.name
-                    start_line = decorator.lineno - 1  # AST line numbers are 1-based
-                    tasks_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Run Task",
-                            "sema4ai.runRobocorpsPythonTask",
-                            [
-                                [
-                                    document.path,
-                                    "-t",
-                                    function_name,
-                                ]
-                            ],
-                        )
-                    )
-                    tasks_code_lenses.append(
-                        _create_code_lens(
-                            start_line,
-                            "Debug Task",
-                            "sema4ai.debugRobocorpsPythonTask",
-                            [
-                                [
-                                    document.path,
-                                    "-t",
-                                    function_name,
-                                ]
-                            ],
-                        )
-                    )
+        elif compute_robo_tasks_code_lenses and decorator.id == "task":
+            function_name = node.name
+            start_line = decorator.lineno - 1  # AST line numbers are 1-based
+            tasks_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Run Task",
+                    "sema4ai.runRobocorpsPythonTask",
+                    [
+                        [
+                            document.path,
+                            "-t",
+                            function_name,
+                        ]
+                    ],
+                )
+            )
+            tasks_code_lenses.append(
+                _create_code_lens(
+                    start_line,
+                    "Debug Task",
+                    "sema4ai.debugRobocorpsPythonTask",
+                    [
+                        [
+                            document.path,
+                            "-t",
+                            function_name,
+                        ]
+                    ],
+                )
+            )
 
     all_lenses = []
     if found_robocorp_tasks_import:
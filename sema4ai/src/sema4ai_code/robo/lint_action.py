@@ -1,4 +1,10 @@
-import json
+import itertools
+import queue
+import threading
+import time
+import typing
+from functools import partial
+from typing import Optional
 
 from sema4ai_ls_core.core_log import get_logger
 from sema4ai_ls_core.ep_resolve_interpreter import (
@@ -6,53 +12,360 @@ from sema4ai_ls_core.ep_resolve_interpreter import (
     IInterpreterInfo,
 )
 from sema4ai_ls_core.pluginmanager import PluginManager
-from sema4ai_ls_core.protocols import IDocument
+from sema4ai_ls_core.protocols import IDocument, IMonitor
 
 from sema4ai_code.robo import lint_in_target_env
 
+if typing.TYPE_CHECKING:
+    import subprocess
+
+    from sema4ai_ls_core.jsonrpc.streams import JsonRpcStreamWriter
+
 log = get_logger(__name__)
 
+# If a worker isn't used for this amount of time it's shut down.
+LINT_WORKER_IDLE_TIMEOUT = 60 * 5
+
+# Maximum number of workers alive at the same time (the least recently used
+# is shut down when a new one is needed).
+LINT_WORKER_MAX_WORKERS = 8
+
+LINT_TIMEOUT = 20
+
+
+def _make_worker_key(python_exe: str, environ: dict[str, str] | None) -> tuple:
+    return (python_exe, tuple(sorted((environ or {}).items())))
+
+
+class _LintWorker:
+    """
+    A python process running `lint_in_target_env.py --server` in the user
+    environment (so that the imports are done only once and each lint just
+    needs to send the contents and wait for the response).
+    """
+
+    def __init__(self, python_exe: str, environ: dict[str, str] | None) -> None:
+        self.python_exe = python_exe
+        self.environ = environ
+        self.last_used = time.time()
+
+        self._process: "subprocess.Popen | None" = None
+        self._writer: "JsonRpcStreamWriter | None" = None
+        self._responses: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._next_id = partial(next, itertools.count())
+        self._lock = threading.Lock()
+        self._disposed = False
+
+    def _start(self) -> None:
+        import os
+        import subprocess
+
+        from sema4ai_ls_core.basic import build_subprocess_kwargs
+        from sema4ai_ls_core.jsonrpc.streams import JsonRpcStreamWriter
+
+        full_env = dict(os.environ)
+        full_env.update(self.environ or {})
+        kwargs: dict = build_subprocess_kwargs(
+            None,
+            full_env,
+            stderr=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+        )
+        cmd = [self.python_exe, lint_in_target_env.__file__, "--server"]
+        log.info(f"Starting lint worker: {' '.join(cmd)}")
+        process = self._process = subprocess.Popen(cmd, **kwargs)
+        self._writer = JsonRpcStreamWriter(process.stdin)
+
+        threading.Thread(
+            target=self._read_stdout,
+            args=(process.stdout, self._responses),
+            name="LintWorker stdout reader",
+            daemon=True,
+        ).start()
+        threading.Thread(
+            target=self._read_stderr,
+            args=(process.stderr,),
+            name="LintWorker stderr reader",
+            daemon=True,
+        ).start()
+
+    @staticmethod
+    def _read_stdout(stream, responses: "queue.Queue[Optional[dict]]") -> None:
+        import json
+
+        from sema4ai_ls_core.jsonrpc.streams import read
+
+        try:
+            while True:
+                data = read(stream)
+                if data is None:
+                    return
+                try:
+                    responses.put(json.loads(data))
+                except Exception:
+                    log.exception(f"Unable to parse as json: {data}")
+        except Exception:
+            log.exception("Error reading lint worker output.")
+        finally:
+            responses.put(None)
+
+    @staticmethod
+    def _read_stderr(stream) -> None:
+        try:
+            for line in iter(stream.readline, b""):
+                log.info(
+                    "Lint worker stderr: %s", line.decode("utf-8", "replace").rstrip()
+                )
+        except Exception:
+            pass
+
+    def is_alive(self) -> bool:
+        process = self._process
+        return process is not None and process.poll() is None
+
+    def lint(
+        self, source: str, timeout: float, monitor: IMonitor | None = None
+    ) -> list | None:
+        """
+        :return: None if it wasn't possible to lint (i.e.: timeout, the
+            worker exited or reported an error).
+
+        :raises JsonRpcRequestCancelled: if the monitor is cancelled while
+            waiting for the response (in which case the worker is killed as
+            it'd still be busy linting the contents which are no longer
+            needed -- it's restarted in the next lint).
+        """
+        from sema4ai_ls_core.jsonrpc.exceptions import JsonRpcRequestCancelled
+
+        with self._lock:
+            if self._disposed:
+                return None
+
+            self.last_used = time.time()
+            if not self.is_alive():
+                self._start()
+
+            request_id = self._next_id()
+            responses = self._responses
+            assert self._writer is not None
+            if not self._writer.write({"id": request_id, "source": source}):
+                self._kill()
+                return None
+
+            timeout_at = time.time() + timeout
+            while True:
+                if monitor is not None:
+                    try:
+                        monitor.check_cancelled()
+                    except JsonRpcRequestCancelled:
+                        log.debug("Lint cancelled (killing lint worker).")
+                        self._kill()
+                        raise
+
+                remaining = timeout_at - time.time()
+                if remaining <= 0:
+                    log.info("Timeout waiting for lint worker (killing it).")
+                    self._kill()
+                    return None
+
+                try:
+                    response = responses.get(timeout=min(remaining, 0.1))
+                except queue.Empty:
+                    continue
+
+                if response is None:
+                    log.info("Lint worker exited unexpectedly.")
+                    self._kill()
+                    return None
+
+                if response.get("id") != request_id:
+                    continue  # Response from a previous (cancelled) request.
+
+                self.last_used = time.time()
+                error = response.get("error")
+                if error:
+                    log.info(f"Error while collecting lint errors: {error}")
+                    return None
+                return response.get("result") or []
+
+    def _kill(self) -> None:
+        from sema4ai_ls_core.process import kill_process_and_subprocesses
+
+        process = self._process
+        self._process = None
+        writer = self._writer
+        self._writer = None
+        # New queue: anything from the previous process must be discarded.
+        self._responses = queue.Queue()
+
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+        if process is not None and process.poll() is None:
+            kill_process_and_subprocesses(process.pid)
 
-def collect_lint_errors(pm: PluginManager, doc: IDocument) -> list:
+    def shutdown(self) -> None:
+        # Note: no lock here: if some lint is waiting for a response it'll
+        # be notified that the process exited.
+        self._disposed = True
+        self._kill()
+
+
+class _LintWorkers:
+    """
+    Keeps the lint workers alive keyed by the python executable and environ
+    (a new worker is started if the environment for an interpreter changes).
     """
-    Note: the way this works is that we'll launch a separate script
-    using the user environment to collect the linting information.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key_to_worker: dict[tuple, _LintWorker] = {}
+        self._interpreter_id_to_key: dict[str, tuple] = {}
+        self._idle_check_scheduled = False
+
+    def get_worker(self, interpreter_info: IInterpreterInfo) -> _LintWorker:
+        python_exe = interpreter_info.get_python_exe()
+        environ = interpreter_info.get_environ()
+        key = _make_worker_key(python_exe, environ)
+
+        to_shutdown = []
+        with self._lock:
+            interpreter_id = interpreter_info.get_interpreter_id()
+            old_key = self._interpreter_id_to_key.get(interpreter_id)
+            self._interpreter_id_to_key[interpreter_id] = key
+            if old_key is not None and old_key != key:
+                # The environment for this interpreter changed: if no one
+                # else is using the previous worker it can be stopped.
+                if old_key not in self._interpreter_id_to_key.values():
+                    old_worker = self._key_to_worker.pop(old_key, None)
+                    if old_worker is not None:
+                        to_shutdown.append(old_worker)
+
+            worker = self._key_to_worker.get(key)
+            if worker is None:
+                worker = self._key_to_worker[key] = _LintWorker(python_exe, environ)
+
+                while len(self._key_to_worker) > LINT_WORKER_MAX_WORKERS:
+                    lru_key, lru_worker = min(
+                        self._key_to_worker.items(), key=lambda item: item[1].last_used
+                    )
+                    del self._key_to_worker[lru_key]
+                    to_shutdown.append(lru_worker)
+
+            worker.last_used = time.time()
+            self._schedule_idle_check()
+
+        for w in to_shutdown:
+            w.shutdown()
+        return worker
+
+    def _schedule_idle_check(self) -> None:
+        # Requires lock.
+        from sema4ai_ls_core.timeouts import TimeoutTracker
+
+        if self._idle_check_scheduled:
+            return
+        self._idle_check_scheduled = True
+        TimeoutTracker.get_singleton().call_on_timeout(
+            LINT_WORKER_IDLE_TIMEOUT, self._on_idle_check
+        )
+
+    def _on_idle_check(self) -> None:
+        to_shutdown = []
+        with self._lock:
+            self._idle_check_scheduled = False
+            curtime = time.time()
+            for key, worker in list(self._key_to_worker.items()):
+                if curtime - worker.last_used >= LINT_WORKER_IDLE_TIMEOUT:
+                    del self._key_to_worker[key]
+                    to_shutdown.append(worker)
+
+            if self._key_to_worker:
+                self._schedule_idle_check()
+
+        for worker in to_shutdown:
+            log.debug("Shutting down idle lint worker for: %s", worker.python_exe)
+            worker.shutdown()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers = list(self._key_to_worker.values())
+            self._key_to_worker.clear()
+            self._interpreter_id_to_key.clear()
+
+        for worker in workers:
+            worker.shutdown()
+
+
+_lint_workers = _LintWorkers()
+
+
+def shutdown_lint_workers() -> None:
+    _lint_workers.shutdown()
+
+
+def get_interpreter_info(pm: PluginManager, doc_uri: str) -> IInterpreterInfo | None:
+    for ep in pm.get_implementations(EPResolveInterpreter):
+        interpreter_info: IInterpreterInfo | None = ep.get_interpreter_info_for_doc_uri(
+            doc_uri
+        )
+        if interpreter_info is not None:
+            return interpreter_info
+    return None
+
+
+def make_environment_fingerprint(interpreter_info: IInterpreterInfo) -> tuple:
+    """
+    Provides a fingerprint of the environment used to lint (if the environment
+    is recreated the python executable mtime changes).
+    """
+    import os
+
+    python_exe = interpreter_info.get_python_exe()
+    try:
+        python_exe_mtime = os.stat(python_exe).st_mtime
+    except OSError:
+        python_exe_mtime = -1
+    return _make_worker_key(python_exe, interpreter_info.get_environ()) + (
+        python_exe_mtime,
+    )
+
+
+def collect_lint_errors(
+    pm: PluginManager,
+    doc: IDocument,
+    monitor: IMonitor | None = None,
+    interpreter_info: IInterpreterInfo | None = None,
+) -> list | None:
+    """
+    Note: the way this works is that we'll use a separate process
+    using the user environment to collect the linting information
+    (that process is kept alive and reused for the same environment).
 
     The major reason this is done (vs just doing the linting in the
     current environment is that if we used the current environment,
     if the user uses a new version of python we could potentially
     have a syntax error (because for linting we need the python ast).
+
+    :param interpreter_info: The interpreter to use (if not given it's
+        resolved for the document).
+
+    :return: None if it wasn't possible to lint.
     """
-    from sema4ai_ls_core.basic import launch_and_return_future
+    from sema4ai_ls_core.jsonrpc.exceptions import JsonRpcRequestCancelled
 
     try:
-        for ep in pm.get_implementations(EPResolveInterpreter):
-            interpreter_info: IInterpreterInfo = ep.get_interpreter_info_for_doc_uri(
-                doc.uri
-            )
-            if interpreter_info is not None:
-                environ = interpreter_info.get_environ()
-                python_exe = interpreter_info.get_python_exe()
-                future = launch_and_return_future(
-                    [python_exe, lint_in_target_env.__file__],
-                    environ=environ,
-                    cwd=None,
-                    timeout=20,
-                    stdin=doc.source.encode("utf-8", "replace"),
-                )
-                result = future.result(20)
-                if result.returncode == 0:
-                    if result.stdout:
-                        try:
-                            return json.loads(result.stdout)
-                        except Exception:
-                            log.exception(f"Unable to parse as json: {result.stdout}")
-
-                if result.stderr:
-                    log.info(
-                        f"Found stderr while collecting lint errors: {result.stderr}"
-                    )
-                break
+        if interpreter_info is None:
+            interpreter_info = get_interpreter_info(pm, doc.uri)
+        if interpreter_info is not None:
+            worker = _lint_workers.get_worker(interpreter_info)
+            return worker.lint(doc.source, LINT_TIMEOUT, monitor)
+    except JsonRpcRequestCancelled:
+        raise
     except BaseException:
         log.exception("Error collection @action")
-    return []
+    return None
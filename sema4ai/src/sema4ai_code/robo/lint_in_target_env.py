@@ -1,10 +1,27 @@
+"""
+Lints `@action` contents in the target environment.
+
+It may be used as a one-shot script (the contents to lint are read from stdin
+and the json with the errors is printed to stdout) or, when `--server` is
+passed, as a long-lived worker which keeps the imports warm and receives
+requests framed as `Content-Length: <len>\\r\\n\\r\\n<json>` in stdin
+(replying in the same format in stdout).
+
+Note: this module is executed with the user python, so, it must not import
+anything from `sema4ai_code` nor `sema4ai_ls_core`.
+"""
+
 import json
 import sys
-from typing import Any
+from typing import Any, Callable, Optional
 
 
-def main() -> None:
-    contents_to_lint: bytes = sys.stdin.buffer.read()
+def _load_linter() -> Optional[Callable[[bytes], list]]:
+    """
+    Provides a function which receives the contents to lint and returns a list
+    with the lsp diagnostics (or None if the linter is not available in the
+    target environment).
+    """
     try:
         from sema4ai import actions  # noqa #type: ignore
 
@@ -53,7 +70,7 @@ def main() -> None:
 
             requires_pm = version_info[:2] >= [0, 2]
         except BaseException:
-            return
+            return None
 
         pm = None
         if requires_pm:
@@ -75,23 +92,103 @@ def main() -> None:
                 pass
             # fmt: on
 
-    if requires_pm:
-        try:
+    def lint(contents_to_lint: bytes) -> list:
+        if requires_pm:
             errors = list(_lint_action.iter_lint_errors(contents_to_lint, pm=pm))
-        except BaseException:
-            return
-    else:
-        try:
+        else:
             errors = list(_lint_action.iter_lint_errors(contents_to_lint))
-        except BaseException:
+
+        lst = []
+        for error in errors:
+            lsp_err = error.to_lsp_diagnostic()
+            lsp_err["range"]["start"]["line"] -= 1
+            lsp_err["range"]["end"]["line"] -= 1
+            lst.append(lsp_err)
+        return lst
+
+    return lint
+
+
+def _read_message(stream) -> Optional[dict]:
+    headers = {}
+    while True:
+        line = stream.readline()
+        if not line:  # EOF
+            return None
+        line = line.strip().decode("ascii")
+        if not line:
+            break
+        name, value = line.split(":", 1)
+        headers[name.strip()] = value.strip()
+
+    content_length = int(headers["Content-Length"])
+    body = b""
+    while len(body) < content_length:
+        data = stream.read(content_length - len(body))
+        if not data:  # EOF
+            return None
+        body += data
+    return json.loads(body.decode("utf-8"))
+
+
+def _write_message(stream, msg: dict) -> None:
+    as_bytes = json.dumps(msg).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n%s" % (len(as_bytes), as_bytes))
+    stream.flush()
+
+
+def serve() -> None:
+    """
+    Keeps on linting the contents received in stdin until stdin is closed.
+
+    Each request is a dict with `id` and `source` and each response is a dict
+    with the same `id` and either `result` (list with the lsp diagnostics) or
+    `error` (a message with the error).
+    """
+    read_stream = sys.stdin.buffer
+    write_stream = sys.stdout.buffer
+
+    # Anything printed by the linted code or the imports must not interfere
+    # with the protocol.
+    sys.stdout = sys.stderr
+
+    try:
+        lint = _load_linter()
+    except BaseException as e:
+        lint = None
+        sys.stderr.write(f"Error loading linter: {e}\n")
+
+    while True:
+        msg = _read_message(read_stream)
+        if msg is None:
             return
 
-    lst = []
-    for error in errors:
-        lsp_err = error.to_lsp_diagnostic()
-        lsp_err["range"]["start"]["line"] -= 1
-        lsp_err["range"]["end"]["line"] -= 1
-        lst.append(lsp_err)
+        response: dict = {"id": msg.get("id")}
+        if lint is None:
+            response["result"] = []
+        else:
+            try:
+                source = msg.get("source", "")
+                response["result"] = lint(source.encode("utf-8", "replace"))
+            except BaseException as e:
+                response["error"] = str(e)
+        _write_message(write_stream, response)
+
+
+def main() -> None:
+    if "--server" in sys.argv[1:]:
+        serve()
+        return
+
+    contents_to_lint: bytes = sys.stdin.buffer.read()
+    lint = _load_linter()
+    if lint is None:
+        return
+
+    try:
+        lst = lint(contents_to_lint)
+    except BaseException:
+        return
 
     print(json.dumps(lst))
 
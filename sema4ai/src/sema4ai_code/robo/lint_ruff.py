@@ -1,10 +1,13 @@
+import functools
 import json
+import os
 import sys
+import threading
 from typing import Any, Dict, List
 
 from sema4ai_ls_core.core_log import get_logger
 from sema4ai_ls_core.options import DEFAULT_TIMEOUT, USE_TIMEOUTS
-from sema4ai_ls_core.protocols import IDocument
+from sema4ai_ls_core.protocols import IDocument, IMonitor
 
 log = get_logger(__name__)
 
@@ -27,14 +30,310 @@ SELECTED_RUFF_ERRORS = (
 )
 
 
-def collect_ruff_errors(doc: IDocument) -> List[Dict[str, Any]]:
+# Cache of the diagnostics computed for a given content (see: _make_cache_key).
+_RUFF_CACHE_MAX_SIZE = 500
+
+
+@functools.lru_cache
+def _get_ruff_cmd() -> tuple[str, ...]:
+    """
+    Provides the command to launch ruff (it's preferred to launch the ruff
+    executable directly instead of `python -m ruff` to avoid the python startup).
+    """
+    try:
+        from ruff.__main__ import find_ruff_bin  # type: ignore
+
+        return (os.fsdecode(find_ruff_bin()),)
+    except Exception:
+        log.info("Unable to find ruff executable (using `python -m ruff`).")
+        return (sys.executable, "-m", "ruff")
+
+
+def _make_cache_key(filename: str, source: str) -> str:
+    import hashlib
+
+    h = hashlib.sha256(filename.encode("utf-8", "replace"))
+    h.update(b"\0")
+    h.update(source.encode("utf-8", "replace"))
+    return h.hexdigest()
+
+
+def _ruff_diagnostic_to_lsp(diagnostic: dict) -> Dict[str, Any]:
+    code = diagnostic.get("code")
+    severity = 1 if code is None else _get_severity(code)  # No code means SyntaxError
+
+    return {
+        "range": {
+            "start": {
+                "line": diagnostic["location"]["row"] - 1,  # Convert to 0-based
+                "character": diagnostic["location"]["column"] - 1,
+            },
+            "end": {
+                "line": diagnostic["end_location"]["row"] - 1,
+                "character": diagnostic["end_location"]["column"] - 1,
+            },
+        },
+        "severity": severity,
+        "source": "sema4ai-lint",
+        "message": diagnostic["message"],
+        "code": code or "SyntaxError",
+    }
+
+
+class _PendingRuffCheck:
+    def __init__(self, filename: str, source: str, cache_key: str) -> None:
+        self.filename = filename
+        self.source = source
+        self.cache_key = cache_key
+        self.event = threading.Event()
+        # None if ruff failed.
+        self.result: List[Dict[str, Any]] | None = None
+        # Set when the lint which requested it is cancelled.
+        self.cancelled = False
+
+
+class _RuffRunner:
+    """
+    Runs ruff for the documents requested.
+
+    The results are cached by the content (so, a document which wasn't changed
+    isn't linted again) and requests which arrive while ruff is running are
+    batched in a single ruff invocation afterwards.
+
+    If all the lints waiting for a ruff process are cancelled, that process
+    is killed.
+    """
+
+    def __init__(self) -> None:
+        from sema4ai_ls_core.cache import LRUCache
+
+        self._lock = threading.Lock()
+        self._cache: LRUCache[str, List[Dict[str, Any]]] = LRUCache(
+            _RUFF_CACHE_MAX_SIZE
+        )
+        self._pending: list[_PendingRuffCheck] = []
+        self._running = False
+        # The checks being done by the current ruff process (and its pid).
+        self._running_batch: list[_PendingRuffCheck] = []
+        self._running_pid: int | None = None
+
+    def check(
+        self, filename: str, source: str, monitor: IMonitor | None = None
+    ) -> List[Dict[str, Any]] | None:
+        """
+        :return: None if ruff failed (i.e.: timeout or error running it).
+
+        :raises JsonRpcRequestCancelled: if the monitor is cancelled while
+            waiting for ruff.
+        """
+        cache_key = _make_cache_key(filename, source)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
+
+            pending = _PendingRuffCheck(filename, source, cache_key)
+            self._pending.append(pending)
+            if not self._running:
+                self._running = True
+                threading.Thread(
+                    target=self._run_pending, name="Ruff runner", daemon=True
+                ).start()
+
+        if monitor is not None:
+            monitor.add_listener(functools.partial(self._on_cancel, pending))
+
+        timeout = (DEFAULT_TIMEOUT * 2) if USE_TIMEOUTS else None
+        if not pending.event.wait(timeout):
+            log.info(f"Timed out waiting for ruff results for: {filename}")
+            return None
+
+        if monitor is not None:
+            monitor.check_cancelled()
+
+        result = pending.result
+        if result is None:
+            return None
+        return list(result)
+
+    def _on_cancel(self, pending: _PendingRuffCheck) -> None:
+        from sema4ai_ls_core.process import (
+            is_process_alive,
+            kill_process_and_subprocesses,
+        )
+
+        pid = None
+        with self._lock:
+            pending.cancelled = True
+            if pending in self._pending:
+                # Not started: no need to check it anymore.
+                self._pending.remove(pending)
+
+            elif pending in self._running_batch and all(
+                p.cancelled for p in self._running_batch
+            ):
+                pid = self._running_pid
+
+        pending.event.set()
+        if pid is not None and is_process_alive(pid):
+            log.debug("Killing ruff (all the lints waiting for it were cancelled).")
+            kill_process_and_subprocesses(pid)
+
+    def _run_pending(self) -> None:
+        while True:
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+                self._running_batch = batch
+                if not batch:
+                    self._running = False
+                    return
+
+            key_to_checks: dict[str, list[_PendingRuffCheck]] = {}
+            for pending in batch:
+                key_to_checks.setdefault(pending.cache_key, []).append(pending)
+
+            key_to_result: dict[str, List[Dict[str, Any]]] = {}
+            try:
+                to_check = [checks[0] for checks in key_to_checks.values()]
+                key_to_result = self._run_ruff(to_check)
+            except Exception as e:
+                if not all(p.cancelled for p in batch):
+                    log.error(f"Error running ruff: {str(e)}")
+
+            with self._lock:
+                self._running_batch = []
+                for cache_key, result in key_to_result.items():
+                    self._cache[cache_key] = result
+
+            for cache_key, checks in key_to_checks.items():
+                # Not found means that ruff failed.
+                found = key_to_result.get(cache_key)
+                for pending in checks:
+                    pending.result = found
+                    pending.event.set()
+
+    def _run_process(
+        self, cmd: list[str], input: bytes | None, timeout: float | None
+    ) -> tuple[int, bytes]:
+        """
+        :return: the return code and the stdout of the process.
+        """
+        import subprocess
+
+        with subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ) as process:
+            with self._lock:
+                self._running_pid = process.pid
+                # Cancelled before the pid was available.
+                running_batch = self._running_batch
+                all_cancelled = all(p.cancelled for p in running_batch)
+            if running_batch and all_cancelled:
+                process.kill()
+            try:
+                stdout, _stderr = process.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                with self._lock:
+                    self._running_pid = None
+        return process.returncode, stdout
+
+    def _run_ruff(
+        self, to_check: list[_PendingRuffCheck]
+    ) -> dict[str, List[Dict[str, Any]]]:
+        """
+        :return: a dict with the cache key to the lsp diagnostics.
+        """
+        import tempfile
+
+        cmd = list(_get_ruff_cmd()) + [
+            "check",
+            # The results are cached based just on the contents, so, don't
+            # let the configuration from the current dir change the results.
+            "--isolated",
+            "--no-cache",
+            "--select",
+            SELECTED_RUFF_ERRORS,
+            "--output-format=json",
+        ]
+        timeout = (DEFAULT_TIMEOUT * 2) if USE_TIMEOUTS else None
+
+        if len(to_check) == 1:
+            pending = to_check[0]
+            returncode, stdout = self._run_process(
+                cmd + [f"--stdin-filename={pending.filename}"],
+                pending.source.encode("utf-8", "replace"),
+                timeout,
+            )
+            if returncode == 0:
+                return {pending.cache_key: []}
+
+            return {
+                pending.cache_key: [
+                    _ruff_diagnostic_to_lsp(diagnostic)
+                    for diagnostic in json.loads(stdout)
+                ]
+            }
+
+        # Many requests: write the contents to a temporary dir and run ruff
+        # just once for all of those.
+        with tempfile.TemporaryDirectory(prefix="sema4ai_ruff_") as tmpdir:
+            path_to_key: dict[str, str] = {}
+            for i, pending in enumerate(to_check):
+                dirname = os.path.join(tmpdir, str(i))
+                os.mkdir(dirname)
+                path = os.path.join(dirname, pending.filename)
+                with open(path, "wb") as stream:
+                    stream.write(pending.source.encode("utf-8", "replace"))
+                path_to_key[os.path.normcase(os.path.realpath(path))] = (
+                    pending.cache_key
+                )
+
+            returncode, stdout = self._run_process(
+                cmd + list(path_to_key.keys()), None, timeout
+            )
+
+            key_to_result: dict[str, List[Dict[str, Any]]] = {
+                cache_key: [] for cache_key in path_to_key.values()
+            }
+            if returncode == 0:
+                return key_to_result
+
+            for diagnostic in json.loads(stdout):
+                filename = diagnostic.get("filename") or ""
+                cache_key = path_to_key.get(
+                    os.path.normcase(os.path.realpath(filename))
+                )
+                if cache_key is not None:
+                    key_to_result[cache_key].append(_ruff_diagnostic_to_lsp(diagnostic))
+            return key_to_result
+
+
+_ruff_runner = _RuffRunner()
+
+
+def collect_ruff_errors(
+    doc: IDocument, monitor: IMonitor | None = None
+) -> List[Dict[str, Any]] | None:
     """
     Run ruff linter on the given source code and return the results in a format
     compatible with LSP diagnostics.
+
+    :return: None if it wasn't possible to run ruff.
+
+    :raises JsonRpcRequestCancelled: if the monitor is cancelled while
+        waiting for ruff.
     """
+    from sema4ai_ls_core.jsonrpc.exceptions import JsonRpcRequestCancelled
 
     try:
-        import subprocess
         from pathlib import Path
 
         from sema4ai_ls_core import uris
@@ -43,58 +342,14 @@ def collect_ruff_errors(doc: IDocument) -> List[Dict[str, Any]]:
         fs_path = uris.to_fs_path(doc.uri)
         filename = Path(fs_path).name
 
-        # Run ruff check with JSON output using stdin
-        result = subprocess.run(
-            [
-                sys.executable,
-                "-m",
-                "ruff",
-                "check",
-                "--select",
-                SELECTED_RUFF_ERRORS,
-                "--output-format=json",
-                f"--stdin-filename={filename}",
-            ],
-            input=doc.source,
-            capture_output=True,
-            text=True,
-            timeout=DEFAULT_TIMEOUT if USE_TIMEOUTS else None,
-        )
+        return _ruff_runner.check(filename, doc.source, monitor)
 
-        if result.returncode == 0:
-            return []
-
-        # Parse the JSON output
-        diagnostics = []
-        for diagnostic in json.loads(result.stdout):
-            code = diagnostic.get("code")
-            severity = (
-                1 if code is None else _get_severity(code)
-            )  # No code means SyntaxError
-
-            lsp_diagnostic = {
-                "range": {
-                    "start": {
-                        "line": diagnostic["location"]["row"] - 1,  # Convert to 0-based
-                        "character": diagnostic["location"]["column"] - 1,
-                    },
-                    "end": {
-                        "line": diagnostic["end_location"]["row"] - 1,
-                        "character": diagnostic["end_location"]["column"] - 1,
-                    },
-                },
-                "severity": severity,
-                "source": "sema4ai-lint",
-                "message": diagnostic["message"],
-                "code": code or "SyntaxError",
-            }
-            diagnostics.append(lsp_diagnostic)
-
-        return diagnostics
+    except JsonRpcRequestCancelled:
+        raise
 
     except Exception as e:
         log.error(f"Error running ruff: {str(e)}")
-        return []
+        return None
 
 
 def check_folder_for_ruff_errors(folder_path: str) -> list[dict] | None:
@@ -108,10 +363,8 @@ def check_folder_for_ruff_errors(folder_path: str) -> list[dict] | None:
 
         # Run ruff check on the folder (it will automatically handle all Python files inside)
         result = subprocess.run(
-            [
-                sys.executable,
-                "-m",
-                "ruff",
+            list(_get_ruff_cmd())
+            + [
                 "check",
                 "--select",
                 SELECTED_RUFF_ERRORS,
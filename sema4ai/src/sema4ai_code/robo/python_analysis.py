@@ -0,0 +1,164 @@
+"""
+Provides the analysis of a python file (the ast and the facts gotten from it)
+which is shared by the code lenses, the listing of actions/datasources and the
+linting, so that a given version of a file is only parsed/analyzed once.
+
+For documents the analysis is kept in the document (and is discarded when the
+document changes) and for files it's cached by (path, mtime, size).
+"""
+
+import ast as ast_module
+import threading
+import typing
+from functools import cached_property
+from pathlib import Path
+from typing import NamedTuple
+
+from sema4ai_ls_core.cache import LRUCache
+from sema4ai_ls_core.core_log import get_logger
+from sema4ai_ls_core.protocols import IDocument
+
+if typing.TYPE_CHECKING:
+    from sema4ai_code.robo.collect_actions_ast import _ActionInfo, _DatasourceInfo
+
+log = get_logger(__name__)
+
+_ANALYSIS_CUSTOM_DATA_KEY = "python_analysis"
+_MAX_CACHED_FILE_ANALYSIS = 500
+
+
+class DecoratedFunction(NamedTuple):
+    node: ast_module.FunctionDef
+    decorator: ast_module.Name
+
+
+class PythonAnalysis:
+    """
+    Note: the facts are computed on demand and then cached.
+    """
+
+    def __init__(self, contents: str | bytes) -> None:
+        self.ast: ast_module.Module | None = None
+        self.parse_error: Exception | None = None
+        try:
+            self.ast = ast_module.parse(contents, "<string>")
+        except Exception as e:
+            self.parse_error = e
+
+    @cached_property
+    def _walked_nodes(self) -> tuple[ast_module.AST, ...]:
+        if self.ast is None:
+            return ()
+        return tuple(ast_module.walk(self.ast))
+
+    @cached_property
+    def imports(self) -> frozenset[tuple[str, str]]:
+        """
+        The `(module, name)` for each `from <module> import <name>` in the file.
+        """
+        ret = set()
+        for node in self._walked_nodes:
+            if isinstance(node, ast_module.ImportFrom) and node.module:
+                for alias in node.names:
+                    ret.add((node.module, alias.name))
+        return frozenset(ret)
+
+    @cached_property
+    def decorated_functions(self) -> tuple[DecoratedFunction, ...]:
+        """
+        The functions (in any scope) decorated with a name (i.e.: `@task`) in
+        the order provided by `ast.walk`.
+        """
+        ret = []
+        for node in self._walked_nodes:
+            if isinstance(node, ast_module.FunctionDef):
+                for decorator in node.decorator_list:
+                    if isinstance(decorator, ast_module.Name):
+                        ret.append(DecoratedFunction(node, decorator))
+        return tuple(ret)
+
+    @cached_property
+    def uses_action_decorator(self) -> bool:
+        """
+        Whether some function is decorated with `@action` (or `@xxx.action`).
+        """
+        for node in self._walked_nodes:
+            if isinstance(node, (ast_module.FunctionDef, ast_module.AsyncFunctionDef)):
+                for decorator in node.decorator_list:
+                    if isinstance(decorator, ast_module.Call):
+                        decorator = decorator.func
+                    if (
+                        isinstance(decorator, ast_module.Name)
+                        and decorator.id == "action"
+                    ) or (
+                        isinstance(decorator, ast_module.Attribute)
+                        and decorator.attr == "action"
+                    ):
+                        return True
+        return False
+
+    @cached_property
+    def actions(self) -> tuple["_ActionInfo", ...]:
+        """
+        The top-level functions decorated with `@action`, `@query` or `@predict`.
+        """
+        from sema4ai_code.robo.collect_actions_ast import _collect_actions_from_ast
+
+        if self.ast is None:
+            return ()
+        return tuple(_collect_actions_from_ast(self.ast))
+
+    @cached_property
+    def datasources(self) -> tuple["_DatasourceInfo", ...]:
+        """
+        The datasources (`Annotated[DataSource, DataSourceSpec(...)]`) declared
+        at the top-level.
+        """
+        from sema4ai_code.robo.collect_actions_ast import (
+            _collect_datasources,
+            _collect_variables,
+        )
+
+        if self.ast is None:
+            return ()
+        return tuple(_collect_datasources(self.ast, _collect_variables(self.ast)))
+
+
+def get_document_analysis(doc: IDocument) -> PythonAnalysis:
+    """
+    Provides the analysis for the current version of the document.
+    """
+    source = doc.source
+    cached = doc.get_custom_data(_ANALYSIS_CUSTOM_DATA_KEY)
+    if cached is not None and cached[0] is source:
+        return cached[1]
+
+    analysis = PythonAnalysis(source)
+    doc.set_custom_data(_ANALYSIS_CUSTOM_DATA_KEY, (source, analysis))
+    return analysis
+
+
+# path -> ((mtime_ns, size), analysis)
+_file_analysis_cache: LRUCache[Path, tuple[tuple[int, int], PythonAnalysis]] = LRUCache(
+    _MAX_CACHED_FILE_ANALYSIS
+)
+_file_analysis_cache_lock = threading.Lock()
+
+
+def get_file_analysis(path: Path) -> PythonAnalysis:
+    """
+    Provides the analysis for the contents of the file in the filesystem.
+
+    :raises OSError: if the file can't be read.
+    """
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _file_analysis_cache_lock:
+        cached = _file_analysis_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    analysis = PythonAnalysis(path.read_bytes())
+    with _file_analysis_cache_lock:
+        _file_analysis_cache[path] = (key, analysis)
+    return analysis
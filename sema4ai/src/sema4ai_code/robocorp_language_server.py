@@ -232,6 +232,20 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
 
         weak_self = weakref.ref(self)  # Avoid cyclic ref.
 
+        def on_actions_changed(action_package_dir: Path) -> None:
+            s = weak_self()
+            if s is not None:
+                # Let the client know so that it can list the actions again.
+                s._endpoint.notify(
+                    "$/actionsChanged",
+                    {"action_package": uris.from_fs_path(str(action_package_dir))},
+                )
+
+        from sema4ai_code.robo import actions_index
+
+        self._on_actions_changed = on_actions_changed
+        actions_index.on_actions_changed.register(on_actions_changed)
+
         def clear_caches_on_login_change():
             s = weak_self()
             if s is not None:
@@ -273,11 +287,18 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
             EPEndPointProvider, DefaultEndPointProvider(self._endpoint)
         )
         from sema4ai_code.resolve_interpreter import register_plugins
+        from sema4ai_code.robo.actions_metadata_cache import ActionsMetadataCache
 
         self._prefix_to_last_run_number_and_time: dict[str, tuple[int, float]] = {}
 
-        self._pypi_cloud = PyPiCloud(weakref.WeakMethod(self._get_pypi_base_urls))  # type: ignore
+        self._pypi_cloud = PyPiCloud(
+            weakref.WeakMethod(self._get_pypi_base_urls),  # type: ignore
+            cache_dir=Path(cache_dir) / "pypi",
+        )
         self._cache_dir = cache_dir
+        self._actions_metadata_cache = ActionsMetadataCache(
+            cache_dir=os.path.join(cache_dir, "actions_metadata")
+        )
         self._paths_remover = None
         self.__conda_cloud: ICondaCloud | None = None
         self._paths_remover_queue: "Queue[Path]" = Queue()
@@ -368,6 +389,11 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
         return ret
 
     def m_shutdown(self, **_kwargs):
+        from sema4ai_code.robo import actions_index
+        from sema4ai_code.robo.lint_action import shutdown_lint_workers
+
+        actions_index.on_actions_changed.unregister(self._on_actions_changed)
+        shutdown_lint_workers()
         PythonLanguageServer.m_shutdown(self, **_kwargs)
 
     @overrides(PythonLanguageServer._obtain_fs_observer)
@@ -376,6 +402,19 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
             self._fs_observer = watchdog_wrapper.create_observer("dummy", ())
         return self._fs_observer
 
+    @overrides(PythonLanguageServer._create_workspace)
+    def _create_workspace(
+        self, root_uri: str, fs_observer: IFSObserver, workspace_folders
+    ) -> IWorkspace:
+        from sema4ai_ls_core.workspace import Workspace
+
+        return Workspace(
+            root_uri,
+            fs_observer,
+            workspace_folders,
+            snapshot_dir=os.path.join(self._cache_dir, "workspace_snapshots"),
+        )
+
     def _create_lint_manager(self) -> BaseLintManager | None:
         from sema4ai_code._lint import LintManager
 
@@ -385,8 +424,29 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
             self._lsp_messages,
             self._endpoint,
             self._jsonrpc_stream_reader.get_read_queue(),
+            diagnostics_cache_dir=os.path.join(self._cache_dir, "lint_diagnostics"),
+            max_manual_lint_workers=self._get_manual_lint_concurrency(),
         )
 
+    def _get_manual_lint_concurrency(self) -> int | None:
+        from sema4ai_code.settings import SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY
+
+        concurrency = self.config.get_setting(
+            SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY, int, 0
+        )
+        if concurrency <= 0:
+            return None  # Use the default.
+        return concurrency
+
+    @overrides(PythonLanguageServer.m_workspace__did_change_configuration)
+    def m_workspace__did_change_configuration(self, settings=None) -> None:
+        PythonLanguageServer.m_workspace__did_change_configuration(self, settings)
+        lint_manager = self._lint_manager
+        if lint_manager is not None:
+            lint_manager.set_manual_lint_concurrency(
+                self._get_manual_lint_concurrency()
+            )
+
     @overrides(PythonLanguageServer._create_config)
     def _create_config(self) -> IConfig:
         from sema4ai_code.robocorp_config import RobocorpConfig
@@ -957,7 +1017,11 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
                 )
 
             result = collect_actions_full_and_slow(
-                self._pm, action_package_uri, action_package_yaml_directory, monitor
+                self._pm,
+                action_package_uri,
+                action_package_yaml_directory,
+                monitor,
+                metadata_cache=self._actions_metadata_cache,
             )
             if not result.success:
                 return result.as_dict()
@@ -998,11 +1062,10 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
     def _local_list_actions_internal_impl(
         self, action_package_uri: str, collect_datasources: bool
     ) -> "ActionResultDict[list[ActionInfoTypedDict | DatasourceInfoTypedDict]]":
-        from sema4ai_code.robo.collect_actions_ast import iter_actions_and_datasources
+        from sema4ai_code.robo.actions_index import get_actions_index
 
-        # TODO: We should move this code somewhere else and have a cache of
-        # things so that when the user changes anything the client is notified
-        # about it.
+        # Note: the index is kept updated and the client is notified through
+        # `$/actionsChanged` when the actions/datasources change.
         p = Path(uris.to_fs_path(action_package_uri))
         if not p.exists():
             msg = f"Unable to collect actions/datasources from: {p} because it does not exist."
@@ -1012,8 +1075,8 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
             p = p.parent
 
         try:
-            actions_and_datasources = list(
-                iter_actions_and_datasources(p, collect_datasources)
+            actions_and_datasources = get_actions_index(p).list_actions_and_datasources(
+                collect_datasources
             )
         except Exception as e:
             log.exception("Error collecting actions/datasources.")
@@ -1283,7 +1346,12 @@ class RobocorpLanguageServer(PythonLanguageServer, InspectorLanguageServer):
                     success=False, message="No workspace currently open", result=None
                 )
 
-            result = get_metadata(self._pm, action_package_path, monitor)
+            result = get_metadata(
+                self._pm,
+                action_package_path,
+                monitor,
+                metadata_cache=self._actions_metadata_cache,
+            )
         except Exception as e:
             log.exception("Error collecting actions metadata.")
             return dict(
@@ -16,6 +16,7 @@ SEMA4AI_VAULT_TOKEN_TIMEOUT_IN_MINUTES = "sema4ai.vaultTokenTimeoutInMinutes"
 SEMA4AI_CODE_LENS_ROBO_LAUNCH = "sema4ai.codeLens.roboLaunch"
 SEMA4AI_CODE_LENS_ACTIONS_LAUNCH = "sema4ai.codeLens.actionsLaunch"
 SEMA4AI_CODE_LENS_DEV_TASK = "sema4ai.codeLens.devTask"
+SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY = "sema4ai.lint.manualLintConcurrency"
 
 ALL_SEMA4AI_OPTIONS = frozenset(
     (
@@ -34,6 +35,7 @@ ALL_SEMA4AI_OPTIONS = frozenset(
         SEMA4AI_CODE_LENS_ROBO_LAUNCH,
         SEMA4AI_CODE_LENS_ACTIONS_LAUNCH,
         SEMA4AI_CODE_LENS_DEV_TASK,
+        SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY,
     )
 )
 
@@ -2,7 +2,7 @@
 import datetime
 import sys
 import typing
-from collections.abc import Iterator, Sequence
+from collections.abc import Iterable, Iterator, Sequence
 from contextlib import contextmanager
 from dataclasses import dataclass
 
@@ -93,6 +93,12 @@ class IPyPiCloud(Protocol):
     def get_package_data(self, package_name: str) -> IPackageData | None:
         pass
 
+    def prefetch(self, package_names: Iterable[str], max_workers: int = 8) -> None:
+        """
+        Loads the information on the given packages concurrently (so that
+        subsequent calls for those packages are answered from the cache).
+        """
+
     def get_versions_newer_than(
         self, package_name: str, version: Versions | VersionStr
     ) -> list[VersionStr]:
@@ -146,6 +152,26 @@ class ISqliteQueries(Protocol):
     ) -> set[str]:
         pass
 
+    def query_versions_many(
+        self, package_names: Iterable[str], db_cursors: Sequence[Cursor] | None = None
+    ) -> dict[str, set[str]]:
+        pass
+
+    def query_sorted_versions_many(
+        self, package_names: Iterable[str], db_cursors: Sequence[Cursor] | None = None
+    ) -> dict[str, list[str]]:
+        pass
+
+    def query_sorted_versions(
+        self, package_name: str, db_cursors: Sequence[Cursor] | None = None
+    ) -> list[str]:
+        pass
+
+    def query_latest_versions_many(
+        self, package_names: Iterable[str], db_cursors: Sequence[Cursor] | None = None
+    ) -> dict[str, str]:
+        pass
+
     def query_version_info(
         self,
         package_name: str,
@@ -167,6 +193,9 @@ class ICondaCloud(Protocol):
     def sqlite_queries(self) -> ISqliteQueries | None:
         pass
 
+    def load_latest_index_info(self) -> LatestIndexInfoTypedDict | None:
+        pass
+
     def schedule_update(
         self, on_finished: IOnFinished | None = None, wait=False, force=False
     ) -> None:
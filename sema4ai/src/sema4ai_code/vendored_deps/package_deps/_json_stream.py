@@ -0,0 +1,127 @@
+"""
+Helper to read a big json (such as conda's repodata.json) without loading it
+fully in memory.
+
+The contents are read in chunks and only the values requested are decoded
+(so, a dict with many entries can be iterated entry by entry).
+
+i.e.:
+
+    with open(json_file, "r", encoding="utf-8") as stream:
+        reader = JsonStreamReader(stream)
+        for key in reader.iter_object_keys():
+            if key == "packages":
+                for filename in reader.iter_object_keys():
+                    package_info = reader.decode_value()
+            else:
+                reader.decode_value()
+"""
+
+import json
+import re
+from collections.abc import Iterator
+from typing import Any, TextIO
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class JsonStreamReader:
+    def __init__(self, stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """
+        Reads more contents from the stream (discarding what was already
+        consumed).
+
+        Returns:
+            False if there's nothing else to read.
+        """
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self) -> None:
+        while True:
+            match = _WHITESPACE.match(self._buf, self._pos)
+            assert match is not None  # It always matches (even if empty).
+            self._pos = match.end()
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def peek(self) -> str:
+        """
+        Provides the next (non-whitespace) char (empty if at the end).
+        """
+        self._skip_whitespace()
+        if self._pos < len(self._buf):
+            return self._buf[self._pos]
+        return ""
+
+    def _consume(self, expected: str) -> None:
+        c = self.peek()
+        if c != expected:
+            raise ValueError(
+                f"Error reading json. Expected: {expected!r}. Found: {c!r}."
+            )
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+        """
+        Decodes the next value (which is fully loaded in memory).
+        """
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            if end >= len(self._buf) and self._fill():
+                # The value ended at the end of the buffer (so, a number
+                # may have been cut). Decode it again with more contents.
+                continue
+
+            self._pos = end
+            return value
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """
+        Iterates over the keys of the next object.
+
+        Note: after each key the caller must read the related value (either
+        with `decode_value` or with `iter_object_keys` if it's an object).
+        """
+        self._consume("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self.decode_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Error reading json. Expected key. Found: {key!r}")
+            self._consume(":")
+            yield key
+
+            c = self.peek()
+            if c == ",":
+                self._pos += 1
+            elif c == "}":
+                self._pos += 1
+                return
+            else:
+                raise ValueError(
+                    f"Error reading json. Expected ',' or '}}'. Found: {c!r}."
+                )
@@ -102,6 +102,17 @@ class BaseAnalyzer:
     def iter_pip_issues(self):
         from .pip_impl import pip_packaging_version
 
+        # Load the info for all the pinned deps concurrently (afterwards
+        # it's gotten from the cache).
+        self._pypi_cloud.prefetch(
+            dep_info.name
+            for dep_info in self._pip_deps.iter_deps_infos()
+            if not dep_info.error_msg
+            and dep_info.constraints
+            and len(dep_info.constraints) == 1
+            and next(iter(dep_info.constraints))[0] == "=="
+        )
+
         for dep_info in self._pip_deps.iter_deps_infos():
             if dep_info.error_msg:
                 diagnostic = {
@@ -136,7 +147,6 @@ class BaseAnalyzer:
                         yield diagnostic
 
     def iter_conda_issues(self) -> Iterator[_DiagnosticsTypedDict]:
-        from .conda_cloud import sort_conda_versions
         from .conda_impl.conda_version import VersionSpec
 
         diagnostic: _DiagnosticsTypedDict
@@ -187,6 +197,19 @@ class BaseAnalyzer:
         sqlite_queries = self._conda_cloud.sqlite_queries()
         if sqlite_queries:
             with sqlite_queries.db_cursors() as db_cursors:
+                # Query the latest versions for all the packages at once (the
+                # whole list of versions is only needed if the latest version
+                # doesn't match the spec).
+                name_to_latest_version = sqlite_queries.query_latest_versions_many(
+                    (
+                        conda_dep.name
+                        for conda_dep in self._conda_deps.iter_deps_infos()
+                        if not conda_dep.error_msg
+                        and conda_dep.name not in ("python", "pip", "uv")
+                    ),
+                    db_cursors,
+                )
+
                 for conda_dep in self._conda_deps.iter_deps_infos():
                     if conda_dep.name in ("python", "pip", "uv"):
                         continue
@@ -207,14 +230,15 @@ class BaseAnalyzer:
                     if version_spec is None:
                         continue
 
-                    versions = sqlite_queries.query_versions(conda_dep.name, db_cursors)
-                    if not versions:
+                    last_version = name_to_latest_version.get(conda_dep.name)
+                    if not last_version:
                         continue
 
-                    sorted_versions = sort_conda_versions(versions)
-                    last_version = sorted_versions[-1]
                     if not version_spec.match(last_version):
                         # The latest version doesn't match, let's show a warning.
+                        sorted_versions = sqlite_queries.query_sorted_versions(
+                            conda_dep.name, db_cursors
+                        )
                         newer_cloud_versions = []
                         for v in reversed(sorted_versions):
                             if not version_spec.match(v):
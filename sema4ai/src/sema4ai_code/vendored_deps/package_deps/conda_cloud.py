@@ -8,7 +8,9 @@ import shutil
 import threading
 import time
 import typing
-from collections.abc import Iterator, Sequence
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
 from concurrent.futures import Future
 from contextlib import contextmanager
 from functools import partial
@@ -45,10 +47,33 @@ TABLE_VERSIONS_SQL = """
         version TEXT,
         subdir TEXT,
         build TEXT,
+        filename TEXT,
+        entry_hash TEXT,
+        version_rank INTEGER,
         FOREIGN KEY (package_id) REFERENCES Packages(package_id)
     );
 """
 
+# The latest (stable) version of each package.
+TABLE_LATEST_VERSIONS_SQL = """
+    CREATE TABLE LatestVersions (
+        package_id INTEGER PRIMARY KEY,
+        version TEXT,
+        version_rank INTEGER,
+        FOREIGN KEY (package_id) REFERENCES Packages(package_id)
+    );
+"""
+
+# Information on the repodata.json indexed (i.e.: http cache headers).
+TABLE_INDEX_INFO_SQL = """
+    CREATE TABLE IndexInfo (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+CACHE_HEADER_KEYS = ("etag", "last_modified")
+
 CREATE_INDEXES_SQL = [
     """
 CREATE UNIQUE INDEX package_name_index 
@@ -61,6 +86,14 @@ ON Versions(package_id);
     """
 CREATE INDEX version_index 
 ON Versions(version);
+""",
+    """
+CREATE INDEX filename_on_versions_index 
+ON Versions(filename);
+""",
+    """
+CREATE INDEX version_rank_on_versions_index 
+ON Versions(package_id, version_rank);
 """,
 ]
 
@@ -76,8 +109,118 @@ def timestamp_to_datetime(timestamp_milliseconds: float) -> datetime.datetime:
     return datetime.datetime.fromtimestamp(timestamp_seconds)
 
 
+# Batches for the `IN (...)` queries are padded to one of these sizes so
+# that the same (cached) prepared statements are reused.
+_IN_QUERY_BATCH_SIZES = (1, 4, 16, 64, 256)
+
+_QUERY_VERSIONS_SQL = """
+SELECT Versions.version
+FROM Packages
+INNER JOIN Versions ON Packages.package_id = Versions.package_id
+WHERE Packages.package_name = ?
+"""
+
+_QUERY_VERSIONS_MANY_SQL = """
+SELECT Packages.package_name, Versions.version
+FROM Packages
+INNER JOIN Versions ON Packages.package_id = Versions.package_id
+WHERE Packages.package_name IN (%s)
+"""
+
+# Note: only available in indexes with the `version_rank`.
+_QUERY_SORTED_VERSIONS_MANY_SQL = """
+SELECT DISTINCT Packages.package_name, Versions.version, Versions.version_rank
+FROM Packages
+INNER JOIN Versions ON Packages.package_id = Versions.package_id
+WHERE Packages.package_name IN (%s)
+ORDER BY Packages.package_name, Versions.version_rank
+"""
+
+_QUERY_LATEST_VERSIONS_MANY_SQL = """
+SELECT Packages.package_name, LatestVersions.version
+FROM Packages
+INNER JOIN LatestVersions ON Packages.package_id = LatestVersions.package_id
+WHERE Packages.package_name IN (%s)
+"""
+
+_QUERY_VERSION_INFO_SQL = """
+SELECT Versions.depends, Versions.timestamp, Versions.subdir, Versions.build
+FROM Packages
+INNER JOIN Versions ON Packages.package_id = Versions.package_id
+WHERE Packages.package_name = ? and Versions.version = ?
+"""
+
+
+def _is_release_version(version: str) -> bool:
+    # Note that we exclude release candidates and development versions.
+    return "_rc" not in version and "_dev" not in version
+
+
+def _iter_in_query_batches(names: Sequence[str]) -> Iterator[tuple[str, ...]]:
+    max_batch_size = _IN_QUERY_BATCH_SIZES[-1]
+    for i in range(0, len(names), max_batch_size):
+        batch = tuple(names[i : i + max_batch_size])
+        for batch_size in _IN_QUERY_BATCH_SIZES:
+            if batch_size >= len(batch):
+                break
+        # Pad with the last name (repeating a name in the `IN` is harmless).
+        yield batch + (batch[-1],) * (batch_size - len(batch))
+
+
+def _merge_sorted_versions(sorted_versions_lists: list[list[str]]) -> list[str]:
+    """
+    Merges the sorted versions found in different indexes (i.e.: one for each
+    arch).
+    """
+    lists = [lst for lst in sorted_versions_lists if lst]
+    if not lists:
+        return []
+
+    longest = max(lists, key=len)
+    if len(lists) == 1:
+        return longest
+
+    # Usually the versions are the same in all the archs (or a subset).
+    longest_set = set(longest)
+    if all(longest_set.issuperset(lst) for lst in lists):
+        return longest
+    return _sort_versions_for_index(set(itertools.chain.from_iterable(lists)))
+
+
+class _ThreadConnections:
+    __slots__ = ["connections", "__weakref__"]
+
+    def __init__(self, connections: list) -> None:
+        self.connections = connections
+
+
+def _close_exited_thread_connections(
+    sqlite_queries_ref: "weakref.ref[SqliteQueries]", connections: list
+) -> None:
+    sqlite_queries = sqlite_queries_ref()
+    if sqlite_queries is None:
+        return
+
+    with sqlite_queries._lock:
+        connections_ids = set(id(c) for c in connections)
+        sqlite_queries._all_connections = [
+            c for c in sqlite_queries._all_connections if id(c) not in connections_ids
+        ]
+    sqlite_queries._close_connections(connections)
+
+
 class SqliteQueries:
-    def __init__(self, sqlite_file: Path | Sequence[Path]):
+    """
+    Provides the queries to the sqlite files with the conda index.
+
+    The sqlite files are expected to be read-only (a new index is always
+    written to a new location), so, connections are opened as read-only,
+    immutable and are kept alive (one per thread) until `close()` is called.
+
+    Note: the queries may be done from any thread.
+    """
+
+    def __init__(self, sqlite_file: Path | Sequence[Path], max_cached_packages=500):
         sqlite_files: Sequence[Path]
         if isinstance(sqlite_file, Path):
             sqlite_files = [sqlite_file]
@@ -85,6 +228,77 @@ class SqliteQueries:
             sqlite_files = sqlite_file
         self.sqlite_files: Sequence[Path] = sqlite_files
 
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+        self._all_connections: list = []
+        self._in_use = 0
+        self._closed = False
+
+        # package name -> versions sorted by the VersionOrder (LRU).
+        self._sorted_versions_cache: OrderedDict[str, list[str]] = OrderedDict()
+        self._max_cached_packages = max_cached_packages
+
+        # Whether each sqlite file has the precomputed version ranks (older
+        # indexes don't have it).
+        self._has_version_ranks: list[bool] | None = None
+
+    def _get_has_version_ranks(self, db_cursors: Sequence[Cursor]) -> list[bool]:
+        has_version_ranks = self._has_version_ranks
+        if has_version_ranks is None:
+            has_version_ranks = [
+                _has_version_ranks(db_cursor) for db_cursor in db_cursors
+            ]
+            self._has_version_ranks = has_version_ranks
+        return has_version_ranks
+
+    def _connect(self, path: Path):
+        import sqlite3
+
+        # Note: `as_uri()` properly escapes chars such as spaces in the path.
+        uri = f"{path.absolute().as_uri()}?mode=ro&immutable=1"
+        # check_same_thread=False: just so that `close()` can be called from
+        # any thread (each connection is only used in the thread that
+        # created it).
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _get_thread_connections(self) -> list:
+        thread_connections = getattr(self._thread_local, "connections", None)
+        if thread_connections is None:
+            connections = [self._connect(path) for path in self.sqlite_files]
+            with self._lock:
+                self._all_connections.extend(connections)
+            thread_connections = _ThreadConnections(connections)
+            # The thread-local is released when the thread exits: close its
+            # connections at that point.
+            weakref.finalize(
+                thread_connections,
+                _close_exited_thread_connections,
+                weakref.ref(self),
+                connections,
+            )
+            self._thread_local.connections = thread_connections
+        return thread_connections.connections
+
+    def close(self) -> None:
+        """
+        Closes the pooled connections (connections in use are closed when
+        released).
+        """
+        with self._lock:
+            self._closed = True
+            if self._in_use:
+                return
+            connections = self._all_connections
+            self._all_connections = []
+        self._close_connections(connections)
+
+    def _close_connections(self, connections: list) -> None:
+        for db_connection in connections:
+            try:
+                db_connection.close()
+            except Exception:
+                log.exception("Error closing sqlite connection.")
+
     @contextmanager
     def db_cursors(
         self, db_cursor: Sequence[Cursor] | None = None
@@ -93,12 +307,45 @@ class SqliteQueries:
             yield db_cursor
             return
 
-        import sqlite3
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._in_use += 1
+
+        if closed:
+            # Already closed: use temporary connections.
+            with self._temporary_db_cursors() as temporary_db_cursors:
+                yield temporary_db_cursors
+            return
 
+        try:
+            db_cursors: list[Cursor] = [
+                db_connection.cursor()
+                for db_connection in self._get_thread_connections()
+            ]
+            try:
+                yield db_cursors
+            finally:
+                for cursor in db_cursors:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        log.exception("Error closing sqlite cursor.")
+        finally:
+            connections = []
+            with self._lock:
+                self._in_use -= 1
+                if self._closed and not self._in_use:
+                    connections = self._all_connections
+                    self._all_connections = []
+            self._close_connections(connections)
+
+    @contextmanager
+    def _temporary_db_cursors(self) -> Iterator[Sequence[Cursor]]:
         db_cursors: list[Cursor] = []
         db_connections: list = []
         for path in self.sqlite_files:
-            db_connections.append(sqlite3.connect(path))
+            db_connections.append(self._connect(path))
             db_cursors.append(db_connections[-1].cursor())
         try:
             yield db_cursors
@@ -108,12 +355,7 @@ class SqliteQueries:
                     cursor.close()
                 except Exception:
                     log.exception("Error closing sqlite cursor.")
-
-            for db_connection in db_connections:
-                try:
-                    db_connection.close()
-                except Exception:
-                    log.exception("Error closing sqlite connection.")
+            self._close_connections(db_connections)
 
     def query_names(self, db_cursors: Sequence[Cursor] | None = None) -> set[str]:
         with self.db_cursors(db_cursors) as db_cursors:
@@ -131,26 +373,166 @@ class SqliteQueries:
         with self.db_cursors(db_cursors) as db_cursors:
             versions: set[str] = set()
             for db_cursor in db_cursors:
-                db_cursor.execute(
-                    """
-SELECT Versions.version
-FROM Packages
-INNER JOIN Versions ON Packages.package_id = Versions.package_id
-WHERE Packages.package_name = ?
-""",
-                    (package_name,),
-                )
+                db_cursor.execute(_QUERY_VERSIONS_SQL, (package_name,))
                 rows = db_cursor.fetchall()
 
-                # Note that we exclude release candidates and development versions.
-                versions.update(
-                    row[0]
-                    for row in rows
-                    if "_rc" not in row[0] and "_dev" not in row[0]
-                )
+                versions.update(row[0] for row in rows if _is_release_version(row[0]))
 
             return versions
 
+    def query_versions_many(
+        self, package_names: Iterable[str], db_cursors: Sequence[Cursor] | None = None
+    ) -> dict[str, set[str]]:
+        """
+        Same as `query_versions` but for multiple packages at once.
+
+        Returns:
+            A dict with the package name to the versions found (packages not
+            found have an empty set).
+        """
+        names = sorted(set(package_names))
+        name_to_versions: dict[str, set[str]] = {name: set() for name in names}
+        if not names:
+            return name_to_versions
+
+        with self.db_cursors(db_cursors) as db_cursors:
+            for batch in _iter_in_query_batches(names):
+                sql = _QUERY_VERSIONS_MANY_SQL % (",".join("?" * len(batch)),)
+                for db_cursor in db_cursors:
+                    db_cursor.execute(sql, batch)
+                    for package_name, version in db_cursor.fetchall():
+                        if _is_release_version(version):
+                            name_to_versions[package_name].add(version)
+
+        return name_to_versions
+
+    def query_sorted_versions_many(
+        self, package_names: Iterable[str], db_cursors: Sequence[Cursor] | None = None
+    ) -> dict[str, list[str]]:
+        """
+        Provides the versions of the given packages sorted (from the oldest to
+        the newest) by the conda version order.
+
+        Note: results are cached (the index is read-only, so, they're valid
+        for the lifetime of this instance), so, the lists returned must not
+        be mutated.
+        """
+        ret: dict[str, list[str]] = {}
+        missing: list[str] = []
+        cache = self._sorted_versions_cache
+        with self._lock:
+            for name in package_names:
+                sorted_versions = cache.get(name)
+                if sorted_versions is None:
+                    missing.append(name)
+                else:
+                    cache.move_to_end(name)
+                    ret[name] = sorted_versions
+
+        if missing:
+            name_to_lists: dict[str, list[list[str]]] = {name: [] for name in missing}
+            with self.db_cursors(db_cursors) as db_cursors:
+                for db_cursor, has_version_ranks in zip(
+                    db_cursors, self._get_has_version_ranks(db_cursors)
+                ):
+                    for name, sorted_versions in self._query_sorted_versions_in_db(
+                        db_cursor, has_version_ranks, missing
+                    ).items():
+                        name_to_lists[name].append(sorted_versions)
+
+            computed = {
+                name: _merge_sorted_versions(lists)
+                for name, lists in name_to_lists.items()
+            }
+            with self._lock:
+                for name, sorted_versions in computed.items():
+                    cache[name] = sorted_versions
+                    cache.move_to_end(name)
+                while len(cache) > self._max_cached_packages:
+                    cache.popitem(last=False)
+            ret.update(computed)
+        return ret
+
+    def _query_sorted_versions_in_db(
+        self, db_cursor: Cursor, has_version_ranks: bool, names: Sequence[str]
+    ) -> dict[str, list[str]]:
+        name_to_sorted_versions: dict[str, list[str]] = {}
+        if not has_version_ranks:
+            # Old index: sort in python.
+            name_to_versions = self.query_versions_many(names, [db_cursor])
+            for name, versions in name_to_versions.items():
+                if versions:
+                    name_to_sorted_versions[name] = sort_conda_versions(versions)
+            return name_to_sorted_versions
+
+        for batch in _iter_in_query_batches(sorted(set(names))):
+            sql = _QUERY_SORTED_VERSIONS_MANY_SQL % (",".join("?" * len(batch)),)
+            db_cursor.execute(sql, batch)
+            for package_name, version, _rank in db_cursor.fetchall():
+                if _is_release_version(version):
+                    try:
+                        lst = name_to_sorted_versions[package_name]
+                    except KeyError:
+                        lst = name_to_sorted_versions[package_name] = []
+                    lst.append(version)
+        return name_to_sorted_versions
+
+    def query_sorted_versions(
+        self, package_name: str, db_cursors: Sequence[Cursor] | None = None
+    ) -> list[str]:
+        return self.query_sorted_versions_many([package_name], db_cursors)[package_name]
+
+    def query_latest_versions_many(
+        self, package_names: Iterable[str], db_cursors: Sequence[Cursor] | None = None
+    ) -> dict[str, str]:
+        """
+        Provides the latest (stable) version of the given packages (packages
+        not found aren't added to the returned dict).
+
+        Note: uses the precomputed latest version from the index when
+        available (so, the versions don't need to be sorted).
+        """
+        names = sorted(set(package_names))
+        name_to_latest: dict[str, str] = {}
+
+        with self._lock:
+            cache = self._sorted_versions_cache
+            missing = []
+            for name in names:
+                sorted_versions = cache.get(name)
+                if sorted_versions is None:
+                    missing.append(name)
+                elif sorted_versions:
+                    name_to_latest[name] = sorted_versions[-1]
+
+        if not missing:
+            return name_to_latest
+
+        with self.db_cursors(db_cursors) as db_cursors:
+            has_version_ranks = self._get_has_version_ranks(db_cursors)
+            if not all(has_version_ranks):
+                for name, sorted_versions in self.query_sorted_versions_many(
+                    missing, db_cursors
+                ).items():
+                    if sorted_versions:
+                        name_to_latest[name] = sorted_versions[-1]
+                return name_to_latest
+
+            name_to_candidates: dict[str, set[str]] = {}
+            for batch in _iter_in_query_batches(missing):
+                sql = _QUERY_LATEST_VERSIONS_MANY_SQL % (",".join("?" * len(batch)),)
+                for db_cursor in db_cursors:
+                    db_cursor.execute(sql, batch)
+                    for package_name, version in db_cursor.fetchall():
+                        name_to_candidates.setdefault(package_name, set()).add(version)
+
+        for name, candidates in name_to_candidates.items():
+            if len(candidates) == 1:
+                name_to_latest[name] = next(iter(candidates))
+            else:
+                name_to_latest[name] = _sort_versions_for_index(candidates)[-1]
+        return name_to_latest
+
     def query_version_info(
         self,
         package_name: str,
@@ -168,15 +550,7 @@ WHERE Packages.package_name = ?
             max_timestamp = 0
 
             for db_cursor in db_cursors:
-                db_cursor.execute(
-                    """
-SELECT Versions.depends, Versions.timestamp, Versions.subdir, Versions.build
-FROM Packages
-INNER JOIN Versions ON Packages.package_id = Versions.package_id
-WHERE Packages.package_name = ? and Versions.version = ?
-""",
-                    (package_name, version),
-                )
+                db_cursor.execute(_QUERY_VERSION_INFO_SQL, (package_name, version))
 
                 for row in db_cursor.fetchall():
                     depends, timestamp, subdir, build = row
@@ -224,122 +598,408 @@ def sort_conda_versions(
 INDEX_FOR_LIBRARIES: set[str] | None = None
 
 
-def index_conda_info(json_file: Path, target_sqlite_file: Path):
-    import sqlite3
+class _RepoDataEntry(typing.NamedTuple):
+    package_name: str
+    depends: bytes
+    timestamp: int
+    version: str
+    subdir: str
+    build: str
+
+    def compute_hash(self) -> str:
+        import hashlib
 
-    # Using msgspec cuts the time in half (from 1 second to 0.5 seconds
-    # for the full process in one use case).
-    # Not only the decoding is faster (from 0.44 to 0.28), but accessing
-    # things from the structure it provides is faster than accessing from
-    # python structures (dict/list).
+        h = hashlib.sha1(self.depends)
+        h.update(
+            f"\0{self.package_name}\0{self.timestamp}\0{self.version}\0{self.subdir}\0{self.build}".encode(
+                "utf-8"
+            )
+        )
+        return h.hexdigest()
+
+
+def _iter_repodata_entries(json_file: Path) -> Iterator[tuple[str, _RepoDataEntry]]:
+    """
+    Provides the (package_filename, entry) for each entry in the given
+    repodata.json.
+
+    Note: the json is streamed (so, the whole file is never loaded in memory
+    at once).
+    """
     import msgspec
 
-    # Use Struct types to define the JSON schema. For efficiency we only define
-    # the fields we actually need.
-    class Package(msgspec.Struct):
-        name: str
-        depends: list[str] | None = []
-        version: str | None = ""
-        subdir: str | None = ""
-        timestamp: int | None = 0
-        build: str | None = ""
-
-    class Info(msgspec.Struct):
-        subdir: str = ""
-
-    class RepoData(msgspec.Struct):
-        info: Info
-        packages: dict[str, Package] | None
-        packages_conda: dict[str, Package] | None = msgspec.field(
-            name="packages.conda",
-            default=None,
+    from ._json_stream import JsonStreamReader
+
+    # This is actually the arch (it's only available after the "info" is
+    # read, which is usually the first key, so, entries found before it are
+    # kept to be provided afterwards).
+    default_subdir = ""
+    missing_subdir: list[tuple[str, dict]] = []
+
+    def create_entry(
+        package_filename: str, package_info: dict
+    ) -> tuple[str, _RepoDataEntry] | None:
+        # "2dfatmic-1.0-hbb7d975_1.tar.bz2": {
+        #   "build": "hbb7d975_1",
+        #   "build_number": 1,
+        #   "depends": [
+        #     "libgfortran 5.*",
+        #     "libgfortran5 >=9.3.0"
+        #   ],
+        #   "license": "Public Domain",
+        #   "license_family": "OTHER",
+        #   "md5": "0abb38856a2c0a45595bbf3888405507",
+        #   "name": "2dfatmic",
+        #   "sha256": "54d7427b37a4984e97c0529f94c927f9bccfbc9e5b57d0fb52030e4be92ce38a",
+        #   "size": 173360,
+        #   "subdir": "osx-64",
+        #   "timestamp": 1602245771778,
+        #   "version": "1.0"
+        # },
+        name = package_info.get("name")
+        if not name:
+            return None
+        if INDEX_FOR_LIBRARIES:
+            if name not in INDEX_FOR_LIBRARIES:
+                return None
+
+        version = package_info.get("version")
+        subdir = package_info.get("subdir") or default_subdir
+        if not version:
+            log.info(
+                f"Unable to get version for package_filename: {package_filename}. Subdir: {subdir}"
+            )
+            return None
+
+        return package_filename, _RepoDataEntry(
+            name,
+            msgspec.json.encode(package_info.get("depends") or []),
+            package_info.get("timestamp") or 0,  # 0 means unknown
+            version,
+            subdir,
+            package_info.get("build") or "",  # '' means unknown
+        )
+
+    with open(json_file, encoding="utf-8") as stream:
+        reader = JsonStreamReader(stream)
+        for key in reader.iter_object_keys():
+            if key in ("packages", "packages.conda"):
+                if reader.peek() != "{":
+                    reader.decode_value()  # i.e.: null
+                    continue
+                for package_filename in reader.iter_object_keys():
+                    package_info = reader.decode_value()
+                    if not default_subdir and not package_info.get("subdir"):
+                        missing_subdir.append((package_filename, package_info))
+                        continue
+                    created = create_entry(package_filename, package_info)
+                    if created is not None:
+                        yield created
+
+            elif key == "info":
+                info = reader.decode_value()
+                if isinstance(info, dict):
+                    default_subdir = info.get("subdir") or ""
+            else:
+                reader.decode_value()
+
+    for package_filename, package_info in missing_subdir:
+        created = create_entry(package_filename, package_info)
+        if created is not None:
+            yield created
+
+
+def _has_version_ranks(db_cursor: Cursor) -> bool:
+    db_cursor.execute("PRAGMA table_info(Versions)")
+    columns = set(row[1] for row in db_cursor.fetchall())
+    if "version_rank" not in columns:
+        return False
+
+    db_cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='LatestVersions'"
+    )
+    return db_cursor.fetchone() is not None
+
+
+def _has_current_schema(db_cursor: Cursor) -> bool:
+    if not _has_version_ranks(db_cursor):
+        return False
+
+    db_cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='IndexInfo'"
+    )
+    return db_cursor.fetchone() is not None
+
+
+def _create_tables(db_cursor: Cursor) -> None:
+    for table in ("LatestVersions", "Versions", "Packages", "IndexInfo"):
+        db_cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+    db_cursor.execute(TABLE_PACKAGES_SQL)
+    db_cursor.execute(TABLE_VERSIONS_SQL)
+    db_cursor.execute(TABLE_LATEST_VERSIONS_SQL)
+    db_cursor.execute(TABLE_INDEX_INFO_SQL)
+
+    for sql in CREATE_INDEXES_SQL:
+        db_cursor.execute(sql)
+
+
+def load_index_cache_headers(sqlite_file: Path) -> dict[str, str]:
+    """
+    Provides the http cache headers (i.e.: `etag` / `last_modified`) of the
+    repodata.json used to build the given index (empty if not available).
+    """
+    import sqlite3
+
+    if not sqlite_file.exists():
+        return {}
+
+    try:
+        db_connection = sqlite3.connect(sqlite_file)
+        try:
+            db_cursor = db_connection.cursor()
+            try:
+                if not _has_current_schema(db_cursor):
+                    return {}
+                db_cursor.execute("SELECT key, value FROM IndexInfo")
+                return dict(
+                    (key, value)
+                    for key, value in db_cursor.fetchall()
+                    if key in CACHE_HEADER_KEYS and value
+                )
+            finally:
+                db_cursor.close()
+        finally:
+            db_connection.close()
+    except Exception:
+        log.exception(f"Error loading cache headers from: {sqlite_file}")
+        return {}
+
+
+def _sort_versions_for_index(versions: Iterable[str]) -> list[str]:
+    """
+    Sorts the versions by the conda version order (versions which can't be
+    parsed are considered older than the others).
+    """
+    from .conda_impl.conda_version import VersionOrder
+
+    invalid: list[str] = []
+    parsed: list[tuple[VersionOrder, str]] = []
+    for version in versions:
+        try:
+            parsed.append((VersionOrder(version), version))
+        except Exception:
+            invalid.append(version)
+
+    parsed.sort(key=lambda tup: tup[0])
+    return sorted(invalid) + [version for _, version in parsed]
+
+
+def _update_version_ranks(db_cursor: Cursor, package_ids: set[int] | None) -> None:
+    """
+    Updates the `Versions.version_rank` (the position of the version when
+    the versions of the package are sorted) and the `LatestVersions` of
+    the given packages (or all packages if None).
+    """
+    package_id_to_versions: dict[int, set[str]] = {}
+    if package_ids is None:
+        db_cursor.execute("SELECT package_id, version FROM Versions")
+        for package_id, version in db_cursor.fetchall():
+            package_id_to_versions.setdefault(package_id, set()).add(version)
+        db_cursor.execute("DELETE FROM LatestVersions")
+    else:
+        for package_id in package_ids:
+            db_cursor.execute(
+                "SELECT DISTINCT version FROM Versions WHERE package_id=?",
+                (package_id,),
+            )
+            versions = set(row[0] for row in db_cursor.fetchall())
+            if versions:
+                package_id_to_versions[package_id] = versions
+        db_cursor.executemany(
+            "DELETE FROM LatestVersions WHERE package_id=?;",
+            [(package_id,) for package_id in package_ids],
         )
 
-    # Decode the data as a `RepoData` type
-    with open(json_file, "rb") as stream:
-        bytes_read = stream.read()
-    data = msgspec.json.decode(bytes_read, type=RepoData)
+    rank_rows: list[tuple[int, int, str]] = []
+    latest_rows: list[tuple[int, str, int]] = []
+    for package_id, versions in package_id_to_versions.items():
+        sorted_versions = _sort_versions_for_index(versions)
+        latest: tuple[int, str, int] | None = None
+        for rank, version in enumerate(sorted_versions):
+            rank_rows.append((rank, package_id, version))
+            if _is_release_version(version):
+                latest = (package_id, version, rank)
+        if latest is not None:
+            latest_rows.append(latest)
+
+    db_cursor.executemany(
+        "UPDATE Versions SET version_rank=? WHERE package_id=? AND version=?;",
+        rank_rows,
+    )
+    db_cursor.executemany(
+        "INSERT INTO LatestVersions (package_id, version, version_rank) VALUES (?, ?, ?);",
+        latest_rows,
+    )
+
+
+class IndexStats(typing.TypedDict):
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+
+
+def index_conda_info(
+    json_file: Path,
+    target_sqlite_file: Path,
+    cache_headers: dict[str, str] | None = None,
+) -> IndexStats:
+    """
+    Indexes the given repodata.json into the target sqlite file.
 
-    # This is actually the arch.
-    default_subdir = data.info.subdir
+    If the target sqlite file already has an index (with the current schema),
+    it's updated incrementally: only the entries (keyed by the package
+    filename) which were added/changed/removed are written.
 
-    # Step 3: Create SQLite database and table
-    db_connection = sqlite3.connect(target_sqlite_file)
+    Args:
+        cache_headers: The http cache headers (`etag` / `last_modified`)
+            related to the json file (saved to do conditional requests later on).
+    """
+    import sqlite3
+
+    stats: IndexStats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    # isolation_level=None: transactions are explicitly managed (everything
+    # is done in a single transaction).
+    db_connection = sqlite3.connect(target_sqlite_file, isolation_level=None)
     try:
         db_cursor = db_connection.cursor()
         try:
-            db_cursor.execute(TABLE_PACKAGES_SQL)
-
-            db_cursor.execute(TABLE_VERSIONS_SQL)
-
-            for sql in CREATE_INDEXES_SQL:
-                db_cursor.execute(sql)
-
-            package_name_to_id: dict[str, int] = {}
-            rows = []
-            # Step 4: Insert package information into the database
-            for package_filename, package_info in itertools.chain(
-                (data.packages or {}).items(), (data.packages_conda or {}).items()
-            ):
-                # "2dfatmic-1.0-hbb7d975_1.tar.bz2": {
-                #   "build": "hbb7d975_1",
-                #   "build": 1,
-                #   "depends": [
-                #     "libgfortran 5.*",
-                #     "libgfortran5 >=9.3.0"
-                #   ],
-                #   "license": "Public Domain",
-                #   "license_family": "OTHER",
-                #   "md5": "0abb38856a2c0a45595bbf3888405507",
-                #   "name": "2dfatmic",
-                #   "sha256": "54d7427b37a4984e97c0529f94c927f9bccfbc9e5b57d0fb52030e4be92ce38a",
-                #   "size": 173360,
-                #   "subdir": "osx-64",
-                #   "timestamp": 1602245771778,
-                #   "version": "1.0"
-                # },
-                name = package_info.name
-                if not name:
-                    continue
-                if INDEX_FOR_LIBRARIES:
-                    if name not in INDEX_FOR_LIBRARIES:
-                        continue
+            db_cursor.execute("BEGIN")
+            try:
+                # filename -> (version_id, entry_hash, package_id)
+                existing: dict[str, tuple[int, str, int]] = {}
+                package_name_to_id: dict[str, int] = {}
 
-                try:
-                    package_id = package_name_to_id[name]
-                except KeyError:
+                # The packages whose versions changed (None means all).
+                changed_package_ids: set[int] | None = set()
+
+                if _has_current_schema(db_cursor):
                     db_cursor.execute(
-                        """INSERT INTO Packages (package_name) VALUES (?);""", (name,)
+                        "SELECT filename, version_id, entry_hash, package_id FROM Versions"
                     )
-                    lastrowid = db_cursor.lastrowid
-                    if lastrowid is None:
+                    for (
+                        filename,
+                        version_id,
+                        entry_hash,
+                        package_id,
+                    ) in db_cursor.fetchall():
+                        existing[filename] = (version_id, entry_hash, package_id)
+
+                    db_cursor.execute("SELECT package_name, package_id FROM Packages")
+                    package_name_to_id.update(db_cursor.fetchall())
+                else:
+                    _create_tables(db_cursor)
+                    changed_package_ids = None
+
+                new_rows: list[tuple] = []
+                updated_rows: list[tuple] = []
+                seen_filenames: set[str] = set()
+
+                for package_filename, entry in _iter_repodata_entries(json_file):
+                    if package_filename in seen_filenames:
                         continue
-                    package_id = package_name_to_id[name] = lastrowid
+                    seen_filenames.add(package_filename)
 
-                depends = msgspec.json.encode(package_info.depends)
-                version = package_info.version
-                timestamp = package_info.timestamp  # 0 means unknown
-                build = package_info.build  # '' means unknown
-                subdir = package_info.subdir or default_subdir
+                    entry_hash = entry.compute_hash()
+                    old = existing.pop(package_filename, None)
+                    if old is not None and old[1] == entry_hash:
+                        stats["unchanged"] += 1
+                        continue
 
-                if not version:
-                    log.info(
-                        f"Unable to get version for package_filename: {package_filename}. Subdir: {subdir}"
+                    name = entry.package_name
+                    try:
+                        package_id = package_name_to_id[name]
+                    except KeyError:
+                        db_cursor.execute(
+                            """INSERT INTO Packages (package_name) VALUES (?);""",
+                            (name,),
+                        )
+                        lastrowid = db_cursor.lastrowid
+                        if lastrowid is None:
+                            continue
+                        package_id = package_name_to_id[name] = lastrowid
+
+                    row = (
+                        package_id,
+                        entry.depends,
+                        entry.timestamp,
+                        entry.version,
+                        entry.subdir,
+                        entry.build,
+                        entry_hash,
+                    )
+                    if old is not None:
+                        updated_rows.append(row + (old[0],))
+                    else:
+                        new_rows.append((package_filename,) + row)
+
+                    if changed_package_ids is not None:
+                        changed_package_ids.add(package_id)
+                        if old is not None:
+                            changed_package_ids.add(old[2])
+
+                db_cursor.executemany(
+                    "INSERT INTO Versions (filename, package_id, depends, timestamp, version, subdir, build, entry_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                    new_rows,
+                )
+                db_cursor.executemany(
+                    "UPDATE Versions SET package_id=?, depends=?, timestamp=?, version=?, subdir=?, build=?, entry_hash=? WHERE version_id=?;",
+                    updated_rows,
+                )
+                # What's still in `existing` is no longer in the repodata.
+                removed = [(version_id,) for version_id, _, _ in existing.values()]
+                db_cursor.executemany(
+                    "DELETE FROM Versions WHERE version_id=?;", removed
+                )
+                if changed_package_ids is not None:
+                    changed_package_ids.update(
+                        package_id for _, _, package_id in existing.values()
                     )
-                    continue
-                rows.append((package_id, depends, timestamp, version, subdir, build))
 
-            db_cursor.executemany(
-                "INSERT INTO Versions (package_id, depends, timestamp, version, subdir, build) VALUES (?, ?, ?, ?, ?, ?);",
-                rows,
-            )
+                _update_version_ranks(db_cursor, changed_package_ids)
+
+                if removed or updated_rows:
+                    db_cursor.execute(
+                        "DELETE FROM Packages WHERE package_id NOT IN (SELECT DISTINCT package_id FROM Versions);"
+                    )
+
+                db_cursor.execute("DELETE FROM IndexInfo")
+                db_cursor.executemany(
+                    "INSERT INTO IndexInfo (key, value) VALUES (?, ?);",
+                    [
+                        (key, value)
+                        for key, value in (cache_headers or {}).items()
+                        if key in CACHE_HEADER_KEYS and value
+                    ],
+                )
+
+                stats["inserted"] = len(new_rows)
+                stats["updated"] = len(updated_rows)
+                stats["deleted"] = len(removed)
+            except BaseException:
+                db_cursor.execute("ROLLBACK")
+                raise
+            else:
+                db_cursor.execute("COMMIT")
         finally:
             db_cursor.close()
-
-        db_connection.commit()
     finally:
         db_connection.close()
 
+    return stats
+
 
 Arch = str
 
@@ -379,8 +1039,21 @@ class _Callback:
 
 class _AfterDownloadMakeSqlite:
     def __init__(
-        self, available_arch: list[Arch], cache_dir: Path, index_cache_dir: Path
+        self,
+        available_arch: list[Arch],
+        cache_dir: Path,
+        index_cache_dir: Path,
+        previous_index_dir: Path | None = None,
+        arch_to_cache_headers: dict[Arch, dict[str, str]] | None = None,
     ):
+        """
+        Args:
+            previous_index_dir: If given, the sqlite files from the previous
+                index are used as the base and are just updated incrementally
+                (or reused as is if the repodata.json wasn't modified).
+            arch_to_cache_headers: The http cache headers for each arch (filled
+                by the download).
+        """
         self._available_arch = available_arch
         self._lock = threading.Lock()
         self._count = 0
@@ -389,13 +1062,37 @@ class _AfterDownloadMakeSqlite:
         self._arch_to_sqlite: dict[str, Path] = {}
         self._index_cache_dir = index_cache_dir
         self._cache_dir = cache_dir
+        self._previous_index_dir = previous_index_dir
+        self._arch_to_cache_headers = (
+            arch_to_cache_headers if arch_to_cache_headers is not None else {}
+        )
 
-    def _convert_to_sqlite(self, json_file: Path, arch: Arch) -> Path:
+    def _convert_to_sqlite(self, json_file: Path | None, arch: Arch) -> Path:
         target_sqlite_file = self._index_cache_dir / f"{arch}.db"
-        index_conda_info(json_file, target_sqlite_file)
+        if self._previous_index_dir is not None:
+            previous_sqlite_file = self._previous_index_dir / f"{arch}.db"
+            if previous_sqlite_file.exists():
+                shutil.copyfile(previous_sqlite_file, target_sqlite_file)
+
+        if json_file is None:
+            # Not modified (the previous index is still valid).
+            if not target_sqlite_file.exists():
+                raise RuntimeError(
+                    f"repodata.json not modified for {arch}, but previous index is not available."
+                )
+            log.debug(f"Conda index for {arch} not modified.")
+            return target_sqlite_file
+
+        initial_time = time.time()
+        stats = index_conda_info(
+            json_file, target_sqlite_file, self._arch_to_cache_headers.get(arch)
+        )
+        log.debug(
+            f"Conda index for {arch} updated in {time.time() - initial_time:.2f}s ({stats})."
+        )
         return target_sqlite_file
 
-    def __call__(self, download_future: "Future[tuple[Path, Arch]]"):
+    def __call__(self, download_future: "Future[tuple[Path | None, Arch]]"):
         json_file = None
         try:
             json_file, arch = download_future.result()
@@ -483,6 +1180,9 @@ class CondaCloud:
 
         self._lock = threading.Lock()
         self._state: State = State.initial
+
+        self._sqlite_queries_lock = threading.Lock()
+        self._sqlite_queries_cache: tuple[tuple, SqliteQueries] | None = None
         self._call_on_finished: list[IOnFinished] = []
 
         if self.is_information_cached():
@@ -498,22 +1198,61 @@ class CondaCloud:
             else:
                 self._state = State.done
 
-    def _download(self, url: str, target_json: Path, arch: str) -> tuple[Path, Arch]:
+    def _download(
+        self,
+        url: str,
+        target_json: Path,
+        arch: str,
+        cache_headers: dict[str, str] | None = None,
+    ) -> tuple[Path | None, Arch]:
+        """
+        Args:
+            cache_headers: If given, the `etag` / `last_modified` in it are
+                used to do a conditional request and it's updated with the
+                new values received.
+
+        Returns:
+            The path to the downloaded json (or None if the contents weren't
+            modified based on the `cache_headers`) and the arch.
+        """
+        import urllib.error
         import urllib.request
 
         CHUNK_SIZE = 32768
 
-        with target_json.open("wb") as stream:
+        headers = {"User-Agent": "Mozilla"}
+        if cache_headers:
+            if cache_headers.get("etag"):
+                headers["If-None-Match"] = cache_headers["etag"]
+            if cache_headers.get("last_modified"):
+                headers["If-Modified-Since"] = cache_headers["last_modified"]
+
+        try:
             request = urllib.request.urlopen(
-                urllib.request.Request(url, headers={"User-Agent": "Mozilla"})
+                urllib.request.Request(url, headers=headers)
             )
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, arch
+            raise
+
+        with request:
+            if request.status == 304:
+                return None, arch
 
             if request.status != 200:
                 raise RuntimeError(
                     f"HTTP error (unable to open: {url}): {request.status}"
                 )
 
-            with request:
+            if cache_headers is not None:
+                cache_headers.clear()
+                cache_headers["etag"] = request.headers.get("ETag") or ""
+                cache_headers["last_modified"] = (
+                    request.headers.get("Last-Modified") or ""
+                )
+
+            with target_json.open("wb") as stream:
                 for chunk in iter(lambda: request.read(CHUNK_SIZE), b""):
                     if chunk:  # Filter out keep-alive new chunks
                         stream.write(chunk)
@@ -563,6 +1302,17 @@ class CondaCloud:
 
             assert self._state in (State.initial, State.done)
 
+            # The current index is used as the base for the new one (so, only
+            # what changed needs to be downloaded/indexed).
+            previous_index_dir = self._load_latest_index_dir_location()
+            arch_to_cache_headers: dict[Arch, dict[str, str]] = {}
+            for arch in self._available_arch:
+                arch_to_cache_headers[arch] = (
+                    load_index_cache_headers(previous_index_dir / f"{arch}.db")
+                    if previous_index_dir is not None
+                    else {}
+                )
+
             # We need to compute the target for the files
             dir_entries = os.listdir(self._cache_dir)
 
@@ -602,14 +1352,20 @@ class CondaCloud:
             self._state = State.downloading
 
             on_done = _AfterDownloadMakeSqlite(
-                self._available_arch, self._cache_dir, index_cache_dir
+                self._available_arch,
+                self._cache_dir,
+                index_cache_dir,
+                previous_index_dir,
+                arch_to_cache_headers,
             )
 
             def mark_as_done(*args, **kwargs):
                 with self._lock:
                     self._state = State.done
 
-                    # Now, remove stale dirs.
+                    # Now, remove stale dirs (the connections to the index in
+                    # those must be closed first).
+                    self._close_sqlite_queries_in(stale_dirs)
                     for directory in stale_dirs:
                         try:
                             shutil.rmtree(directory, ignore_errors=False)
@@ -634,7 +1390,9 @@ class CondaCloud:
             # Something as:
             # https://conda.anaconda.org/conda-forge/linux-64/current_repodata.json
             url = f"{self._base_url}/{arch}/{self._json_name}"
-            future = executor.submit(partial(self._download, url, name, arch))
+            future = executor.submit(
+                partial(self._download, url, name, arch, arch_to_cache_headers[arch])
+            )
             future.add_done_callback(on_done)
         executor.shutdown(wait=wait)
 
@@ -692,8 +1450,50 @@ class CondaCloud:
 
         return True
 
+    def _close_sqlite_queries_in(self, directories: Sequence[Path]) -> None:
+        """
+        Closes the cached queries if they're done in a file inside one of the
+        given directories.
+        """
+        with self._sqlite_queries_lock:
+            cached = self._sqlite_queries_cache
+            if cached is None:
+                return
+
+            sqlite_queries = cached[1]
+            if any(f.parent in directories for f in sqlite_queries.sqlite_files):
+                self._sqlite_queries_cache = None
+                sqlite_queries.close()
+
     def sqlite_queries(self) -> SqliteQueries | None:
-        index_dir_files = tuple(self._iter_index_files())
-        if not index_dir_files:
-            return None
-        return SqliteQueries(index_dir_files)
+        """
+        Provides the queries for the current index (the same instance is
+        reused while `latest_index_info.json` is unchanged).
+        """
+        try:
+            stat = (self._cache_dir / "latest_index_info.json").stat()
+            key: tuple | None = (stat.st_mtime_ns, stat.st_size)
+        except Exception:
+            key = None
+
+        with self._sqlite_queries_lock:
+            cached = self._sqlite_queries_cache
+            if key is not None and cached is not None and cached[0] == key:
+                return cached[1]
+
+            index_dir_files = tuple(self._iter_index_files())
+            if cached is not None and cached[1].sqlite_files == index_dir_files:
+                sqlite_queries: SqliteQueries | None = cached[1]
+            else:
+                if cached is not None:
+                    # The index changed: release the connections to the old one.
+                    cached[1].close()
+                sqlite_queries = (
+                    SqliteQueries(index_dir_files) if index_dir_files else None
+                )
+
+            if key is not None and sqlite_queries is not None:
+                self._sqlite_queries_cache = (key, sqlite_queries)
+            else:
+                self._sqlite_queries_cache = None
+            return sqlite_queries
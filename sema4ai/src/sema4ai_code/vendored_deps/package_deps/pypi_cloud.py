@@ -1,8 +1,14 @@
 import datetime
+import json
 import logging
-import typing
+import threading
+import time
 import weakref
-from collections.abc import Iterator, Sequence
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
 
 from ._deps_protocols import PyPiInfoTypedDict, ReleaseData, Versions, VersionStr
 
@@ -94,13 +100,182 @@ class PackageData:
         return self._info
 
 
+# Only these fields from the info are kept in the cache.
+_INFO_KEYS = (
+    "version",
+    "requires_dist",
+    "requires_python",
+    "home_page",
+    "package_url",
+    "project_urls",
+    "description",
+    "description_content_type",
+)
+
+# The time for which the information in the cache is used without asking
+# the server whether it changed.
+DEFAULT_TTL_IN_SECONDS = 60 * 60 * 4
+
+# Max number of packages for which the information is kept in memory (LRU).
+DEFAULT_MAX_CACHED_PACKAGES = 500
+
+TABLE_PYPI_JSON_SQL = """
+    CREATE TABLE IF NOT EXISTS PyPiJson (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL,
+        data TEXT
+    );
+"""
+
+
+def _reduce_pypi_json(data: dict) -> dict:
+    """
+    Provides a dict with the same structure of the json from
+    `/pypi/<name>/json` but only with the information we actually use.
+    """
+    info = data.get("info")
+    if isinstance(info, dict):
+        info = dict((key, info.get(key)) for key in _INFO_KEYS)
+
+    releases = data.get("releases")
+    if isinstance(releases, dict):
+        new_releases = {}
+        for version_str, release_info in releases.items():
+            upload_time = None
+            if isinstance(release_info, list):
+                for dct in release_info:
+                    if isinstance(dct, dict):
+                        upload_time = dct.get("upload_time")
+                        if upload_time:
+                            break
+            new_releases[version_str] = (
+                [{"upload_time": upload_time}] if upload_time else []
+            )
+        releases = new_releases
+
+    return {"info": info, "releases": releases}
+
+
+@dataclass
+class _CachedJson:
+    data: dict
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class _PyPiDiskCache:
+    """
+    Keeps the (reduced) json from `/pypi/<name>/json` in a sqlite db along
+    with the information needed to revalidate it (etag/last-modified).
+    """
+
+    def __init__(self, sqlite_file: Path) -> None:
+        self._sqlite_file = sqlite_file
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        import sqlite3
+
+        with self._lock:
+            if not self._initialized:
+                self._sqlite_file.parent.mkdir(parents=True, exist_ok=True)
+                db_connection = sqlite3.connect(self._sqlite_file, timeout=30)
+                try:
+                    db_connection.execute(TABLE_PYPI_JSON_SQL)
+                    db_connection.commit()
+                finally:
+                    db_connection.close()
+                self._initialized = True
+
+        db_connection = sqlite3.connect(self._sqlite_file, timeout=30)
+        try:
+            yield db_connection
+        finally:
+            db_connection.close()
+
+    def load(self, url: str) -> _CachedJson | None:
+        try:
+            with self._connection() as db_connection:
+                row = db_connection.execute(
+                    "SELECT data, etag, last_modified, fetched_at FROM PyPiJson WHERE url = ?",
+                    (url,),
+                ).fetchone()
+        except Exception as e:
+            log.info(f"Unable to load pypi info from cache: {url}. Error: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        data, etag, last_modified, fetched_at = row
+        try:
+            return _CachedJson(json.loads(data), etag, last_modified, fetched_at)
+        except Exception:
+            return None
+
+    def store(self, url: str, cached: _CachedJson) -> None:
+        try:
+            with self._connection() as db_connection:
+                db_connection.execute(
+                    "INSERT OR REPLACE INTO PyPiJson (url, etag, last_modified, fetched_at, data) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        url,
+                        cached.etag,
+                        cached.last_modified,
+                        cached.fetched_at,
+                        json.dumps(cached.data),
+                    ),
+                )
+                db_connection.commit()
+        except Exception as e:
+            log.info(f"Unable to store pypi info in cache: {url}. Error: {e}")
+
+    def touch(self, url: str, fetched_at: float) -> None:
+        try:
+            with self._connection() as db_connection:
+                db_connection.execute(
+                    "UPDATE PyPiJson SET fetched_at = ? WHERE url = ?",
+                    (fetched_at, url),
+                )
+                db_connection.commit()
+        except Exception as e:
+            log.info(f"Unable to update pypi info in cache: {url}. Error: {e}")
+
+
 class PyPiCloud:
     def __init__(
-        self, get_base_urls_weak_method: weakref.WeakMethod | None = None
+        self,
+        get_base_urls_weak_method: weakref.WeakMethod | None = None,
+        cache_dir: Path | None = None,
+        ttl_in_seconds: float = DEFAULT_TTL_IN_SECONDS,
+        max_cached_packages: int = DEFAULT_MAX_CACHED_PACKAGES,
     ) -> None:
-        self._cached_package_data: dict[str, PackageData] = {}
-        self._cached_cloud: dict[str, PackageData] = {}
-        self._last_base_urls: Sequence[str] = ()
+        """
+        Args:
+            cache_dir: If given the information from pypi is cached in this
+                directory (and revalidated with the server after the ttl).
+            ttl_in_seconds: The time for which the cached information is
+                used without checking with the server.
+            max_cached_packages: The max number of packages for which the
+                information is kept in memory.
+        """
+        self._lock = threading.Lock()
+        # The package data is kept along with the json it was created from
+        # (it's created again if that json is fetched again).
+        self._cached_package_data: OrderedDict[
+            tuple[Sequence[str], str], tuple[dict, PackageData]
+        ] = OrderedDict()
+        self._cached_cloud: OrderedDict[str, _CachedJson] = OrderedDict()
+        self._max_cached_packages = max_cached_packages
+        self._ttl_in_seconds = ttl_in_seconds
+        self._disk_cache: _PyPiDiskCache | None = None
+        if cache_dir is not None:
+            self._disk_cache = _PyPiDiskCache(cache_dir / "pypi_json.db")
 
         if get_base_urls_weak_method is None:
             # use pypi.org
@@ -114,58 +289,113 @@ class PyPiCloud:
         else:
             self.get_base_urls_weak_method = get_base_urls_weak_method
 
-    def _get_json_from_cloud(self, url: str) -> dict | None:
-        try:
-            return typing.cast(dict, self._cached_cloud[url])
-        except KeyError:
-            pass
+    def _put_in_memory_cache(self, cache: OrderedDict, key, value) -> None:
+        # Note: must be called with the lock held.
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self._max_cached_packages:
+            cache.popitem(last=False)
+
+    def _load_cached_json(self, url: str) -> _CachedJson | None:
+        with self._lock:
+            cached = self._cached_cloud.get(url)
+            if cached is not None:
+                self._cached_cloud.move_to_end(url)
+        if cached is None and self._disk_cache is not None:
+            cached = self._disk_cache.load(url)
+            if cached is not None:
+                with self._lock:
+                    self._put_in_memory_cache(self._cached_cloud, url, cached)
+        return cached
+
+    def _store_cached_json(self, url: str, cached: _CachedJson) -> None:
+        with self._lock:
+            self._put_in_memory_cache(self._cached_cloud, url, cached)
+        if self._disk_cache is not None:
+            self._disk_cache.store(url, cached)
 
-        import json
+    def _get_json_from_cloud(self, url: str) -> dict | None:
+        import urllib.error
         import urllib.request
 
+        cached = self._load_cached_json(url)
+        now = time.time()
+        if cached is not None and now - cached.fetched_at < self._ttl_in_seconds:
+            return cached.data
+
+        headers = {"User-Agent": "Mozilla"}
+        if cached is not None:
+            # Conditional request: if it wasn't changed the server answers
+            # with a 304 without the contents.
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
         try:
-            request = urllib.request.urlopen(
-                urllib.request.Request(url, headers={"User-Agent": "Mozilla"})
-            )
-            if request.status == 200:
-                with request:
-                    data = request.read().decode("utf-8", "replace")
-                self._cached_cloud[url] = json.loads(data)
-            else:
-                log.info(
-                    f"Unable to get url (as json): {url}. Status code: {request.status}"
+            try:
+                request = urllib.request.urlopen(
+                    urllib.request.Request(url, headers=headers)
+                )
+            except urllib.error.HTTPError as e:
+                if e.code == 304 and cached is not None:
+                    cached.fetched_at = now
+                    if self._disk_cache is not None:
+                        self._disk_cache.touch(url, now)
+                    return cached.data
+                raise
+
+            with request:
+                if request.status == 304 and cached is not None:
+                    cached.fetched_at = now
+                    if self._disk_cache is not None:
+                        self._disk_cache.touch(url, now)
+                    return cached.data
+
+                if request.status != 200:
+                    log.info(
+                        f"Unable to get url (as json): {url}. Status code: {request.status}"
+                    )
+                    return cached.data if cached is not None else None
+
+                data = request.read().decode("utf-8", "replace")
+                new_cached = _CachedJson(
+                    _reduce_pypi_json(json.loads(data)),
+                    request.headers.get("ETag"),
+                    request.headers.get("Last-Modified"),
+                    now,
                 )
-                return None
         except Exception as e:
             log.info(f"Unable to get url (as json): {url}. Error: {e}")
-            return None
+            # If offline, use what we have (even if old).
+            return cached.data if cached is not None else None
 
-        return typing.cast(dict, self._cached_cloud[url])
+        self._store_cached_json(url, new_cached)
+        return new_cached.data
 
     def get_package_data(self, package_name: str) -> PackageData | None:
         get_base_urls = self.get_base_urls_weak_method()
         if get_base_urls is None:
             return None
 
-        base_urls = get_base_urls()
-        if base_urls != self._last_base_urls:
-            # We need to clear packages if urls changed.
-            self._last_base_urls = base_urls
-            self._cached_package_data.clear()
-            self._cached_cloud.clear()
-
-        try:
-            return self._cached_package_data[package_name]
-        except KeyError:
-            pass
+        base_urls = tuple(get_base_urls())
+        key = (base_urls, package_name)
 
         for base_url in base_urls:
             if base_url.endswith("/"):
                 base_url = base_url[:-1]
+            # Note: while in the ttl this is just a lookup in the memory (and
+            # the same json is returned if it was revalidated with the server).
             data = self._get_json_from_cloud(f"{base_url}/pypi/{package_name}/json")
             if not data:
                 continue  # go to the next url
 
+            with self._lock:
+                found = self._cached_package_data.get(key)
+                if found is not None and found[0] is data:
+                    self._cached_package_data.move_to_end(key)
+                    return found[1]
+
             try:
                 releases = data["releases"]
             except KeyError:
@@ -181,12 +411,39 @@ class PyPiCloud:
                 for release_number, release_info in releases.items():
                     package_data.add_release(release_number, release_info)
 
-            self._cached_package_data[package_name] = package_data
-            return self._cached_package_data[package_name]
+            with self._lock:
+                self._put_in_memory_cache(
+                    self._cached_package_data, key, (data, package_data)
+                )
+            return package_data
 
         # If there was no match, return.
         return None
 
+    def prefetch(self, package_names: Iterable[str], max_workers: int = 8) -> None:
+        """
+        Loads the information on the given packages concurrently (so that
+        subsequent calls for those packages are answered from the cache).
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        package_names = list(dict.fromkeys(package_names))
+        if len(package_names) <= 1:
+            return
+
+        def load(package_name: str) -> None:
+            try:
+                self.get_package_data(package_name)
+            except Exception:
+                log.exception(f"Error prefetching pypi info for: {package_name}")
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(package_names)),
+            thread_name_prefix="PyPiCloud prefetch",
+        ) as executor:
+            for _ in executor.map(load, package_names):
+                pass
+
     def get_versions_newer_than(
         self, package_name: str, version: Versions | VersionStr
     ) -> list[VersionStr]:
@@ -0,0 +1,124 @@
+import time
+import zipfile
+from pathlib import Path
+
+
+def _create_zipped_action_package(zip_path: Path, name: str, version: str) -> None:
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(zip_path, "w") as zip_file:
+        zip_file.writestr("package.yaml", f"name: {name}\nversion: {version}\n")
+
+
+def _create_agent(agent_root_dir: Path, n_zips: int) -> None:
+    actions_dir = agent_root_dir / "actions" / "MyActions"
+    package_dir = actions_dir / "folder-package"
+    package_dir.mkdir(parents=True)
+    (package_dir / "package.yaml").write_text("name: Folder Package\nversion: 1.0.0\n")
+    for i in range(n_zips):
+        _create_zipped_action_package(
+            actions_dir / f"zipped-{i}" / "0.0.1.zip", f"Zipped {i}", "0.0.1"
+        )
+
+
+def test_action_packages_inventory(tmp_path, monkeypatch) -> None:
+    from sema4ai_ls_core.basic import wait_for_condition
+
+    from sema4ai_code.agents import list_actions_from_agent
+    from sema4ai_code.agents.list_actions_from_agent import (
+        clear_action_packages_inventories,
+        get_action_packages_inventory,
+    )
+
+    zips_opened: list[Path] = []
+    original = list_actions_from_agent.get_package_yaml_from_zip
+
+    def get_package_yaml_from_zip(zip_path):
+        zips_opened.append(zip_path)
+        return original(zip_path)
+
+    monkeypatch.setattr(
+        list_actions_from_agent, "get_package_yaml_from_zip", get_package_yaml_from_zip
+    )
+
+    agent_root_dir = tmp_path / "agent"
+    _create_agent(agent_root_dir, 2)
+
+    try:
+        inventory = get_action_packages_inventory(agent_root_dir)
+        assert get_action_packages_inventory(agent_root_dir) is inventory
+
+        found = inventory.list_action_packages()
+        assert sorted(str(p.get_name()) for p in found.values()) == [
+            "Folder Package",
+            "Zipped 0",
+            "Zipped 1",
+        ]
+        assert len(zips_opened) == 2
+
+        # The referenced flag is not shared among requests.
+        for action_package in found.values():
+            action_package.referenced_from_agent_spec = True
+        found = inventory.list_action_packages()
+        assert not any(p.referenced_from_agent_spec for p in found.values())
+        assert len(zips_opened) == 2
+
+        # A new zip is noticed through the file-watch (and only the new
+        # zip is opened).
+        _create_zipped_action_package(
+            agent_root_dir / "actions" / "MyActions" / "zipped-2" / "0.0.1.zip",
+            "Zipped 2",
+            "0.0.1",
+        )
+
+        def check_new_zip_found():
+            return len(inventory.list_action_packages()) == 4
+
+        wait_for_condition(check_new_zip_found)
+        assert len(zips_opened) == 3
+
+        # Changing the zip contents (size/mtime) opens it again.
+        _create_zipped_action_package(
+            agent_root_dir / "actions" / "MyActions" / "zipped-2" / "0.0.1.zip",
+            "Zipped 2",
+            "0.0.22",
+        )
+
+        def check_new_version_found():
+            return "0.0.22" in [
+                p.get_version() for p in inventory.list_action_packages().values()
+            ]
+
+        wait_for_condition(check_new_version_found)
+    finally:
+        clear_action_packages_inventories()
+
+
+def test_benchmark_action_packages_inventory(tmp_path) -> None:
+    from sema4ai_code.agents.list_actions_from_agent import (
+        clear_action_packages_inventories,
+        get_action_packages_inventory,
+        list_actions_from_agent,
+    )
+
+    agent_root_dir = tmp_path / "agent"
+    _create_agent(agent_root_dir, 50)
+
+    n_requests = 100
+    try:
+        inventory = get_action_packages_inventory(agent_root_dir)
+        initial_time = time.perf_counter()
+        for _i in range(n_requests):
+            assert len(inventory.list_action_packages()) == 51
+        inventory_time = time.perf_counter() - initial_time
+    finally:
+        clear_action_packages_inventories()
+
+    initial_time = time.perf_counter()
+    for _i in range(n_requests):
+        assert len(list_actions_from_agent(agent_root_dir)) == 51
+    listing_time = time.perf_counter() - initial_time
+
+    print(
+        f"{n_requests} requests with 51 action packages: "
+        f"inventory: {inventory_time:.3f}s (listing: {listing_time:.3f}s)"
+    )
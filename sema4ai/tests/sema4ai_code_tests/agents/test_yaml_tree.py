@@ -0,0 +1,165 @@
+import random
+import time
+
+import pytest
+
+_AGENT_SPEC = """\
+agent-package:
+  spec-version: v2
+  agents:
+  - name: New Agent ✨
+    description: "Agent \\"description\\""
+    model:
+      provider: OpenAI
+      name: gpt-4o
+    version: 0.0.1
+    architecture: agent
+    reasoning: disabled
+    runbook: runbook.md
+    action-packages:
+    - name: &name Control Room Test
+      organization: MyActions
+      type: folder
+      version: 0.0.1
+      whitelist: ''
+      path: MyActions/control-room-test
+    - name: *name
+      version: 1.0
+      enabled: yes
+    knowledge: []
+    metadata:
+      mode: conversational
+      description: >
+        Some folded
+        description.
+"""
+
+
+def _to_comparable(obj):
+    if isinstance(obj, dict):
+        return (
+            type(obj).__name__,
+            obj.location[:2],
+            [(_to_comparable(k), _to_comparable(v)) for k, v in obj.items()],
+        )
+    if isinstance(obj, list):
+        return [_to_comparable(x) for x in obj]
+    return (type(obj).__name__, obj, getattr(obj, "location", None))
+
+
+def test_tree_to_python_matches_loader_with_lines() -> None:
+    from sema4ai_code.agents.yaml_tree import parse_yaml, tree_to_python
+    from sema4ai_code.vendored_deps.yaml_with_location import LoaderWithLines
+
+    expected = LoaderWithLines(_AGENT_SPEC).get_single_data()
+    found = tree_to_python(parse_yaml(_AGENT_SPEC), _AGENT_SPEC)
+    assert _to_comparable(found) == _to_comparable(expected)
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "a: |\n  x\nb: 1",
+        "a: |+\n  x\n\nb: 1",
+        "a: |-\n  x\nb: 1",
+        "a: |\n  x\n\n\nb: 1\n",
+        "a: |+\n  x\n  \n\n# comment\nb: 1\n",
+        "a: >\n  x\n  y\nb: 1",
+        "a: >+\n  x\n\nb: 1",
+        "a: |\r\n  x\r\n\r\nb: 1\r\n",
+        "l:\n- |\n  x\n- >+\n  y\n\n- 2\n",
+        "l:\n- |\n  x\n",
+        "agents:\n- name: a\n  description: |\n    Some\n    description\n  version: 1\n",
+    ],
+)
+def test_tree_to_python_block_scalars(contents: str) -> None:
+    from sema4ai_code.agents.yaml_tree import parse_yaml, tree_to_python
+    from sema4ai_code.vendored_deps.yaml_with_location import LoaderWithLines
+
+    expected = LoaderWithLines(contents).get_single_data()
+    found = tree_to_python(parse_yaml(contents), contents)
+    assert found == expected
+    assert _to_comparable(found) == _to_comparable(expected)
+
+
+def test_tree_to_python_unsupported() -> None:
+    import pytest
+
+    from sema4ai_code.agents.yaml_tree import (
+        UnsupportedYamlTree,
+        parse_yaml,
+        tree_to_python,
+    )
+
+    for contents in (
+        "a: [",
+        "a: !!str 1",
+        "a: 1\n---\nb: 2\n",
+        "a: *undefined",
+        "base: &b {a: 1}\nother: {<<: *b}",
+        "base: &b\n  a: 1\nother:\n  <<: *b\n  c: 2\n",
+        "a: =",
+    ):
+        with pytest.raises(UnsupportedYamlTree):
+            tree_to_python(parse_yaml(contents), contents)
+
+
+def test_parse_yaml_incremental() -> None:
+    from sema4ai_code.agents.yaml_tree import _tree_cache, parse_yaml
+
+    rnd = random.Random(0)
+    pieces = ["a", ": ", "\n", "  ", "- ", "'", "é", "#", "x: 1\n", "[", "]"]
+    cache_key = "test_parse_yaml_incremental"
+
+    contents = _AGENT_SPEC
+    try:
+        tree = parse_yaml(contents, cache_key)
+        assert parse_yaml(contents, cache_key) is tree
+
+        for _ in range(200):
+            start = rnd.randint(0, len(contents))
+            end = rnd.randint(start, min(len(contents), start + 10))
+            text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 3)))
+            contents = contents[:start] + text + contents[end:]
+
+            tree = parse_yaml(contents, cache_key)
+            expected = parse_yaml(contents)
+            assert str(tree.root_node) == str(expected.root_node)
+            assert tree.root_node.start_byte == expected.root_node.start_byte
+            assert tree.root_node.end_byte == expected.root_node.end_byte
+    finally:
+        _tree_cache.clear()
+
+
+def test_benchmark_parse_yaml_incremental() -> None:
+    from sema4ai_code.agents.yaml_tree import _tree_cache, parse_yaml
+
+    # Big spec (many agents) with a small edit in the middle at each step.
+    contents = _AGENT_SPEC + "".join(
+        _AGENT_SPEC.split("  agents:\n", 1)[1].replace("New Agent", f"Agent {i}")
+        for i in range(300)
+    )
+    middle = contents.index("name: Agent 150")
+    cache_key = "test_benchmark_parse_yaml_incremental"
+
+    n_edits = 100
+    try:
+        parse_yaml(contents, cache_key)
+        initial_time = time.perf_counter()
+        for i in range(n_edits):
+            contents = contents[:middle] + "x" + contents[middle:]
+            parse_yaml(contents, cache_key)
+        incremental_time = time.perf_counter() - initial_time
+    finally:
+        _tree_cache.clear()
+
+    initial_time = time.perf_counter()
+    for i in range(n_edits):
+        contents = contents[:middle] + "x" + contents[middle:]
+        parse_yaml(contents)
+    full_time = time.perf_counter() - initial_time
+
+    print(
+        f"{n_edits} edits in a yaml with {len(contents) // 1024} KB: "
+        f"incremental: {incremental_time:.3f}s (full parse: {full_time:.3f}s)"
+    )
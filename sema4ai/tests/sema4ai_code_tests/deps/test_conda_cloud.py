@@ -1,8 +1,13 @@
+import json
 import os
 import threading
+from collections.abc import Iterator
 from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
+import pytest
+
 
 def test_conda_cloud_index(datadir, data_regression):
     from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
@@ -50,9 +55,82 @@ def test_conda_cloud_index(datadir, data_regression):
             infos.append(dct)
 
         data_regression.check(infos)
+    sqlite_helper.close()
     os.remove(target_sqlite)
 
 
+def test_conda_cloud_query_versions_many(datadir) -> None:
+    from sema4ai_ls_core.basic import wait_for_condition
+
+    from sema4ai_code.vendored_deps.package_deps import conda_cloud
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
+        SqliteQueries,
+        index_conda_info,
+        sort_conda_versions,
+    )
+
+    target_sqlite = datadir / "sqlite.db"
+    index_conda_info(datadir / "noarch-testdata.json", target_sqlite)
+    sqlite_queries = SqliteQueries(target_sqlite, max_cached_packages=5)
+    try:
+        names = sorted(sqlite_queries.query_names())
+        # More names than the max batch size (also with names not found).
+        query_names = names + ["not-there"]
+        name_to_versions = sqlite_queries.query_versions_many(query_names)
+        assert len(name_to_versions) == len(query_names)
+        assert name_to_versions["not-there"] == set()
+        for name in names[:30]:
+            assert name_to_versions[name] == sqlite_queries.query_versions(name)
+        assert name_to_versions["aadict"] == {"0.2.3", "0.2.5"}
+
+        name_to_sorted = sqlite_queries.query_sorted_versions_many(names[:10])
+        for name, sorted_versions in name_to_sorted.items():
+            assert sorted_versions == sort_conda_versions(name_to_versions[name])
+        assert len(sqlite_queries._sorted_versions_cache) == 5
+
+        # Cached: no new query is done.
+        expected = name_to_sorted[names[9]]
+        original = sqlite_queries._query_sorted_versions_in_db
+        sqlite_queries._query_sorted_versions_in_db = None  # type: ignore
+        try:
+            assert sqlite_queries.query_sorted_versions(names[9]) == expected
+        finally:
+            sqlite_queries._query_sorted_versions_in_db = original  # type: ignore
+
+        # Connections are reused in the same thread (and one is created
+        # for each thread).
+        sqlite_queries.query_versions("aadict")
+        assert len(sqlite_queries._all_connections) == 1
+
+        release_thread = threading.Event()
+
+        def query_in_thread():
+            sqlite_queries.query_versions("aadict")
+            release_thread.wait(5)
+
+        t = threading.Thread(target=query_in_thread)
+        t.start()
+        try:
+            wait_for_condition(lambda: len(sqlite_queries._all_connections) == 2)
+        finally:
+            release_thread.set()
+        t.join()
+
+        # The connections of a thread are closed when it exits.
+        wait_for_condition(lambda: len(sqlite_queries._all_connections) == 1)
+
+        assert [len(b) for b in conda_cloud._iter_in_query_batches(["a"] * 300)] == [
+            256,
+            64,
+        ]
+    finally:
+        sqlite_queries.close()
+
+    assert not sqlite_queries._all_connections
+    # Still works after closed (with temporary connections).
+    assert sqlite_queries.query_versions("aadict") == {"0.2.3", "0.2.5"}
+
+
 def _test_check_manual():
     # Manual performance tests with a downloaded file.
     from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
@@ -96,15 +174,17 @@ def test_conda_cloud(datadir) -> None:
 
     original_download = conda_cloud._download
 
-    def create_mock_download() -> Callable[[str, Path, str], tuple[Path, str]]:
+    def create_mock_download() -> Callable[..., tuple[Path, str]]:
         # Just download once. Get from cache afterwards.
         download_cache: dict = {}
 
-        def mock_download(url: str, target_json: Path, arch: str):
+        def mock_download(url: str, target_json: Path, arch: str, cache_headers=None):
             try:
                 contents = download_cache[url]
             except KeyError:
-                target_json, arch = original_download(url, target_json, arch)
+                downloaded, arch = original_download(url, target_json, arch)
+                assert downloaded
+                target_json = downloaded
 
                 # Save in the cache.
                 with target_json.open("rb") as stream:
@@ -177,3 +257,382 @@ def test_conda_cloud(datadir) -> None:
     # was downloaded already.
     conda_cloud = CondaCloud(cache_dir, reindex_if_old=True)
     assert conda_cloud._state == State.done
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024 * 1024])
+def test_json_stream_reader(datadir, chunk_size) -> None:
+    from sema4ai_code.vendored_deps.package_deps._json_stream import (
+        JsonStreamReader,
+    )
+
+    json_file = datadir / "noarch-testdata.json"
+    expected = json.loads(json_file.read_text(encoding="utf-8"))
+
+    found: dict = {}
+    with json_file.open("r", encoding="utf-8") as stream:
+        reader = JsonStreamReader(stream, chunk_size=chunk_size)
+        for key in reader.iter_object_keys():
+            if key == "packages":
+                packages = found[key] = {}
+                for filename in reader.iter_object_keys():
+                    packages[filename] = reader.decode_value()
+            else:
+                found[key] = reader.decode_value()
+    assert found == expected
+
+
+def test_conda_cloud_index_entry_without_depends(tmp_path) -> None:
+    import msgspec
+
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
+        SqliteQueries,
+        index_conda_info,
+    )
+
+    repodata = {
+        "info": {"subdir": "noarch"},
+        "packages": {
+            "no-depends-1.0-0.tar.bz2": {
+                "name": "no-depends",
+                "version": "1.0",
+                "build": "0",
+            }
+        },
+    }
+    json_file = tmp_path / "noarch.json"
+    json_file.write_text(json.dumps(repodata), encoding="utf-8")
+    sqlite_file = tmp_path / "noarch.db"
+    index_conda_info(json_file, sqlite_file)
+
+    sqlite_queries = SqliteQueries(sqlite_file)
+    try:
+        info = sqlite_queries.query_version_info("no-depends", "1.0")
+        build_and_depends = info.subdir_to_build_and_depends_json_bytes["noarch"]
+        assert [msgspec.json.decode(depends) for _, depends in build_and_depends] == [
+            []
+        ]
+    finally:
+        sqlite_queries.close()
+
+
+def test_conda_cloud_latest_versions(datadir, tmp_path) -> None:
+    import shutil
+
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
+        SqliteQueries,
+        index_conda_info,
+        sort_conda_versions,
+    )
+
+    sqlite_file = tmp_path / "noarch.db"
+    index_conda_info(datadir / "noarch-testdata.json", sqlite_file)
+
+    def check(sqlite_queries: SqliteQueries, names: set[str]) -> None:
+        name_to_versions = sqlite_queries.query_versions_many(names)
+        name_to_latest = sqlite_queries.query_latest_versions_many(names)
+        expected_latest = {}
+        for name, versions in name_to_versions.items():
+            if versions:
+                expected_latest[name] = sort_conda_versions(versions)[-1]
+        assert name_to_latest == expected_latest
+
+        name_to_sorted = sqlite_queries.query_sorted_versions_many(names)
+        for name, versions in name_to_versions.items():
+            assert name_to_sorted[name] == sort_conda_versions(versions)
+
+    sqlite_queries = SqliteQueries(sqlite_file)
+    names = sqlite_queries.query_names()
+    assert sqlite_queries.query_latest_versions_many(["aadict"]) == {"aadict": "0.2.5"}
+    assert sqlite_queries._has_version_ranks == [True]
+    check(sqlite_queries, names)
+    sqlite_queries.close()
+
+    # Multiple indexes (with different versions in each one).
+    other_sqlite_file = tmp_path / "other.db"
+    repodata = json.loads((datadir / "noarch-testdata.json").read_text("utf-8"))
+    repodata["packages"]["aadict-0.3.0-0.tar.bz2"] = {
+        "name": "aadict",
+        "version": "0.3.0",
+        "depends": [],
+    }
+    repodata["packages"]["aadict-0.3.1_rc1-0.tar.bz2"] = {
+        "name": "aadict",
+        "version": "0.3.1_rc1",
+        "depends": [],
+    }
+    other_json = tmp_path / "other.json"
+    other_json.write_text(json.dumps(repodata), encoding="utf-8")
+    index_conda_info(other_json, other_sqlite_file)
+
+    sqlite_queries = SqliteQueries([sqlite_file, other_sqlite_file])
+    check(sqlite_queries, names)
+    assert sqlite_queries.query_latest_versions_many(["aadict"]) == {"aadict": "0.3.0"}
+    sqlite_queries.close()
+
+    # Indexes without the ranks (the versions are sorted in python).
+    resources = Path(__file__).parent.parent / "_resources"
+    old_index = resources / "conda-forge cache" / ".conda_indexes" / "index_0001"
+    shutil.copyfile(old_index / "win-64.db", tmp_path / "old.db")
+    sqlite_queries = SqliteQueries([tmp_path / "old.db", sqlite_file])
+    assert sqlite_queries.query_latest_versions_many(["numpy", "not-there"]) == {
+        "numpy": "1.25.2"
+    }
+    assert sqlite_queries._has_version_ranks == [False, True]
+    check(sqlite_queries, {"numpy", "python", "aadict"})
+    sqlite_queries.close()
+
+
+def _query_all(sqlite_file: Path) -> dict:
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import SqliteQueries
+
+    sqlite_queries = SqliteQueries(sqlite_file)
+    ret = {}
+    with sqlite_queries.db_cursors() as db_cursors:
+        for name in sqlite_queries.query_names(db_cursors=db_cursors):
+            for version in sqlite_queries.query_versions(name, db_cursors=db_cursors):
+                info = sqlite_queries.query_version_info(
+                    name, version, db_cursors=db_cursors
+                )
+                ret[(name, version)] = (
+                    info.timestamp,
+                    {
+                        subdir: sorted(lst)
+                        for subdir, lst in info.subdir_to_build_and_depends_json_bytes.items()
+                    },
+                )
+    sqlite_queries.close()
+    return ret
+
+
+def _modify_repodata(repodata: dict) -> dict:
+    packages = repodata["packages"]
+    filenames = sorted(packages)
+
+    # Remove some entries (including all the ones from "aadict").
+    for filename in filenames[:10]:
+        del packages[filename]
+    for filename in filenames:
+        if packages.get(filename, {}).get("name") == "aadict":
+            del packages[filename]
+
+    # Change an entry.
+    packages[filenames[20]]["depends"] = ["python >=3.10"]
+
+    # Add new entries.
+    packages["new-package-1.0-0.tar.bz2"] = {
+        "name": "new-package",
+        "version": "1.0",
+        "build": "0",
+        "depends": ["python"],
+        "timestamp": 1,
+    }
+    repodata["packages.conda"] = {
+        "new-package-2.0-0.conda": {
+            "name": "new-package",
+            "version": "2.0",
+            "build": "0",
+            "depends": [],
+            "subdir": "noarch",
+        }
+    }
+    return repodata
+
+
+def test_conda_cloud_index_incremental(datadir, tmp_path) -> None:
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import (
+        index_conda_info,
+        load_index_cache_headers,
+    )
+
+    json_file = datadir / "noarch-testdata.json"
+    incremental_sqlite = tmp_path / "incremental.db"
+    stats = index_conda_info(json_file, incremental_sqlite, {"etag": '"v1"'})
+    assert stats["inserted"] == 476
+    assert load_index_cache_headers(incremental_sqlite) == {"etag": '"v1"'}
+
+    stats = index_conda_info(json_file, incremental_sqlite)
+    assert stats == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 476}
+    assert load_index_cache_headers(incremental_sqlite) == {}
+
+    modified_json = tmp_path / "modified.json"
+    modified_json.write_text(
+        json.dumps(_modify_repodata(json.loads(json_file.read_text("utf-8")))),
+        encoding="utf-8",
+    )
+    stats = index_conda_info(modified_json, incremental_sqlite)
+    assert stats["inserted"] == 2
+    assert stats["updated"] == 1
+    assert stats["deleted"] >= 10
+
+    full_sqlite = tmp_path / "full.db"
+    index_conda_info(modified_json, full_sqlite)
+    incremental = _query_all(incremental_sqlite)
+    assert incremental == _query_all(full_sqlite)
+
+    # The version ranks/latest versions must also match.
+    def query_ranks(sqlite_file: Path) -> set:
+        import sqlite3
+
+        db_connection = sqlite3.connect(sqlite_file)
+        try:
+            return set(
+                db_connection.execute(
+                    "SELECT package_name, version, version_rank FROM Packages "
+                    "INNER JOIN Versions ON Packages.package_id = Versions.package_id"
+                ).fetchall()
+            ) | set(
+                db_connection.execute(
+                    "SELECT package_name, version, -1 FROM Packages "
+                    "INNER JOIN LatestVersions ON Packages.package_id = LatestVersions.package_id"
+                ).fetchall()
+            )
+        finally:
+            db_connection.close()
+
+    assert query_ranks(incremental_sqlite) == query_ranks(full_sqlite)
+    assert ("new-package", "2.0") in incremental
+    assert not any(name == "aadict" for (name, _version) in incremental)
+
+
+def test_conda_cloud_index_old_schema(datadir, tmp_path) -> None:
+    import sqlite3
+
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import index_conda_info
+
+    # An index with the old schema (without the filename/hash) is recreated.
+    sqlite_file = tmp_path / "old.db"
+    db_connection = sqlite3.connect(sqlite_file)
+    db_connection.execute(
+        "CREATE TABLE Packages (package_id INTEGER PRIMARY KEY, package_name TEXT UNIQUE)"
+    )
+    db_connection.execute(
+        "CREATE TABLE Versions (version_id INTEGER PRIMARY KEY, package_id INTEGER, depends TEXT, timestamp INTEGER, version TEXT, subdir TEXT, build TEXT)"
+    )
+    db_connection.commit()
+    db_connection.close()
+
+    stats = index_conda_info(datadir / "noarch-testdata.json", sqlite_file)
+    assert stats["inserted"] == 476
+    assert len(set(name for name, _ in _query_all(sqlite_file))) == 292
+
+
+class _RepodataStandIn:
+    def __init__(self, contents: bytes) -> None:
+        self.contents = contents
+        self.etag = '"v1"'
+        self.requests: list[str | None] = []
+        self.server: ThreadingHTTPServer | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self.server is not None
+        port = self.server.server_address[1]
+        return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def repodata_stand_in(datadir) -> Iterator[_RepodataStandIn]:
+    stand_in = _RepodataStandIn((datadir / "noarch-testdata.json").read_bytes())
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if_none_match = self.headers.get("If-None-Match")
+            stand_in.requests.append(if_none_match)
+            if if_none_match == stand_in.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("ETag", stand_in.etag)
+            self.send_header("Content-Length", str(len(stand_in.contents)))
+            self.end_headers()
+            self.wfile.write(stand_in.contents)
+
+        def log_message(self, *args):
+            pass
+
+    server = stand_in.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield stand_in
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_conda_cloud_conditional_update(
+    repodata_stand_in: _RepodataStandIn, tmp_path
+) -> None:
+    from sema4ai_code.vendored_deps.package_deps.conda_cloud import CondaCloud
+
+    def create_conda_cloud():
+        conda_cloud = CondaCloud(tmp_path / "cache", reindex_if_old=True)
+        conda_cloud._base_url = repodata_stand_in.base_url
+        conda_cloud._available_arch = ["noarch"]
+        return conda_cloud
+
+    def get_index_file(conda_cloud) -> Path:
+        index_files = list(conda_cloud._iter_index_files())
+        assert len(index_files) == 1
+        return index_files[0]
+
+    conda_cloud = create_conda_cloud()
+    conda_cloud.schedule_update(wait=True)
+    assert repodata_stand_in.requests == [None]
+    initial = _query_all(get_index_file(conda_cloud))
+    assert len(initial) > 300
+
+    # The same queries are reused while the index doesn't change.
+    first_conda_cloud = conda_cloud
+    sqlite_queries = first_conda_cloud.sqlite_queries()
+    assert sqlite_queries is not None
+    assert sqlite_queries is first_conda_cloud.sqlite_queries()
+    assert sqlite_queries.query_sorted_versions("aadict") == ["0.2.3", "0.2.5"]
+
+    # Not modified: the previous index is reused.
+    conda_cloud = create_conda_cloud()
+    conda_cloud.schedule_update(wait=True, force=True)
+    assert repodata_stand_in.requests[-1] == '"v1"'
+    index_file = get_index_file(conda_cloud)
+    assert index_file.parent.name == "index_0002"
+    assert _query_all(index_file) == initial
+
+    # Modified: the previous index is updated.
+    repodata_stand_in.etag = '"v2"'
+    repodata_stand_in.contents = json.dumps(
+        _modify_repodata(json.loads(repodata_stand_in.contents))
+    ).encode("utf-8")
+    conda_cloud = create_conda_cloud()
+    conda_cloud.schedule_update(wait=True, force=True)
+    index_file = get_index_file(conda_cloud)
+    assert index_file.parent.name == "index_0003"
+    modified = _query_all(index_file)
+    assert ("new-package", "2.0") in modified
+    assert modified != initial
+
+    # The index changed: new queries are provided (and the old ones closed).
+    new_sqlite_queries = first_conda_cloud.sqlite_queries()
+    assert new_sqlite_queries is not None
+    assert new_sqlite_queries is not sqlite_queries
+    assert sqlite_queries._closed
+    assert new_sqlite_queries.query_sorted_versions("aadict") == []
+    assert new_sqlite_queries.query_sorted_versions("new-package") == ["1.0", "2.0"]
+    new_sqlite_queries.close()
+
+    # When the directory of an old index is removed the queries to it are
+    # closed first.
+    sqlite_queries = conda_cloud.sqlite_queries()
+    assert sqlite_queries is not None
+    assert sqlite_queries.query_sorted_versions("aadict") == []
+    conda_cloud.schedule_update(wait=True, force=True)
+    assert not sqlite_queries._closed
+    assert index_file.parent.exists()
+    conda_cloud.schedule_update(wait=True, force=True)
+    assert sqlite_queries._closed
+    assert not sqlite_queries._all_connections
+    assert not index_file.parent.exists()
+
+    # The json is removed after being indexed.
+    assert not list((tmp_path / "cache").glob("tmp_*/*.json"))
@@ -0,0 +1,199 @@
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _PyPiStandIn:
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, str | None]] = []
+        self.lock = threading.Lock()
+        self.etag = '"v1"'
+        # If given, a new release with this version is available.
+        self.new_version: str | None = None
+        self.server: ThreadingHTTPServer | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self.server is not None
+        port = self.server.server_address[1]
+        return f"http://127.0.0.1:{port}"
+
+    def count_requests(self, path: str) -> int:
+        with self.lock:
+            return len([x for x in self.requests if x[0] == path])
+
+
+def _make_pypi_json(package_name: str, new_version: str | None = None) -> dict:
+    ret: dict = {
+        "info": {
+            "version": "1.1",
+            "requires_dist": [],
+            "home_page": f"https://{package_name}.org",
+            "summary": "Not kept in the cache",
+        },
+        "releases": {
+            "1.0": [
+                {"upload_time": "2023-01-01T10:00:00", "size": 10},
+                {"upload_time": "2023-01-01T11:00:00", "size": 20},
+            ],
+            "1.1": [{"upload_time": "2023-02-01T10:00:00"}],
+        },
+    }
+    if new_version:
+        ret["info"]["version"] = new_version
+        ret["releases"][new_version] = [{"upload_time": "2023-03-01T10:00:00"}]
+    return ret
+
+
+@pytest.fixture
+def pypi_stand_in() -> Iterator[_PyPiStandIn]:
+    stand_in = _PyPiStandIn()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if_none_match = self.headers.get("If-None-Match")
+            with stand_in.lock:
+                stand_in.requests.append((self.path, if_none_match))
+
+            parts = self.path.strip("/").split("/")
+            if len(parts) != 3 or parts[0] != "pypi" or parts[1] == "missing":
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            if if_none_match == stand_in.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            contents = json.dumps(
+                _make_pypi_json(parts[1], stand_in.new_version)
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("ETag", stand_in.etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(contents)))
+            self.end_headers()
+            self.wfile.write(contents)
+
+        def log_message(self, *args):
+            pass
+
+    server = stand_in.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield stand_in
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _create_pypi_cloud(
+    stand_in: _PyPiStandIn, cache_dir, ttl_in_seconds: float, **kwargs
+):
+    from sema4ai_code.vendored_deps.package_deps.pypi_cloud import PyPiCloud
+
+    def get_weak():
+        def get_base_urls():
+            return (stand_in.base_url,)
+
+        return get_base_urls
+
+    return PyPiCloud(
+        get_weak,  # type: ignore
+        cache_dir=cache_dir,
+        ttl_in_seconds=ttl_in_seconds,
+        **kwargs,
+    )
+
+
+def test_pypi_cloud_disk_cache(pypi_stand_in: _PyPiStandIn, tmp_path) -> None:
+    path = "/pypi/pkg/json"
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 1000)
+    assert pypi_cloud.get_versions_newer_than("pkg", "1.0") == ["1.1"]
+    package_data = pypi_cloud.get_package_data("pkg")
+    assert package_data is not None
+    assert package_data.info["home_page"] == "https://pkg.org"
+    assert "summary" not in package_data.info
+    release_data = package_data.get_release_data("1.0")
+    assert release_data is not None
+    assert release_data.upload_time == "2023-01-01T10:00:00"
+    assert pypi_stand_in.count_requests(path) == 1
+
+    # New instance (i.e.: new process): gotten from the disk while in the ttl.
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 1000)
+    assert pypi_cloud.get_versions_newer_than("pkg", "1.0") == ["1.1"]
+    assert pypi_stand_in.count_requests(path) == 1
+
+    # After the ttl a conditional request is done (and a 304 is answered).
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 0)
+    assert pypi_cloud.get_versions_newer_than("pkg", "1.0") == ["1.1"]
+    assert pypi_stand_in.requests[-1] == (path, '"v1"')
+    assert pypi_stand_in.count_requests(path) == 2
+
+    # Contents changed in the server.
+    pypi_stand_in.etag = '"v2"'
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 0)
+    assert pypi_cloud.get_versions_newer_than("pkg", "1.0") == ["1.1"]
+    assert pypi_stand_in.count_requests(path) == 3
+
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 0)
+    pypi_cloud.get_package_data("pkg")
+    assert pypi_stand_in.requests[-1] == (path, '"v2"')
+
+    assert pypi_cloud.get_package_data("missing") is None
+
+
+def test_pypi_cloud_prefetch(pypi_stand_in: _PyPiStandIn, tmp_path) -> None:
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 1000)
+    names = [f"pkg{i}" for i in range(10)]
+    pypi_cloud.prefetch(names + ["missing"])
+    assert len(pypi_stand_in.requests) == 11
+
+    for name in names:
+        assert pypi_cloud.get_versions_newer_than(name, "1.0") == ["1.1"]
+    assert len(pypi_stand_in.requests) == 11
+
+
+def test_pypi_cloud_revalidate_same_instance(
+    pypi_stand_in: _PyPiStandIn, tmp_path
+) -> None:
+    path = "/pypi/pkg/json"
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, tmp_path, 0)
+    package_data = pypi_cloud.get_package_data("pkg")
+    assert package_data is not None
+    assert package_data.latest_version == "1.1"
+    assert pypi_stand_in.count_requests(path) == 1
+
+    # Revalidated (304): the package data is reused.
+    assert pypi_cloud.get_package_data("pkg") is package_data
+    assert pypi_stand_in.requests[-1] == (path, '"v1"')
+    assert pypi_stand_in.count_requests(path) == 2
+
+    # Changed in the server: the package data is created again.
+    pypi_stand_in.etag = '"v2"'
+    pypi_stand_in.new_version = "1.2"
+    new_package_data = pypi_cloud.get_package_data("pkg")
+    assert new_package_data is not None
+    assert new_package_data is not package_data
+    assert new_package_data.latest_version == "1.2"
+    assert pypi_cloud.get_versions_newer_than("pkg", "1.0") == ["1.1", "1.2"]
+    assert pypi_stand_in.count_requests(path) == 4
+
+
+def test_pypi_cloud_memory_cache_bounded(pypi_stand_in: _PyPiStandIn) -> None:
+    pypi_cloud = _create_pypi_cloud(pypi_stand_in, None, 1000, max_cached_packages=2)
+    for name in ("pkg1", "pkg2", "pkg1", "pkg3"):
+        assert pypi_cloud.get_package_data(name) is not None
+
+    # pkg2 was the least recently used.
+    assert [key[1] for key in pypi_cloud._cached_package_data] == ["pkg1", "pkg3"]
+    assert len(pypi_cloud._cached_cloud) == 2
+    assert pypi_stand_in.count_requests("/pypi/pkg1/json") == 1
+
+    assert pypi_cloud.get_package_data("pkg2") is not None
+    assert pypi_stand_in.count_requests("/pypi/pkg2/json") == 2
@@ -0,0 +1,111 @@
+import time
+from pathlib import Path
+
+_ACTIONS_CONTENTS = """
+from sema4ai.actions import action
+
+
+@action
+def {name}() -> str:
+    return ""
+"""
+
+
+def _write_action(path: Path, name: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(_ACTIONS_CONTENTS.format(name=name))
+
+
+def _names(entries) -> list[str]:
+    return sorted(entry["name"] for entry in entries)
+
+
+def test_actions_index(tmp_path) -> None:
+    from sema4ai_ls_core.basic import wait_for_condition
+
+    from sema4ai_code.robo import actions_index
+    from sema4ai_code.robo.actions_index import (
+        clear_actions_indexes,
+        get_actions_index,
+    )
+    from sema4ai_code.robo.collect_actions_ast import iter_actions_and_datasources
+
+    _write_action(tmp_path / "my_actions.py", "action1")
+    _write_action(tmp_path / "sub" / "actions.py", "action2")
+    _write_action(tmp_path / "not_matched.py", "not_matched")
+    for ignored in (".venv", "node_modules", "output"):
+        _write_action(tmp_path / ignored / "actions.py", ignored)
+
+    changed: list[Path] = []
+    actions_index.on_actions_changed.register(changed.append)
+    try:
+        index = get_actions_index(tmp_path)
+        assert get_actions_index(tmp_path) is index
+
+        found = index.list_actions_and_datasources(collect_datasources=True)
+        assert _names(found) == ["action1", "action2"]
+        assert _names(found) == _names(
+            iter_actions_and_datasources(tmp_path, collect_datasources=True)
+        )
+
+        # Changing a file is noticed (and the client is notified).
+        _write_action(tmp_path / "my_actions.py", "action1_renamed")
+        wait_for_condition(lambda: changed == [tmp_path])
+        assert _names(index.list_actions_and_datasources(True)) == [
+            "action1_renamed",
+            "action2",
+        ]
+
+        # A new directory is noticed.
+        _write_action(tmp_path / "new_dir" / "other_actions.py", "action3")
+        wait_for_condition(lambda: len(changed) == 2)
+        assert _names(index.list_actions_and_datasources(True)) == [
+            "action1_renamed",
+            "action2",
+            "action3",
+        ]
+
+        # Changes in ignored directories are not noticed.
+        _write_action(tmp_path / ".venv" / "actions.py", "venv_changed")
+        (tmp_path / "sub" / "actions.py").unlink()
+        wait_for_condition(lambda: len(changed) == 3)
+        assert _names(index.list_actions_and_datasources(True)) == [
+            "action1_renamed",
+            "action3",
+        ]
+    finally:
+        actions_index.on_actions_changed.unregister(changed.append)
+        clear_actions_indexes()
+
+
+def test_benchmark_actions_index(tmp_path) -> None:
+    from sema4ai_code.robo.actions_index import (
+        clear_actions_indexes,
+        get_actions_index,
+    )
+    from sema4ai_code.robo.collect_actions_ast import iter_actions_and_datasources
+
+    for i in range(50):
+        _write_action(tmp_path / f"dir_{i}" / "actions.py", f"action_{i}")
+        for j in range(20):
+            _write_action(tmp_path / f"dir_{i}" / f"module_{j}.py", f"func_{j}")
+
+    n_requests = 50
+    try:
+        index = get_actions_index(tmp_path)
+        initial_time = time.perf_counter()
+        for _i in range(n_requests):
+            assert len(index.list_actions_and_datasources(True)) == 50
+        index_time = time.perf_counter() - initial_time
+    finally:
+        clear_actions_indexes()
+
+    initial_time = time.perf_counter()
+    for _i in range(n_requests):
+        assert len(list(iter_actions_and_datasources(tmp_path, True))) == 50
+    listing_time = time.perf_counter() - initial_time
+
+    print(
+        f"{n_requests} requests with 50 action files: "
+        f"index: {index_time:.3f}s (listing: {listing_time:.3f}s)"
+    )
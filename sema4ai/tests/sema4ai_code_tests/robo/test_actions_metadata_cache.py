@@ -0,0 +1,107 @@
+import sys
+
+
+def _create_interpreter_info(environ: dict[str, str] | None = None):
+    from sema4ai_ls_core.ep_resolve_interpreter import DefaultInterpreterInfo
+
+    return DefaultInterpreterInfo("interpreter_id", sys.executable, environ or {}, [])
+
+
+def test_actions_metadata_cache(tmp_path) -> None:
+    from sema4ai_ls_core.protocols import ActionResult
+
+    from sema4ai_code.robo.actions_metadata_cache import ActionsMetadataCache
+
+    package_dir = tmp_path / "package"
+    package_dir.mkdir()
+    (package_dir / "package.yaml").write_text("name: Package\n")
+    (package_dir / "actions.py").write_text("# actions\n")
+    (package_dir / ".venv").mkdir()
+    (package_dir / ".venv" / "lib.py").write_text("# lib\n")
+
+    interpreter_info = _create_interpreter_info()
+    computed: list[int] = []
+
+    def compute() -> ActionResult:
+        computed.append(1)
+        return ActionResult.make_success({"actions": [len(computed)]})
+
+    def get(cache: ActionsMetadataCache) -> dict:
+        result = cache.get_or_compute(
+            "metadata", ("args",), package_dir, interpreter_info, compute
+        )
+        assert result.success
+        assert result.result is not None
+        return result.result
+
+    cache_dir = str(tmp_path / "cache")
+    cache = ActionsMetadataCache(cache_dir=cache_dir)
+    assert get(cache) == {"actions": [1]}
+    assert get(cache) == {"actions": [1]}
+    assert len(computed) == 1
+
+    # The disk tier is used by a new cache.
+    assert get(ActionsMetadataCache(cache_dir=cache_dir)) == {"actions": [1]}
+    assert len(computed) == 1
+
+    # Changes in ignored directories don't matter.
+    (package_dir / ".venv" / "lib.py").write_text("# lib changed\n")
+    assert get(cache) == {"actions": [1]}
+
+    # Changes in the code or in the package.yaml do.
+    (package_dir / "actions.py").write_text("# actions changed\n")
+    assert get(cache) == {"actions": [2]}
+    (package_dir / "package.yaml").write_text("name: Package changed\n")
+    assert get(cache) == {"actions": [3]}
+    (package_dir / "new_module.py").write_text("")
+    assert get(cache) == {"actions": [4]}
+    assert get(cache) == {"actions": [4]}
+
+    # Failures are not cached.
+    def compute_failure() -> ActionResult:
+        computed.append(1)
+        return ActionResult.make_failure("Failed")
+
+    for _i in range(2):
+        result = cache.get_or_compute(
+            "list", ("args",), package_dir, interpreter_info, compute_failure
+        )
+        assert not result.success
+    assert len(computed) == 6
+
+
+def test_actions_version_cached_per_interpreter(monkeypatch, tmp_path) -> None:
+    from sema4ai_ls_core import uris
+    from sema4ai_ls_core.cache import LRUCache
+    from sema4ai_ls_core.jsonrpc.monitor import Monitor
+    from sema4ai_ls_core.pluginmanager import PluginManager
+    from sema4ai_ls_core.protocols import ActionResult
+
+    from sema4ai_code.robo import collect_actions
+
+    launched: list[list[str]] = []
+
+    def execute_within_user_env(pm, uri, args, *_args, **_kwargs):
+        launched.append(args)
+        return ActionResult.make_success("1.3.0\n")
+
+    monkeypatch.setattr(
+        collect_actions, "_execute_within_user_env", execute_within_user_env
+    )
+
+    monkeypatch.setattr(collect_actions, "_actions_version_cache", LRUCache(50))
+
+    uri = uris.from_fs_path(str(tmp_path))
+    interpreter_info = _create_interpreter_info()
+    for _i in range(3):
+        result = collect_actions._get_actions_version(
+            PluginManager(), uri, Monitor(), interpreter_info=interpreter_info
+        )
+        assert result.result == (1, 3, 0)
+    assert len(launched) == 1
+
+    other_interpreter_info = _create_interpreter_info({"SOME_VAR": "1"})
+    collect_actions._get_actions_version(
+        PluginManager(), uri, Monitor(), interpreter_info=other_interpreter_info
+    )
+    assert len(launched) == 2
@@ -0,0 +1,86 @@
+import sys
+
+from sema4ai_ls_core.ep_resolve_interpreter import DefaultInterpreterInfo
+
+ACTION_WITHOUT_DOCSTRING = """
+from sema4ai.actions import action
+
+@action
+def my_action() -> str:
+    return ""
+"""
+
+
+def test_lint_worker_reused():
+    from sema4ai_code.robo.lint_action import _LintWorkers
+
+    lint_workers = _LintWorkers()
+    try:
+        interpreter_info = DefaultInterpreterInfo("id1", sys.executable, {}, [])
+        worker = lint_workers.get_worker(interpreter_info)
+        errors = worker.lint(ACTION_WITHOUT_DOCSTRING, 20)
+        assert errors
+        assert errors[0]["range"]["start"]["line"] >= 0
+
+        process = worker._process
+        assert process is not None
+
+        # Same environment: the same process is reused.
+        worker2 = lint_workers.get_worker(interpreter_info)
+        assert worker2 is worker
+        assert worker2.lint(ACTION_WITHOUT_DOCSTRING, 20) == errors
+        assert worker2._process is process
+
+        # Environment changed: the previous worker is shut down.
+        interpreter_info = DefaultInterpreterInfo(
+            "id1", sys.executable, {"SOME_VAR": "1"}, []
+        )
+        worker3 = lint_workers.get_worker(interpreter_info)
+        assert worker3 is not worker
+        assert not worker.is_alive()
+        assert worker3.lint(ACTION_WITHOUT_DOCSTRING, 20) == errors
+    finally:
+        lint_workers.shutdown()
+
+
+def test_lint_worker_restarted_after_exit():
+    from sema4ai_code.robo.lint_action import _LintWorker
+
+    worker = _LintWorker(sys.executable, {})
+    try:
+        errors = worker.lint(ACTION_WITHOUT_DOCSTRING, 20)
+        assert errors
+
+        worker._kill()
+        assert not worker.is_alive()
+
+        assert worker.lint(ACTION_WITHOUT_DOCSTRING, 20) == errors
+        assert worker.is_alive()
+    finally:
+        worker.shutdown()
+    assert not worker.is_alive()
+    # Failures are reported as None (so that they're not cached).
+    assert worker.lint(ACTION_WITHOUT_DOCSTRING, 20) is None
+
+
+def test_lint_worker_killed_on_cancel():
+    import pytest
+    from sema4ai_ls_core.jsonrpc.exceptions import JsonRpcRequestCancelled
+    from sema4ai_ls_core.jsonrpc.monitor import Monitor
+
+    from sema4ai_code.robo.lint_action import _LintWorker
+
+    worker = _LintWorker(sys.executable, {})
+    try:
+        monitor = Monitor()
+        monitor.cancel()
+        with pytest.raises(JsonRpcRequestCancelled):
+            worker.lint(ACTION_WITHOUT_DOCSTRING, 20, monitor)
+
+        # The worker would still be busy with the cancelled lint: it's killed
+        # and restarted in the next lint.
+        assert not worker.is_alive()
+        assert worker.lint(ACTION_WITHOUT_DOCSTRING, 20)
+        assert worker.is_alive()
+    finally:
+        worker.shutdown()
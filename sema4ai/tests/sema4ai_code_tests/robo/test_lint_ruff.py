@@ -0,0 +1,130 @@
+OK_SOURCE = """
+def method():
+    return 1
+"""
+
+UNDEFINED_NAME_SOURCE = """
+def method():
+    return undefined_name
+"""
+
+
+def test_ruff_runner_cache():
+    from sema4ai_code.robo.lint_ruff import _RuffRunner
+
+    runner = _RuffRunner()
+    original_run_ruff = runner._run_ruff
+    run_ruff_calls = []
+
+    def _run_ruff(to_check):
+        run_ruff_calls.append([pending.filename for pending in to_check])
+        return original_run_ruff(to_check)
+
+    runner._run_ruff = _run_ruff  # type: ignore
+
+    assert runner.check("my.py", OK_SOURCE) == []
+    errors = runner.check("my.py", UNDEFINED_NAME_SOURCE)
+    assert errors is not None
+    assert len(errors) == 1
+    assert errors[0]["code"] == "F821"
+    assert errors[0]["range"]["start"] == {"line": 2, "character": 11}
+    assert len(run_ruff_calls) == 2
+
+    # Same contents: results are gotten from the cache.
+    assert runner.check("my.py", UNDEFINED_NAME_SOURCE) == errors
+    assert runner.check("my.py", OK_SOURCE) == []
+    assert len(run_ruff_calls) == 2
+
+
+def test_ruff_runner_failure_not_cached():
+    from sema4ai_code.robo.lint_ruff import _RuffRunner
+
+    runner = _RuffRunner()
+    original_run_ruff = runner._run_ruff
+
+    def _run_ruff_failure(to_check):
+        raise RuntimeError("Ruff failed")
+
+    runner._run_ruff = _run_ruff_failure  # type: ignore
+    assert runner.check("my.py", UNDEFINED_NAME_SOURCE) is None
+
+    runner._run_ruff = original_run_ruff  # type: ignore
+    errors = runner.check("my.py", UNDEFINED_NAME_SOURCE)
+    assert errors is not None
+    assert len(errors) == 1
+
+
+def test_ruff_runner_batch():
+    from sema4ai_code.robo.lint_ruff import (
+        _make_cache_key,
+        _PendingRuffCheck,
+        _RuffRunner,
+    )
+
+    runner = _RuffRunner()
+    to_check = [
+        _PendingRuffCheck("a.py", OK_SOURCE, _make_cache_key("a.py", OK_SOURCE)),
+        _PendingRuffCheck(
+            "a.py",
+            UNDEFINED_NAME_SOURCE,
+            _make_cache_key("a.py", UNDEFINED_NAME_SOURCE),
+        ),
+        _PendingRuffCheck(
+            "b.py",
+            UNDEFINED_NAME_SOURCE,
+            _make_cache_key("b.py", UNDEFINED_NAME_SOURCE),
+        ),
+    ]
+    key_to_result = runner._run_ruff(to_check)
+    assert key_to_result[to_check[0].cache_key] == []
+    assert [d["code"] for d in key_to_result[to_check[1].cache_key]] == ["F821"]
+    assert [d["code"] for d in key_to_result[to_check[2].cache_key]] == ["F821"]
+
+
+def test_ruff_runner_cancel_kills_ruff():
+    import sys
+    import threading
+
+    from sema4ai_ls_core.basic import wait_for_condition
+    from sema4ai_ls_core.jsonrpc.exceptions import JsonRpcRequestCancelled
+    from sema4ai_ls_core.jsonrpc.monitor import Monitor
+    from sema4ai_ls_core.process import is_process_alive
+
+    from sema4ai_code.robo.lint_ruff import _RuffRunner
+
+    runner = _RuffRunner()
+    pids = []
+
+    def _run_ruff(to_check):
+        # Emulate a ruff process which takes a long time to finish.
+        runner._run_process(
+            [sys.executable, "-c", "import time;time.sleep(20)"], None, 30
+        )
+        return {}
+
+    runner._run_ruff = _run_ruff  # type: ignore
+
+    monitor = Monitor()
+    cancelled = threading.Event()
+
+    def check():
+        try:
+            runner.check("my.py", OK_SOURCE, monitor)
+        except JsonRpcRequestCancelled:
+            cancelled.set()
+
+    t = threading.Thread(target=check, daemon=True)
+    t.start()
+
+    def get_pid():
+        pid = runner._running_pid
+        if pid is not None:
+            pids.append(pid)
+            return True
+        return False
+
+    wait_for_condition(get_pid)
+    monitor.cancel()
+    assert cancelled.wait(10)
+    wait_for_condition(lambda: not is_process_alive(pids[0]))
+    wait_for_condition(lambda: not runner._running)
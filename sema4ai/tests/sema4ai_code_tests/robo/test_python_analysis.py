@@ -0,0 +1,108 @@
+import os
+import time
+
+_ACTIONS_CONTENTS = """
+from typing import Annotated
+
+from sema4ai.actions import action
+from sema4ai.data import DataSource, DataSourceSpec, query
+
+MyDataSource = Annotated[DataSource, DataSourceSpec(name="my_datasource", engine="files")]
+
+
+@action
+def my_action() -> str:
+    return ""
+
+
+@query(is_consequential=False)
+def my_query(datasource: MyDataSource) -> str:
+    return ""
+
+
+def not_an_action() -> str:
+    return ""
+"""
+
+
+def test_python_analysis_facts() -> None:
+    from sema4ai_code.robo.python_analysis import PythonAnalysis
+
+    analysis = PythonAnalysis(_ACTIONS_CONTENTS)
+    assert analysis.ast is not None
+    assert analysis.parse_error is None
+    assert ("sema4ai.actions", "action") in analysis.imports
+    assert ("sema4ai.data", "query") in analysis.imports
+    assert [(f.node.name, f.decorator.id) for f in analysis.decorated_functions] == [
+        ("my_action", "action")
+    ]
+    assert analysis.uses_action_decorator
+    assert [a["node"].name for a in analysis.actions] == ["my_action", "my_query"]
+    assert [d["python_variable_name"] for d in analysis.datasources] == ["MyDataSource"]
+
+    analysis = PythonAnalysis("@action\ndef error(")
+    assert analysis.ast is None
+    assert analysis.parse_error is not None
+    assert not analysis.uses_action_decorator
+    assert analysis.actions == ()
+
+    analysis = PythonAnalysis(
+        "import sema4ai.actions\n@sema4ai.actions.action()\ndef a(): pass\n"
+    )
+    assert analysis.uses_action_decorator
+
+
+def test_python_analysis_document_cache() -> None:
+    from sema4ai_ls_core.workspace import Document
+
+    from sema4ai_code.robo.python_analysis import get_document_analysis
+
+    doc = Document("uri", _ACTIONS_CONTENTS)
+    analysis = get_document_analysis(doc)
+    assert get_document_analysis(doc) is analysis
+
+    doc.source = _ACTIONS_CONTENTS + "\n@action\ndef another() -> str:\n    return ''\n"
+    new_analysis = get_document_analysis(doc)
+    assert new_analysis is not analysis
+    assert [a["node"].name for a in new_analysis.actions] == [
+        "my_action",
+        "my_query",
+        "another",
+    ]
+    assert get_document_analysis(doc) is new_analysis
+
+
+def test_python_analysis_file_cache(tmp_path) -> None:
+    from sema4ai_code.robo.python_analysis import get_file_analysis
+
+    actions_py = tmp_path / "actions.py"
+    actions_py.write_text(_ACTIONS_CONTENTS)
+    analysis = get_file_analysis(actions_py)
+    assert get_file_analysis(actions_py) is analysis
+
+    # A change in the size is noticed.
+    actions_py.write_text(_ACTIONS_CONTENTS + "\n# Comment\n")
+    new_analysis = get_file_analysis(actions_py)
+    assert new_analysis is not analysis
+    assert get_file_analysis(actions_py) is new_analysis
+
+    # A change in the mtime (with the same size) is noticed.
+    actions_py.write_text(_ACTIONS_CONTENTS + "\n# Changed\n")
+    stat = actions_py.stat()
+    os.utime(actions_py, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get_file_analysis(actions_py) is not new_analysis
+
+
+def test_benchmark_python_analysis(tmp_path) -> None:
+    from sema4ai_code.robo.collect_actions_ast import iter_actions_and_datasources
+
+    for i in range(50):
+        (tmp_path / f"actions_{i}.py").write_text(_ACTIONS_CONTENTS * 10)
+
+    n_listings = 20
+    initial_time = time.perf_counter()
+    for _i in range(n_listings):
+        assert len(list(iter_actions_and_datasources(tmp_path))) == 50 * 20
+    listing_time = time.perf_counter() - initial_time
+
+    print(f"{n_listings} listings of 50 files: {listing_time:.3f}s")
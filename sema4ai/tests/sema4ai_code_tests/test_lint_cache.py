@@ -0,0 +1,183 @@
+def _make_diagnostic(message: str) -> dict:
+    return {
+        "range": {
+            "start": {"line": 0, "character": 0},
+            "end": {"line": 0, "character": 1},
+        },
+        "severity": 1,
+        "source": "sema4ai",
+        "message": message,
+    }
+
+
+def test_diagnostics_cache_memory():
+    from sema4ai_code._lint_cache import (
+        DiagnosticsCache,
+        compute_content_hash,
+        make_fingerprint,
+    )
+
+    cache = DiagnosticsCache(max_size=10)
+    content_hash = compute_content_hash("a = 1")
+    fingerprint = make_fingerprint("env1")
+
+    computed = []
+
+    def compute():
+        computed.append(1)
+        return [_make_diagnostic("error")]
+
+    found = cache.get_or_compute("ruff", content_hash, fingerprint, compute)
+    assert found == [_make_diagnostic("error")]
+    assert cache.get_or_compute("ruff", content_hash, fingerprint, compute) == found
+    assert len(computed) == 1
+
+    # A different linter, content or fingerprint must not reuse it.
+    assert cache.get("action", content_hash, fingerprint) is None
+    assert cache.get("ruff", compute_content_hash("a = 2"), fingerprint) is None
+    assert cache.get("ruff", content_hash, make_fingerprint("env2")) is None
+
+    # Changing the returned list must not change the cache.
+    found.append(_make_diagnostic("other"))
+    assert cache.get("ruff", content_hash, fingerprint) == [_make_diagnostic("error")]
+
+    # Failures (None) are not cached.
+    def compute_failure():
+        computed.append(1)
+        return None
+
+    other_hash = compute_content_hash("a = 3")
+    for _i in range(2):
+        assert (
+            cache.get_or_compute("ruff", other_hash, fingerprint, compute_failure) == []
+        )
+    assert cache.get("ruff", other_hash, fingerprint) is None
+    assert len(computed) == 3
+
+
+def test_diagnostics_cache_disk(tmpdir):
+    from sema4ai_code._lint_cache import DiagnosticsCache
+
+    cache_dir = str(tmpdir.join("cache"))
+    cache = DiagnosticsCache(max_size=10, cache_dir=cache_dir, max_disk_entries=3)
+    cache.put("ruff", "hash1", "fp", [_make_diagnostic("persisted")])
+    cache.put("rcc", "hash1", "fp", [_make_diagnostic("memory")], persist=False)
+
+    # A new cache (i.e.: new process) gets the persisted entries from the disk.
+    cache = DiagnosticsCache(max_size=10, cache_dir=cache_dir, max_disk_entries=3)
+    assert cache.get("ruff", "hash1", "fp") == [_make_diagnostic("persisted")]
+    assert cache.get("rcc", "hash1", "fp") is None
+
+    for i in range(10):
+        cache.put("ruff", f"hash{i}", "fp", [])
+    cache._prune_disk_entries()
+    assert len(tmpdir.join("cache").listdir()) == 3
+
+
+def test_agent_spec_fingerprint(tmpdir):
+    from pathlib import Path
+
+    from sema4ai_ls_core.basic import wait_for_condition
+
+    from sema4ai_code._lint import _agent_spec_fingerprint
+    from sema4ai_code.agents.list_actions_from_agent import (
+        clear_action_packages_inventories,
+    )
+
+    agent_root = Path(str(tmpdir))
+    agent_spec = agent_root / "agent-spec.yaml"
+    agent_spec.write_text("agent-package: {}\n")
+    (agent_root / "runbook.md").write_text("runbook")
+    package_dir = agent_root / "actions" / "MyActions" / "package"
+    package_dir.mkdir(parents=True)
+    (package_dir / "package.yaml").write_text("name: package\n")
+    (package_dir / "src").mkdir()
+
+    try:
+        initial = _agent_spec_fingerprint(str(agent_spec))
+        assert _agent_spec_fingerprint(str(agent_spec)) == initial
+
+        # Changes in files which are not checked don't matter.
+        (package_dir / "src" / "actions.py").write_text("# actions")
+        assert _agent_spec_fingerprint(str(agent_spec)) == initial
+
+        # A new action package is noticed.
+        other_package_dir = agent_root / "actions" / "MyActions" / "other"
+        other_package_dir.mkdir()
+        (other_package_dir / "package.yaml").write_text("name: other\n")
+        wait_for_condition(lambda: _agent_spec_fingerprint(str(agent_spec)) != initial)
+
+        # Changes in the package.yaml or in the agent dir are noticed.
+        fingerprint = _agent_spec_fingerprint(str(agent_spec))
+        (package_dir / "package.yaml").write_text("name: package changed\n")
+        assert _agent_spec_fingerprint(str(agent_spec)) != fingerprint
+
+        fingerprint = _agent_spec_fingerprint(str(agent_spec))
+        (agent_root / "runbook.md").unlink()
+        assert _agent_spec_fingerprint(str(agent_spec)) != fingerprint
+    finally:
+        clear_action_packages_inventories()
+
+
+def test_rcc_fingerprint(tmpdir):
+    import os
+    from pathlib import Path
+
+    from sema4ai_code._lint import _rcc_fingerprint
+
+    robot_root = Path(str(tmpdir))
+    robot_yaml = robot_root / "robot.yaml"
+    robot_yaml.write_text("condaConfigFile: conda.yaml\n")
+    conda_yaml = robot_root / "conda.yaml"
+    conda_yaml.write_text("dependencies: []\n")
+
+    initial = _rcc_fingerprint(str(robot_yaml))
+    assert _rcc_fingerprint(str(robot_yaml)) == initial
+
+    # Changes in the referenced conda.yaml are noticed.
+    conda_yaml.write_text("dependencies:\n- python=3.10\n")
+    os.utime(conda_yaml, (1, 1))
+    fingerprint = _rcc_fingerprint(str(robot_yaml))
+    assert fingerprint != initial
+
+    # Files not referenced don't matter.
+    (robot_root / "other.yaml").write_text("a: 1\n")
+    assert _rcc_fingerprint(str(robot_yaml)) == fingerprint
+
+
+def test_rcc_diagnostics_failure_not_cached():
+    from sema4ai_ls_core.protocols import ActionResult
+
+    from sema4ai_code._lint import collect_rcc_configuration_diagnostics
+    from sema4ai_code._lint_cache import DiagnosticsCache
+
+    class _RccStub:
+        def __init__(self):
+            self.result = ActionResult(success=False, message="rcc failed")
+            self.calls = 0
+
+        def configuration_diagnostics(self, robot_yaml, json=True, on_pid=None):
+            self.calls += 1
+            return self.result
+
+    rcc = _RccStub()
+    cache = DiagnosticsCache()
+
+    def compute():
+        return collect_rcc_configuration_diagnostics(rcc, "robot.yaml")
+
+    assert cache.get_or_compute("rcc", "hash", "fingerprint", compute) == []
+    assert rcc.calls == 1
+
+    # The failure wasn't cached: rcc is run again.
+    rcc.result = ActionResult(
+        success=True,
+        message=None,
+        result='{"checks": [{"status": "fail", "message": "Bad config"}]}',
+    )
+    diagnostics = cache.get_or_compute("rcc", "hash", "fingerprint", compute)
+    assert [d["message"] for d in diagnostics] == ["Bad config"]
+    assert rcc.calls == 2
+
+    assert cache.get_or_compute("rcc", "hash", "fingerprint", compute) == diagnostics
+    assert rcc.calls == 2
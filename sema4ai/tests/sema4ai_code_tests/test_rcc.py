@@ -388,6 +388,200 @@ def test_get_robot_yaml_environ(rcc: IRcc, datadir, holotree_manager):
     )
 
 
+class _RccHashStandIn:
+    def holotree_hash(self, conda_yaml_contents: str, file_path: str):
+        # i.e.: rcc is not available (contents are compared directly).
+        return ActionResult.make_failure("rcc not available")
+
+
+def test_holotree_manager_space_index(tmpdir, monkeypatch):
+    from sema4ai_code.holetree_manager import HolotreeManager
+    from sema4ai_code.rcc_space_info import RCCSpaceInfo
+
+    directory = Path(str(tmpdir)) / "spaces"
+
+    def create_manager(max_number_of_spaces=20):
+        return HolotreeManager(
+            _RccHashStandIn(),  # type: ignore
+            directory,
+            max_number_of_spaces=max_number_of_spaces,
+            timeout_to_reuse_space=TIMEOUT_TO_REUSE_SPACE,
+        )
+
+    compared = []
+    original_conda_contents_match = RCCSpaceInfo.conda_contents_match
+
+    def conda_contents_match(self, *args, **kwargs):
+        compared.append(self.space_name)
+        return original_conda_contents_match(self, *args, **kwargs)
+
+    monkeypatch.setattr(RCCSpaceInfo, "conda_contents_match", conda_contents_match)
+
+    conda_yaml = Path(str(tmpdir)) / "conda.yaml"
+    holotree_manager = create_manager()
+    for i in range(15):
+        space = holotree_manager.compute_valid_space_info(
+            conda_yaml, f"dependencies:\n- python={i}\n"
+        )
+        assert space.space_name == "vscode-%02d" % (i + 1)
+
+    # The index makes the match found without comparing the other spaces
+    # (even in a new manager/process).
+    del compared[:]
+    holotree_manager = create_manager()
+    space = holotree_manager.compute_valid_space_info(
+        conda_yaml, "# comment\ndependencies:\n- python=12\n"
+    )
+    assert space.space_name == "vscode-13"
+    assert compared == ["vscode-13"]
+
+    # If the contents are changed externally the index entry is stale and the
+    # contents are compared.
+    del compared[:]
+    conda_contents_path = directory / "vscode-02" / "conda.yaml"
+    conda_contents_path.write_text("dependencies:\n- python=100\n\n", "utf-8")
+    space = holotree_manager.compute_valid_space_info(
+        conda_yaml, "dependencies:\n- python=100\n"
+    )
+    assert space.space_name == "vscode-02"
+    assert compared == ["vscode-02"]
+
+    # A space without an index entry (i.e.: created by an older version) is
+    # still found (and is then added to the index).
+    (directory / "space_index.json").unlink()
+    del compared[:]
+    holotree_manager = create_manager()
+    space = holotree_manager.compute_valid_space_info(
+        conda_yaml, "dependencies:\n- python=3\n"
+    )
+    assert space.space_name == "vscode-04"
+    assert compared == ["vscode-01", "vscode-02", "vscode-03", "vscode-04"]
+    del compared[:]
+    space = holotree_manager.compute_valid_space_info(
+        conda_yaml, "dependencies:\n- python=3\n"
+    )
+    assert space.space_name == "vscode-04"
+    assert compared == ["vscode-04"]
+
+    # When all the spaces are used, the least recently used one is reclaimed.
+    holotree_manager = create_manager(max_number_of_spaces=15)
+    space = holotree_manager.compute_valid_space_info(
+        conda_yaml, "dependencies:\n- python=200\n"
+    )
+    assert space.space_name == "vscode-01"
+    space = holotree_manager.compute_valid_space_info(
+        conda_yaml, "dependencies:\n- python=200\n"
+    )
+    assert space.space_name == "vscode-01"
+
+
+def test_holotree_manager_max_number_of_spaces(tmpdir, monkeypatch):
+    from sema4ai_code.holetree_manager import HolotreeManager
+
+    monkeypatch.setenv("SEMA4AI_CODE_MAX_HOLOTREE_SPACES", "30")
+    holotree_manager = HolotreeManager(
+        _RccHashStandIn(),  # type: ignore
+        Path(str(tmpdir)),
+    )
+    assert len(list(holotree_manager._iter_target_space_names())) == 30
+
+    monkeypatch.setenv("SEMA4AI_CODE_MAX_HOLOTREE_SPACES", "invalid")
+    holotree_manager = HolotreeManager(
+        _RccHashStandIn(),  # type: ignore
+        Path(str(tmpdir)),
+    )
+    assert len(list(holotree_manager._iter_target_space_names())) == 10
+
+
+def test_space_state_waiter(tmpdir):
+    import threading
+
+    from sema4ai_code.rcc_space_info import (
+        RCCSpaceInfo,
+        SpaceState,
+        SpaceStateWaiter,
+    )
+
+    space_info = RCCSpaceInfo.from_directory(Path(str(tmpdir)), "vscode-01")
+    space_info.space_path.mkdir()
+    space_info.write_state(SpaceState.ENV_REQUESTED)
+
+    with SpaceStateWaiter(space_info) as waiter:
+        assert not waiter.wait(0.1)
+
+        # Changed in this process.
+        initial_time = time.time()
+        threading.Timer(0.1, space_info.write_state, (SpaceState.ENV_READY,)).start()
+        assert waiter.wait(10)
+        assert time.time() - initial_time < 2
+        assert space_info.load_state() == SpaceState.ENV_READY
+
+        # Changed in another process (only noticed through the file-watch).
+        initial_time = time.time()
+        threading.Timer(
+            0.1,
+            space_info.state_path.write_text,
+            (SpaceState.CREATED.value, "utf-8"),
+        ).start()
+        while space_info.load_state() != SpaceState.CREATED:
+            assert waiter.wait(10)
+        assert time.time() - initial_time < 2
+
+
+def test_rcc_mutex_per_space(monkeypatch):
+    import threading
+
+    from sema4ai_ls_core import progress_report
+
+    from sema4ai_code import rcc as rcc_module
+
+    class _ProgressReporterStandIn:
+        def __init__(self):
+            self.additional_info = []
+
+        def set_additional_info(self, additional_info):
+            self.additional_info.append(additional_info)
+
+    progress_reporter = _ProgressReporterStandIn()
+    monkeypatch.setattr(
+        progress_report, "get_current_progress_reporter", lambda: progress_reporter
+    )
+    monkeypatch.setattr(rcc_module, "_REPORT_MUTEX_WAIT_AFTER_SECONDS", 0.05)
+
+    # Note: the mutexes are system-wide, so, use names unique to this test.
+    pid = os.getpid()
+    space1 = rcc_module.get_holotree_space_mutex_name(f"test-{pid}-01")
+    space2 = rcc_module.get_holotree_space_mutex_name(f"test-{pid}-02")
+    assert space1 != space2
+
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold_space1():
+        with rcc_module._acquire_rcc_mutex(space1):
+            acquired.set()
+            release.wait(10)
+
+    t = threading.Thread(target=hold_space1, daemon=True)
+    t.start()
+    assert acquired.wait(10)
+
+    # Different spaces/operations don't block each other.
+    with rcc_module._acquire_rcc_mutex(space2):
+        with rcc_module._acquire_rcc_mutex(f"test_rcc_cloud_activity_{pid}"):
+            pass
+    assert progress_reporter.additional_info == []
+
+    # Waiting for the same space is reported.
+    threading.Timer(0.3, release.set).start()
+    with rcc_module._acquire_rcc_mutex(space1):
+        pass
+    t.join(10)
+    assert len(progress_reporter.additional_info) == 2
+    assert space1 in progress_reporter.additional_info[0]
+    assert "Lock acquired" in progress_reporter.additional_info[1]
+
+
 @pytest.mark.rcc_env
 def test_get_robot_yaml_environ_not_ok(rcc: IRcc, datadir, holotree_manager):
     # Test what happens when things go don't go as planned (i.e.: an environment
@@ -443,3 +637,23 @@ def test_rcc_timeout(rcc):
         timeout=0.0001,
     )
     assert result.message.startswith("Timed out (0.0001s elapsed) when running: ")
+
+
+def test_check_output_notifying_pid():
+    import subprocess
+    import sys
+
+    from sema4ai_code.rcc import _check_output_notifying_pid
+
+    pids: List[int] = []
+    output = _check_output_notifying_pid(
+        [sys.executable, "-c", "print('ok')"], 30, pids.append
+    )
+    assert output.strip() == b"ok"
+    assert len(pids) == 1
+
+    with pytest.raises(subprocess.CalledProcessError):
+        _check_output_notifying_pid(
+            [sys.executable, "-c", "import sys;sys.exit(1)"], 30, pids.append
+        )
+    assert len(pids) == 2
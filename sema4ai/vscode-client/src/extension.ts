@@ -982,6 +982,12 @@ export async function doActivate(context: ExtensionContext, C: CommandRegistry)
                         refreshCloudTreeView();
                     })
                 );
+                context.subscriptions.push(
+                    langServer.onNotification("$/actionsChanged", () => {
+                        // The actions/datasources of some action package changed.
+                        refreshTreeView(TREE_VIEW_SEMA4AI_TASK_PACKAGES_TREE);
+                    })
+                );
                 context.subscriptions.push(
                     langServer.onRequest("$/executeWorkspaceCommand", async (args: ExecuteWorkspaceCommandArgs) => {
                         // OUTPUT_CHANNEL.appendLine(args.command + " - " + args.arguments);
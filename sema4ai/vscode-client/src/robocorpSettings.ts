@@ -24,6 +24,7 @@ export const SEMA4AI_VAULT_TOKEN_TIMEOUT_IN_MINUTES = "sema4ai.vaultTokenTimeout
 export const SEMA4AI_CODE_LENS_ROBO_LAUNCH = "sema4ai.codeLens.roboLaunch";
 export const SEMA4AI_CODE_LENS_ACTIONS_LAUNCH = "sema4ai.codeLens.actionsLaunch";
 export const SEMA4AI_CODE_LENS_DEV_TASK = "sema4ai.codeLens.devTask";
+export const SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY = "sema4ai.lint.manualLintConcurrency";
 
 export function getLanguageServerTcpPort(): number {
     let key = SEMA4AI_LANGUAGE_SERVER_TCP_PORT;
@@ -248,3 +249,18 @@ export async function setCodelensDevtask(value): Promise<void> {
     let config = workspace.getConfiguration(key.slice(0, i));
     await config.update(key.slice(i + 1), value, ConfigurationTarget.Global);
 }
+
+
+export function getLintManuallintconcurrency(): number {
+    let key = SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY;
+    return get<number>(key);
+}
+
+
+export async function setLintManuallintconcurrency(value): Promise<void> {
+    let key = SEMA4AI_LINT_MANUAL_LINT_CONCURRENCY;
+    let i = key.lastIndexOf('.');
+
+    let config = workspace.getConfiguration(key.slice(0, i));
+    await config.update(key.slice(i + 1), value, ConfigurationTarget.Global);
+}